@@ -8,80 +8,85 @@ Perfekt til geografiske kort.
 
 import pandas as pd
 from pathlib import Path
-from utils import find_latest_file, load_parquet
+from datastore import DataStore
+from filplacering import output_sti
+from utils import atomisk
 
-def aggreger_afstemningsomraade(valgtype='KOMMUNAL'):
-    """Aggreger valgresultater per afstemningsområde + parti"""
+# Kolonner fra afstemningsområde-dimensionen (kolonne-projektion)
+GEO_KOLONNER = {
+    'Dagi_id': 'Dagi_id',
+    'Afstemningssted.Navn': 'Afstemningssted',
+    'Afstemningssted.Adgangsadresse.Adressebetegnelse': 'Adresse',
+}
 
-    print(f"📍 Aggregerer {valgtype} per afstemningsområde...")
+# Valgtype -> (Valgart i område-matricen, navn i output-filen)
+VALGTYPER = {
+    'KOMMUNAL': ('Kommunalvalg', 'Kommunal'),
+    'REGIONAL': ('Regionsrådsvalg', 'Regionsraads'),
+}
 
-    # 1. Load afstemningsområder med geografisk data
-    geo_dir = Path('excel_output/04_Reference_Geografi')
-    afstem_fil = find_latest_file(str(geo_dir / 'Afstemningsomraade-*.xlsx'))
 
-    if not afstem_fil:
+def dagi_nøgle(værdier):
+    """DAGI-id som nullable heltal (også hvis kilden har dem som tekst)"""
+    return pd.to_numeric(værdier, errors='coerce').astype('Int64')
+
+
+def aggreger_afstemningsomraade(store=None):
+    """
+    Aggreger valgresultater per afstemningsområde + parti for begge valgtyper.
+
+    Område-matricen for alle valg og afstemningsområde-dimensionen læses og
+    joines én gang; resultatet deles derefter per valgtype.
+
+    Returns:
+        {valgtype: DataFrame} ('KOMMUNAL', 'REGIONAL' - kun dem der har data)
+        eller None hvis data mangler
+    """
+    store = store or DataStore('excel_output')
+
+    print("📍 Aggregerer per afstemningsområde...")
+
+    # 1. Afstemningsområder med geografisk data (typet dimensionstabel)
+    afstem = store.geography('Afstemningsomraade', columns=list(GEO_KOLONNER))
+
+    if afstem is None or 'Dagi_id' not in afstem.columns:
         print("❌ Kunne ikke finde afstemningsområde-fil")
         return None
 
-    print(f"📖 Læser geografisk data: {Path(afstem_fil).name}")
-    afstem = pd.read_excel(afstem_fil)
-
-    # Behold relevante kolonner
-    geo_data = afstem[[
-        'Dagi_id',
-        'Navn',
-        'Kommunekode',
-        'Afstemningssted.Navn',
-        'Afstemningssted.Adgangsadresse.Adressebetegnelse'
-    ]].copy()
-
-    geo_data.rename(columns={
-        'Navn': 'Afstemningsområde',
-        'Afstemningssted.Navn': 'Afstemningssted',
-        'Afstemningssted.Adgangsadresse.Adressebetegnelse': 'Adresse'
-    }, inplace=True)
-
-    # 2. Load valgresultater
-    parquet_dir = Path('excel_output/parquet')
-    valgres_fil = find_latest_file(str(parquet_dir / f'valgresultater_{valgtype}_*.parquet'))
-
-    if not valgres_fil:
-        print(f"❌ Kunne ikke finde valgresultater for {valgtype}")
+    print(f"📖 Læser geografisk data: {Path(store.find_file('Afstemningsomraade')).name}")
+    geo_data = afstem.rename(columns=GEO_KOLONNER).assign(Dagi_id=lambda d: dagi_nøgle(d['Dagi_id']))
+
+    # 2. Område × parti matrix for alle valg (materialiseret af converteren)
+    matrix = store.area_matrix('ALLE_VALG')
+
+    if matrix is None:
+        print("❌ Kunne ikke finde valgresultater")
         return None
 
-    print(f"📖 Læser valgresultater: {Path(valgres_fil).name}")
-    valgres = load_parquet(valgres_fil)
+    print(f"📖 Læser område × parti matrix: {len(matrix.områder)} områder × {len(matrix.partier)} partier")
 
-    # 3. Dedupliker ListeStemmer per område + parti (kun én gang per område)
-    print(f"📊 Deduplikerer og aggregerer...")
-    valgres_dedup = valgres.groupby(
-        ['Kommune', 'AfstemningsområdeDagiId', 'Afstemningsområde', 'ListeNavn']
-    )['ListeStemmer'].first().reset_index()
+    # 3. Én række per område + parti (ListeStemmer er allerede deduplikeret i matricen)
+    print(f"📊 Aggregerer...")
+    valgres_dedup = matrix.to_long()[
+        ['Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'Afstemningsområde', 'ListeNavn', 'ListeStemmer']
+    ].sort_values(['Kommune', 'AfstemningsområdeDagiId', 'Afstemningsområde', 'ListeNavn'])
 
-    # 4. Join med geografisk data
+    # 4. Join med geografisk data på heltals-DAGI-id
     print(f"🔗 Joiner med geografisk data...")
-    resultat = valgres_dedup.merge(
-        geo_data,
-        left_on='AfstemningsområdeDagiId',
-        right_on='Dagi_id',
-        how='left'
+    resultat = valgres_dedup.assign(Dagi_id=dagi_nøgle(valgres_dedup['AfstemningsområdeDagiId'])).merge(
+        geo_data, on='Dagi_id', how='left'
     )
 
-    # Drop duplikerede kolonner
     resultat = resultat[[
+        'Valgart',
         'Kommune',
-        'Afstemningsområde_x',
+        'Afstemningsområde',
         'Afstemningssted',
         'Adresse',
         'ListeNavn',
         'ListeStemmer',
         'AfstemningsområdeDagiId'
-    ]].copy()
-
-    resultat.rename(columns={
-        'Afstemningsområde_x': 'Afstemningsområde',
-        'ListeStemmer': 'TotalStemmer'
-    }, inplace=True)
+    ]].rename(columns={'ListeStemmer': 'TotalStemmer'})
 
     # Sorter
     resultat = resultat.sort_values(
@@ -89,41 +94,58 @@ def aggreger_afstemningsomraade(valgtype='KOMMUNAL'):
         ascending=[True, True, False]
     )
 
-    print(f"✅ {len(resultat):,} rækker genereret")
-    print(f"   {resultat['Kommune'].nunique()} kommuner")
-    print(f"   {resultat['Afstemningsområde'].nunique()} afstemningsområder")
-    print(f"   {resultat['ListeNavn'].nunique()} partier")
+    # 5. Del op per valgtype
+    valgart = resultat.pop('Valgart').fillna('')
+    resultater = {}
+    for valgtype, (navn, _) in VALGTYPER.items():
+        del_resultat = resultat[valgart.str.contains(navn, regex=False).to_numpy()]
+        if del_resultat.empty:
+            print(f"❌ Kunne ikke finde valgresultater for {valgtype}")
+            continue
+
+        print(f"\n✅ {valgtype}: {len(del_resultat):,} rækker genereret")
+        print(f"   {del_resultat['Kommune'].nunique()} kommuner")
+        print(f"   {del_resultat['Afstemningsområde'].nunique()} afstemningsområder")
+        print(f"   {del_resultat['ListeNavn'].nunique()} partier")
+        resultater[valgtype] = del_resultat
+
+    return resultater
 
-    return resultat
 
-def main():
+def main(output_dir='excel_output', store=None):
     print("="*80)
     print("AGGREGERING PER AFSTEMNINGSOMRÅDE")
     print("="*80)
     print()
 
-    # Lav begge valgtyper
-    for valgtype in ['KOMMUNAL', 'REGIONAL']:
-        print()
-        resultat = aggreger_afstemningsomraade(valgtype)
+    # Begge valgtyper i én gennemgang
+    resultater = aggreger_afstemningsomraade(store or DataStore(output_dir))
+    if not resultater:
+        return
 
-        if resultat is not None:
-            # Gem til Excel
-            output_dir = Path('excel_output/03_Samlet_Alle_Valg')
-            output_dir.mkdir(parents=True, exist_ok=True)
+    from datetime import datetime
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M')
 
-            from datetime import datetime
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+    for valgtype, resultat in resultater.items():
+        valgart_navn = VALGTYPER[valgtype][1]
+        output_fil = output_sti(output_dir, f'resultater_per_afstemningsomraade_{valgart_navn}_{timestamp}.xlsx')
 
-            valgart_navn = 'Kommunal' if valgtype == 'KOMMUNAL' else 'Regionsraads'
-            output_fil = output_dir / f'resultater_per_afstemningsomraade_{valgart_navn}_{timestamp}.xlsx'
+        print()
+        with atomisk(output_fil) as tmp:
+            resultat.to_excel(tmp, index=False, engine='openpyxl')
+        print(f"💾 Gemt: {output_fil.name}")
 
-            resultat.to_excel(output_fil, index=False, engine='openpyxl')
-            print(f"💾 Gemt: {output_fil.name}")
+        # Vis preview
+        print(f"\n👀 Preview ({valgart_navn}):")
+        print(resultat.head(20).to_string(index=False))
 
-            # Vis preview
-            print(f"\n👀 Preview ({valgart_navn}):")
-            print(resultat.head(20).to_string(index=False))
 
 if __name__ == '__main__':
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Aggreger valgresultater per afstemningsområde + parti')
+    parser.add_argument('--output-dir', default='excel_output',
+                       help='Output directory (default: excel_output)')
+
+    args = parser.parse_args()
+    main(args.output_dir)
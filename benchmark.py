@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Skaleringsbenchmark for converter og analyser
+
+For hver skala genereres syntetiske valgdata (syntetiske_data.py), og
+converteren og de valgte analyse-stager køres én ad gangen - hver i sin egen,
+friske proces, så hukommelsens højvandsmærke (peak RSS) er stagens eget.
+Hver stage måles med pipeline_metrics.StageMåling (vægtid, CPU, peak RSS, I/O,
+cache-opslag) ligesom i pipelinen.
+
+Resultaterne gemmes i benchmark_resultater.json med kodeversion (git), så
+kørsler fra forskellige versioner kan sammenlignes (--sammenlign FIL). For
+hver stage beregnes en skaleringseksponent mellem to skalaer:
+
+    eksponent = log(tid_2 / tid_1) / log(skala_2 / skala_1)
+
+~1 er lineær skalering; over SKALERINGSGRÆNSE regnes stagen for at være holdt
+op med at skalere. Den første stage der bryder grænsen, fejler eller rammer
+timeout (ved den mindste skala) rapporteres - en stage der har fejlet,
+springes over ved de større skalaer.
+
+Brug: python benchmark.py [--skalaer 1 10 100] [--udgivelser 3] [--stager convert magt ...]
+      [--arbejdsmappe benchmark] [--output benchmark_resultater.json] [--sammenlign FIL]
+      [--timeout 3600] [--behold]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+from pipeline import STAGE_GRAF, ANALYSE_STAGES, VALGFRIE_STAGES, _kør_stage_i_worker
+from pipeline_metrics import StageMåling, tabel_rækker, load_forrige, sammenlign
+import syntetiske_data
+
+BENCHMARK_FIL = 'benchmark_resultater.json'
+STANDARD_SKALAER = [1, 2, 5]
+STANDARD_STAGER = ['convert'] + ANALYSE_STAGES
+
+# Skaleringseksponent (vægtid) over denne grænse = stagen skalerer superlineært
+SKALERINGSGRÆNSE = 1.25
+
+# Mapper inde i hver skalas arbejdsmappe
+JSON_MAPPE = 'json'
+OUTPUT_MAPPE = 'excel_output'
+
+
+def skala_navn(skala):
+    """Nøgle for en skala i resultatfilen (1 -> '1', 0.5 -> '0.5')"""
+    return f'{skala:g}'
+
+
+def kode_version():
+    """Git-commit for koden (med '-dirty' ved lokale ændringer) - None uden git"""
+    rod = Path(__file__).parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=rod,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        ændret = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=rod,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if ændret else commit
+
+
+def _kør_i_mappe(mappe, name, log_fil, resultat):
+    """Worker: kør stagen i skalaens arbejdsmappe med output til log_fil"""
+    os.chdir(mappe)
+    if name == 'convert':
+        args, kwargs = (JSON_MAPPE, OUTPUT_MAPPE), {'karantæne': False}
+    else:
+        args, kwargs = (OUTPUT_MAPPE,), {}
+    store_dir = OUTPUT_MAPPE if STAGE_GRAF[name].get('store', True) else None
+
+    with open(log_fil, 'w', encoding='utf-8') as log, redirect_stdout(log), redirect_stderr(log):
+        ok, fejl, tb, _, metrics = _kør_stage_i_worker(name, args, kwargs, store_dir)
+        if tb:
+            print(tb)
+    resultat.put((ok, fejl, metrics))
+
+
+def kør_stage(mappe, name, timeout=None):
+    """
+    Kør én stage i en frisk proces og mål den.
+
+    Returns:
+        {'status': 'ok' | 'fejl' | 'timeout', **metrics, 'fejl': tekst}
+    """
+    ctx = multiprocessing.get_context('spawn')
+    resultat = ctx.Queue()
+    log_fil = Path(mappe) / 'logs' / f'{name}.log'
+    log_fil.parent.mkdir(exist_ok=True)
+
+    start = time.perf_counter()
+    proces = ctx.Process(target=_kør_i_mappe, args=(str(mappe), name, str(log_fil), resultat))
+    proces.start()
+    while True:
+        levende = proces.is_alive()
+        try:
+            ok, fejl, metrics = resultat.get(timeout=1)
+            break
+        except queue.Empty:
+            varighed = round(time.perf_counter() - start, 3)
+            if not levende:
+                # Processen døde uden resultat (fx stoppet af OOM-killeren)
+                return {'status': 'fejl', 'wall_s': varighed,
+                        'fejl': f'processen stoppede (exitcode {proces.exitcode})'}
+            if timeout is not None and varighed > timeout:
+                proces.terminate()
+                proces.join()
+                return {'status': 'timeout', 'wall_s': varighed, 'fejl': f'over {timeout:g}s'}
+    proces.join()
+    return {'status': 'ok' if ok else 'fejl', **metrics, **({'fejl': fejl} if fejl else {})}
+
+
+def datasæt_rækker(output_dir):
+    """Rækker i converterens datasæt (ALLE_VALG) - bruges som stagernes input-størrelse"""
+    from datastore import DataStore, DATASETS
+
+    store = DataStore(output_dir)
+    rækker = {}
+    for dataset in DATASETS:
+        fil = store.find_file(dataset)
+        rækker[dataset] = tabel_rækker([Path(fil)]) if fil else None
+    return rækker
+
+
+def kør_skala(skala, mappe, stager, udgivelser=1, seed=2025, timeout=None, springes=()):
+    """
+    Generér data for én skala og kør stagerne.
+
+    Args:
+        springes: Stager der springes over (fejlede ved en mindre skala)
+
+    Returns:
+        {'data': optælling fra generatoren, 'rækker': {datasæt: rækker},
+         'stager': {stage: metrics}}
+    """
+    mappe = Path(mappe)
+    if mappe.exists():
+        shutil.rmtree(mappe)
+    mappe.mkdir(parents=True)
+
+    print(f"\n📐 Skala {skala_navn(skala)}")
+    måling = StageMåling()
+    with måling:
+        data = syntetiske_data.generer(mappe / JSON_MAPPE, skala, udgivelser, seed,
+                                       borgmestre_fil=mappe / 'borgmestre_parsed.csv')
+    print(f"  🧪 Data: {data['kommuner']} kommuner, {data['afstemningsområder']:,} afstemningsområder, "
+          f"{data['kandidater']:,} kandidater, {data['filer']:,} filer ({data['bytes'] / 1024 ** 2:.0f} MB) "
+          f"på {måling.metrics['wall_s']:.1f}s")
+
+    resultat = {'data': {**data, 'generering_s': måling.metrics['wall_s']}, 'rækker': {}, 'stager': {}}
+    for name in stager:
+        if name in springes:
+            resultat['stager'][name] = {'status': 'sprunget over'}
+            print(f"  ⏭️  {name}: sprunget over (fejlede ved mindre skala)")
+            continue
+        if name != 'convert' and resultat['stager'].get('convert', {'status': 'ok'})['status'] != 'ok':
+            resultat['stager'][name] = {'status': 'sprunget over'}
+            continue
+
+        m = kør_stage(mappe, name, timeout)
+        if name == 'convert':
+            m['rækker_ind'] = data['filer']
+            if m['status'] == 'ok':
+                resultat['rækker'] = datasæt_rækker(mappe / OUTPUT_MAPPE)
+                m['rækker_ud'] = sum(r or 0 for r in resultat['rækker'].values())
+        else:
+            antal = [resultat['rækker'].get(i) for i in STAGE_GRAF[name]['inputs']]
+            antal = [a for a in antal if a is not None]
+            m['rækker_ind'] = sum(antal) if antal else None
+        resultat['stager'][name] = m
+
+        if m['status'] == 'ok':
+            print(f"  ✅ {name}: {m['wall_s']:.1f}s, CPU {m['cpu_s']:.1f}s, peak {m['peak_rss_mb'] or 0:.0f} MB")
+        else:
+            print(f"  ❌ {name}: {m['status']} - {m.get('fejl', '')} (se {mappe / 'logs' / f'{name}.log'})")
+    return resultat
+
+
+def eksponent(før, nu, skala_før, skala_nu):
+    """Skaleringseksponent log(nu/før) / log(skala_nu/skala_før) (None hvis udefineret)"""
+    if not før or not nu or skala_før == skala_nu:
+        return None
+    return round(math.log(nu / før) / math.log(skala_nu / skala_før), 2)
+
+
+def skalering(skalaer, grænse=SKALERINGSGRÆNSE):
+    """
+    Skaleringseksponenter per stage mellem på hinanden følgende skalaer.
+
+    Args:
+        skalaer: {skala-navn: resultat fra kør_skala}
+
+    Returns:
+        ({stage: [{'fra', 'til', 'wall', 'peak_rss'}]},
+         {'stage', 'skala', 'grund'} for den første stage der holder op med at skalere, eller None)
+    """
+    rækkefølge = sorted(skalaer, key=float)
+    stager = list(dict.fromkeys(s for navn in rækkefølge for s in skalaer[navn]['stager']))
+    eksponenter = {}
+    brud = []
+    for stage in stager:
+        eksponenter[stage] = []
+        forrige = None
+        for navn in rækkefølge:
+            m = skalaer[navn]['stager'].get(stage)
+            if m is None or m['status'] == 'sprunget over':
+                continue
+            if m['status'] != 'ok':
+                brud.append((float(navn), math.inf, stage, m['status']))
+                break
+            if forrige is not None:
+                fra, før = forrige
+                e = {
+                    'fra': fra,
+                    'til': navn,
+                    'wall': eksponent(før['wall_s'], m['wall_s'], float(fra), float(navn)),
+                    'peak_rss': eksponent(før.get('peak_rss_mb'), m.get('peak_rss_mb'), float(fra), float(navn)),
+                }
+                eksponenter[stage].append(e)
+                if e['wall'] is not None and e['wall'] > grænse:
+                    brud.append((float(navn), e['wall'], stage, f"eksponent {e['wall']} ({fra}→{navn})"))
+            forrige = (navn, m)
+
+    if not brud:
+        return eksponenter, None
+    # Mindste skala først; ved samme skala den dårligste eksponent (fejl/timeout = uendelig)
+    skala, _, stage, grund = min(brud, key=lambda b: (b[0], -b[1]))
+    return eksponenter, {'stage': stage, 'skala': skala_navn(skala), 'grund': grund}
+
+
+def sammenlign_versioner(nu, forrige):
+    """
+    Ændring per skala og stage i forhold til en tidligere benchmark-kørsel.
+
+    Returns:
+        {skala: {stage: ændring (se pipeline_metrics.sammenlign)}} for skalaer i begge kørsler
+    """
+    ændring = {}
+    for navn, resultat in nu['skalaer'].items():
+        før = forrige.get('skalaer', {}).get(navn)
+        if før:
+            før_ok = {s: {**m, 'kørsel': forrige.get('start')} for s, m in før['stager'].items()
+                      if m.get('status') == 'ok'}
+            ændring[navn] = sammenlign(resultat['stager'], før_ok)
+    return ændring
+
+
+def print_rapport(resultater):
+    """Tabel: vægtid og peak RSS per stage og skala + skaleringseksponenter"""
+    skalaer = sorted(resultater['skalaer'], key=float)
+    stager = list(dict.fromkeys(s for n in skalaer for s in resultater['skalaer'][n]['stager']))
+
+    print("\n" + "=" * 80)
+    print(f"BENCHMARK (version {resultater['version'] or 'ukendt'})")
+    print("=" * 80)
+    print(f"{'Stage':<12}" + ''.join(f"{'×' + n:>18}" for n in skalaer) + f"{'eksponent':>12}")
+    for stage in stager:
+        celler = []
+        for n in skalaer:
+            m = resultater['skalaer'][n]['stager'].get(stage, {'status': '-'})
+            if m['status'] == 'ok':
+                celler.append(f"{m['wall_s']:.1f}s/{m['peak_rss_mb'] or 0:.0f}MB")
+            else:
+                celler.append(m['status'])
+        eksp = [e['wall'] for e in resultater['skalering'][stage] if e['wall'] is not None]
+        print(f"{stage:<12}" + ''.join(f"{c:>18}" for c in celler) + f"{(max(eksp) if eksp else '-'):>12}")
+
+    brud = resultater['første_brud']
+    if brud:
+        print(f"\n⚠️  Første stage der holder op med at skalere: {brud['stage']} ved ×{brud['skala']} ({brud['grund']})")
+    else:
+        print(f"\n✅ Alle stager skalerer (eksponent ≤ {SKALERINGSGRÆNSE})")
+
+    if resultater.get('sammenligning'):
+        print(f"\nΔ wall mod version {resultater['sammenlignet_med'] or 'ukendt'}:")
+        for n, ændring in resultater['sammenligning'].items():
+            for stage, e in ændring.items():
+                pct = f" ({e['wall_pct']:+.1f}%)" if e['wall_pct'] is not None else ""
+                print(f"  ×{n:<6} {stage:<12} {e['wall_s']:+.2f}s{pct}")
+
+
+def main(skalaer=STANDARD_SKALAER, udgivelser=1, stager=STANDARD_STAGER, arbejdsmappe='benchmark',
+         output=BENCHMARK_FIL, sammenlign_med=None, timeout=None, seed=2025, behold=False):
+    """Kør benchmark for alle skalaer og gem resultaterne som JSON"""
+    forrige = load_forrige(sammenlign_med or output)
+    arbejdsmappe = Path(arbejdsmappe).resolve()
+
+    resultater = {
+        'version': kode_version(),
+        'start': datetime.now().isoformat(timespec='seconds'),
+        'platform': {
+            'python': platform.python_version(),
+            'system': platform.platform(),
+            'cpu': os.cpu_count(),
+        },
+        'parametre': {'udgivelser': udgivelser, 'seed': seed, 'timeout_s': timeout, 'stager': stager},
+        'skalaer': {},
+    }
+
+    fejlede = set()
+    for skala in sorted(skalaer):
+        mappe = arbejdsmappe / f'skala_{skala_navn(skala)}'
+        resultat = kør_skala(skala, mappe, stager, udgivelser, seed, timeout, springes=fejlede)
+        resultater['skalaer'][skala_navn(skala)] = resultat
+        fejlede |= {s for s, m in resultat['stager'].items() if m['status'] in ('fejl', 'timeout')}
+        if not behold:
+            shutil.rmtree(mappe, ignore_errors=True)
+
+    resultater['skalering'], resultater['første_brud'] = skalering(resultater['skalaer'])
+    if forrige:
+        resultater['sammenlignet_med'] = forrige.get('version')
+        resultater['sammenligning'] = sammenlign_versioner(resultater, forrige)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(resultater, f, ensure_ascii=False, indent=2)
+
+    print_rapport(resultater)
+    print(f"\n💾 Gemt: {output}")
+    return resultater
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Skaleringsbenchmark af converter og analyser på syntetiske data')
+    parser.add_argument('--skalaer', type=float, nargs='+', default=STANDARD_SKALAER,
+                        help='Gange dagens antal kommuner/områder/kandidater (default: 1 2 5)')
+    parser.add_argument('--udgivelser', type=int, default=1, help='Udgivelser af valgresultater (default: 1)')
+    parser.add_argument('--stager', nargs='+', default=STANDARD_STAGER, choices=STANDARD_STAGER + VALGFRIE_STAGES,
+                        help='Stager der måles (default: convert og analyserne fra --all; simulering kun hvis valgt)')
+    parser.add_argument('--arbejdsmappe', default='benchmark', help='Mappe til data og output per skala')
+    parser.add_argument('--output', default=BENCHMARK_FIL, help=f'Resultatfil (default: {BENCHMARK_FIL})')
+    parser.add_argument('--sammenlign', metavar='FIL',
+                        help='Tidligere resultatfil (fx fra en anden version) - default: --output før den overskrives')
+    parser.add_argument('--timeout', type=float, default=None, help='Max sekunder per stage')
+    parser.add_argument('--seed', type=int, default=2025, help='Seed for de syntetiske data')
+    parser.add_argument('--behold', action='store_true', help='Behold data og output for hver skala')
+    args = parser.parse_args()
+
+    if 'convert' not in args.stager:
+        parser.error('--stager skal indeholde convert (analyserne læser converterens output)')
+
+    main(args.skalaer, args.udgivelser, args.stager, args.arbejdsmappe, args.output,
+         args.sammenlign, args.timeout, args.seed, args.behold)
+    sys.exit(0)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Delt in-process datalager for pipeline-stagerne
+
+Pipeline opretter ét DataStore og giver det videre til hver analyse-stage, så
+kandidater, valgresultater og mandatfordeling kun læses og dekodes én gang per
+kørsel. Hver kolonne indlæses først når en stage beder om den (kolonne-
+projektion), og alle stager får frames der deler hukommelse med cachen.
+
+Frames er read-only via copy-on-write: en stage kan tilføje eller ændre
+kolonner i sin egen frame uden at påvirke cachen eller andre stager. På
+pandas 2.x (uden copy-on-write som standard) får hver stage en kopi.
+"""
+
+import pandas as pd
+from pathlib import Path
+from utils import find_latest_file, load_parquet, spor
+from geografi import GEOGRAFI_TYPER, GEOGRAFI_MAPPE
+from filplacering import mappe
+
+# pandas >= 3 har altid copy-on-write. På pandas 2.x slås det ikke til for hele
+# processen; i stedet får stagerne en kopi (se DataStore._project)
+COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+# Datasæt som converteren skriver (filnavn-præfiks)
+DATASETS = ['kandidater', 'valgresultater', 'mandatfordeling']
+
+
+class DataStore:
+    """Indlæser hvert datasæt én gang og udleverer delte, read-only frames"""
+
+    def __init__(self, output_dir='excel_output'):
+        self.output_dir = Path(output_dir)
+        self._files = {}
+        self._frames = {}
+        self._schemas = {}
+        self._matrices = {}
+        self._findings = None
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @property
+    def findings(self):
+        """Resultattabeller fra analyse-stagerne (se findings_store.py)"""
+        if self._findings is None:
+            from findings_store import FindingsStore
+            self._findings = FindingsStore(self.output_dir)
+        return self._findings
+
+    def find_file(self, dataset, valgtype='ALLE_VALG'):
+        """Find nyeste fil for datasæt (Parquet først, derefter Excel fallback)"""
+        key = (dataset, valgtype)
+        if key not in self._files and dataset in GEOGRAFI_TYPER:
+            # Geografi har ingen valgtype: parquet/geografi/<Type>-<tidsstempel>.parquet
+            mønster = f'{dataset}-*'
+            fil = find_latest_file(str(self.output_dir / 'parquet' / GEOGRAFI_MAPPE / f'{mønster}.parquet'))
+            if not fil:
+                fil = find_latest_file(str(self.output_dir / mappe('geografi') / f'{mønster}.xlsx'))
+            if not fil:
+                fil = find_latest_file(str(self.output_dir / f'{mønster}.xlsx'))
+            self._files[key] = fil
+        elif key not in self._files:
+            mønster = f'{dataset}_{valgtype}_*'
+            fil = find_latest_file(str(self.output_dir / 'parquet' / f'{mønster}.parquet'))
+            if not fil:
+                fil = find_latest_file(str(self.output_dir / mappe('datasæt', valgtype) / f'{mønster}.xlsx'))
+            if not fil:
+                fil = find_latest_file(str(self.output_dir / f'{mønster}.xlsx'))
+            self._files[key] = fil
+        return self._files[key]
+
+    def get(self, dataset, valgtype='ALLE_VALG', columns=None):
+        """
+        Hent datasæt som DataFrame.
+
+        Args:
+            dataset: 'kandidater', 'valgresultater', 'mandatfordeling' eller en
+                geografi-type (se geography())
+            valgtype: 'ALLE_VALG', 'KOMMUNAL' eller 'REGIONAL'
+            columns: Kolonner der skal bruges (None = alle). Kolonner der ikke
+                findes i filen springes over, så kaldere kan tjekke `in df.columns`.
+
+        Returns:
+            DataFrame (copy-on-write view af cachen) eller None hvis filen mangler
+        """
+        fil = self.find_file(dataset, valgtype)
+        if not fil:
+            return None
+
+        key = (dataset, valgtype)
+
+        if not fil.endswith('.parquet'):
+            # Excel kan ikke projiceres billigt - læs hele arket én gang
+            if key not in self._frames:
+                self.stats['misses'] += 1
+                with spor(f'læs {dataset}', 'datastore', valgtype=valgtype, fil=Path(fil).name):
+                    self._frames[key] = pd.read_excel(fil)
+                self._schemas[key] = list(self._frames[key].columns)
+            else:
+                self.stats['hits'] += 1
+            return self._project(key, columns)
+
+        if key not in self._schemas:
+            import pyarrow.parquet as pq
+            self._schemas[key] = [c for c in pq.read_schema(fil).names
+                                  if not c.startswith('__index_level_')]
+
+        ønskede = self._schemas[key] if columns is None else [c for c in columns if c in self._schemas[key]]
+        frame = self._frames.get(key)
+        manglende = [c for c in ønskede if frame is None or c not in frame.columns]
+
+        if manglende:
+            self.stats['misses'] += 1
+            with spor(f'læs {dataset}', 'datastore', valgtype=valgtype, kolonner=len(manglende)):
+                nye = load_parquet(fil, columns=manglende)
+            if frame is None:
+                frame = nye
+            else:
+                for col in manglende:
+                    frame[col] = nye[col]
+            self._frames[key] = frame
+        else:
+            self.stats['hits'] += 1
+
+        return self._project(key, columns)
+
+    def geography(self, navn, columns=None):
+        """
+        Geografisk dimensionstabel (se geografi.py).
+
+        Args:
+            navn: 'Kommune', 'Region', 'Afstemningsomraade', 'Opstillingskreds',
+                'Storkreds' eller 'Valglandsdel'
+            columns: Kolonner der skal bruges (None = alle)
+
+        Returns:
+            DataFrame med heltals-nøgler (Dagi_id, Kommunekode ...) eller None
+        """
+        return self.get(navn, columns=columns)
+
+    def area_matrix(self, valgtype='ALLE_VALG'):
+        """
+        Afstemningsområde × parti stemmematrix (se omraade_matrix.py).
+
+        Bruger matricen converteren har materialiseret i arrow/; findes den
+        ikke (fx ældre output), bygges den én gang fra valgresultater.
+
+        Returns:
+            OmrådeMatrix eller None hvis valgresultater mangler
+        """
+        if valgtype not in self._matrices:
+            from omraade_matrix import OmrådeMatrix, RESULTAT_KOLONNER
+
+            fil = find_latest_file(str(self.output_dir / 'arrow' / f'omraade_parti_{valgtype}_*.arrow'))
+            if fil:
+                self.stats['misses'] += 1
+                self._matrices[valgtype] = OmrådeMatrix.load(fil)
+            else:
+                df_res = self.get('valgresultater', valgtype, columns=RESULTAT_KOLONNER)
+                self._matrices[valgtype] = OmrådeMatrix.from_results(df_res) if df_res is not None else None
+        else:
+            self.stats['hits'] += 1
+        return self._matrices[valgtype]
+
+    def candidate_matrix(self, valgtype='ALLE_VALG'):
+        """
+        Sparse kandidat × afstemningsområde matrix (se kandidat_matrix.py).
+
+        Returns:
+            KandidatMatrix eller None hvis valgresultater mangler
+        """
+        key = ('kandidat_matrix', valgtype)
+        if key not in self._matrices:
+            from kandidat_matrix import KandidatMatrix, RESULTAT_KOLONNER
+
+            fil = find_latest_file(str(self.output_dir / 'arrow' / f'kandidat_omraade_{valgtype}_*.npz'))
+            if fil:
+                self.stats['misses'] += 1
+                self._matrices[key] = KandidatMatrix.load(fil)
+            else:
+                df_res = self.get('valgresultater', valgtype, columns=RESULTAT_KOLONNER)
+                self._matrices[key] = KandidatMatrix.from_results(df_res) if df_res is not None else None
+        else:
+            self.stats['hits'] += 1
+        return self._matrices[key]
+
+    def gender_cube(self, valgtype='ALLE_VALG'):
+        """
+        Kønsfordelingskube over kandidater (se kønskube.py).
+
+        Bygges én gang per DataStore og deles af kønsanalyse og findings.
+
+        Returns:
+            KønsKube eller None hvis kandidater mangler
+        """
+        key = ('kønskube', valgtype)
+        if key not in self._matrices:
+            from kønskube import KønsKube, KANDIDAT_KOLONNER
+
+            df_kand = self.get('kandidater', valgtype, columns=KANDIDAT_KOLONNER)
+            self._matrices[key] = KønsKube.from_candidates(df_kand) if df_kand is not None else None
+        else:
+            self.stats['hits'] += 1
+        return self._matrices[key]
+
+    def candidate_index(self, valgtype='ALLE_VALG'):
+        """
+        Kandidatopslag på normaliseret navn + kommune (se kandidat_indeks.py).
+
+        Returns:
+            KandidatIndeks eller None hvis kandidater mangler
+        """
+        key = ('kandidat_indeks', valgtype)
+        if key not in self._matrices:
+            from kandidat_indeks import KandidatIndeks, KANDIDAT_KOLONNER
+
+            df_kand = self.get('kandidater', valgtype, columns=KANDIDAT_KOLONNER)
+            self._matrices[key] = KandidatIndeks(df_kand) if df_kand is not None else None
+        else:
+            self.stats['hits'] += 1
+        return self._matrices[key]
+
+    def _project(self, key, columns):
+        """Returnér kolonneudsnit i skema-rækkefølge som copy-on-write frame (kopi på pandas 2.x)"""
+        frame = self._frames[key]
+        if columns is None:
+            cols = [c for c in self._schemas[key] if c in frame.columns]
+        else:
+            cols = [c for c in columns if c in frame.columns]
+        return frame[cols] if COPY_ON_WRITE else frame[cols].copy()
+
+    def clear(self):
+        """Glem alle cachede frames (fx efter ny konvertering)"""
+        self._files.clear()
+        self._frames.clear()
+        self._schemas.clear()
+        self._matrices.clear()
+        self._findings = None
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Placering af output-filer i output-mappen
+
+Én routing-tabel (PLACERING) afgør hvilken undermappe en fil hører til ud fra
+datasættets art og valgtype. Converteren og analyserne beregner den endelige
+sti med output_sti() og skriver direkte dertil (atomisk via utils.atomisk), så
+der ikke er noget efterfølgende trin der flytter filer rundt.
+
+    kandidater_KOMMUNAL_<ts>.xlsx                -> 01_Kommunalvalg/
+    valgdeltagelse-Kommunalvalg-<...>.xlsx       -> 05_Valgdeltagelse_Kommunal/
+    Kommune-<ts>.xlsx                            -> 04_Reference_Geografi/
+    Analyse_magt.xlsx, MASTER_FINDINGS.md        -> 00_START_HER/
+
+Filer uden regel (fx ukendte JSON-dokumenter) lægges i roden af output-mappen.
+"""
+
+import re
+from pathlib import Path
+from geografi import geografi_type
+
+# Undermapper i output-mappen
+MAPPER = {
+    '00_START_HER': 'Præsentationsfiler',
+    '01_Kommunalvalg': 'Kommunalvalg data',
+    '02_Regionsrådsvalg': 'Regionsrådsvalg data',
+    '03_Samlet_Alle_Valg': 'Samlet data',
+    '04_Reference_Geografi': 'Geografiske data',
+    '05_Valgdeltagelse_Kommunal': 'Valgdeltagelse per opstillingskreds - Kommunalvalg',
+    '06_Valgdeltagelse_Regional': 'Valgdeltagelse per opstillingskreds - Regionsrådsvalg',
+}
+
+# (art, valgtype) -> mappe
+PLACERING = {
+    ('analyse', None): '00_START_HER',
+    ('datasæt', 'KOMMUNAL'): '01_Kommunalvalg',
+    ('datasæt', 'REGIONAL'): '02_Regionsrådsvalg',
+    ('datasæt', 'ALLE_VALG'): '03_Samlet_Alle_Valg',
+    ('opsummering', None): '03_Samlet_Alle_Valg',
+    ('geografi', None): '04_Reference_Geografi',
+    ('valgdeltagelse', 'KOMMUNAL'): '05_Valgdeltagelse_Kommunal',
+    ('valgdeltagelse', 'REGIONAL'): '06_Valgdeltagelse_Regional',
+}
+
+# Valgart i valg.dk-filnavne -> valgtype
+VALGARTER = {'Kommunalvalg': 'KOMMUNAL', 'Regionsrådsvalg': 'REGIONAL'}
+
+_DATASÆT = re.compile(r'_(KOMMUNAL|REGIONAL|ALLE_VALG)_')
+_VALGDELTAGELSE = re.compile(r'^valgdeltagelse-(Kommunalvalg|Regionsrådsvalg)-')
+
+
+def fil_art(filnavn):
+    """
+    (art, valgtype) for en output-fil ud fra filnavnet.
+
+    Returns:
+        Nøgle i PLACERING, eller (None, None) hvis filen ikke har en regel
+    """
+    navn = Path(filnavn).name
+    if navn.startswith('Analyse_') or navn.startswith('MASTER_FINDINGS'):
+        return 'analyse', None
+    match = _VALGDELTAGELSE.match(navn)
+    if match:
+        return 'valgdeltagelse', VALGARTER[match[1]]
+    match = _DATASÆT.search(navn)
+    if match:
+        return 'datasæt', match[1]
+    if navn.startswith('resultater_per_'):
+        return 'opsummering', None
+    if geografi_type(navn):
+        return 'geografi', None
+    return None, None
+
+
+def mappe(art, valgtype=None):
+    """Undermappe for (art, valgtype) - None = roden af output-mappen"""
+    return PLACERING.get((art, valgtype))
+
+
+def output_sti(output_dir, filnavn):
+    """Endelig sti for en output-fil (undermappen oprettes af utils.atomisk ved skrivning)"""
+    undermappe = mappe(*fil_art(filnavn))
+    return Path(output_dir) / undermappe / filnavn if undermappe else Path(output_dir) / filnavn
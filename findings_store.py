@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Maskinlæsbart lager for analyse-resultater
+
+Hver analyse-stage skriver sine resultattabeller både til Excel-projektmappen
+i 00_START_HER/ (præsentation) og hertil som Parquet + et JSON-indeks:
+
+    findings/<analyse>/<tabel>.parquet
+    findings/<analyse>/index.json   (ark-navn -> fil, rækker, kolonner)
+
+generate_findings og validate_data læser tabellerne herfra i stedet for at
+parse Excel-filerne igen. Excel er dermed kun et output-format; findes en
+tabel ikke i lageret (fx output fra en ældre kørsel), læses arket fra Excel.
+"""
+
+import json
+import re
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from utils import spor, atomisk
+from filplacering import output_sti
+
+INDEKS_FIL = 'index.json'
+
+
+def tabel_filnavn(ark):
+    """Filnavn for et ark ('Top 100 Stemmeslugere' -> 'Top_100_Stemmeslugere.parquet')"""
+    return re.sub(r'\W+', '_', ark).strip('_') + '.parquet'
+
+
+class FindingsStore:
+    """Resultattabeller per analyse (Parquet + JSON-indeks, Excel som fallback)"""
+
+    def __init__(self, output_dir='excel_output'):
+        self.output_dir = Path(output_dir)
+        self.dir = self.output_dir / 'findings'
+        self._frames = {}
+        self._indeks = {}
+
+    def write_workbook(self, output_file, ark):
+        """
+        Skriv analyse-ark til Excel og publicér dem i lageret.
+
+        Args:
+            output_file: Excel-fil (analysenavn = filnavn uden endelse)
+            ark: {arknavn: DataFrame} i den rækkefølge arkene skal stå
+        """
+        output_file = Path(output_file)
+        with atomisk(output_file) as tmp, pd.ExcelWriter(tmp, engine='openpyxl') as writer:
+            for navn, df in ark.items():
+                with spor(navn, 'excel', fil=output_file.name, rækker=len(df)):
+                    df.to_excel(writer, sheet_name=navn, index=False)
+
+        self.publish(output_file.stem, ark, excel_fil=output_file)
+
+    def publish(self, analyse, tabeller, excel_fil=None):
+        """Gem tabeller som Parquet og opdatér analysens JSON-indeks"""
+        import pyarrow as pa
+
+        mappe = self.dir / analyse
+        mappe.mkdir(parents=True, exist_ok=True)
+
+        indeks = {
+            'analyse': analyse,
+            'opdateret': datetime.now().isoformat(timespec='seconds'),
+            'excel': str(Path(excel_fil).relative_to(self.output_dir)) if excel_fil else None,
+            'tabeller': {},
+        }
+        for navn, df in tabeller.items():
+            fil = mappe / tabel_filnavn(navn)
+            with atomisk(fil) as tmp:
+                try:
+                    df.to_parquet(tmp, index=False)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # Kolonner med blandede typer gemmes som tekst
+                    tekst = {k: 'string' for k in df.select_dtypes('object').columns}
+                    df.astype(tekst).to_parquet(tmp, index=False)
+
+            indeks['tabeller'][navn] = {
+                'fil': fil.name,
+                'rækker': len(df),
+                'kolonner': [str(k) for k in df.columns],
+            }
+            self._frames[(analyse, navn)] = df
+
+        # Skriv indekset til sidst, så det kun peger på færdige filer
+        midlertidig = mappe / (INDEKS_FIL + '.tmp')
+        midlertidig.write_text(json.dumps(indeks, ensure_ascii=False, indent=2), encoding='utf-8')
+        midlertidig.replace(mappe / INDEKS_FIL)
+        self._indeks[analyse] = indeks
+
+    def index(self, analyse):
+        """Analysens JSON-indeks (None hvis analysen ikke er publiceret)"""
+        if analyse not in self._indeks:
+            fil = self.dir / analyse / INDEKS_FIL
+            if not fil.exists():
+                return None
+            self._indeks[analyse] = json.loads(fil.read_text(encoding='utf-8'))
+        return self._indeks[analyse]
+
+    def excel_file(self, analyse):
+        """Analysens Excel-fil i 00_START_HER/"""
+        return output_sti(self.output_dir, f'{analyse}.xlsx')
+
+    def has(self, analyse):
+        """Findes analysen i lageret eller som Excel-fil?"""
+        return self.index(analyse) is not None or self.excel_file(analyse).exists()
+
+    def get(self, analyse, tabel):
+        """
+        Hent en resultattabel.
+
+        Returns:
+            DataFrame (delt med lagerets cache - må ikke ændres in-place)
+
+        Raises:
+            KeyError hvis tabellen hverken findes i lageret eller i Excel-filen
+        """
+        key = (analyse, tabel)
+        if key not in self._frames:
+            indeks = self.index(analyse)
+            if indeks is not None and tabel in indeks['tabeller']:
+                self._frames[key] = pd.read_parquet(self.dir / analyse / indeks['tabeller'][tabel]['fil'])
+            elif self.excel_file(analyse).exists():
+                try:
+                    self._frames[key] = pd.read_excel(self.excel_file(analyse), sheet_name=tabel)
+                except ValueError:
+                    raise KeyError(f"{analyse}: ark '{tabel}' findes ikke")
+            else:
+                raise KeyError(f"{analyse}: tabel '{tabel}' findes ikke")
+        return self._frames[key]
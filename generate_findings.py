@@ -7,44 +7,30 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import sys
-from utils import find_latest_file, load_parquet
+from datastore import DataStore
+from filplacering import output_sti
+from utils import atomisk
 
-def analyze_data(output_dir='excel_output'):
+# Kolonner findings bruger fra kandidater (kolonne-projektion)
+KANDIDAT_KOLONNER = ['ValgNavn', 'KommuneNavn', 'RegionNavn', 'ListeNavn',
+                     'EstimeretKøn', 'KønsMetode', 'JobKategori']
+
+def analyze_data(output_dir='excel_output', store=None):
     """Analyser data og udtræk key findings"""
 
     print("🔍 Analyserer valgdata...")
+    if store is None:
+        store = DataStore(output_dir)
 
     # Find filer - Parquet først, derefter Excel (også i undermapper)
-    parquet_dir = Path(output_dir) / 'parquet'
-
-    kandidater_fil = find_latest_file(f'{parquet_dir}/kandidater_ALLE_VALG_*.parquet')
-    if not kandidater_fil:
-        kandidater_fil = find_latest_file(f'{output_dir}/kandidater_ALLE_VALG_*.xlsx')
-    if not kandidater_fil:
-        # Søg i 03_Samlet_Alle_Valg undermappe
-        kandidater_fil = find_latest_file(f'{output_dir}/03_Samlet_Alle_Valg/kandidater_ALLE_VALG_*.xlsx')
-
-    resultater_fil = find_latest_file(f'{parquet_dir}/valgresultater_ALLE_VALG_*.parquet')
-    if not resultater_fil:
-        resultater_fil = find_latest_file(f'{output_dir}/valgresultater_ALLE_VALG_*.xlsx')
-    if not resultater_fil:
-        # Søg i 03_Samlet_Alle_Valg undermappe
-        resultater_fil = find_latest_file(f'{output_dir}/03_Samlet_Alle_Valg/valgresultater_ALLE_VALG_*.xlsx')
-    
-    # Kønsanalyse fil (kan være i både root og 00_START_HER)
-    køns_fil = f'{output_dir}/Analyse_kønsfordeling.xlsx'
-    if not Path(køns_fil).exists():
-        køns_fil = f'{output_dir}/00_START_HER/Analyse_kønsfordeling.xlsx'
+    kandidater_fil = store.find_file('kandidater')
 
     if not kandidater_fil:
         print("❌ Kunne ikke finde kandidat-filer")
         return None
 
     print(f"Læser: {Path(kandidater_fil).name}")
-    if kandidater_fil.endswith('.parquet'):
-        kandidater = load_parquet(kandidater_fil)
-    else:
-        kandidater = pd.read_excel(kandidater_fil)
+    kandidater = store.get('kandidater', columns=KANDIDAT_KOLONNER)
 
     findings = {
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -53,9 +39,16 @@ def analyze_data(output_dir='excel_output'):
         'regional_kandidater': len(kandidater[kandidater['ValgNavn'].str.contains('Regionsrådsvalg', na=False)]),
     }
 
+    # Kønstabeller er rollups fra én kønsfordelingskube over kandidaterne
+    kube = store.gender_cube() if 'EstimeretKøn' in kandidater.columns else None
+
+    def køn_tabel(dims):
+        tabel = kube.fordeling(dims).rename(columns={'Andel Kvinder %': 'Andel_Kvinder'})
+        return tabel if 'Andel_Kvinder' in tabel.columns else None
+
     # Kønsfordeling
-    if 'EstimeretKøn' in kandidater.columns:
-        køn_dist = kandidater['EstimeretKøn'].value_counts()
+    if kube is not None:
+        køn_dist = kube.fordeling(kun_kendt=False).iloc[0]
         findings['køn_mænd'] = int(køn_dist.get('M', 0))
         findings['køn_kvinder'] = int(køn_dist.get('K', 0))
         findings['køn_ukendt'] = int(køn_dist.get('Ukendt', 0))
@@ -66,21 +59,24 @@ def analyze_data(output_dir='excel_output'):
         top_partier = kandidater['ListeNavn'].value_counts().head(10)
         findings['top_partier'] = top_partier.to_dict()
 
-    # Kønsbalance per parti
-    if 'EstimeretKøn' in kandidater.columns and 'ListeNavn' in kandidater.columns:
-        kandidater_kendt = kandidater[kandidater['EstimeretKøn'].isin(['M', 'K'])]
-        parti_køn = kandidater_kendt.groupby(['ListeNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-        if 'K' in parti_køn.columns and 'M' in parti_køn.columns:
-            parti_køn['Total'] = parti_køn.sum(axis=1)
-            parti_køn['Andel_Kvinder'] = parti_køn['K'] / (parti_køn['M'] + parti_køn['K']) * 100
+    # Job-titler (JobKategori er klassificeret af converteren)
+    if 'JobKategori' in kandidater.columns:
+        job_stats = kandidater['JobKategori'].value_counts()
+        job_stats = job_stats[job_stats > 0].reset_index()
+        job_stats.columns = ['Jobtitel', 'Antal Kandidater']
+        job_stats['Andel %'] = (job_stats['Antal Kandidater'] / len(kandidater) * 100).round(1)
+        findings['top_job_titler'] = job_stats.head(15).to_dict('records')
 
-            # Kun store partier (50+ kandidater)
-            store_partier = parti_køn[parti_køn['Total'] >= 50].copy()
-            store_partier['Afvigelse'] = abs(store_partier['Andel_Kvinder'] - 50)
+    # Kønsbalance per parti
+    parti_køn = køn_tabel(['ListeNavn']) if kube is not None else None
+    if parti_køn is not None:
+        # Kun store partier (50+ kandidater)
+        store_partier = parti_køn[parti_køn['Total'] >= 50].copy()
+        store_partier['Afvigelse'] = abs(store_partier['Andel_Kvinder'] - 50)
 
-            findings['bedste_kønsbalance'] = store_partier.sort_values('Afvigelse').head(5)['Andel_Kvinder'].to_dict()
-            findings['værste_kønsbalance'] = store_partier.sort_values('Andel_Kvinder').head(5)['Andel_Kvinder'].to_dict()
-            findings['alle_partier_kønsbalance'] = parti_køn[['K', 'M', 'Total', 'Andel_Kvinder']].sort_values('Total', ascending=False).to_dict('index')
+        findings['bedste_kønsbalance'] = store_partier.sort_values('Afvigelse').head(5)['Andel_Kvinder'].to_dict()
+        findings['værste_kønsbalance'] = store_partier.sort_values('Andel_Kvinder').head(5)['Andel_Kvinder'].to_dict()
+        findings['alle_partier_kønsbalance'] = parti_køn[['K', 'M', 'Total', 'Andel_Kvinder']].sort_values('Total', ascending=False).to_dict('index')
 
     # Kommuner
     if 'KommuneNavn' in kandidater.columns:
@@ -95,83 +91,51 @@ def analyze_data(output_dir='excel_output'):
     # === JOURNALISTISKE ANALYSER ===
 
     # 1. Regional kønsbalance analyse
-    if 'EstimeretKøn' in kandidater.columns and 'RegionNavn' in kandidater.columns:
-        kandidater_regional = kandidater[kandidater['RegionNavn'] != ''].copy()
-        kandidater_regional_kendt = kandidater_regional[kandidater_regional['EstimeretKøn'].isin(['M', 'K'])]
-
-        if len(kandidater_regional_kendt) > 0:
-            region_køn = kandidater_regional_kendt.groupby(['RegionNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-            if 'K' in region_køn.columns and 'M' in region_køn.columns:
-                region_køn['Total'] = region_køn.sum(axis=1)
-                region_køn['Andel_Kvinder'] = region_køn['K'] / (region_køn['M'] + region_køn['K']) * 100
-                findings['regional_kønsbalance'] = region_køn[['K', 'M', 'Total', 'Andel_Kvinder']].sort_values('Andel_Kvinder', ascending=False).to_dict('index')
+    region_køn = køn_tabel(['RegionNavn']) if kube is not None else None
+    if region_køn is not None:
+        findings['regional_kønsbalance'] = region_køn[['K', 'M', 'Total', 'Andel_Kvinder']].sort_values('Andel_Kvinder', ascending=False).to_dict('index')
 
     # 2. Kommunal kønsbalance (min 50 kandidater for at undgå statistisk støj)
-    if 'EstimeretKøn' in kandidater.columns and 'KommuneNavn' in kandidater.columns:
-        kandidater_kommunal = kandidater[kandidater['KommuneNavn'] != ''].copy()
-        kandidater_kommunal_kendt = kandidater_kommunal[kandidater_kommunal['EstimeretKøn'].isin(['M', 'K'])]
-
-        if len(kandidater_kommunal_kendt) > 0:
-            kommune_køn = kandidater_kommunal_kendt.groupby(['KommuneNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-            if 'K' in kommune_køn.columns and 'M' in kommune_køn.columns:
-                kommune_køn['Total'] = kommune_køn.sum(axis=1)
-                kommune_køn['Andel_Kvinder'] = kommune_køn['K'] / (kommune_køn['M'] + kommune_køn['K']) * 100
-
-                # Kun kommuner med 50+ kandidater for valid sammenligning
-                store_kommuner = kommune_køn[kommune_køn['Total'] >= 50].copy()
-                findings['bedste_kommuner_kønsbalance'] = store_kommuner.nlargest(10, 'Andel_Kvinder')[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
-                findings['værste_kommuner_kønsbalance'] = store_kommuner.nsmallest(10, 'Andel_Kvinder')[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
+    kommune_køn = køn_tabel(['KommuneNavn']) if kube is not None else None
+    if kommune_køn is not None:
+        # Kun kommuner med 50+ kandidater for valid sammenligning
+        store_kommuner = kommune_køn[kommune_køn['Total'] >= 50].copy()
+        findings['bedste_kommuner_kønsbalance'] = store_kommuner.nlargest(10, 'Andel_Kvinder')[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
+        findings['værste_kommuner_kønsbalance'] = store_kommuner.nsmallest(10, 'Andel_Kvinder')[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
 
     # 3. Parti-regional variation (store partier i forskellige regioner)
-    if 'EstimeretKøn' in kandidater.columns and 'ListeNavn' in kandidater.columns and 'RegionNavn' in kandidater.columns:
-        kandidater_regional = kandidater[kandidater['RegionNavn'] != ''].copy()
-        kandidater_regional_kendt = kandidater_regional[kandidater_regional['EstimeretKøn'].isin(['M', 'K'])]
+    if kube is not None and 'ListeNavn' in kandidater.columns:
+        parti_region = kube.fordeling(['ListeNavn', 'RegionNavn']).rename(columns={'Andel Kvinder %': 'Andel_Kvinder'})
 
-        if len(kandidater_regional_kendt) > 0:
+        if 'Andel_Kvinder' in parti_region.columns:
             # Top 5 partier
             top5_partier = kandidater['ListeNavn'].value_counts().head(5).index.tolist()
+            partier_i_regioner = parti_region.index.get_level_values('ListeNavn')
 
             parti_regional_data = {}
             for parti in top5_partier:
-                parti_data = kandidater_regional_kendt[kandidater_regional_kendt['ListeNavn'] == parti]
-                if len(parti_data) > 0:
-                    region_breakdown = parti_data.groupby(['RegionNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-                    if 'K' in region_breakdown.columns and 'M' in region_breakdown.columns:
-                        region_breakdown['Total'] = region_breakdown.sum(axis=1)
-                        region_breakdown['Andel_Kvinder'] = region_breakdown['K'] / (region_breakdown['M'] + region_breakdown['K']) * 100
-                        parti_regional_data[parti] = region_breakdown[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
+                if parti not in partier_i_regioner:
+                    continue
+                region_breakdown = parti_region.xs(parti, level='ListeNavn')
+                if region_breakdown['K'].sum() > 0 and region_breakdown['M'].sum() > 0:
+                    parti_regional_data[parti] = region_breakdown[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
 
             findings['parti_regional_variation'] = parti_regional_data
 
     # 4. Små partier med god kønsbalance (interessant angle)
-    if 'EstimeretKøn' in kandidater.columns and 'ListeNavn' in kandidater.columns:
-        kandidater_kendt = kandidater[kandidater['EstimeretKøn'].isin(['M', 'K'])]
-        parti_køn = kandidater_kendt.groupby(['ListeNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-        if 'K' in parti_køn.columns and 'M' in parti_køn.columns:
-            parti_køn['Total'] = parti_køn.sum(axis=1)
-            parti_køn['Andel_Kvinder'] = parti_køn['K'] / (parti_køn['M'] + parti_køn['K']) * 100
-
-            # Små/mellemstore partier (20-100 kandidater) med god kønsbalance
-            mellem_partier = parti_køn[(parti_køn['Total'] >= 20) & (parti_køn['Total'] < 100)].copy()
-            mellem_partier['Afvigelse'] = abs(mellem_partier['Andel_Kvinder'] - 50)
-            findings['små_partier_god_balance'] = mellem_partier.sort_values('Afvigelse').head(10)[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
+    if parti_køn is not None:
+        # Små/mellemstore partier (20-100 kandidater) med god kønsbalance
+        mellem_partier = parti_køn[(parti_køn['Total'] >= 20) & (parti_køn['Total'] < 100)].copy()
+        mellem_partier['Afvigelse'] = abs(mellem_partier['Andel_Kvinder'] - 50)
+        findings['små_partier_god_balance'] = mellem_partier.sort_values('Afvigelse').head(10)[['K', 'M', 'Total', 'Andel_Kvinder']].to_dict('index')
 
     # 5. Kommunal vs Regional kønsbalance sammenligning
-    if 'EstimeretKøn' in kandidater.columns and 'ValgNavn' in kandidater.columns:
-        kandidater_kendt = kandidater[kandidater['EstimeretKøn'].isin(['M', 'K'])]
-
-        kommunal = kandidater_kendt[kandidater_kendt['ValgNavn'].str.contains('Kommunalvalg', na=False)]
-        regional = kandidater_kendt[kandidater_kendt['ValgNavn'].str.contains('Regionsrådsvalg', na=False)]
-
-        if len(kommunal) > 0:
-            kommunal_køn = kommunal['EstimeretKøn'].value_counts()
-            kommunal_pct = round(kommunal_køn.get('K', 0) / (kommunal_køn.get('M', 0) + kommunal_køn.get('K', 0)) * 100, 1)
-            findings['kommunal_køn_procent'] = kommunal_pct
-
-        if len(regional) > 0:
-            regional_køn = regional['EstimeretKøn'].value_counts()
-            regional_pct = round(regional_køn.get('K', 0) / (regional_køn.get('M', 0) + regional_køn.get('K', 0)) * 100, 1)
-            findings['regional_køn_procent'] = regional_pct
+    if kube is not None:
+        valgart_køn = kube.fordeling(['Valgart'])
+        for art, nøgle in [('Kommunalvalg', 'kommunal_køn_procent'), ('Regionsrådsvalg', 'regional_køn_procent')]:
+            if art in valgart_køn.index and valgart_køn.loc[art, 'Total'] > 0:
+                køn = valgart_køn.loc[art]
+                findings[nøgle] = round(køn.get('K', 0) / (køn.get('M', 0) + køn.get('K', 0)) * 100, 1)
 
     # 6. Kønsmetode statistik (hvor mange blev manuelt/AI identificeret)
     if 'KønsMetode' in kandidater.columns:
@@ -204,58 +168,64 @@ def analyze_data(output_dir='excel_output'):
 
         # Match med kønsdata hvis tilgængeligt
         if kandidater_fil:
-            # Opret kønsmap baseret på fornavn
-            koen_map = {}
-            for _, row in kandidater.iterrows():
-                fornavn = str(row.get('Fornavn', '')).strip()
-                koen = row.get('EstimeretKøn', 'Ukendt')
-                if fornavn and koen in ['M', 'K']:
-                    koen_map[fornavn] = koen
-
-            # Match borgmestre med køn
-            def get_koen(navn):
-                fornavn = str(navn).split()[0] if navn else ''
-                return koen_map.get(fornavn, 'Ukendt')
-
-            borgmestre['Køn'] = borgmestre['Navn'].apply(get_koen)
+            # Match borgmestre med kandidater (navn + kommune) og køn
+            borgmestre = store.candidate_index().match_borgmestre(borgmestre)
             koen_dist = borgmestre['Køn'].value_counts()
 
             findings['borgmestre_køn_mænd'] = int(koen_dist.get('M', 0))
             findings['borgmestre_køn_kvinder'] = int(koen_dist.get('K', 0))
             findings['borgmestre_køn_procent_kvinder'] = round(koen_dist.get('K', 0) / (koen_dist.get('M', 0) + koen_dist.get('K', 0)) * 100, 1) if (koen_dist.get('M', 0) + koen_dist.get('K', 0)) > 0 else 0
 
-    # === VALGDELTAGELSE & STEMMESLUGERE (fra Analyse_generel.xlsx) ===
-    generel_fil = f'{output_dir}/00_START_HER/Analyse_generel.xlsx'
-    if Path(generel_fil).exists():
-        print(f"Læser generel analyse fra {Path(generel_fil).name}...")
+    # === VALGDELTAGELSE & STEMMESLUGERE (fra findings-lageret for Analyse_generel) ===
+    resultater = store.findings
+    if resultater.has('Analyse_generel'):
+        print("Læser generel analyse fra findings-lageret...")
 
         # Valgdeltagelse
         try:
-            valgdeltagelse = pd.read_excel(generel_fil, sheet_name='Valgdeltagelse')
+            valgdeltagelse = resultater.get('Analyse_generel', 'Valgdeltagelse')
             top_deltagelse = valgdeltagelse.head(5)
             findings['top_valgdeltagelse'] = top_deltagelse.to_dict('records')
+
+            # Split by Valgtype
+            kommunal = valgdeltagelse[valgdeltagelse['Valgtype'] == 'Kommunalvalg']
+            regional = valgdeltagelse[valgdeltagelse['Valgtype'] == 'Regionsrådsvalg']
+
+            # Top 5 + Bund 5 + Statistik for kommunal
+            findings['valgdelt_kommunal_top5'] = kommunal.nlargest(5, 'Valgdeltagelse %').to_dict('records')
+            findings['valgdelt_kommunal_bund5'] = kommunal.nsmallest(5, 'Valgdeltagelse %').to_dict('records')
+            findings['valgdelt_kommunal_avg'] = round(kommunal['Valgdeltagelse %'].mean(), 1)
+
+            # Top 5 + Bund 5 + Statistik for regional
+            findings['valgdelt_regional_top5'] = regional.nlargest(5, 'Valgdeltagelse %').to_dict('records')
+            findings['valgdelt_regional_bund5'] = regional.nsmallest(5, 'Valgdeltagelse %').to_dict('records')
+            findings['valgdelt_regional_avg'] = round(regional['Valgdeltagelse %'].mean(), 1)
+
+            # Overall average
+            findings['valgdelt_avg_all'] = round(valgdeltagelse['Valgdeltagelse %'].mean(), 1)
         except Exception as e:
             print(f"Kunne ikke læse valgdeltagelse: {e}")
 
         # Stemmeslugere (Top 100)
         try:
-            stemmeslugere = pd.read_excel(generel_fil, sheet_name='Top 100 Stemmeslugere')
-            top_stemmer = stemmeslugere.head(5)
-            findings['top_stemmeslugere'] = top_stemmer.to_dict('records')
+            stemmeslugere = resultater.get('Analyse_generel', 'Top 100 Stemmeslugere')
+            findings['top_stemmeslugere'] = stemmeslugere.head(5).to_dict('records')
+            findings['top_20_stemmeslugere'] = stemmeslugere.head(20).to_dict('records')
         except Exception as e:
             print(f"Kunne ikke læse stemmeslugere: {e}")
 
-        # Job-titler
-        try:
-            job_titler = pd.read_excel(generel_fil, sheet_name='Top Job-titler')
-            top_jobs = job_titler.head(15)  # Udvid til top 15
-            findings['top_job_titler'] = top_jobs.to_dict('records')
-        except Exception as e:
-            print(f"Kunne ikke læse job-titler: {e}")
+        # Job-titler (fallback hvis kandidatfilen ikke har JobKategori)
+        if 'top_job_titler' not in findings:
+            try:
+                job_titler = resultater.get('Analyse_generel', 'Top Job-titler')
+                top_jobs = job_titler.head(15)  # Udvid til top 15
+                findings['top_job_titler'] = top_jobs.to_dict('records')
+            except Exception as e:
+                print(f"Kunne ikke læse job-titler: {e}")
 
         # Partistatistik (NYT!)
         try:
-            partistatistik = pd.read_excel(generel_fil, sheet_name='Partistatistik')
+            partistatistik = resultater.get('Analyse_generel', 'Partistatistik')
             # Top 10 partier efter totale stemmer
             partistatistik_top = partistatistik.nlargest(10, 'Totale Stemmer')
             findings['partistatistik'] = partistatistik_top.to_dict('records')
@@ -274,7 +244,7 @@ def analyze_data(output_dir='excel_output'):
 
         # Kandidater per Kommune (NYT!)
         try:
-            kand_kommune = pd.read_excel(generel_fil, sheet_name='Kandidater per Kommune')
+            kand_kommune = resultater.get('Analyse_generel', 'Kandidater per Kommune')
             # Top 10 mest aktive + bund 10
             top_kommuner = kand_kommune.nlargest(10, 'Antal Kandidater')
             bund_kommuner = kand_kommune.nsmallest(10, 'Antal Kandidater')
@@ -285,49 +255,18 @@ def analyze_data(output_dir='excel_output'):
 
         # Job per Parti (NYT!)
         try:
-            job_parti = pd.read_excel(generel_fil, sheet_name='Job per Parti')
+            job_parti = resultater.get('Analyse_generel', 'Job per Parti')
             findings['job_per_parti'] = job_parti.head(10).to_dict('records')  # Top 10 partier
         except Exception as e:
             print(f"Kunne ikke læse job per parti: {e}")
 
-        # Udvid valgdeltagelse med statistik
-        try:
-            valgdeltagelse = pd.read_excel(generel_fil, sheet_name='Valgdeltagelse')
-
-            # Split by Valgtype
-            kommunal = valgdeltagelse[valgdeltagelse['Valgtype'] == 'Kommunalvalg']
-            regional = valgdeltagelse[valgdeltagelse['Valgtype'] == 'Regionsrådsvalg']
-
-            # Top 5 + Bund 5 + Statistik for kommunal
-            findings['valgdelt_kommunal_top5'] = kommunal.nlargest(5, 'Valgdeltagelse %').to_dict('records')
-            findings['valgdelt_kommunal_bund5'] = kommunal.nsmallest(5, 'Valgdeltagelse %').to_dict('records')
-            findings['valgdelt_kommunal_avg'] = round(kommunal['Valgdeltagelse %'].mean(), 1)
-
-            # Top 5 + Bund 5 + Statistik for regional
-            findings['valgdelt_regional_top5'] = regional.nlargest(5, 'Valgdeltagelse %').to_dict('records')
-            findings['valgdelt_regional_bund5'] = regional.nsmallest(5, 'Valgdeltagelse %').to_dict('records')
-            findings['valgdelt_regional_avg'] = round(regional['Valgdeltagelse %'].mean(), 1)
-
-            # Overall average
-            findings['valgdelt_avg_all'] = round(valgdeltagelse['Valgdeltagelse %'].mean(), 1)
-        except Exception as e:
-            print(f"Kunne ikke læse udvidet valgdeltagelse: {e}")
-
-        # Udvid stemmeslugere til top 20
-        try:
-            stemmeslugere = pd.read_excel(generel_fil, sheet_name='Top 100 Stemmeslugere')
-            findings['top_20_stemmeslugere'] = stemmeslugere.head(20).to_dict('records')
-        except Exception as e:
-            print(f"Kunne ikke læse top 20 stemmeslugere: {e}")
-
-    # === MAGTANALYSE (fra Analyse_magt.xlsx) ===
-    magt_fil = f'{output_dir}/00_START_HER/Analyse_magt.xlsx'
-    if Path(magt_fil).exists():
-        print(f"Læser magtanalyse fra {Path(magt_fil).name}...")
+    # === MAGTANALYSE (fra findings-lageret for Analyse_magt) ===
+    if resultater.has('Analyse_magt'):
+        print("Læser magtanalyse fra findings-lageret...")
 
         # 1. De Tragiske Helte (Mandattyveri)
         try:
-            robbed = pd.read_excel(magt_fil, sheet_name='De Tragiske Helte')
+            robbed = resultater.get('Analyse_magt', 'De Tragiske Helte')
             if len(robbed) > 0:
                 findings['mandate_theft_top10'] = robbed.head(10).to_dict('records')
                 findings['mandate_theft_count'] = len(robbed)
@@ -339,21 +278,21 @@ def analyze_data(output_dir='excel_output'):
 
         # 2. Enmandshæren (Dependency Ratio)
         try:
-            dependency = pd.read_excel(magt_fil, sheet_name='Enmandshæren')
+            dependency = resultater.get('Analyse_magt', 'Enmandshæren')
             findings['dependency_top20'] = dependency.head(20).to_dict('records')
         except Exception as e:
             print(f"Kunne ikke læse enmandshæren: {e}")
 
         # 3. Geografiske Højborge
         try:
-            strongholds = pd.read_excel(magt_fil, sheet_name='Geografiske Højborge')
+            strongholds = resultater.get('Analyse_magt', 'Geografiske Højborge')
             findings['strongholds_top20'] = strongholds.head(20).to_dict('records')
         except Exception as e:
             print(f"Kunne ikke læse geografiske højborge: {e}")
 
         # 4. Tynde Flertaller
         try:
-            thin_majorities = pd.read_excel(magt_fil, sheet_name='Tynde Flertaller')
+            thin_majorities = resultater.get('Analyse_magt', 'Tynde Flertaller')
             # Only include parties with POSITIVE margin (actual majorities, not coalitions)
             thin_majorities_positive = thin_majorities[thin_majorities['Margin (over flertal)'] > 0].copy()
             # Sorter efter mindste margin (mest sårbare)
@@ -372,7 +311,7 @@ def generate_master_findings(findings, output_dir='excel_output'):
         print("❌ Ingen findings at generere")
         return
 
-    output_file = f'{output_dir}/00_START_HER/MASTER_FINDINGS.md'
+    output_file = output_sti(output_dir, 'MASTER_FINDINGS.md')
 
     # Build content with journalistic narrative structure
     content = f"""# DANSK KOMMUNALVALG 2025
@@ -779,20 +718,17 @@ Angiv venligst kilde som "KV2025 Valgdata analyse. Kaas & Mulvad Research (githu
 **Pipeline:** `generate_findings.py` · Komplet reproducerbar analyse
 """
 
-    # Ensure directory exists
-    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-
-    # Gem fil
-    with open(output_file, 'w', encoding='utf-8') as f:
+    # Gem fil (atomisk - mappen oprettes ved behov)
+    with atomisk(output_file) as tmp, open(tmp, 'w', encoding='utf-8') as f:
         f.write(content)
 
     print(f"✅ MASTER_FINDINGS.md gemt: {output_file}")
     return output_file
 
-def main(output_dir='excel_output'):
+def main(output_dir='excel_output', store=None):
     """Main funktion til brug i pipeline"""
     # Analyser data
-    findings = analyze_data(output_dir)
+    findings = analyze_data(output_dir, store)
 
     if findings:
         # Generer MASTER_FINDINGS.md
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Geografiske dimensionstabeller fra valg.dk
+
+Converteren gemmer geografi-dokumenterne (Kommune, Region, Afstemningsomraade,
+Opstillingskreds, Storkreds, Valglandsdel) som typede Parquet-tabeller med
+heltals-nøgler (DAGI-id, koder, numre) i parquet/geografi/, ved siden af
+Excel-filen i 04_Reference_Geografi/.
+
+Tabellerne læses via DataStore.geography() med kolonne-projektion og caches
+i processen ligesom de øvrige datasæt. Findes der kun Excel (ældre output),
+bruges den som fallback.
+"""
+
+import re
+import pandas as pd
+from pathlib import Path
+from utils import save_parquet
+
+# Geografi-dokumenter (filnavn-præfiks '<Type>-<tidsstempel>.json')
+GEOGRAFI_TYPER = ['Kommune', 'Region', 'Afstemningsomraade', 'Opstillingskreds', 'Storkreds', 'Valglandsdel']
+
+# Undermappe i parquet/ til dimensionstabellerne
+GEOGRAFI_MAPPE = 'geografi'
+
+# Kolonner der er heltals-nøgler ('Dagi_id', 'Kommunekode', 'Afstemningssted.Nummer' ...)
+NØGLE_MØNSTER = re.compile(r'(Dagi_id|[Kk]ode|Nummer)$')
+
+
+def geografi_type(filnavn):
+    """Geografi-type for en fil ('Kommune-111120250750.json' -> 'Kommune'), ellers None"""
+    for navn in GEOGRAFI_TYPER:
+        if Path(filnavn).name.startswith(f'{navn}-'):
+            return navn
+    return None
+
+
+def geografi_tabel(data):
+    """
+    Fladgør et geografi-dokument til en typet tabel.
+
+    Nøglekolonner konverteres til nullable Int64, når alle værdier er heltal;
+    ellers bevares de som de er.
+    """
+    df = pd.json_normalize(data if isinstance(data, list) else [data])
+
+    for kolonne in df.columns:
+        if not NØGLE_MØNSTER.search(kolonne):
+            continue
+        værdier = df[kolonne].replace('', None)
+        tal = pd.to_numeric(værdier, errors='coerce')
+        if tal.notna().sum() == værdier.notna().sum() and (tal.dropna() % 1 == 0).all():
+            df[kolonne] = tal.astype('Int64')
+    return df
+
+
+def gem_geografi(df, parquet_dir, stem, description=""):
+    """Gem dimensionstabel som parquet/geografi/<stem>.parquet"""
+    fil = Path(parquet_dir) / GEOGRAFI_MAPPE / f'{stem}.parquet'
+    save_parquet(df, fil, description)
+    return fil
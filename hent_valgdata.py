@@ -10,6 +10,7 @@ import paramiko
 from pathlib import Path
 import sys
 import time
+from utils import spor
 
 
 def hent_fra_sftp(output_mappe="./json_data"):
@@ -131,7 +132,8 @@ def download_recursive(sftp, remote_path, local_path, indent=0):
                         continue
                 
                 print(f"{prefix}  ↓ {item.filename} ({format_size(item.st_size)})")
-                success = download_file_with_retry(sftp, remote_item, local_item, item.st_size)
+                with spor(item.filename, 'download', bytes=item.st_size):
+                    success = download_file_with_retry(sftp, remote_item, local_item, item.st_size)
                 if not success:
                     print(f"{prefix}    ⚠ Spring over (download fejlede)")
             else:
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Indekseret kandidatopslag på normaliseret fulde navn + kommune
+
+Bygges én gang fra kandidater og bruges til at koble personer fra andre kilder
+(fx borgmestre_parsed.csv) til præcise KandidatId-rækker:
+
+1. Vektoriseret join på (normaliseret kommune, normaliseret fulde navn)
+2. Trigram-fallback inden for kommunen for nær-match (mellemnavne,
+   bindestreger, stavevarianter)
+3. Til sidst køn ud fra fornavnets mest udbredte køn blandt kandidaterne
+   (kun køn - ingen KandidatId)
+"""
+
+import pandas as pd
+
+# Kolonner indekset bruger fra kandidater (kolonne-projektion)
+KANDIDAT_KOLONNER = ['KandidatId', 'Navn', 'KommuneNavn', 'EstimeretKøn']
+
+# Mindste trigram-overlap (andel af det korteste navns trigrammer) for nær-match
+TRIGRAM_TÆRSKEL = 0.8
+
+
+def normaliser_navn(navne):
+    """Små bogstaver, bindestreger/punktummer som mellemrum, ét mellemrum mellem ord"""
+    return (navne.fillna('').astype(str)
+            .str.normalize('NFKC')
+            .str.lower()
+            .str.replace(r'[-‐–.]', ' ', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip())
+
+
+def normaliser_kommune(kommuner):
+    """'Københavns Kommune' -> 'københavns' (uden Kommune/Regionskommune)"""
+    return normaliser_navn(kommuner).str.replace(r'\s+(regions)?kommune$', '', regex=True)
+
+
+def trigrammer(navn):
+    """Mængde af tegn-trigrammer med ordgrænser markeret"""
+    tekst = f"  {navn} "
+    return frozenset(tekst[i:i + 3] for i in range(len(tekst) - 2))
+
+
+class KandidatIndeks:
+    """Opslag fra (kommune, navn) til kandidatrækker"""
+
+    def __init__(self, kandidater):
+        df = kandidater[[k for k in KANDIDAT_KOLONNER if k in kandidater.columns]]
+        df = df[df['KommuneNavn'].fillna('') != ''].assign(
+            Navnenøgle=lambda d: normaliser_navn(d['Navn']),
+            Kommunenøgle=lambda d: normaliser_kommune(d['KommuneNavn']),
+        )
+        # Samme kandidat kan optræde flere gange (flere frigivelser) - behold seneste
+        self.kandidater = df.drop_duplicates(['Kommunenøgle', 'Navnenøgle'], keep='last').reset_index(drop=True)
+
+        # Genitiv-alias: 'københavns' findes også som 'københavn' ('Halsnæs' bevares)
+        nøgler = self.kandidater[['Kommunenøgle', 'Navnenøgle']].reset_index(names='Række')
+        alias = nøgler[nøgler['Kommunenøgle'].str.endswith('s')].assign(
+            Kommunenøgle=lambda d: d['Kommunenøgle'].str[:-1])
+        self.nøgler = pd.concat([nøgler, alias], ignore_index=True).drop_duplicates(
+            ['Kommunenøgle', 'Navnenøgle'], keep='first')
+
+        self._per_kommune = None
+        self._fornavn_køn = None
+
+    def _kommune_trigrammer(self):
+        """Kommunenøgle -> [(række, trigrammer)] til fallback (bygges ved første behov)"""
+        if self._per_kommune is None:
+            self._per_kommune = {}
+            for kommune, rækker in self.nøgler.groupby('Kommunenøgle')['Række']:
+                navne = self.kandidater['Navnenøgle'].to_numpy()[rækker.to_numpy()]
+                self._per_kommune[kommune] = [(r, trigrammer(n)) for r, n in zip(rækker, navne)]
+        return self._per_kommune
+
+    def fornavn_køn(self):
+        """Mest udbredte kendte køn per normaliseret fornavn"""
+        if self._fornavn_køn is None:
+            fornavne = normaliser_navn(self.kandidater['Navn']).str.split(' ').str[0]
+            kendt = self.kandidater.assign(Fornavnenøgle=fornavne)
+            kendt = kendt[kendt['EstimeretKøn'].isin(['M', 'K'])]
+            antal = kendt.groupby(['Fornavnenøgle', 'EstimeretKøn']).size().reset_index(name='Antal')
+            antal = antal.sort_values(['Fornavnenøgle', 'Antal'], ascending=[True, False], kind='stable')
+            self._fornavn_køn = antal.drop_duplicates('Fornavnenøgle').set_index('Fornavnenøgle')['EstimeretKøn']
+        return self._fornavn_køn
+
+    def match(self, navne, kommuner):
+        """
+        Find kandidatrække for hver (navn, kommune).
+
+        Returns:
+            DataFrame (samme rækkefølge som input) med KandidatId, EstimeretKøn
+            og Match ('navn+kommune', 'trigram' eller None)
+        """
+        opslag = pd.DataFrame({
+            'Kommunenøgle': normaliser_kommune(pd.Series(kommuner)).to_numpy(),
+            'Navnenøgle': normaliser_navn(pd.Series(navne)).to_numpy(),
+        })
+        opslag = opslag.merge(self.nøgler, on=['Kommunenøgle', 'Navnenøgle'], how='left')
+        opslag['Match'] = opslag['Række'].notna().map({True: 'navn+kommune', False: None})
+
+        # Trigram-fallback kun for de få der ikke matchede direkte
+        mangler = opslag.index[opslag['Række'].isna()]
+        if len(mangler):
+            per_kommune = self._kommune_trigrammer()
+            for i in mangler:
+                kandidater = per_kommune.get(opslag.at[i, 'Kommunenøgle'], [])
+                mål = trigrammer(opslag.at[i, 'Navnenøgle'])
+                bedste, bedste_score = None, TRIGRAM_TÆRSKEL
+                for række, tri in kandidater:
+                    score = len(mål & tri) / min(len(mål), len(tri))
+                    if score >= bedste_score and (bedste is None or score > bedste_score):
+                        bedste, bedste_score = række, score
+                if bedste is not None:
+                    opslag.at[i, 'Række'] = bedste
+                    opslag.at[i, 'Match'] = 'trigram'
+
+        rækker = opslag['Række']
+        fundet = rækker.notna().to_numpy()
+        resultat = pd.DataFrame({'KandidatId': None, 'EstimeretKøn': None, 'Match': opslag['Match']})
+        if fundet.any():
+            match = self.kandidater.iloc[rækker[fundet].astype(int).to_numpy()]
+            resultat.loc[fundet, 'KandidatId'] = match['KandidatId'].to_numpy()
+            resultat.loc[fundet, 'EstimeretKøn'] = match['EstimeretKøn'].to_numpy()
+        return resultat
+
+    def match_borgmestre(self, borgmestre):
+        """
+        Kobl borgmestre (Navn, Kommune) til kandidater og sæt Køn.
+
+        Køn tages fra den matchede kandidat; ellers fra fornavnets mest
+        udbredte køn blandt kandidaterne; ellers 'Ukendt'.
+
+        Returns:
+            Kopi af borgmestre med KandidatId, Køn og KønsMatch
+        """
+        match = self.match(borgmestre['Navn'], borgmestre['Kommune'])
+
+        fornavne = normaliser_navn(borgmestre['Navn']).str.split(' ').str[0]
+        køn_fornavn = pd.Series(fornavne.map(self.fornavn_køn()).to_numpy())
+
+        køn = match['EstimeretKøn'].where(match['EstimeretKøn'].isin(['M', 'K']))
+        kønsmatch = match['Match'].where(køn.notna())
+        brug_fornavn = køn.isna() & køn_fornavn.notna()
+        køn = køn.mask(brug_fornavn, køn_fornavn)
+        kønsmatch = kønsmatch.mask(brug_fornavn, 'fornavn')
+
+        return borgmestre.assign(
+            KandidatId=match['KandidatId'].to_numpy(),
+            Køn=køn.fillna('Ukendt').to_numpy(),
+            KønsMatch=kønsmatch.to_numpy(),
+        )
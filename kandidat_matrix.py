@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Sparse kandidat × afstemningsområde matrix med personlige stemmer
+
+Converteren bygger matricen én gang (scipy.sparse CSR) og gemmer den i arrow/
+sammen med indeks-dimensionerne for kandidater og afstemningsområder. Spørgsmål
+som "hvor fik kandidat X sine stemmer" eller "hvilke kandidater deler
+vælgergrundlag" besvares derefter direkte fra matricen i stedet for at filtrere
+hele valgresultater-tabellen:
+
+- area_profile(): kandidatens stemmer og andel per afstemningsområde
+- home_area(): området hvor kandidaten har størst andel af de personlige stemmer
+- similar_candidates(): cosinus-lighed mod kandidater i samme kommune/region
+  (kandidater der optræder i de samme afstemningsområder)
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pathlib import Path
+from utils import save_arrow_ipc
+
+KANDIDAT_DIM = ['KandidatId', 'Stemmeseddelnavn', 'ListeNavn', 'Kommune', 'Valgart']
+OMRÅDE_DIM = ['Valgart', 'AfstemningsområdeDagiId', 'Afstemningsområde', 'Kommune']
+
+# Kolonner fra valgresultater der skal bruges for at bygge matricen
+RESULTAT_KOLONNER = ['Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'Afstemningsområde',
+                     'KandidatId', 'Stemmeseddelnavn', 'ListeNavn', 'PersonligeStemmer']
+
+
+class KandidatMatrix:
+    """Personlige stemmer: kandidat (rækker) × afstemningsområde (kolonner)"""
+
+    def __init__(self, csr, kandidater, områder):
+        self.csr = sp.csr_matrix(csr)
+        self.kandidater = kandidater.reset_index(drop=True)
+        self.områder = områder.reset_index(drop=True)
+        self._csc = None
+
+        # Indeks-opslag: KandidatId -> række
+        self.række = pd.Index(self.kandidater['KandidatId'].astype(str))
+
+        # Personlige stemmer i alt per område og per kandidat
+        self.område_total = np.asarray(self.csr.sum(axis=0)).ravel()
+        self.kandidat_total = np.asarray(self.csr.sum(axis=1)).ravel()
+
+        # L2-normer til cosinus-lighed
+        self._norm = np.sqrt(np.asarray(self.csr.multiply(self.csr).sum(axis=1)).ravel())
+
+    @property
+    def csc(self):
+        """Kolonne-orienteret kopi (hurtige opslag per område)"""
+        if self._csc is None:
+            self._csc = self.csr.tocsc()
+        return self._csc
+
+    @classmethod
+    def from_results(cls, df_res):
+        """Byg matricen fra valgresultater (kun rækker med kandidat)"""
+        df = df_res[df_res['KandidatId'].notna() & (df_res['KandidatId'].astype(str) != '')]
+
+        område_kode, område_unikke = pd.MultiIndex.from_frame(
+            df[['Valgart', 'AfstemningsområdeDagiId']]).factorize()
+        kandidat_kode, kandidat_unikke = pd.factorize(df['KandidatId'].astype(str))
+
+        csr = sp.csr_matrix(
+            (df['PersonligeStemmer'].fillna(0).to_numpy(dtype=np.int64), (kandidat_kode, område_kode)),
+            shape=(len(kandidat_unikke), len(område_unikke)),
+        )
+        csr.sum_duplicates()
+
+        # Dimensioner i matricens rækkefølge (første forekomst)
+        første_kandidat = df.assign(KandidatId=df['KandidatId'].astype(str)).drop_duplicates('KandidatId')
+        kandidater = første_kandidat[KANDIDAT_DIM].reset_index(drop=True)
+        områder = df.drop_duplicates(['Valgart', 'AfstemningsområdeDagiId'])[OMRÅDE_DIM].reset_index(drop=True)
+
+        return cls(csr, kandidater, områder)
+
+    def save(self, filepath, description=""):
+        """Gem CSR som .npz og indeks-dimensionerne som Arrow IPC ved siden af"""
+        filepath = Path(filepath)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        sp.save_npz(filepath, self.csr, compressed=False)
+        save_arrow_ipc(self.kandidater, filepath.with_name(filepath.stem + '_kandidater.arrow'))
+        save_arrow_ipc(self.områder, filepath.with_name(filepath.stem + '_omraader.arrow'))
+        if description:
+            print(f"✓ {description}: {filepath.name} ({self.csr.shape[0]} × {self.csr.shape[1]}, {self.csr.nnz} værdier)")
+
+    @classmethod
+    def load(cls, filepath):
+        """Indlæs matrix gemt med save()"""
+        from utils import open_dataset_mmap
+
+        filepath = Path(filepath)
+        csr = sp.load_npz(filepath)
+        kandidater = open_dataset_mmap(filepath.with_name(filepath.stem + '_kandidater.arrow'), as_pandas=True)
+        områder = open_dataset_mmap(filepath.with_name(filepath.stem + '_omraader.arrow'), as_pandas=True)
+        return cls(csr, kandidater, områder)
+
+    def _row(self, kandidat_id):
+        """Række for KandidatId (KeyError hvis ukendt)"""
+        return self.række.get_loc(str(kandidat_id))
+
+    def area_profile(self, kandidat_id):
+        """
+        Kandidatens stemmer per afstemningsområde.
+
+        Returns:
+            DataFrame med områdedimensionen + PersonligeStemmer, Andel af kandidat %
+            og Andel af område % (kandidatens andel af områdets personlige stemmer),
+            sorteret efter flest stemmer
+        """
+        r = self._row(kandidat_id)
+        start, slut = self.csr.indptr[r], self.csr.indptr[r + 1]
+        kolonner = self.csr.indices[start:slut]
+        stemmer = self.csr.data[start:slut]
+
+        profil = self.områder.iloc[kolonner].reset_index(drop=True)
+        profil['PersonligeStemmer'] = stemmer
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profil['Andel af kandidat %'] = (stemmer / self.kandidat_total[r] * 100).round(1)
+            profil['Andel af område %'] = (stemmer / self.område_total[kolonner] * 100).round(1)
+        return profil.sort_values('PersonligeStemmer', ascending=False, kind='stable')
+
+    def home_area(self, kandidat_id):
+        """
+        Kandidatens hjemmeområde: området hvor kandidaten har størst andel af
+        de personlige stemmer (argmax af andel, ikke af rå stemmetal).
+
+        Returns:
+            Række (Series) fra områdedimensionen med Andel af område %, eller None
+        """
+        r = self._row(kandidat_id)
+        start, slut = self.csr.indptr[r], self.csr.indptr[r + 1]
+        if slut == start or self.kandidat_total[r] == 0:
+            return None
+
+        kolonner = self.csr.indices[start:slut]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            andel = np.nan_to_num(self.csr.data[start:slut] / self.område_total[kolonner])
+        k = kolonner[np.argmax(andel)]
+
+        område = self.områder.iloc[k].copy()
+        område['Andel af område %'] = round(andel.max() * 100, 1)
+        return område
+
+    def home_areas(self):
+        """Hjemmeområde for alle kandidater på én gang (vektoriseret)"""
+        with np.errstate(divide='ignore'):
+            skala = sp.diags(np.where(self.område_total > 0, 1.0 / self.område_total, 0.0))
+        andele = (self.csr @ skala).tocsr()
+        k = np.asarray(andele.argmax(axis=1)).ravel()
+
+        resultat = self.kandidater.copy()
+        resultat['Hjemmeområde'] = self.områder['Afstemningsområde'].to_numpy()[k]
+        resultat['HjemmeområdeDagiId'] = self.områder['AfstemningsområdeDagiId'].to_numpy()[k]
+        resultat['Andel af område %'] = (np.asarray(andele.max(axis=1).todense()).ravel() * 100).round(1)
+        return resultat[self.kandidat_total > 0]
+
+    def cosine_similarity(self, kandidat_a, kandidat_b):
+        """Cosinus-lighed mellem to kandidaters områdeprofiler (0-1)"""
+        a, b = self._row(kandidat_a), self._row(kandidat_b)
+        if self._norm[a] == 0 or self._norm[b] == 0:
+            return 0.0
+        return float(self.csr[a].multiply(self.csr[b]).sum() / (self._norm[a] * self._norm[b]))
+
+    def similar_candidates(self, kandidat_id, n=10):
+        """
+        Kandidater med mest lignende vælgergrundlag i samme kommune/region.
+
+        Sammenligner kun med kandidater der har stemmer i de samme
+        afstemningsområder (= samme kommune ved kommunalvalg, samme region ved
+        regionsrådsvalg).
+
+        Returns:
+            DataFrame med kandidatdimensionen + Cosinus-lighed, top n
+        """
+        r = self._row(kandidat_id)
+        kolonner = self.csr.indices[self.csr.indptr[r]:self.csr.indptr[r + 1]]
+        if len(kolonner) == 0 or self._norm[r] == 0:
+            return self.kandidater.iloc[[]].assign(**{'Cosinus-lighed': []})
+
+        # Kandidater i samme områder via CSC-opslag
+        naboer = np.unique(self.csc[:, kolonner].indices)
+        naboer = naboer[(naboer != r) & (self._norm[naboer] > 0)]
+
+        prikprodukt = np.asarray((self.csr[naboer] @ self.csr[r].T).todense()).ravel()
+        lighed = prikprodukt / (self._norm[naboer] * self._norm[r])
+
+        top = np.argsort(-lighed, kind='stable')[:n]
+        resultat = self.kandidater.iloc[naboer[top]].reset_index(drop=True)
+        resultat['Cosinus-lighed'] = lighed[top].round(3)
+        return resultat
+
+
+def build_and_save(df_res, arrow_dir, valgtype, timestamp, description=""):
+    """Byg matrix fra valgresultater og gem som kandidat_omraade_{valgtype}_{timestamp}.npz"""
+    matrix = KandidatMatrix.from_results(df_res)
+    matrix.save(Path(arrow_dir) / f"kandidat_omraade_{valgtype}_{timestamp}.npz", description)
+    return matrix
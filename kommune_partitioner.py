@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Per-kommune partitioner for analyse-resultater
+
+Analyser der kan beregnes kommune for kommune (mandattyveri, enmandshære,
+højborge, stemmeslugere, valgdeltagelse) gemmer alle deres rækker - før
+top-N - i
+
+    partitioner/<analyse>/<tabel>.parquet   (alle kommuner, med Kommune-kolonne)
+    partitioner/<analyse>/index.json        (fingerprint per kommune + version)
+
+Ved næste kørsel beregnes et fingerprint per kommune af analysens inputrækker.
+Kun kommuner hvis fingerprint er ændret (eller som er nye) beregnes igen; deres
+rækker erstatter de gemte, og de nationale top-N-lister laves af den flettede
+tabel. Når kun få kommuner er opdateret, koster det en hash af inputtet, en
+beregning på de ændrede kommuners rækker og en sortering af den gemte tabel.
+
+Forudsætning: en kommunes resultatrækker afhænger kun af inputrækker med samme
+Kommune (alle gruppering sker per kommune). Ændres analysens kode (version),
+beregnes alle kommuner igen.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from utils import spor
+
+PARTITION_MAPPE = 'partitioner'
+INDEKS_FIL = 'index.json'
+
+
+def kommune_fingerprints(frames, kolonne='Kommune'):
+    """
+    Fingerprint per kommune af en eller flere frames.
+
+    Hashen afhænger af rækkernes indhold og rækkefølge inden for kommunen
+    (beregnet vektoriseret med pandas' række-hash).
+
+    Args:
+        frames: {navn: DataFrame med kolonne}
+
+    Returns:
+        {kommune: fingerprint-streng}
+    """
+    dele = {}
+    for navn, df in frames.items():
+        if df is None or len(df) == 0:
+            continue
+        koder, kommuner = pd.factorize(df[kolonne])
+        gyldig = koder >= 0
+        h = pd.util.hash_pandas_object(df, index=False).to_numpy()[gyldig]
+        koder = koder[gyldig]
+        # Positionsvægt gør hashen følsom for rækkefølgen inden for kommunen
+        position = pd.Series(koder).groupby(koder).cumcount().to_numpy(dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            vægtet = h * (position * np.uint64(2) + np.uint64(1))
+        summer = np.zeros(len(kommuner), dtype=np.uint64)
+        np.add.at(summer, koder, vægtet)
+        antal = np.bincount(koder, minlength=len(kommuner))
+        for kommune, s, n in zip(kommuner, summer, antal):
+            dele.setdefault(kommune, []).append(f'{navn}:{int(s):016x}:{n}')
+    return {kommune: '|'.join(d) for kommune, d in dele.items()}
+
+
+class KommunePartitioner:
+    """Gemte per-kommune resultatrækker for én analyse"""
+
+    def __init__(self, output_dir, analyse, version=''):
+        """
+        Args:
+            analyse: Navn (mappe under partitioner/)
+            version: Ændres den (fx hash af analysens kode), beregnes alt igen
+        """
+        self.dir = Path(output_dir) / PARTITION_MAPPE / analyse
+        self.analyse = analyse
+        self.version = version
+
+    def load_index(self):
+        """Gemt indeks ({'version', 'kommuner', 'tabeller'}) eller None"""
+        fil = self.dir / INDEKS_FIL
+        if not fil.exists():
+            return None
+        return json.loads(fil.read_text(encoding='utf-8'))
+
+    def opdater(self, fingerprints, beregn, orden):
+        """
+        Beregn ændrede kommuner og flet dem med de gemte partitioner.
+
+        Args:
+            fingerprints: {kommune: fingerprint} for det aktuelle input
+            beregn: funktion(kommuner) -> {tabel: DataFrame} med alle rækker
+                (ingen top-N) for de givne kommuner
+            orden: {tabel: kolonner} - den flettede tabel sorteres (stabilt)
+                efter disse, så rækkefølgen er den samme som ved en fuld beregning
+
+        Returns:
+            ({tabel: flettet DataFrame}, liste af genberegnede kommuner)
+        """
+        indeks = self.load_index()
+        gemte = {}
+        if indeks and indeks.get('version') == self.version and set(indeks['tabeller']) == set(orden):
+            gemte = indeks['kommuner']
+
+        ændrede = sorted(k for k, fp in fingerprints.items() if gemte.get(k) != fp)
+        fjernede = set(gemte) - set(fingerprints)
+        genbrug = bool(gemte) and len(ændrede) < len(fingerprints)
+
+        if not ændrede and not fjernede and genbrug:
+            print(f"    → {self.analyse}: alle {len(fingerprints)} kommuner uændrede")
+        elif genbrug:
+            print(f"    → {self.analyse}: genberegner {len(ændrede)} af {len(fingerprints)} kommuner")
+        else:
+            print(f"    → {self.analyse}: beregner alle {len(fingerprints)} kommuner")
+
+        with spor(f'beregn {self.analyse}', 'partition', kommuner=len(ændrede)):
+            nye = beregn(ændrede) if ændrede or not genbrug else {}
+
+        tabeller = {}
+        with spor(f'flet {self.analyse}', 'partition'):
+            for tabel, kolonner in orden.items():
+                dele = []
+                if genbrug:
+                    gammel = pd.read_parquet(self.dir / f'{tabel}.parquet')
+                    dele.append(gammel[~gammel['Kommune'].isin(set(ændrede) | fjernede)])
+                if tabel in nye:
+                    dele.append(nye[tabel])
+                dele = [d for d in dele if len(d)] or dele[:1]
+                flettet = pd.concat(dele, ignore_index=True) if len(dele) > 1 else dele[0].reset_index(drop=True)
+                tabeller[tabel] = flettet.sort_values(kolonner, kind='stable').reset_index(drop=True)
+
+        self.save(tabeller, fingerprints)
+        return tabeller, ændrede
+
+    def save(self, tabeller, fingerprints):
+        """Gem flettede tabeller og fingerprints"""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for tabel, df in tabeller.items():
+            df.to_parquet(self.dir / f'{tabel}.parquet', index=False)
+        (self.dir / INDEKS_FIL).write_text(json.dumps({
+            'analyse': self.analyse,
+            'version': self.version,
+            'opdateret': datetime.now().isoformat(timespec='seconds'),
+            'tabeller': sorted(tabeller),
+            'kommuner': fingerprints,
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def kode_version(modul):
+    """Version til KommunePartitioner: hash af modulets kode og lokale imports"""
+    import hashlib
+    from stage_cache import kode_filer, fil_hash
+
+    h = hashlib.sha256()
+    for fil in kode_filer(modul):
+        h.update(fil_hash(fil).encode())
+    return h.hexdigest()[:12]
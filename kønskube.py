@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Grouping-sets kube med kønsfordeling af kandidater
+
+Kandidattabellen gennemløbes én gang og tælles på det fineste niveau
+(Valgart × RegionNavn × KommuneNavn × ListeNavn × KønsMetode × EstimeretKøn).
+Alle rollups (per parti, kommune, region, parti × region, valgart, total ...)
+summeres derefter fra denne basis-kuboide, som kun har én række per
+kombination der faktisk forekommer - uanset hvor mange valg og kandidater der
+ligger i historikken.
+
+Både lav_kønsanalyse og generate_findings læser deres kønstabeller herfra.
+"""
+
+import pandas as pd
+
+# Dimensioner i basis-kuboiden (EstimeretKøn er altid med i rollups)
+DIMENSIONER = ['Valgart', 'RegionNavn', 'KommuneNavn', 'ListeNavn', 'KønsMetode']
+KØN = 'EstimeretKøn'
+KENDT_KØN = ['M', 'K']
+
+# Kolonner kuben bruger fra kandidater (kolonne-projektion)
+KANDIDAT_KOLONNER = ['ValgNavn', 'RegionNavn', 'KommuneNavn', 'ListeNavn', 'KønsMetode', KØN]
+
+
+def valgart(valgnavn):
+    """Valgart (Kommunalvalg/Regionsrådsvalg) udledt af ValgNavn - beregnes per unik værdi"""
+    unikke = pd.Series(valgnavn.dropna().unique())
+    art = unikke.where(~unikke.str.contains('Kommunalvalg'), 'Kommunalvalg')
+    art = art.where(~unikke.str.contains('Regionsrådsvalg'), 'Regionsrådsvalg')
+    return valgnavn.map(dict(zip(unikke, art)))
+
+
+class KønsKube:
+    """Antal kandidater per kombination af dimensioner og køn"""
+
+    def __init__(self, basis):
+        self.basis = basis
+        self._rollups = {}
+
+    @classmethod
+    def from_candidates(cls, kandidater):
+        """Byg basis-kuboiden i én gennemgang af kandidattabellen"""
+        df = pd.DataFrame({
+            'Valgart': valgart(kandidater['ValgNavn']) if 'ValgNavn' in kandidater.columns else None,
+            **{dim: kandidater[dim] if dim in kandidater.columns else None for dim in DIMENSIONER[1:]},
+            KØN: kandidater[KØN],
+        })
+        # Tom streng = dimensionen gælder ikke (fx KommuneNavn for regionskandidater)
+        df[DIMENSIONER] = df[DIMENSIONER].replace('', None)
+
+        basis = df.groupby(DIMENSIONER + [KØN], dropna=False, observed=True).size().rename('Antal')
+        return cls(basis.reset_index())
+
+    def rollup(self, dims=()):
+        """
+        Antal per dims + køn (summeret fra basis-kuboiden, caches).
+
+        Rækker hvor en af dims mangler udelades; manglende køn bevares så
+        totaler stemmer med antal kandidater.
+        """
+        dims = tuple(dims)
+        if dims not in self._rollups:
+            basis = self.basis.dropna(subset=list(dims)) if dims else self.basis
+            self._rollups[dims] = basis.groupby(list(dims) + [KØN], dropna=False)['Antal'].sum()
+        return self._rollups[dims]
+
+    def fordeling(self, dims=(), kun_kendt=True):
+        """
+        Bred kønstabel: én række per kombination af dims, én kolonne per køn.
+
+        Args:
+            dims: Dimensioner der grupperes på (tom = én total-række)
+            kun_kendt: Kun M/K (Total og Andel Kvinder % regnes på kendt køn)
+
+        Returns:
+            DataFrame indekseret på dims med kønskolonner, Total og
+            Andel Kvinder % (uafrundet; kun når både M og K forekommer)
+        """
+        antal = self.rollup(dims)
+        køn = antal.index.get_level_values(KØN)
+        if kun_kendt:
+            antal = antal[køn.isin(KENDT_KØN)]
+        else:
+            antal = antal[køn.notna()]
+
+        if dims:
+            tabel = antal.unstack(KØN, fill_value=0)
+        else:
+            tabel = antal.to_frame().T
+            tabel.index = ['Alle']
+        tabel.columns.name = None
+
+        tabel['Total'] = tabel.sum(axis=1)
+        if 'K' in tabel.columns and 'M' in tabel.columns:
+            tabel['Andel Kvinder %'] = tabel['K'] / (tabel['M'] + tabel['K']) * 100
+        return tabel
+
+    def total(self, dims=()):
+        """Antal kandidater i alt (alle køn, også manglende) per kombination af dims"""
+        antal = self.rollup(dims)
+        if not dims:
+            return int(antal.sum())
+        return antal.groupby(level=list(range(len(dims)))).sum()
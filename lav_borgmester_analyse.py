@@ -6,10 +6,15 @@ Laver borgmester-analyse baseret på parsed borgmester-data
 import pandas as pd
 from pathlib import Path
 import sys
-from utils import find_latest_file, load_parquet
+from datastore import DataStore
+from filplacering import output_sti
+from utils import spor
 
-def lav_borgmester_analyse(output_dir='excel_output'):
+@spor()
+def lav_borgmester_analyse(output_dir='excel_output', store=None):
     """Lav omfattende borgmester-analyse"""
+    if store is None:
+        store = DataStore(output_dir)
 
     # Læs borgmester CSV
     print("Læser borgmester-data...")
@@ -22,38 +27,15 @@ def lav_borgmester_analyse(output_dir='excel_output'):
     print(f"Læste {len(borgmestre)} borgmestre")
 
     # Find kandidat-fil med kønsdata - Parquet først
-    parquet_dir = Path(output_dir) / 'parquet'
-    samlet_dir = Path(output_dir) / '03_Samlet_Alle_Valg'
-    
-    kandidater_fil = find_latest_file(f'{parquet_dir}/kandidater_ALLE_VALG_*.parquet')
-    if not kandidater_fil:
-        kandidater_fil = find_latest_file(f'{samlet_dir}/kandidater_ALLE_VALG_*.xlsx')
-    if not kandidater_fil:
-        kandidater_fil = find_latest_file(f'{output_dir}/kandidater_ALLE_VALG_*.xlsx')
+    kandidater_fil = store.find_file('kandidater')
 
     # Match med kønsdata hvis muligt
     if kandidater_fil:
         print(f"\nMatcher med kønsdata fra {Path(kandidater_fil).name}...")
-        if kandidater_fil.endswith('.parquet'):
-            kandidater = load_parquet(kandidater_fil)
-        else:
-            kandidater = pd.read_excel(kandidater_fil)
-
-        # Opret kønsmap baseret på fornavn
-        koen_map = {}
-        for _, row in kandidater.iterrows():
-            fornavn = str(row.get('Fornavn', '')).strip()
-            koen = row.get('EstimeretKøn', 'Ukendt')
-            if fornavn and koen in ['M', 'K']:
-                koen_map[fornavn] = koen
-
-        # Match borgmestre med køn baseret på fornavn
-        def get_koen(navn):
-            fornavn = str(navn).split()[0] if navn else ''
-            return koen_map.get(fornavn, 'Ukendt')
-
-        borgmestre['Køn'] = borgmestre['Navn'].apply(get_koen)
-        print(f"Matchede køn for {len(borgmestre[borgmestre['Køn'] != 'Ukendt'])} borgmestre")
+        # Ét join på normaliseret navn + kommune (trigram/fornavn som fallback)
+        borgmestre = store.candidate_index().match_borgmestre(borgmestre)
+        print(f"Matchede køn for {len(borgmestre[borgmestre['Køn'] != 'Ukendt'])} borgmestre "
+              f"({borgmestre['KandidatId'].notna().sum()} koblet til KandidatId)")
     else:
         print("\n⚠️  Kunne ikke finde kandidat-fil - kønsanalyse springer over")
         borgmestre['Køn'] = 'Ukendt'
@@ -114,18 +96,18 @@ def lav_borgmester_analyse(output_dir='excel_output'):
     magtskifter = borgmestre[borgmestre['Status'] == 'Magtskifte'].groupby('Parti').size().reset_index(name='Antal Magtskifter')
     magtskifter = magtskifter.sort_values('Antal Magtskifter', ascending=False)
 
-    # Gem til Excel
-    output_file = Path(output_dir) / '00_START_HER' / 'Analyse_borgmestre.xlsx'
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    # Gem til Excel (og findings-lageret)
+    output_file = output_sti(output_dir, 'Analyse_borgmestre.xlsx')
     print(f"\nGemmer borgmester-analyse til {output_file}...")
 
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        oversigt.to_excel(writer, sheet_name='Oversigt', index=False)
-        parti_fordeling.to_excel(writer, sheet_name='Partifordeling', index=False)
-        status_fordeling.to_excel(writer, sheet_name='Status (Genvalgt mv)', index=False)
-        top_stemmer.to_excel(writer, sheet_name='Top 20 Stemmer', index=False)
-        df_koen.to_excel(writer, sheet_name='Kønsfordeling', index=False)
-        magtskifter.to_excel(writer, sheet_name='Magtskifter per Parti', index=False)
+    store.findings.write_workbook(output_file, {
+        'Oversigt': oversigt,
+        'Partifordeling': parti_fordeling,
+        'Status (Genvalgt mv)': status_fordeling,
+        'Top 20 Stemmer': top_stemmer,
+        'Kønsfordeling': df_koen,
+        'Magtskifter per Parti': magtskifter,
+    })
 
     print("✅ Borgmester-analyse færdig!")
     print(f"\n📊 HOVEDRESULTATER:")
@@ -141,9 +123,9 @@ def lav_borgmester_analyse(output_dir='excel_output'):
 
     print(f"\n📁 Fil gemt: {output_file}")
 
-def main(output_dir='excel_output'):
+def main(output_dir='excel_output', store=None):
     """Main funktion til brug i pipeline"""
-    lav_borgmester_analyse(output_dir)
+    lav_borgmester_analyse(output_dir, store)
 
 if __name__ == '__main__':
     import argparse
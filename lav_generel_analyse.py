@@ -9,62 +9,98 @@ from pathlib import Path
 import sys
 import re
 import argparse
-from utils import find_latest_file, load_parquet
+from datastore import DataStore
+from filplacering import output_sti
+from utils import klassificer_stilling, klassificer_stillinger, spor
+from kommune_partitioner import KommunePartitioner, kommune_fingerprints, kode_version
+
+# Kolonner analysen bruger (kolonne-projektion)
+KANDIDAT_KOLONNER = ['KandidatId', 'KommuneNavn', 'ListeNavn', 'EstimeretKøn', 'Stilling', 'JobKategori']
+RESULTAT_KOLONNER = ['Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'ListeNavn', 'ListeStemmer',
+                     'KandidatId', 'Stemmeseddelnavn', 'PersonligeStemmer',
+                     'Stemmeberettigede', 'AfgivneStemmer', 'ValgdeltagelseProcent']
 
 def rens_stilling(titel):
-    """Simpel rensning af jobtitler for bedre gruppering"""
-    if not isinstance(titel, str) or pd.isna(titel):
-        return "Uoplyst"
-
-    titel = titel.lower().strip()
-
-    # Slå enslydende titler sammen
-    if "studerende" in titel or "elev" in titel:
-        return "Studerende"
-    if "pensionist" in titel or "efterløn" in titel:
-        return "Pensionist"
-    if "lærer" in titel:
-        return "Lærer"
-    if "sygeplejerske" in titel or "sosu" in titel:
-        return "Sygeplejerske/SOSU"
-    if "konsulent" in titel:
-        return "Konsulent"
-    if "direktør" in titel or "leder" in titel or "chef" in titel:
-        return "Direktør/Leder"
-    if "ingeniør" in titel:
-        return "Ingeniør"
-    if "håndværker" in titel or "tømrer" in titel or "murer" in titel or "elektriker" in titel:
-        return "Håndværker"
-    if "pædagog" in titel:
-        return "Pædagog"
-    if "læge" in titel or "doktor" in titel:
-        return "Læge"
-    if "medarbejder" in titel:
-        return "Medarbejder"
-    if "selvstændig" in titel:
-        return "Selvstændig"
-
-    return titel.capitalize()
-
-def lav_generel_analyse(output_dir='excel_output'):
+    """Simpel rensning af jobtitler for bedre gruppering (nøgleord i data/jobkategorier.json)"""
+    return klassificer_stilling(titel)
+
+# Rækkefølge som groupby giver - flettede partitioner sorteres efter den
+STEMMESLUGER_NØGLE = ['KandidatId', 'Stemmeseddelnavn', 'ListeNavn', 'Kommune', 'Valgart']
+DELTAGELSE_NØGLE = ['Kommune', 'Valgart']
+
+
+def stemmesluger_rækker(df_res):
+    """Personlige stemmer per kandidat (alle kandidater, før top 100)"""
+    # Fjern rækker uden kandidat (listestemmer)
+    df_kandidat_stemmer = df_res[df_res['Stemmeseddelnavn'].notna()]
+
+    # Aggreger personlige stemmer per kandidat (hvis de optræder i flere områder)
+    return df_kandidat_stemmer.groupby(STEMMESLUGER_NØGLE).agg({
+        'PersonligeStemmer': 'sum'
+    }).reset_index()
+
+
+def deltagelse_rækker(df_res):
+    """Valgdeltagelse per kommune og valgart (vægtet efter stemmeberettigede)"""
+    deltagelse_data = df_res[df_res['ValgdeltagelseProcent'].notna()]
+
+    # Gruppér pr. kommune og valgart
+    deltagelse = deltagelse_data.groupby(DELTAGELSE_NØGLE).agg({
+        'ValgdeltagelseProcent': 'mean',
+        'Stemmeberettigede': 'sum',
+        'AfgivneStemmer': 'sum'
+    }).reset_index()
+
+    # Beregn vægtet gennemsnit
+    deltagelse['ValgdeltagelseProcent'] = (deltagelse['AfgivneStemmer'] / deltagelse['Stemmeberettigede'] * 100).round(2)
+    return deltagelse
+
+
+def kommune_rækker(df_res, output_dir):
+    """
+    Stemmesluger- og deltagelsesrækker beregnet per kommune.
+
+    Kun kommuner hvis valgresultater er ændret siden sidste kørsel beregnes
+    igen (se kommune_partitioner.py).
+
+    Returns:
+        {'stemmeslugere': DataFrame, 'valgdeltagelse': DataFrame} (de tabeller
+        hvis kolonner findes i valgresultaterne)
+    """
+    orden = {}
+    if 'PersonligeStemmer' in df_res.columns and 'Stemmeseddelnavn' in df_res.columns:
+        orden['stemmeslugere'] = STEMMESLUGER_NØGLE
+    if 'ValgdeltagelseProcent' in df_res.columns and 'Kommune' in df_res.columns:
+        orden['valgdeltagelse'] = DELTAGELSE_NØGLE
+    if not orden:
+        return {}
+
+    fingerprints = kommune_fingerprints({'resultater': df_res})
+
+    def beregn(kommuner):
+        udsnit = df_res if set(kommuner) >= set(fingerprints) else df_res[df_res['Kommune'].isin(kommuner)]
+        tabeller = {}
+        if 'stemmeslugere' in orden:
+            tabeller['stemmeslugere'] = stemmesluger_rækker(udsnit)
+        if 'valgdeltagelse' in orden:
+            tabeller['valgdeltagelse'] = deltagelse_rækker(udsnit)
+        return tabeller
+
+    partitioner = KommunePartitioner(output_dir, 'generel', kode_version('lav_generel_analyse'))
+    rækker, _ = partitioner.opdater(fingerprints, beregn, orden)
+    return rækker
+
+
+@spor()
+def lav_generel_analyse(output_dir='excel_output', store=None):
     """Lav generel analyse af valgdata"""
     print("🔍 Starter generel valganalyse...")
+    if store is None:
+        store = DataStore(output_dir)
 
     # Find filer - Parquet først, derefter Excel fallback
-    parquet_dir = Path(output_dir) / 'parquet'
-    samlet_dir = Path(output_dir) / '03_Samlet_Alle_Valg'
-
-    kand_fil = find_latest_file(str(parquet_dir / 'kandidater_ALLE_VALG_*.parquet'))
-    if not kand_fil:
-        kand_fil = find_latest_file(str(samlet_dir / 'kandidater_ALLE_VALG_*.xlsx'))
-    if not kand_fil:
-        kand_fil = find_latest_file(str(Path(output_dir) / 'kandidater_ALLE_VALG_*.xlsx'))
-
-    res_fil = find_latest_file(str(parquet_dir / 'valgresultater_ALLE_VALG_*.parquet'))
-    if not res_fil:
-        res_fil = find_latest_file(str(samlet_dir / 'valgresultater_ALLE_VALG_*.xlsx'))
-    if not res_fil:
-        res_fil = find_latest_file(str(Path(output_dir) / 'valgresultater_ALLE_VALG_*.xlsx'))
+    kand_fil = store.find_file('kandidater')
+    res_fil = store.find_file('valgresultater')
 
     if not kand_fil:
         print(f"❌ Mangler kandidat-fil")
@@ -76,63 +112,41 @@ def lav_generel_analyse(output_dir='excel_output'):
 
     # Læs data - auto-detect format
     print(f"📖 Læser kandidater fra: {Path(kand_fil).name}")
-    if kand_fil.endswith('.parquet'):
-        df_kand = load_parquet(kand_fil)
-    else:
-        df_kand = pd.read_excel(kand_fil)
+    df_kand = store.get('kandidater', columns=KANDIDAT_KOLONNER)
 
     print(f"📖 Læser resultater fra: {Path(res_fil).name}")
-    if res_fil.endswith('.parquet'):
-        df_res = load_parquet(res_fil)
-    else:
-        df_res = pd.read_excel(res_fil)
+    df_res = store.get('valgresultater', columns=RESULTAT_KOLONNER)
 
-    # Opret output fil i 00_START_HER
-    output_file = Path(output_dir) / '00_START_HER' / 'Analyse_generel.xlsx'
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    # Output-fil i 00_START_HER
+    output_file = output_sti(output_dir, 'Analyse_generel.xlsx')
+    ark = {}
 
-    writer = pd.ExcelWriter(output_file, engine='openpyxl')
+    # Stemmeslugere og valgdeltagelse beregnes per kommune (kun ændrede kommuner)
+    rækker = kommune_rækker(df_res, output_dir)
 
     # --- ANALYSE 1: STEMMESLUGERE (Top 100) ---
     print("  • Analyserer stemmeslugere...")
-    if 'PersonligeStemmer' in df_res.columns and 'Stemmeseddelnavn' in df_res.columns:
-        # Fjern rækker uden kandidat (listestemmer)
-        df_kandidat_stemmer = df_res[df_res['Stemmeseddelnavn'].notna()].copy()
-
-        # Aggreger personlige stemmer per kandidat (hvis de optræder i flere områder)
-        kandidat_stemmer = df_kandidat_stemmer.groupby(['KandidatId', 'Stemmeseddelnavn', 'ListeNavn', 'Kommune', 'Valgart']).agg({
-            'PersonligeStemmer': 'sum'
-        }).reset_index()
+    if 'stemmeslugere' in rækker:
+        kandidat_stemmer = rækker['stemmeslugere']
 
         # Sorter og tag top 100
         top_stemmer = kandidat_stemmer.nlargest(100, 'PersonligeStemmer')[
             ['Stemmeseddelnavn', 'ListeNavn', 'Kommune', 'Valgart', 'PersonligeStemmer']
         ]
         top_stemmer.columns = ['Navn', 'Parti', 'Kommune', 'Valgtype', 'Personlige Stemmer']
-        top_stemmer.to_excel(writer, sheet_name='Top 100 Stemmeslugere', index=False)
+        ark['Top 100 Stemmeslugere'] = top_stemmer
 
         print(f"    → Top stemmemodtager: {top_stemmer.iloc[0]['Navn']} med {top_stemmer.iloc[0]['Personlige Stemmer']:,} stemmer")
 
     # --- ANALYSE 2: VALGDELTAGELSE PR. KOMMUNE ---
     print("  • Analyserer valgdeltagelse...")
-    if 'ValgdeltagelseProcent' in df_res.columns and 'Kommune' in df_res.columns:
-        # Beregn gennemsnit pr. kommune (vægtet efter antal stemmeberettigede)
-        deltagelse_data = df_res[df_res['ValgdeltagelseProcent'].notna()].copy()
-
-        # Gruppér pr. kommune og valgart
-        deltagelse = deltagelse_data.groupby(['Kommune', 'Valgart']).agg({
-            'ValgdeltagelseProcent': 'mean',
-            'Stemmeberettigede': 'sum',
-            'AfgivneStemmer': 'sum'
-        }).reset_index()
-
-        # Beregn vægtet gennemsnit
-        deltagelse['ValgdeltagelseProcent'] = (deltagelse['AfgivneStemmer'] / deltagelse['Stemmeberettigede'] * 100).round(2)
-        deltagelse = deltagelse.sort_values('ValgdeltagelseProcent', ascending=False)
+    if 'valgdeltagelse' in rækker:
+        # Gennemsnit pr. kommune (vægtet efter antal stemmeberettigede)
+        deltagelse = rækker['valgdeltagelse'].sort_values('ValgdeltagelseProcent', ascending=False)
 
         deltagelse_output = deltagelse[['Kommune', 'Valgart', 'ValgdeltagelseProcent', 'Stemmeberettigede', 'AfgivneStemmer']]
         deltagelse_output.columns = ['Kommune', 'Valgtype', 'Valgdeltagelse %', 'Stemmeberettigede', 'Afgivne Stemmer']
-        deltagelse_output.to_excel(writer, sheet_name='Valgdeltagelse', index=False)
+        ark['Valgdeltagelse'] = deltagelse_output
 
         print(f"    → Højeste deltagelse: {deltagelse.iloc[0]['Kommune']} ({deltagelse.iloc[0]['ValgdeltagelseProcent']:.1f}%)")
         print(f"    → Laveste deltagelse: {deltagelse.iloc[-1]['Kommune']} ({deltagelse.iloc[-1]['ValgdeltagelseProcent']:.1f}%)")
@@ -140,13 +154,16 @@ def lav_generel_analyse(output_dir='excel_output'):
     # --- ANALYSE 3: ERHVERVSFORDELING ---
     print("  • Analyserer kandidaternes job...")
     if 'Stilling' in df_kand.columns:
-        df_kand['JobKategori'] = df_kand['Stilling'].apply(rens_stilling)
+        # JobKategori gemmes af converteren; ældre kandidatfiler klassificeres her
+        if 'JobKategori' not in df_kand.columns:
+            df_kand['JobKategori'] = klassificer_stillinger(df_kand['Stilling'])
 
         # Total jobfordeling
-        job_stats = df_kand['JobKategori'].value_counts().reset_index()
+        job_stats = df_kand['JobKategori'].value_counts()
+        job_stats = job_stats[job_stats > 0].reset_index()
         job_stats.columns = ['Jobtitel', 'Antal Kandidater']
         job_stats['Andel %'] = (job_stats['Antal Kandidater'] / len(df_kand) * 100).round(1)
-        job_stats.head(100).to_excel(writer, sheet_name='Top Job-titler', index=False)
+        ark['Top Job-titler'] = job_stats.head(100)
 
         # Job per parti (top 10 partier)
         top_partier = df_kand['ListeNavn'].value_counts().head(10).index
@@ -154,7 +171,7 @@ def lav_generel_analyse(output_dir='excel_output'):
 
         job_parti = pd.crosstab(df_top_partier['JobKategori'], df_top_partier['ListeNavn'], margins=True)
         job_parti = job_parti.sort_values('All', ascending=False).head(30)
-        job_parti.to_excel(writer, sheet_name='Job per Parti')
+        ark['Job per Parti'] = job_parti.reset_index()
 
         print(f"    → Mest almindelige job: {job_stats.iloc[0]['Jobtitel']} ({job_stats.iloc[0]['Antal Kandidater']} kandidater)")
 
@@ -190,12 +207,12 @@ def lav_generel_analyse(output_dir='excel_output'):
         parti_stats['Stemmer per Kandidat'] = (parti_stats['Totale Stemmer'] / parti_stats['Antal Kandidater']).round(0)
         parti_stats = parti_stats.sort_values('Totale Stemmer', ascending=False)
 
-        parti_stats.to_excel(writer, sheet_name='Partistatistik', index=False)
+        ark['Partistatistik'] = parti_stats
 
         print(f"    → Parti med flest stemmer: {parti_stats.iloc[0]['Parti']} ({parti_stats.iloc[0]['Totale Stemmer']:,.0f} stemmer)")
     else:
         parti_kand = parti_kand.sort_values('Antal Kandidater', ascending=False)
-        parti_kand.to_excel(writer, sheet_name='Partistatistik', index=False)
+        ark['Partistatistik'] = parti_kand
 
     # --- ANALYSE 5: GEOGRAFI - FJERNET ---
     # Note: Geografisk analyse (lokale vs eksterne kandidater) er fjernet
@@ -220,17 +237,17 @@ def lav_generel_analyse(output_dir='excel_output'):
         kandidater_kommune['% Kvinder'] = (kandidater_kommune['Antal Kvinder'] / kandidater_kommune['Antal Kandidater'] * 100).round(1)
         kandidater_kommune = kandidater_kommune.sort_values('Antal Kandidater', ascending=False)
 
-        kandidater_kommune.to_excel(writer, sheet_name='Kandidater per Kommune', index=False)
+        ark['Kandidater per Kommune'] = kandidater_kommune
 
         print(f"    → Kommune med flest kandidater: {kandidater_kommune.iloc[0]['Kommune']} ({kandidater_kommune.iloc[0]['Antal Kandidater']} kandidater)")
 
-    writer.close()
+    store.findings.write_workbook(output_file, ark)
     print(f"✅ Generel analyse gemt: {output_file}")
     return True
 
-def main(output_dir='excel_output'):
+def main(output_dir='excel_output', store=None):
     """Main funktion til brug i pipeline"""
-    success = lav_generel_analyse(output_dir)
+    success = lav_generel_analyse(output_dir, store)
     return success
 
 if __name__ == '__main__':
@@ -6,34 +6,19 @@ Laver kønsanalyse baseret på valgdata med estimeret køn
 import pandas as pd
 from pathlib import Path
 import sys
-from utils import find_latest_file, load_parquet
+from datastore import DataStore
+from filplacering import output_sti
+from utils import spor
 
-def lav_kønsanalyse(output_dir='excel_output'):
+@spor()
+def lav_kønsanalyse(output_dir='excel_output', store=None):
     """Lav omfattende kønsanalyse af valgdata"""
+    if store is None:
+        store = DataStore(output_dir)
 
     # Find nyeste filer automatisk (Parquet først, derefter Excel fallback)
     print("Finder nyeste datafiler...")
-    parquet_dir = Path(output_dir) / 'parquet'
-    samlet_dir = Path(output_dir) / '03_Samlet_Alle_Valg'
-
-    # Søg efter Parquet først, derefter Excel
-    kandidater_fil = find_latest_file(f'{parquet_dir}/kandidater_ALLE_VALG_*.parquet')
-    if not kandidater_fil:
-        kandidater_fil = find_latest_file(f'{samlet_dir}/kandidater_ALLE_VALG_*.xlsx')
-    if not kandidater_fil:
-        kandidater_fil = find_latest_file(f'{output_dir}/kandidater_ALLE_VALG_*.xlsx')
-
-    mandater_kommunal_fil = find_latest_file(f'{parquet_dir}/mandatfordeling_KOMMUNAL_*.parquet')
-    if not mandater_kommunal_fil:
-        mandater_kommunal_fil = find_latest_file(f'{samlet_dir}/mandatfordeling_KOMMUNAL_*.xlsx')
-    if not mandater_kommunal_fil:
-        mandater_kommunal_fil = find_latest_file(f'{output_dir}/mandatfordeling_KOMMUNAL_*.xlsx')
-
-    mandater_regional_fil = find_latest_file(f'{parquet_dir}/mandatfordeling_REGIONAL_*.parquet')
-    if not mandater_regional_fil:
-        mandater_regional_fil = find_latest_file(f'{samlet_dir}/mandatfordeling_REGIONAL_*.xlsx')
-    if not mandater_regional_fil:
-        mandater_regional_fil = find_latest_file(f'{output_dir}/mandatfordeling_REGIONAL_*.xlsx')
+    kandidater_fil = store.find_file('kandidater')
 
     if not kandidater_fil:
         print(f"❌ Fejl: Kunne ikke finde kandidater_ALLE_VALG filer i {output_dir}/")
@@ -41,109 +26,53 @@ def lav_kønsanalyse(output_dir='excel_output'):
 
     print(f"Bruger filer:")
     print(f"  • {Path(kandidater_fil).name}")
-    if mandater_kommunal_fil:
-        print(f"  • {Path(mandater_kommunal_fil).name}")
-    if mandater_regional_fil:
-        print(f"  • {Path(mandater_regional_fil).name}")
 
-    # Læs kandidat- og mandatdata (auto-detect Parquet vs Excel)
+    # Kønsfordelingskuben tæller alle kandidater én gang; arkene er rollups fra den
     print("\nLæser data...")
-    if kandidater_fil.endswith('.parquet'):
-        kandidater = load_parquet(kandidater_fil)
-    else:
-        kandidater = pd.read_excel(kandidater_fil)
-    
-    if mandater_kommunal_fil:
-        if mandater_kommunal_fil.endswith('.parquet'):
-            mandater_kommunal = load_parquet(mandater_kommunal_fil)
-        else:
-            mandater_kommunal = pd.read_excel(mandater_kommunal_fil)
-    else:
-        mandater_kommunal = None
-    
-    if mandater_regional_fil:
-        if mandater_regional_fil.endswith('.parquet'):
-            mandater_regional = load_parquet(mandater_regional_fil)
-        else:
-            mandater_regional = pd.read_excel(mandater_regional_fil)
-    else:
-        mandater_regional = None
-
-    # Fjern "Ukendt" køn fra detaljerede analyser (men behold i totaler)
-    kandidater_kendt = kandidater[kandidater['EstimeretKøn'].isin(['M', 'K'])].copy()
-
-    print(f"Total kandidater: {len(kandidater)}")
-    print(f"Med kendt køn: {len(kandidater_kendt)}")
+    kube = store.gender_cube()
+    total = kube.total()
+    total_køn = kube.fordeling(kun_kendt=False).iloc[0]
+
+    print(f"Total kandidater: {total}")
+    print(f"Med kendt køn: {int(total_køn.get('M', 0) + total_køn.get('K', 0))}")
+
+    def oversigt_række(kategori, køn, antal):
+        m, k = køn.get('M', 0), køn.get('K', 0)
+        return {
+            'Kategori': kategori,
+            'Mænd (M)': m,
+            'Kvinder (K)': k,
+            'Ukendt': køn.get('Ukendt', 0),
+            'Total': antal,
+            'Andel Kvinder %': round(k / (m + k) * 100, 1) if (m + k) > 0 else 0
+        }
 
     # ARK 1: OVERSIGT
-    oversigt_data = []
-
-    # Total fordeling
-    total_køn = kandidater['EstimeretKøn'].value_counts()
-    oversigt_data.append({
-        'Kategori': 'ALLE KANDIDATER',
-        'Mænd (M)': total_køn.get('M', 0),
-        'Kvinder (K)': total_køn.get('K', 0),
-        'Ukendt': total_køn.get('Ukendt', 0),
-        'Total': len(kandidater),
-        'Andel Kvinder %': round(total_køn.get('K', 0) / (total_køn.get('M', 0) + total_køn.get('K', 0)) * 100, 1) if (total_køn.get('M', 0) + total_køn.get('K', 0)) > 0 else 0
-    })
-
-    # Kommunalvalg
-    kommunal = kandidater[kandidater['ValgNavn'].str.contains('Kommunalvalg', na=False)]
-    k_køn = kommunal['EstimeretKøn'].value_counts()
-    oversigt_data.append({
-        'Kategori': 'Kommunalvalg',
-        'Mænd (M)': k_køn.get('M', 0),
-        'Kvinder (K)': k_køn.get('K', 0),
-        'Ukendt': k_køn.get('Ukendt', 0),
-        'Total': len(kommunal),
-        'Andel Kvinder %': round(k_køn.get('K', 0) / (k_køn.get('M', 0) + k_køn.get('K', 0)) * 100, 1) if (k_køn.get('M', 0) + k_køn.get('K', 0)) > 0 else 0
-    })
-
-    # Regionsrådsvalg
-    regional = kandidater[kandidater['ValgNavn'].str.contains('Regionsrådsvalg', na=False)]
-    r_køn = regional['EstimeretKøn'].value_counts()
-    oversigt_data.append({
-        'Kategori': 'Regionsrådsvalg',
-        'Mænd (M)': r_køn.get('M', 0),
-        'Kvinder (K)': r_køn.get('K', 0),
-        'Ukendt': r_køn.get('Ukendt', 0),
-        'Total': len(regional),
-        'Andel Kvinder %': round(r_køn.get('K', 0) / (r_køn.get('M', 0) + r_køn.get('K', 0)) * 100, 1) if (r_køn.get('M', 0) + r_køn.get('K', 0)) > 0 else 0
-    })
+    valgart_køn = kube.fordeling(['Valgart'], kun_kendt=False)
+    valgart_total = kube.total(['Valgart'])
+    oversigt_data = [oversigt_række('ALLE KANDIDATER', total_køn, total)]
+    for art in ['Kommunalvalg', 'Regionsrådsvalg']:
+        køn = valgart_køn.loc[art] if art in valgart_køn.index else pd.Series(dtype='int64')
+        oversigt_data.append(oversigt_række(art, køn, int(valgart_total.get(art, 0))))
 
     df_oversigt = pd.DataFrame(oversigt_data)
 
+    def køn_ark(dims):
+        tabel = kube.fordeling(dims)
+        tabel['Andel Kvinder %'] = tabel['Andel Kvinder %'].round(1)
+        return tabel
+
     # ARK 2: KØNSFORDELING PER PARTI
-    parti_køn = kandidater_kendt.groupby(['ListeNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-    parti_køn['Total'] = parti_køn.sum(axis=1)
-    parti_køn['Andel Kvinder %'] = round(parti_køn['K'] / (parti_køn['M'] + parti_køn['K']) * 100, 1)
-    parti_køn = parti_køn.sort_values('Andel Kvinder %', ascending=False)
-    parti_køn = parti_køn.reset_index()
-    parti_køn.columns.name = None
+    parti_køn = køn_ark(['ListeNavn']).sort_values('Andel Kvinder %', ascending=False).reset_index()
 
     # ARK 3: KØNSFORDELING PER KOMMUNE (top 30)
-    kommune_køn = kandidater_kendt[kandidater_kendt['KommuneNavn'] != ''].groupby(['KommuneNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-    kommune_køn['Total'] = kommune_køn.sum(axis=1)
-    kommune_køn['Andel Kvinder %'] = round(kommune_køn['K'] / (kommune_køn['M'] + kommune_køn['K']) * 100, 1)
-    kommune_køn = kommune_køn.sort_values('Total', ascending=False).head(30)
-    kommune_køn = kommune_køn.reset_index()
-    kommune_køn.columns.name = None
+    kommune_køn = køn_ark(['KommuneNavn']).sort_values('Total', ascending=False).head(30).reset_index()
 
     # ARK 4: KØNSFORDELING PER REGION
-    region_køn = kandidater_kendt[kandidater_kendt['RegionNavn'] != ''].groupby(['RegionNavn', 'EstimeretKøn']).size().unstack(fill_value=0)
-    region_køn['Total'] = region_køn.sum(axis=1)
-    region_køn['Andel Kvinder %'] = round(region_køn['K'] / (region_køn['M'] + region_køn['K']) * 100, 1)
-    region_køn = region_køn.sort_values('Andel Kvinder %', ascending=False)
-    region_køn = region_køn.reset_index()
-    region_køn.columns.name = None
+    region_køn = køn_ark(['RegionNavn']).sort_values('Andel Kvinder %', ascending=False).reset_index()
 
     # ARK 5: ESTIMERINGSMETODER
-    metode_stats = kandidater.groupby(['KønsMetode', 'EstimeretKøn']).size().unstack(fill_value=0)
-    metode_stats['Total'] = metode_stats.sum(axis=1)
-    metode_stats = metode_stats.reset_index()
-    metode_stats.columns.name = None
+    metode_stats = kube.fordeling(['KønsMetode'], kun_kendt=False).drop(columns='Andel Kvinder %').reset_index()
 
     # ARK 6: TOP PARTIER MED BEDST KØNSBALANCE
     # Kun partier med mindst 50 kandidater
@@ -151,30 +80,30 @@ def lav_kønsanalyse(output_dir='excel_output'):
     store_partier['Afvigelse fra 50%'] = abs(store_partier['Andel Kvinder %'] - 50)
     bedste_balance = store_partier.sort_values('Afvigelse fra 50%').head(20)
 
-    # Gem til Excel i 00_START_HER/
-    output_file = Path(output_dir) / '00_START_HER' / 'Analyse_kønsfordeling.xlsx'
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    # Gem til Excel i 00_START_HER/ (og findings-lageret)
+    output_file = output_sti(output_dir, 'Analyse_kønsfordeling.xlsx')
     print(f"\nGemmer kønsanalyse til {output_file}...")
 
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df_oversigt.to_excel(writer, sheet_name='Oversigt', index=False)
-        parti_køn.to_excel(writer, sheet_name='Per Parti', index=False)
-        kommune_køn.to_excel(writer, sheet_name='Per Kommune (Top 30)', index=False)
-        region_køn.to_excel(writer, sheet_name='Per Region', index=False)
-        metode_stats.to_excel(writer, sheet_name='Estimeringsmetoder', index=False)
-        bedste_balance.to_excel(writer, sheet_name='Bedste Kønsbalance', index=False)
+    store.findings.write_workbook(output_file, {
+        'Oversigt': df_oversigt,
+        'Per Parti': parti_køn,
+        'Per Kommune (Top 30)': kommune_køn,
+        'Per Region': region_køn,
+        'Estimeringsmetoder': metode_stats,
+        'Bedste Kønsbalance': bedste_balance,
+    })
 
     print("✅ Kønsanalyse færdig!")
     print(f"\n📊 HOVEDRESULTATER:")
-    print(f"   • Total: {len(kandidater)} kandidater")
-    print(f"   • Mænd: {total_køn.get('M', 0)} ({round(total_køn.get('M', 0)/len(kandidater)*100, 1)}%)")
-    print(f"   • Kvinder: {total_køn.get('K', 0)} ({round(total_køn.get('K', 0)/len(kandidater)*100, 1)}%)")
-    print(f"   • Ukendt: {total_køn.get('Ukendt', 0)} ({round(total_køn.get('Ukendt', 0)/len(kandidater)*100, 1)}%)")
+    print(f"   • Total: {total} kandidater")
+    print(f"   • Mænd: {total_køn.get('M', 0)} ({round(total_køn.get('M', 0)/total*100, 1)}%)")
+    print(f"   • Kvinder: {total_køn.get('K', 0)} ({round(total_køn.get('K', 0)/total*100, 1)}%)")
+    print(f"   • Ukendt: {total_køn.get('Ukendt', 0)} ({round(total_køn.get('Ukendt', 0)/total*100, 1)}%)")
     print(f"\n📁 Fil gemt: {output_file}")
 
-def main(output_dir='excel_output'):
+def main(output_dir='excel_output', store=None):
     """Main funktion til brug i pipeline"""
-    lav_kønsanalyse(output_dir)
+    lav_kønsanalyse(output_dir, store)
 
 if __name__ == '__main__':
     import argparse
@@ -1,17 +1,41 @@
 #!/usr/bin/env python3
 """
-Magtanalyse - Fire politiske analyser:
+Magtanalyse - Politiske analyser:
 1. De Tragiske Helte (Mandattyveri)
 2. Enmandshæren (Dependency Ratio)
 3. Geografiske Højborge (Afstemningsområde-analyse)
 4. Tynde Flertaller (Konstitueringsrisiko)
+5. Koalitioner (alle mulige flertal per kommune)
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
 import argparse
-from utils import find_latest_file, load_parquet
+from datastore import DataStore
+from filplacering import output_sti
+from utils import spor
+from kommune_partitioner import KommunePartitioner, kommune_fingerprints, kode_version
+
+# Kolonner analysen bruger (kolonne-projektion)
+RESULTAT_KOLONNER = ['Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'ListeNavn', 'ListeStemmer',
+                     'KandidatId', 'Stemmeseddelnavn', 'PersonligeStemmer']
+MANDAT_KOLONNER = ['Valgart', 'Kommune', 'MandatType', 'MandatNummer', 'KandidatId',
+                   'Stemmeseddelnavn', 'ListeNavn']
+
+# Mapping table for common party name variations
+# Borgmester-data bruger korte navne, mandatfordeling bruger fulde navne.
+PARTI_NORMALISERING = {
+    'SF - Socialistisk Folkeparti': 'Socialistisk Folkeparti',
+    'Venstre, Danmarks Liberale Parti': 'Venstre',
+    'Det Konservative Folkeparti': 'Konservative',
+    'Enhedslisten - De Rød-Grønne': 'Enhedslisten',
+    'Danmarksdemokraterne - Inger Støjberg': 'Danmarksdemokraterne',
+}
+
+# Max antal partier med mandater i én kommune for koalitions-enumerering (2^n koalitioner)
+MAX_KOALITIONS_PARTIER = 20
 
 def normalize_party_name(party_name):
     """
@@ -21,24 +45,26 @@ def normalize_party_name(party_name):
     if pd.isna(party_name):
         return party_name
 
-    # Mapping table for common party name variations
-    normalization_map = {
-        'SF - Socialistisk Folkeparti': 'Socialistisk Folkeparti',
-        'Venstre, Danmarks Liberale Parti': 'Venstre',
-        'Det Konservative Folkeparti': 'Konservative',
-        'Enhedslisten - De Rød-Grønne': 'Enhedslisten',
-        'Danmarksdemokraterne - Inger Støjberg': 'Danmarksdemokraterne',
-    }
+    return PARTI_NORMALISERING.get(party_name, party_name)
 
-    return normalization_map.get(party_name, party_name)
-
-def find_mandate_theft(df_res, df_mand):
+def build_party_dimension(party_names):
     """
-    Analyse 1: De Tragiske Helte - Kandidater der fik flere stemmer
-    end den sidste valgte fra deres parti, men ikke blev valgt.
+    Partidimension: én række per unikt ListeNavn med normaliseret navn.
+    Normaliseringen sker én gang per parti i stedet for per mandat-række.
     """
-    print("  • Analyserer mandattyveri (De Tragiske Helte)...")
+    dim = pd.DataFrame({'ListeNavn': pd.unique(pd.Series(party_names))})
+    dim['PartiNormaliseret'] = dim['ListeNavn'].map(normalize_party_name)
+    return dim
 
+@spor(kategori='magt')
+def mandate_theft_rows(df_res, df_mand):
+    """
+    Alle 'tragiske helte' (før top 100) med KandidatId, i rækkefølgen
+    Kommune, Parti, KandidatId, Navn, Valgtype.
+
+    KandidatId deduplikeres i mandatfordelingen; et id findes kun i én kommune,
+    så rækkerne for en kommune afhænger kun af kommunens egne inputrækker.
+    """
     # Aggregate kandidat stemmer per kommune+parti
     kandidat_stemmer = df_res[df_res['Stemmeseddelnavn'].notna()].groupby([
         'Kommune', 'ListeNavn', 'KandidatId', 'Stemmeseddelnavn', 'Valgart'
@@ -50,54 +76,58 @@ def find_mandate_theft(df_res, df_mand):
     elected = df_mand[
         (df_mand['MandatType'].isin(['Personligt', 'Liste'])) &
         (df_mand['KandidatId'].notna())
-    ].copy()
+    ]
 
     # VIGTIGT: Deduplicate på KandidatId (valg.dk data kan have multiple FrigivelsesTidspunkt)
     elected = elected.drop_duplicates(subset='KandidatId', keep='last')
 
-    robbed_candidates = []
+    gruppe = ['Kommune', 'ListeNavn', 'Valgart']
 
-    # Process each kommune+parti combination
-    for (kommune, parti, valgart), group in kandidat_stemmer.groupby(['Kommune', 'ListeNavn', 'Valgart']):
-        # Get elected from this parti+kommune
-        elected_here = elected[
-            (elected['Kommune'] == kommune) &
-            (elected['ListeNavn'] == parti) &
-            (elected['Valgart'] == valgart)
-        ]
-
-        if len(elected_here) == 0:
-            continue  # No mandates won
-
-        # Find last elected (highest mandate number)
-        last_elected = elected_here.sort_values('MandatNummer').iloc[-1]
-        last_elected_id = last_elected['KandidatId']
+    # Sidst valgte per liste (højeste mandatnummer) - én groupby i stedet for filter per gruppe
+    last_elected = elected.sort_values('MandatNummer', kind='stable').groupby(gruppe).tail(1)
+    last_elected = last_elected[gruppe + ['KandidatId', 'Stemmeseddelnavn']].rename(
+        columns={'KandidatId': 'SidsteValgteId', 'Stemmeseddelnavn': 'Sidste Valgte'}
+    )
 
-        # Get personal votes for last elected
-        last_elected_votes = group[group['KandidatId'] == last_elected_id]
-        if len(last_elected_votes) == 0:
-            continue
+    # Tærskel = sidst valgtes personlige stemmer (lister uden match springes over)
+    stemmer_per_id = kandidat_stemmer.drop_duplicates(subset=gruppe + ['KandidatId'])
+    thresholds = last_elected.merge(
+        stemmer_per_id[gruppe + ['KandidatId', 'PersonligeStemmer']].rename(
+            columns={'KandidatId': 'SidsteValgteId', 'PersonligeStemmer': 'Sidste Valgtes Stemmer'}
+        ),
+        on=gruppe + ['SidsteValgteId'],
+        how='inner'
+    )
 
-        threshold = last_elected_votes.iloc[0]['PersonligeStemmer']
+    # Join tærskel på alle kandidater og fjern de valgte fra samme liste (anti-join)
+    kandidater = kandidat_stemmer.merge(thresholds, on=gruppe, how='inner')
+    valgt = kandidater.merge(
+        elected[gruppe + ['KandidatId']].drop_duplicates(),
+        on=gruppe + ['KandidatId'],
+        how='left',
+        indicator=True
+    )['_merge'].eq('both').to_numpy()
+
+    robbed = kandidater[(kandidater['PersonligeStemmer'] > kandidater['Sidste Valgtes Stemmer']) & ~valgt]
+
+    df_robbed = pd.DataFrame({
+        'Navn': robbed['Stemmeseddelnavn'],
+        'Parti': robbed['ListeNavn'],
+        'Kommune': robbed['Kommune'],
+        'Valgtype': robbed['Valgart'],
+        'Personlige Stemmer': robbed['PersonligeStemmer'],
+        'Sidste Valgtes Stemmer': robbed['Sidste Valgtes Stemmer'],
+        'Stemmeoverskud': robbed['PersonligeStemmer'] - robbed['Sidste Valgtes Stemmer'],
+        'Sidste Valgte': robbed['Sidste Valgte'],
+        'KandidatId': robbed['KandidatId'],
+    }).reset_index(drop=True)
 
-        # Find candidates with more votes but not elected
-        elected_ids = set(elected_here['KandidatId'].tolist())
+    return df_robbed
 
-        for _, kandidat in group.iterrows():
-            if (kandidat['PersonligeStemmer'] > threshold and
-                kandidat['KandidatId'] not in elected_ids):
-                robbed_candidates.append({
-                    'Navn': kandidat['Stemmeseddelnavn'],
-                    'Parti': parti,
-                    'Kommune': kommune,
-                    'Valgtype': valgart,
-                    'Personlige Stemmer': kandidat['PersonligeStemmer'],
-                    'Sidste Valgtes Stemmer': threshold,
-                    'Stemmeoverskud': kandidat['PersonligeStemmer'] - threshold,
-                    'Sidste Valgte': last_elected['Stemmeseddelnavn']
-                })
 
-    df_robbed = pd.DataFrame(robbed_candidates)
+def top_mandate_theft(rækker):
+    """Top 100 tragiske helte fra mandate_theft_rows (evt. flettet fra kommune-partitioner)"""
+    df_robbed = rækker.drop(columns='KandidatId')
 
     if len(df_robbed) > 0:
         df_robbed = df_robbed.sort_values('Stemmeoverskud', ascending=False).head(100)
@@ -111,13 +141,21 @@ def find_mandate_theft(df_res, df_mand):
     return df_robbed
 
 
-def find_one_person_armies(df_res):
+def find_mandate_theft(df_res, df_mand):
     """
-    Analyse 2: Enmandshæren - Kandidater der bærer hele partiet
-    (høj dependency ratio)
+    Analyse 1: De Tragiske Helte - Kandidater der fik flere stemmer
+    end den sidste valgte fra deres parti, men ikke blev valgt.
     """
-    print("  • Analyserer enmandshære (Dependency Ratio)...")
+    print("  • Analyserer mandattyveri (De Tragiske Helte)...")
+    return top_mandate_theft(mandate_theft_rows(df_res, df_mand))
 
+
+@spor(kategori='magt')
+def one_person_army_rows(df_res):
+    """
+    Dependency ratio for alle kandidater (før støjfilter og top 100), i
+    rækkefølgen Kommune, ListeNavn, Valgart, KandidatId, Stemmeseddelnavn.
+    """
     kandidat_data = df_res[df_res['Stemmeseddelnavn'].notna()].copy()
 
     # Calculate party totals per kommune (avoid listestemmer duplication!)
@@ -152,7 +190,11 @@ def find_one_person_armies(df_res):
 
     # Calculate dependency ratio
     merged['Dependency Ratio %'] = (merged['PersonligeStemmer'] / merged['PartiTotalStemmer'] * 100).round(1)
+    return merged
+
 
+def top_one_person_armies(merged):
+    """Top 100 enmandshære fra one_person_army_rows (evt. flettet fra kommune-partitioner)"""
     # Filter out 100% cases with very few votes (noise)
     merged = merged[
         ~((merged['Dependency Ratio %'] >= 99.9) & (merged['PartiTotalStemmer'] < 50))
@@ -172,84 +214,78 @@ def find_one_person_armies(df_res):
     return top_dependency
 
 
-def find_geographic_strongholds(df_res):
+def find_one_person_armies(df_res):
     """
-    Analyse 3: Geografiske Højborge - Afstemningsområder hvor
-    partiet klarer sig meget bedre end kommunegennemsnittet
+    Analyse 2: Enmandshæren - Kandidater der bærer hele partiet
+    (høj dependency ratio)
     """
-    print("  • Analyserer geografiske højborge...")
-
-    # Calculate party vote share per afstemningsområde
-    # For each afstemningsområde: ListeStemmer + PersonligeStemmer for parti / Total Gyldige Stemmer
+    print("  • Analyserer enmandshære (Dependency Ratio)...")
+    return top_one_person_armies(one_person_army_rows(df_res))
 
-    # Deduplicate listestemmer
-    area_data = df_res.copy()
 
-    # Get total gyldige stemmer per område (use first row per område)
-    area_totals = area_data.groupby(['AfstemningsområdeDagiId', 'Afstemningsområde', 'Kommune', 'Valgart']).agg({
-        'GyldigeStemmer': 'first'  # Same for all rows in area
-    }).reset_index()
+@spor(kategori='magt')
+def stronghold_rows(matrix):
+    """
+    Alle højborge (før top 200) med områdets DAGI-id, i matricens rækkefølge.
 
-    # Calculate parti votes per område
+    Args:
+        matrix: OmrådeMatrix (afstemningsområde × parti, se omraade_matrix.py)
+    """
+    # Partiets andel per område: ListeStemmer / GyldigeStemmer
     # VIGTIGT: ListeStemmer (capital S) er ALLEREDE den totale sum for partiet
     # ListeStemmer = Listestemmer (blanke) + PersonligeStemmer (kandidater)
-    # Så vi skal IKKE lægge sammen - bare bruge ListeStemmer direkte!
-
-    # Deduplicate: ListeStemmer er samme værdi for alle kandidater i samme parti+område
-    parti_area = area_data[['AfstemningsområdeDagiId', 'Afstemningsområde', 'Kommune', 'Valgart', 'ListeNavn', 'ListeStemmer']].drop_duplicates()
-
-    # Rename for klarhed
-    parti_area = parti_area.rename(columns={'ListeStemmer': 'PartiStemmer'})
-
-    # Merge with totals
-    parti_area = pd.merge(parti_area, area_totals,
-                          on=['AfstemningsområdeDagiId', 'Afstemningsområde', 'Kommune', 'Valgart'],
-                          how='left')
 
     # VALIDATION: PartiStemmer må ALDRIG være større end GyldigeStemmer
-    invalid_rows = parti_area[parti_area['PartiStemmer'] > parti_area['GyldigeStemmer']]
-    if len(invalid_rows) > 0:
-        print(f"\n⚠️  ADVARSEL: Fandt {len(invalid_rows)} rækker hvor PartiStemmer > GyldigeStemmer")
+    ugyldige = matrix.deltager & (matrix.stemmer > matrix.gyldige[:, None])
+    if ugyldige.any():
+        række, kolonne = np.nonzero(ugyldige)
+        print(f"\n⚠️  ADVARSEL: Fandt {len(række)} rækker hvor PartiStemmer > GyldigeStemmer")
         print("Dette indikerer en fejl i databehandlingen!")
-        print(invalid_rows[['Kommune', 'Afstemningsområde', 'ListeNavn', 'PartiStemmer', 'GyldigeStemmer']].head(10))
-        # Cap at 100% to prevent crashes
-        parti_area.loc[parti_area['PartiStemmer'] > parti_area['GyldigeStemmer'], 'PartiStemmer'] = parti_area['GyldigeStemmer']
-
-    # Calculate vote share per area
-    parti_area['OmrådeAndel %'] = (parti_area['PartiStemmer'] / parti_area['GyldigeStemmer'] * 100).round(1)
-
-    # Calculate kommune-gennemsnit for each parti
-    kommune_avg = parti_area.groupby(['Kommune', 'Valgart', 'ListeNavn']).agg({
-        'PartiStemmer': 'sum',
-        'GyldigeStemmer': 'sum'
-    }).reset_index()
-    kommune_avg['KommuneGennemsnit %'] = (kommune_avg['PartiStemmer'] / kommune_avg['GyldigeStemmer'] * 100).round(1)
-
-    # Merge
-    parti_area = pd.merge(
-        parti_area,
-        kommune_avg[['Kommune', 'Valgart', 'ListeNavn', 'KommuneGennemsnit %']],
-        on=['Kommune', 'Valgart', 'ListeNavn'],
-        how='left'
-    )
-
-    # Calculate deviation
-    parti_area['Afvigelse'] = parti_area['OmrådeAndel %'] - parti_area['KommuneGennemsnit %']
+        eksempler = matrix.områder.iloc[række[:10]][['Kommune', 'Afstemningsområde']].assign(
+            ListeNavn=matrix.partier[kolonne[:10]],
+            PartiStemmer=matrix.stemmer[række[:10], kolonne[:10]],
+            GyldigeStemmer=matrix.gyldige[række[:10]],
+        )
+        print(eksempler)
+        # Capped til 100% i matrix.andel() så analysen ikke crasher
+
+    andel = matrix.andel()
+    gennemsnit = matrix.kommune_andel()
+    afvigelse = andel - gennemsnit
 
     # Filter: only areas with >10% positive deviation AND kommune avg > 2% (filter noise)
-    strongholds = parti_area[
-        (parti_area['Afvigelse'] > 10) &
-        (parti_area['KommuneGennemsnit %'] > 2)
-    ].copy()
-
-    # Top 200 by deviation
-    strongholds = strongholds.nlargest(200, 'Afvigelse')[[
-        'ListeNavn', 'Kommune', 'Afstemningsområde', 'Valgart',
-        'OmrådeAndel %', 'KommuneGennemsnit %', 'Afvigelse'
-    ]].copy()
+    with np.errstate(invalid='ignore'):
+        kandidat = matrix.deltager & (afvigelse > 10) & (gennemsnit > 2)
+    række, kolonne = np.nonzero(kandidat)
+
+    return pd.DataFrame({
+        'Parti': matrix.partier[kolonne],
+        'Kommune': matrix.områder['Kommune'].to_numpy()[række],
+        'Afstemningsområde': matrix.områder['Afstemningsområde'].to_numpy()[række],
+        'Valgtype': matrix.områder['Valgart'].to_numpy()[række],
+        'Område %': andel[række, kolonne],
+        'Kommune Gennemsnit %': gennemsnit[række, kolonne],
+        'Afvigelse': afvigelse[række, kolonne],
+        'AfstemningsområdeDagiId': matrix.områder['AfstemningsområdeDagiId'].to_numpy()[række],
+    })
+
+
+def top_strongholds(rækker, matrix):
+    """
+    Top 200 højborge efter afvigelse fra stronghold_rows (evt. flettet fra
+    kommune-partitioner). Lige afvigelser ordnes efter område og parti i den
+    fulde matrix (som np.nonzero + stabil sortering).
+    """
+    nøgle = ['Valgart', 'Kommune', 'Afstemningsområde', 'AfstemningsområdeDagiId']
+    område_nr = pd.Series(np.arange(len(matrix.områder)), index=pd.MultiIndex.from_frame(matrix.områder[nøgle]))
+    parti_nr = pd.Series(np.arange(len(matrix.partier)), index=matrix.partier)
+    række = område_nr.reindex(pd.MultiIndex.from_frame(
+        rækker.rename(columns={'Valgtype': 'Valgart'})[nøgle])).to_numpy()
+    kolonne = parti_nr.reindex(rækker['Parti']).to_numpy()
 
-    strongholds.columns = ['Parti', 'Kommune', 'Afstemningsområde', 'Valgtype',
-                           'Område %', 'Kommune Gennemsnit %', 'Afvigelse']
+    # Top 200 by deviation (stabil sortering = nlargest keep='first')
+    orden = np.lexsort((kolonne, række, -rækker['Afvigelse'].to_numpy()))[:200]
+    strongholds = rækker.iloc[orden].drop(columns='AfstemningsområdeDagiId').reset_index(drop=True)
 
     if len(strongholds) > 0:
         top = strongholds.iloc[0]
@@ -260,83 +296,137 @@ def find_geographic_strongholds(df_res):
     return strongholds
 
 
-def find_thin_majorities(df_mand, output_dir):
+def find_geographic_strongholds(matrix):
     """
-    Analyse 4: Tynde Flertaller - Kommuner hvor borgmesterens
-    parti har mindst muligt flertal (risiko for kaos)
+    Analyse 3: Geografiske Højborge - Afstemningsområder hvor
+    partiet klarer sig meget bedre end kommunegennemsnittet
+
+    Args:
+        matrix: OmrådeMatrix (afstemningsområde × parti, se omraade_matrix.py)
     """
-    print("  • Analyserer tynde flertaller...")
+    print("  • Analyserer geografiske højborge...")
+    return top_strongholds(stronghold_rows(matrix), matrix)
 
-    # Load borgmester data (check multiple locations)
+
+def kommune_udsnit(df, kommuner, alle):
+    """Rækker for de givne kommuner (hele frame uden kopi når det er alle)"""
+    if set(kommuner) >= alle:
+        return df
+    return df[df['Kommune'].isin(kommuner)]
+
+
+def partitioned_analyses(df_res, df_mand, matrix, output_dir):
+    """
+    Mandattyveri, enmandshære og højborge beregnet per kommune.
+
+    Kun kommuner hvis inputrækker er ændret siden sidste kørsel beregnes igen
+    (se kommune_partitioner.py); top-listerne laves af de flettede partitioner.
+
+    Returns:
+        (df_robbed, df_dependency, df_strongholds)
+    """
+    fingerprints = kommune_fingerprints({'resultater': df_res, 'mandater': df_mand,
+                                         'områder': matrix.to_frame()})
+    alle = set(fingerprints)
+
+    def beregn(kommuner):
+        udsnit = matrix
+        if not set(kommuner) >= alle:
+            udsnit = matrix.udsnit(matrix.områder['Kommune'].isin(kommuner).to_numpy())
+        res = kommune_udsnit(df_res, kommuner, alle)
+        return {
+            'mandattyveri': mandate_theft_rows(res, kommune_udsnit(df_mand, kommuner, alle)),
+            'enmandshære': one_person_army_rows(res),
+            'højborge': stronghold_rows(udsnit),
+        }
+
+    partitioner = KommunePartitioner(output_dir, 'magt', kode_version('lav_magtanalyse'))
+    rækker, _ = partitioner.opdater(fingerprints, beregn, {
+        'mandattyveri': ['Kommune', 'Parti', 'KandidatId', 'Navn', 'Valgtype'],
+        'enmandshære': ['Kommune', 'ListeNavn', 'Valgart', 'KandidatId', 'Stemmeseddelnavn'],
+        'højborge': ['Kommune'],
+    })
+
+    print("  • Analyserer mandattyveri (De Tragiske Helte)...")
+    df_robbed = top_mandate_theft(rækker['mandattyveri'])
+    print("  • Analyserer enmandshære (Dependency Ratio)...")
+    df_dependency = top_one_person_armies(rækker['enmandshære'])
+    print("  • Analyserer geografiske højborge...")
+    df_strongholds = top_strongholds(rækker['højborge'], matrix)
+    return df_robbed, df_dependency, df_strongholds
+
+
+def load_borgmestre(output_dir):
+    """Indlæs borgmestre_parsed.csv (cwd først, derefter output_dir) - None hvis den mangler"""
     borgmester_fil = Path('borgmestre_parsed.csv')
     if not borgmester_fil.exists():
         borgmester_fil = Path(output_dir) / 'borgmestre_parsed.csv'
     if not borgmester_fil.exists():
-        print("    ⚠️ Mangler borgmestre_parsed.csv - springer analyse over")
-        return pd.DataFrame()
+        return None
+    return pd.read_csv(borgmester_fil)
+
 
-    df_borg = pd.read_csv(borgmester_fil)
+def count_kommune_mandates(df_mand):
+    """
+    Tæl mandater per kommune+parti (kun Kommunalvalg, ekskl. Stedfortræder).
 
-    # Count mandates per kommune+parti (only Kommunalvalg, exclude Stedfortræder)
+    Returns:
+        (parti_mandater, total_mandater) - mandater per (Kommune, PartiNormaliseret)
+        og total per Kommune
+    """
     mandater = df_mand[
         (df_mand['Valgart'] == 'Kommunalvalg') &
         (df_mand['MandatType'] != 'Stedfortræder')
-    ].copy()
+    ]
 
     # VIGTIGT: Deduplicate på KandidatId (valg.dk data kan have multiple FrigivelsesTidspunkt)
     # Vi beholder den seneste version (sidst i DataFrame)
     mandater = mandater.drop_duplicates(subset='KandidatId', keep='last')
 
-    # Normalize party names to match borgmester data
-    mandater['PartiNormaliseret'] = mandater['ListeNavn'].apply(normalize_party_name)
+    # Normalize party names to match borgmester data (via partidimension)
+    mandater = mandater[['Kommune', 'ListeNavn']].merge(
+        build_party_dimension(mandater['ListeNavn']), on='ListeNavn', how='left'
+    )
 
-    # Count mandates per parti
     parti_mandater = mandater.groupby(['Kommune', 'PartiNormaliseret']).size().reset_index(name='Mandater')
-
-    # Total mandates per kommune
     total_mandater = mandater.groupby('Kommune').size().reset_index(name='Total Mandater')
 
-    thin_majorities = []
+    return parti_mandater, total_mandater
 
-    for _, borg in df_borg.iterrows():
-        kommune = borg['Kommune']
-        borgmester_parti = borg['Parti']
-        borgmester_navn = borg['Navn']
 
-        # Get mandates for this kommune
-        kommune_mandater = parti_mandater[parti_mandater['Kommune'] == kommune]
-        kommune_total = total_mandater[total_mandater['Kommune'] == kommune]
-
-        if len(kommune_total) == 0:
-            continue
-
-        total = kommune_total.iloc[0]['Total Mandater']
-        simple_majority = total / 2
+@spor(kategori='magt')
+def find_thin_majorities(df_mand, output_dir):
+    """
+    Analyse 4: Tynde Flertaller - Kommuner hvor borgmesterens
+    parti har mindst muligt flertal (risiko for kaos)
+    """
+    print("  • Analyserer tynde flertaller...")
 
-        # Get borgmester parti mandates (using normalized name)
-        borg_parti_row = kommune_mandater[kommune_mandater['PartiNormaliseret'] == borgmester_parti]
+    # Load borgmester data (check multiple locations)
+    df_borg = load_borgmestre(output_dir)
+    if df_borg is None:
+        print("    ⚠️ Mangler borgmestre_parsed.csv - springer analyse over")
+        return pd.DataFrame()
 
-        if len(borg_parti_row) == 0:
-            # Borgmester parti has 0 mandates (coalition government)
-            margin = 0 - simple_majority
-            parti_mandater_count = 0
-        else:
-            parti_mandater_count = borg_parti_row.iloc[0]['Mandater']
-            margin = parti_mandater_count - simple_majority
+    parti_mandater, total_mandater = count_kommune_mandates(df_mand)
 
-        flertal_pct = (parti_mandater_count / total * 100).round(1)
+    # Join borgmestre med kommunens mandattal (kommuner uden mandatdata udelades)
+    df_thin = df_borg[['Kommune', 'Navn', 'Parti']].merge(total_mandater, on='Kommune', how='inner')
+    df_thin = df_thin.merge(
+        parti_mandater.rename(columns={'PartiNormaliseret': 'Parti'}),
+        on=['Kommune', 'Parti'],
+        how='left'
+    )
 
-        thin_majorities.append({
-            'Kommune': kommune,
-            'Borgmester': borgmester_navn,
-            'Parti': borgmester_parti,
-            'Parti Mandater': parti_mandater_count,
-            'Total Mandater': total,
-            'Margin (over flertal)': margin,
-            'Flertal %': flertal_pct
-        })
+    # Borgmester parti uden mandater (coalition government) får 0
+    df_thin['Parti Mandater'] = df_thin['Mandater'].fillna(0).astype(int)
+    df_thin['Margin (over flertal)'] = df_thin['Parti Mandater'] - df_thin['Total Mandater'] / 2
+    df_thin['Flertal %'] = (df_thin['Parti Mandater'] / df_thin['Total Mandater'] * 100).round(1)
 
-    df_thin = pd.DataFrame(thin_majorities)
+    df_thin = df_thin.rename(columns={'Navn': 'Borgmester'})[[
+        'Kommune', 'Borgmester', 'Parti', 'Parti Mandater', 'Total Mandater',
+        'Margin (over flertal)', 'Flertal %'
+    ]]
     df_thin = df_thin.sort_values('Margin (over flertal)')
 
     if len(df_thin) > 0:
@@ -346,67 +436,156 @@ def find_thin_majorities(df_mand, output_dir):
     return df_thin
 
 
-def lav_magtanalyse(output_dir='excel_output'):
-    """Main analyse funktion"""
-    print("🔍 Starter magtanalyse...")
+def enumerate_coalitions(seats):
+    """
+    Enumerér alle koalitioner af partier som bitmasker.
 
-    # Find filer
-    parquet_dir = Path(output_dir) / 'parquet'
-    samlet_dir = Path(output_dir) / '03_Samlet_Alle_Valg'
+    Args:
+        seats: Array med mandater per parti (n partier)
 
-    # Valgresultater
-    res_fil = find_latest_file(str(parquet_dir / 'valgresultater_ALLE_VALG_*.parquet'))
-    if not res_fil:
-        res_fil = find_latest_file(str(samlet_dir / 'valgresultater_ALLE_VALG_*.xlsx'))
+    Returns:
+        (members, coalition_seats) - bool-matrix (2^n - 1) x n med medlemskab
+        og mandater per koalition
+    """
+    n = len(seats)
+    masks = np.arange(1, 1 << n, dtype=np.int64)
+    members = ((masks[:, None] >> np.arange(n)) & 1).astype(bool)
+    return members, members @ seats
 
-    # Mandatfordeling
-    mand_fil = find_latest_file(str(parquet_dir / 'mandatfordeling_ALLE_VALG_*.parquet'))
-    if not mand_fil:
-        mand_fil = find_latest_file(str(samlet_dir / 'mandatfordeling_ALLE_VALG_*.xlsx'))
 
-    if not res_fil or not mand_fil:
+@spor(kategori='magt')
+def find_majority_coalitions(df_mand, output_dir):
+    """
+    Analyse 5: Koalitioner - Alle mulige flertalskoalitioner per kommune.
+
+    For hver kommune med borgmester enumereres alle koalitioner af partier med
+    mandater. Konstitueringen er skrøbelig når borgmesterpartiet indgår i få
+    minimale flertal (hvor hvert parti er nødvendigt) med lille margin.
+    """
+    print("  • Analyserer mulige flertalskoalitioner...")
+
+    df_borg = load_borgmestre(output_dir)
+    if df_borg is None:
+        print("    ⚠️ Mangler borgmestre_parsed.csv - springer analyse over")
+        return pd.DataFrame()
+
+    parti_mandater, total_mandater = count_kommune_mandates(df_mand)
+    borgmester_per_kommune = df_borg.drop_duplicates(subset='Kommune').set_index('Kommune')
+    total_per_kommune = total_mandater.set_index('Kommune')['Total Mandater']
+
+    resultater = []
+    for kommune, partier in parti_mandater.groupby('Kommune', sort=True):
+        if kommune not in borgmester_per_kommune.index:
+            continue
+
+        partier = partier.sort_values('Mandater', ascending=False, kind='stable')
+        navne = partier['PartiNormaliseret'].to_numpy()
+        seats = partier['Mandater'].to_numpy(dtype=np.int64)
+
+        if len(seats) > MAX_KOALITIONS_PARTIER:
+            print(f"    ⚠️ {kommune}: {len(seats)} partier - for mange til fuld enumerering, springes over")
+            continue
+
+        total = total_per_kommune[kommune]
+        kvote = total / 2
+        members, coalition_seats = enumerate_coalitions(seats)
+
+        # Flertal: koalitionen har over halvdelen af mandaterne
+        winning = coalition_seats > kvote
+        # Swing: partiet er afgørende (koalitionen mister flertal uden det)
+        swing = members & winning[:, None] & ((coalition_seats[:, None] - seats[None, :]) <= kvote)
+        # Minimal vindende: alle medlemmer er afgørende
+        minimal = winning & (swing.sum(axis=1) == members.sum(axis=1))
+
+        borg = borgmester_per_kommune.loc[kommune]
+        idx = np.flatnonzero(navne == borg['Parti'])
+
+        if len(idx) > 0:
+            med_borgmester = minimal & members[:, idx[0]]
+            banzhaf = swing[:, idx[0]].sum() / swing.sum() * 100 if swing.sum() > 0 else 0.0
+        else:
+            med_borgmester = np.zeros(len(minimal), dtype=bool)
+            banzhaf = 0.0
+
+        if med_borgmester.any():
+            # Sikreste mulighed: færrest partier, derefter størst margin
+            kandidater = np.flatnonzero(med_borgmester)
+            bedst = kandidater[np.lexsort((-coalition_seats[kandidater], members[kandidater].sum(axis=1)))[0]]
+            mindste = ' + '.join(navne[members[bedst]])
+            bedste_margin = coalition_seats[bedst] - kvote
+        else:
+            mindste = ''
+            bedste_margin = np.nan
+
+        resultater.append({
+            'Kommune': kommune,
+            'Borgmester': borg['Navn'],
+            'Parti': borg['Parti'],
+            'Total Mandater': total,
+            'Partier med Mandater': len(seats),
+            'Flertalskoalitioner': int(winning.sum()),
+            'Minimale Flertal': int(minimal.sum()),
+            'Minimale Flertal med Borgmesterparti': int(med_borgmester.sum()),
+            'Mindste Flertal med Borgmesterparti': mindste,
+            'Margin (over flertal)': bedste_margin,
+            'Banzhaf-magt %': round(banzhaf, 1),
+        })
+
+    df_koalitioner = pd.DataFrame(resultater)
+
+    if len(df_koalitioner) > 0:
+        # Mest skrøbelige først: få flertalsmuligheder, lille margin
+        df_koalitioner = df_koalitioner.sort_values(
+            ['Minimale Flertal med Borgmesterparti', 'Margin (over flertal)'], kind='stable'
+        )
+        mest = df_koalitioner.iloc[0]
+        print(f"    → Mest skrøbelige konstituering: {mest['Kommune']} ({mest['Parti']}) - {mest['Minimale Flertal med Borgmesterparti']} minimale flertal med borgmesterpartiet")
+
+    return df_koalitioner
+
+
+@spor()
+def lav_magtanalyse(output_dir='excel_output', store=None):
+    """Main analyse funktion"""
+    print("🔍 Starter magtanalyse...")
+    if store is None:
+        store = DataStore(output_dir)
+
+    # Find filer (valgresultater + mandatfordeling)
+    if not store.find_file('valgresultater') or not store.find_file('mandatfordeling'):
         print("❌ Mangler nødvendige filer")
         return False
 
     # Load data
     print(f"📖 Læser data...")
-    if res_fil.endswith('.parquet'):
-        df_res = load_parquet(res_fil)
-    else:
-        df_res = pd.read_excel(res_fil)
+    df_res = store.get('valgresultater', columns=RESULTAT_KOLONNER)
+    df_mand = store.get('mandatfordeling', columns=MANDAT_KOLONNER)
 
-    if mand_fil.endswith('.parquet'):
-        df_mand = load_parquet(mand_fil)
-    else:
-        df_mand = pd.read_excel(mand_fil)
-
-    # Run all 4 analyses
-    df_robbed = find_mandate_theft(df_res, df_mand)
-    df_dependency = find_one_person_armies(df_res)
-    df_strongholds = find_geographic_strongholds(df_res)
+    # Run all analyses
+    df_robbed, df_dependency, df_strongholds = partitioned_analyses(
+        df_res, df_mand, store.area_matrix(), output_dir)
     df_thin = find_thin_majorities(df_mand, output_dir)
+    df_koalitioner = find_majority_coalitions(df_mand, output_dir)
 
-    # Save to Excel
-    output_file = Path(output_dir) / '00_START_HER' / 'Analyse_magt.xlsx'
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-
-    writer = pd.ExcelWriter(output_file, engine='openpyxl')
+    # Save to Excel (og findings-lageret)
+    output_file = output_sti(output_dir, 'Analyse_magt.xlsx')
 
     # Always write all sheets, even if empty (so generate_findings can load them)
-    df_robbed.to_excel(writer, sheet_name='De Tragiske Helte', index=False)
-    df_dependency.to_excel(writer, sheet_name='Enmandshæren', index=False)
-    df_strongholds.to_excel(writer, sheet_name='Geografiske Højborge', index=False)
-    df_thin.to_excel(writer, sheet_name='Tynde Flertaller', index=False)
-
-    writer.close()
+    store.findings.write_workbook(output_file, {
+        'De Tragiske Helte': df_robbed,
+        'Enmandshæren': df_dependency,
+        'Geografiske Højborge': df_strongholds,
+        'Tynde Flertaller': df_thin,
+        'Koalitioner': df_koalitioner,
+    })
 
     print(f"✅ Magtanalyse gemt: {output_file}")
     return True
 
 
-def main(output_dir='excel_output'):
+def main(output_dir='excel_output', store=None):
     """Main funktion til brug i pipeline"""
-    success = lav_magtanalyse(output_dir)
+    success = lav_magtanalyse(output_dir, store)
     return success
 
 
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Logning for pipeline og converter
+
+Alle beskeder går gennem logger-hierarkiet 'valg' (stdlib logging):
+
+- 'valg'       pipeline-beskeder (Starter/Succes/Fejl, sammenfatninger)
+- 'valg.fil'   én linje per behandlet fil i converteren ("Behandler: ...")
+
+Konsollen får samme tekstformat som før ([tid] [NIVEAU] besked). Log-filen
+holdes åben hele kørslen bag en buffer (MemoryHandler), der tømmes for hver
+BUFFER_STØRRELSE beskeder, ved fejl og når processen afsluttes - i stedet for
+at åbne filen for hver besked.
+
+Med stille=True logges per-fil-linjer kun ved advarsler/fejl; converteren
+skriver i stedet en optælling per filtype. Med format='json' skrives log-filen
+som JSON-linjer (ts, niveau, logger, besked + evt. felter) til metrics-værktøjer.
+"""
+
+import json
+import logging
+import logging.handlers
+import sys
+from datetime import datetime
+
+# Ekstra niveau mellem INFO og WARNING (bruges af pipeline: "✅ Succes: ...")
+SUCCESS = 25
+logging.addLevelName(SUCCESS, 'SUCCESS')
+
+LOGGER = 'valg'
+FIL_LOGGER = 'valg.fil'
+
+# Antal beskeder der bufres før log-filen skrives
+BUFFER_STØRRELSE = 200
+
+TEKST_FORMAT = '[%(asctime)s] [%(levelname)s] %(message)s'
+DATO_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """Én JSON-linje per besked; strukturerede felter gives med extra={'felter': {...}}"""
+
+    def format(self, record):
+        linje = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'niveau': record.levelname,
+            'logger': record.name,
+            'besked': record.getMessage(),
+        }
+        linje.update(getattr(record, 'felter', None) or {})
+        if record.exc_info:
+            linje['traceback'] = self.formatException(record.exc_info)
+        return json.dumps(linje, ensure_ascii=False, default=str)
+
+
+def opsæt_logning(log_fil=None, niveau='INFO', format='tekst', stille=False):
+    """
+    Konfigurér 'valg'-loggerne (kan kaldes igen; tidligere handlers fjernes).
+
+    Args:
+        log_fil: Fil der logges til (None = kun konsol)
+        niveau: Mindste niveau ('DEBUG', 'INFO', 'WARNING' ...)
+        format: 'tekst' eller 'json' (gælder log-filen; konsollen er altid tekst)
+        stille: Vis kun per-fil-linjer ved advarsler og fejl
+
+    Returns:
+        'valg'-loggeren
+    """
+    logger = logging.getLogger(LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(niveau.upper() if isinstance(niveau, str) else niveau)
+    logger.propagate = False
+
+    konsol = logging.StreamHandler(sys.stdout)
+    konsol.setFormatter(logging.Formatter(TEKST_FORMAT, DATO_FORMAT))
+    logger.addHandler(konsol)
+
+    if log_fil:
+        fil = logging.FileHandler(log_fil, mode='a', encoding='utf-8', delay=True)
+        fil.setFormatter(JsonFormatter() if format == 'json' else logging.Formatter(TEKST_FORMAT, DATO_FORMAT))
+        logger.addHandler(logging.handlers.MemoryHandler(
+            BUFFER_STØRRELSE, flushLevel=logging.ERROR, target=fil))
+
+    logging.getLogger(FIL_LOGGER).setLevel(logging.WARNING if stille else logging.NOTSET)
+    return logger
+
+
+def hent_logger(navn=LOGGER):
+    """Logger under 'valg' (konfigurerer konsol-logning hvis intet er sat op)"""
+    if not logging.getLogger(LOGGER).handlers:
+        opsæt_logning()
+    return logging.getLogger(navn)
+
+
+def tøm_log():
+    """Skriv bufferede beskeder til log-filen nu (fx før en stage der kan crashe)"""
+    for handler in logging.getLogger(LOGGER).handlers:
+        handler.flush()
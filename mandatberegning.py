@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Mandatberegning - genberegn kommunal- og regionsrådsmandater fra listestemmer
+
+Fordeler mandaterne efter D'Hondts metode for alle kommuner og regioner på én
+gang: stemmetal for alle lister samles i én kvotient-matrix (stemmer / 1, 2,
+3, ...) og de største kvotienter udvælges per valg med ét samlet sort.
+
+Valgforbund og listeforbund håndteres som i den kommunale valglov: mandaterne
+fordeles først mellem valgforbund (og lister/listeforbund uden for forbund),
+derefter inden for hvert valgforbund mellem dets listeforbund/lister, og til
+sidst inden for hvert listeforbund mellem listerne. Forbund læses fra
+data/valgforbund.csv (Valgart, Valg, ListeBogstav, Valgforbund, Listeforbund).
+
+Resultatet krydstjekkes mod de faktiske mandater i mandatfordeling
+(PersonligeMandater/ListeMandater).
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+import time
+import argparse
+from datastore import DataStore
+from filplacering import output_sti
+from utils import spor
+
+# Kolonner beregningen bruger (kolonne-projektion)
+RESULTAT_KOLONNER = ['Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'ListeId',
+                     'ListeBogstav', 'ListeNavn', 'ListeStemmer']
+KANDIDAT_KOLONNER = ['ValgNavn', 'RegionNavn', 'ListeId']
+MANDAT_KOLONNER = ['Valgart', 'Kommune', 'MandatType', 'MandatNummer', 'KandidatId', 'ListeId']
+
+FORBUND_FIL = Path(__file__).parent / 'data' / 'valgforbund.csv'
+
+
+def dhondt(gruppe, stemmer, mandater):
+    """
+    D'Hondt for mange valg på én gang.
+
+    Args:
+        gruppe: int-array (n) - hvilket valg/forbund hver deltager tilhører (0..G-1)
+        stemmer: Array (n) med stemmer per deltager
+        mandater: int-array (G) med antal mandater der skal fordeles per gruppe
+
+    Returns:
+        (fordeling, uafgjort) - mandater per deltager (n) og bool per gruppe (G)
+        der angiver lige kvotienter om sidste mandat (lodtrækning)
+    """
+    gruppe = np.asarray(gruppe, dtype=np.int64)
+    stemmer = np.asarray(stemmer, dtype=np.float64)
+    mandater = np.asarray(mandater, dtype=np.int64)
+    n = len(stemmer)
+
+    if n == 0 or mandater.max(initial=0) == 0:
+        return np.zeros(n, dtype=np.int64), np.zeros(len(mandater), dtype=bool)
+
+    # Kvotient-matrix: deltager x divisor. Én divisor mere end gruppens mandater,
+    # så første ikke-valgte kvotient også er med (til lodtrækningstjek)
+    divisorer = np.arange(1, mandater.max() + 2)
+    kvotienter = stemmer[:, None] / divisorer[None, :]
+    relevant = divisorer[None, :] <= (mandater[gruppe] + 1)[:, None]
+
+    deltager = np.broadcast_to(np.arange(n)[:, None], kvotienter.shape)[relevant]
+    grp = gruppe[deltager]
+    kvot = kvotienter[relevant]
+
+    # Sortér per gruppe efter faldende kvotient (ved lige kvotient: flest stemmer først)
+    orden = np.lexsort((-stemmer[deltager], -kvot, grp))
+    deltager, grp, kvot = deltager[orden], grp[orden], kvot[orden]
+
+    # Position inden for gruppen
+    starter = np.searchsorted(grp, np.arange(len(mandater)))
+    position = np.arange(len(grp)) - starter[grp]
+    valgt = position < mandater[grp]
+
+    fordeling = np.bincount(deltager[valgt], minlength=n)
+
+    # Lodtrækning: sidste valgte kvotient er lig første ikke-valgte i samme gruppe
+    sidste = np.full(len(mandater), np.nan)
+    første_ude = np.full(len(mandater), np.nan)
+    er_sidste = position == mandater[grp] - 1
+    er_første_ude = position == mandater[grp]
+    sidste[grp[er_sidste]] = kvot[er_sidste]
+    første_ude[grp[er_første_ude]] = kvot[er_første_ude]
+    uafgjort = (sidste == første_ude) & (sidste > 0)
+
+    return fordeling, uafgjort
+
+
+def dhondt_matrix(stemmer, mandater):
+    """
+    D'Hondt for en batch af scenarier med samme lister og mandattal.
+
+    Hurtigere end dhondt() til simulering: D'Hondt er en divisormetode, så en
+    liste får floor(stemmer / t) mandater for en fælles divisor t. Divisoren
+    findes per scenarie ved bisektion (alle scenarier på én gang). Scenarier
+    hvor ingen divisor giver præcis mandater (lige kvotienter) fordeles med
+    dhondt().
+
+    Args:
+        stemmer: Array (B, L) - stemmer per scenarie og liste
+        mandater: Antal mandater der fordeles i hvert scenarie
+
+    Returns:
+        int-array (B, L) med mandater per scenarie og liste
+    """
+    stemmer = np.asarray(stemmer, dtype=np.float64)
+    B, L = stemmer.shape
+    fordeling = np.zeros((B, L), dtype=np.int64)
+    if mandater <= 0 or L == 0:
+        return fordeling
+
+    # Divisoren ligger i [total / (mandater + L), total / mandater]
+    total = stemmer.sum(axis=1)
+    lav = total / (mandater + L)
+    høj = total / mandater
+    aktiv = total > 0
+
+    for _ in range(64):
+        if not aktiv.any():
+            break
+        idx = np.flatnonzero(aktiv)
+        t = (lav[idx] + høj[idx]) / 2
+        antal = np.floor(stemmer[idx] / t[:, None]).astype(np.int64)
+        summer = antal.sum(axis=1)
+
+        fundet = summer == mandater
+        fordeling[idx[fundet]] = antal[fundet]
+        aktiv[idx[fundet]] = False
+
+        for_mange = summer > mandater
+        lav[idx[for_mange]] = t[for_mange]
+        høj[idx[~for_mange & ~fundet]] = t[~for_mange & ~fundet]
+
+    # Lige kvotienter om sidste mandat (eller ingen stemmer): eksakt fordeling
+    rest = np.flatnonzero(aktiv | (total <= 0))
+    if len(rest) > 0:
+        eksakt, _ = dhondt(np.repeat(np.arange(len(rest)), L), stemmer[rest].ravel(),
+                           np.full(len(rest), mandater))
+        fordeling[rest] = eksakt.reshape(len(rest), L)
+
+    return fordeling
+
+
+def fordel_batch(stemmer, mandater, niveauer=()):
+    """
+    Fordel mandater for en batch af scenarier i ét valg (med forbund).
+
+    Args:
+        stemmer: Array (B, L) - stemmer per scenarie og liste
+        mandater: Antal mandater i valget
+        niveauer: Forbundsniveauer fra toppen (valgforbund, listeforbund) som
+            int-arrays (L) med tætte koder 0..U-1. Tom = ren D'Hondt på listerne.
+
+    Returns:
+        int-array (B, L) med mandater per scenarie og liste
+    """
+    stemmer = np.asarray(stemmer, dtype=np.float64)
+    B, L = stemmer.shape
+    if len(niveauer) == 0:
+        return dhondt_matrix(stemmer, mandater)
+
+    forælder_kode = np.zeros(L, dtype=np.int64)
+    forælder_mandater = np.full((B, 1), mandater, dtype=np.int64)
+
+    for koder in [*niveauer, np.arange(L)]:
+        koder = np.asarray(koder, dtype=np.int64)
+        U = koder.max() + 1
+        enhed_forælder = np.zeros(U, dtype=np.int64)
+        enhed_forælder[koder] = forælder_kode
+
+        # Stemmer per enhed (B, U) og gruppe = (scenarie, forælder)
+        medlemskab = np.zeros((L, U))
+        medlemskab[np.arange(L), koder] = 1
+        enhed_stemmer = stemmer @ medlemskab
+        P = forælder_mandater.shape[1]
+        gruppe = (np.arange(B)[:, None] * P + enhed_forælder[None, :]).ravel()
+
+        fordeling, _ = dhondt(gruppe, enhed_stemmer.ravel(), forælder_mandater.ravel())
+        forælder_mandater = fordeling.reshape(B, U)
+        forælder_kode = koder
+
+    return forælder_mandater
+
+
+def forbund_niveauer(lister):
+    """
+    Tætte int-koder per forbundsniveau for ét valgs lister.
+
+    Args:
+        lister: DataFrame med ListeId, Valgforbund, Listeforbund (i listernes rækkefølge)
+
+    Returns:
+        Liste af int-arrays (tom hvis valget ikke har forbund)
+    """
+    if lister['Valgforbund'].isna().all() and lister['Listeforbund'].isna().all():
+        return []
+
+    liste_nøgle = 'L:' + lister['ListeId'].astype(str)
+    listeforbund = ('LF:' + lister['Listeforbund'].astype(str)).where(lister['Listeforbund'].notna(), liste_nøgle)
+    valgforbund = ('VF:' + lister['Valgforbund'].astype(str)).where(lister['Valgforbund'].notna(), listeforbund)
+
+    # Listeforbund kodes inden for valgforbund, så hver enhed har én forælder
+    return [pd.factorize(valgforbund)[0], pd.factorize(valgforbund + '|' + listeforbund)[0]]
+
+
+def area_list_votes(df_res, df_kand=None):
+    """
+    Listestemmer per afstemningsområde og valg.
+
+    ListeStemmer står på hver kandidatrække, så der tages én værdi per
+    afstemningsområde + liste. Regionsrådsvalg samles per region via listernes
+    RegionNavn i kandidatdata.
+
+    Returns:
+        DataFrame med Valgart, Valg, AfstemningsområdeDagiId, ListeId,
+        ListeBogstav, ListeNavn, Stemmer
+    """
+    df = df_res.drop_duplicates(['Valgart', 'AfstemningsområdeDagiId', 'ListeId'])
+    df = df.assign(ListeId=df['ListeId'].astype(str), Valg=df['Kommune'])
+
+    # Regionsrådsvalg: lister er regionale, så valget er regionen
+    if df_kand is not None and 'RegionNavn' in df_kand.columns:
+        regioner = df_kand[df_kand['ValgNavn'] == 'Regionsrådsvalg'][['ListeId', 'RegionNavn']]
+        regioner = regioner.assign(ListeId=regioner['ListeId'].astype(str)).drop_duplicates('ListeId')
+        region = df['ListeId'].map(regioner.set_index('ListeId')['RegionNavn'])
+        er_region = (df['Valgart'] == 'Regionsrådsvalg') & region.notna() & (region != '')
+        df = df.assign(Valg=df['Valg'].where(~er_region, region))
+
+    return df[['Valgart', 'Valg', 'AfstemningsområdeDagiId', 'ListeId', 'ListeBogstav',
+               'ListeNavn', 'ListeStemmer']].rename(columns={'ListeStemmer': 'Stemmer'})
+
+
+def list_vote_totals(df_res, df_kand=None):
+    """
+    Samlede listestemmer per valg.
+
+    Returns:
+        DataFrame med Valgart, Valg, ListeId, ListeBogstav, ListeNavn, Stemmer
+    """
+    return area_list_votes(df_res, df_kand).groupby(['Valgart', 'Valg', 'ListeId'], sort=True).agg(
+        ListeBogstav=('ListeBogstav', 'first'),
+        ListeNavn=('ListeNavn', 'first'),
+        Stemmer=('Stemmer', 'sum'),
+    ).reset_index()
+
+
+def actual_list_seats(df_mand):
+    """
+    Faktiske mandater per liste fra mandatfordeling (ekskl. stedfortrædere).
+
+    Personlige mandater tælles per kandidat, listemandater per mandatnummer.
+    """
+    mand = df_mand[df_mand['MandatType'] != 'Stedfortræder']
+    mand = mand.assign(ListeId=mand['ListeId'].astype(str))
+
+    personlige = mand[mand['MandatType'] == 'Personligt'].drop_duplicates(['Valgart', 'KandidatId'])
+    liste = mand[mand['MandatType'] == 'Liste'].drop_duplicates(['Valgart', 'ListeId', 'MandatNummer'])
+
+    return pd.concat([personlige, liste]).groupby('ListeId').size().rename('Faktiske Mandater')
+
+
+def load_forbund(forbund_fil=FORBUND_FIL):
+    """Indlæs valgforbund/listeforbund (tom tabel hvis filen mangler)"""
+    kolonner = ['Valgart', 'Valg', 'ListeBogstav', 'Valgforbund', 'Listeforbund']
+    if not Path(forbund_fil).exists():
+        return pd.DataFrame(columns=kolonner)
+    return pd.read_csv(forbund_fil, dtype=str)[kolonner]
+
+
+def fordel_mandater(lister, mandater_per_valg, forbund=None):
+    """
+    Fordel mandater for alle valg på én gang (D'Hondt med forbund).
+
+    Args:
+        lister: DataFrame med Valgart, Valg, ListeId, ListeBogstav, Stemmer
+        mandater_per_valg: Series indekseret på (Valgart, Valg) med antal mandater
+        forbund: Valgfri tabel fra load_forbund()
+
+    Returns:
+        (lister med kolonnen 'Beregnede Mandater', Series med lodtrækning per valg)
+    """
+    df = lister.copy()
+    if forbund is not None and len(forbund) > 0:
+        df = df.merge(forbund, on=['Valgart', 'Valg', 'ListeBogstav'], how='left')
+    else:
+        df['Valgforbund'] = np.nan
+        df['Listeforbund'] = np.nan
+
+    # Niveauer: valgforbund -> listeforbund -> liste. Lister uden forbund er
+    # deres eget forbund, så fordelingen går uændret igennem det niveau.
+    liste_nøgle = 'L:' + df['ListeId'].astype(str)
+    listeforbund = ('LF:' + df['Listeforbund'].astype(str)).where(df['Listeforbund'].notna(), liste_nøgle)
+    valgforbund = ('VF:' + df['Valgforbund'].astype(str)).where(df['Valgforbund'].notna(), listeforbund)
+
+    valg_kode = df.groupby(['Valgart', 'Valg'], sort=True).ngroup()
+    valg_index = pd.MultiIndex.from_frame(df[['Valgart', 'Valg']].drop_duplicates().sort_values(['Valgart', 'Valg']))
+
+    forælder = 'V:' + valg_kode.astype(str)
+    forælder_mandater = pd.Series(
+        mandater_per_valg.reindex(valg_index).fillna(0).astype(int).to_numpy(),
+        index='V:' + pd.Series(range(len(valg_index))).astype(str)
+    )
+    uafgjort_valg = np.zeros(len(valg_index), dtype=bool)
+
+    for niveau in [valgforbund, listeforbund, liste_nøgle]:
+        enheder = pd.DataFrame({'Forælder': forælder, 'Enhed': niveau, 'Valg': valg_kode,
+                                'Stemmer': df['Stemmer']})
+        enheder = enheder.groupby(['Forælder', 'Enhed'], sort=False).agg(
+            Valg=('Valg', 'first'), Stemmer=('Stemmer', 'sum')).reset_index()
+
+        koder, unikke = pd.factorize(enheder['Forælder'])
+        mandater = forælder_mandater.reindex(unikke).fillna(0).astype(int).to_numpy()
+        fordeling, uafgjort = dhondt(koder, enheder['Stemmer'].to_numpy(), mandater)
+
+        # Lodtrækning på et niveau gælder hele valget
+        grp_valg = enheder.groupby(koder)['Valg'].first().to_numpy()
+        uafgjort_valg[grp_valg[uafgjort]] = True
+
+        forælder = forælder + '|' + niveau
+        forælder_mandater = pd.Series(fordeling, index=(enheder['Forælder'] + '|' + enheder['Enhed']).to_numpy())
+
+    df['Beregnede Mandater'] = forælder.map(forælder_mandater).fillna(0).astype(int)
+    return df, pd.Series(uafgjort_valg, index=valg_index, name='Lodtrækning')
+
+
+def beregn_mandater(df_res, df_mand, df_kand=None, forbund=None):
+    """
+    Genberegn mandater for alle valg og krydstjek mod mandatfordeling.
+
+    Antal mandater per valg tages fra mandatfordeling (summen over valgets lister).
+
+    Returns:
+        (per_liste, per_valg) DataFrames
+    """
+    lister = list_vote_totals(df_res, df_kand)
+    faktiske = actual_list_seats(df_mand)
+    lister['Faktiske Mandater'] = lister['ListeId'].map(faktiske).fillna(0).astype(int)
+
+    mandater_per_valg = lister.groupby(['Valgart', 'Valg'])['Faktiske Mandater'].sum()
+
+    start = time.perf_counter()
+    per_liste, lodtrækning = fordel_mandater(lister, mandater_per_valg, forbund)
+    varighed = time.perf_counter() - start
+
+    per_liste['Difference'] = per_liste['Beregnede Mandater'] - per_liste['Faktiske Mandater']
+    per_liste = per_liste[[
+        'Valgart', 'Valg', 'ListeBogstav', 'ListeNavn', 'ListeId', 'Stemmer',
+        'Valgforbund', 'Listeforbund', 'Beregnede Mandater', 'Faktiske Mandater', 'Difference'
+    ]].sort_values(['Valgart', 'Valg', 'Stemmer'], ascending=[True, True, False])
+
+    per_valg = per_liste.groupby(['Valgart', 'Valg']).agg(
+        Lister=('ListeId', 'size'),
+        Stemmer=('Stemmer', 'sum'),
+        Mandater=('Faktiske Mandater', 'sum'),
+        Afvigelser=('Difference', lambda d: int((d != 0).sum())),
+    )
+    per_valg['Lodtrækning'] = lodtrækning.reindex(per_valg.index).fillna(False).astype(bool)
+    per_valg['Stemmer'] = per_valg['Stemmer'].astype(int)
+    per_valg = per_valg.reset_index()
+
+    print(f"    → {len(per_valg)} valg / {len(per_liste)} lister genberegnet på {varighed * 1000:.1f} ms")
+
+    return per_liste, per_valg
+
+
+@spor()
+def lav_mandatberegning(output_dir='excel_output', store=None):
+    """Genberegn mandater og gem krydstjek til Excel"""
+    print("🧮 Starter mandatberegning...")
+    if store is None:
+        store = DataStore(output_dir)
+
+    if not store.find_file('valgresultater') or not store.find_file('mandatfordeling'):
+        print("❌ Mangler nødvendige filer")
+        return False
+
+    print(f"📖 Læser data...")
+    df_res = store.get('valgresultater', columns=RESULTAT_KOLONNER)
+    df_mand = store.get('mandatfordeling', columns=MANDAT_KOLONNER)
+    df_kand = store.get('kandidater', columns=KANDIDAT_KOLONNER)
+
+    for kolonne in ['ListeId', 'ListeStemmer']:
+        if kolonne not in df_res.columns:
+            print(f"❌ Valgresultater mangler kolonnen {kolonne}")
+            return False
+
+    forbund = load_forbund()
+    if len(forbund) > 0:
+        print(f"  • {len(forbund)} lister i valg-/listeforbund")
+
+    print("  • Fordeler mandater (D'Hondt)...")
+    per_liste, per_valg = beregn_mandater(df_res, df_mand, df_kand, forbund)
+
+    afvigende = per_valg[per_valg['Afvigelser'] > 0]
+    if len(afvigende) > 0:
+        print(f"    ⚠️ {len(afvigende)} valg afviger fra mandatfordeling:")
+        for _, row in afvigende.head(10).iterrows():
+            print(f"       {row['Valgart']} - {row['Valg']}: {row['Afvigelser']} lister")
+    else:
+        print(f"    ✓ Alle {len(per_valg)} valg stemmer med mandatfordeling")
+
+    if per_valg['Lodtrækning'].any():
+        print(f"    ⚠️ Lodtrækning om sidste mandat i {int(per_valg['Lodtrækning'].sum())} valg")
+
+    output_file = output_sti(output_dir, 'Analyse_mandater.xlsx')
+    store.findings.write_workbook(output_file, {'Per Valg': per_valg, 'Per Liste': per_liste})
+
+    print(f"✅ Mandatberegning gemt: {output_file}")
+    return True
+
+
+def main(output_dir='excel_output', store=None):
+    """Main funktion til brug i pipeline"""
+    success = lav_mandatberegning(output_dir, store)
+    return success
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genberegn mandater (D\'Hondt) og krydstjek mod mandatfordeling')
+    parser.add_argument('--output-dir', default='excel_output', help='Output directory')
+    args = parser.parse_args()
+
+    success = main(args.output_dir)
+    sys.exit(0 if success else 1)
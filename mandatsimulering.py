@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Mandatsimulering - hvor følsom er mandatfordelingen for små stemmeforskydninger?
+
+Den kvantitative udgave af "Tynde Flertaller" i lav_magtanalyse. For hver
+liste i hver kommune beregnes:
+
+1. Mindste stemmeskift der ændrer et mandat: hvor mange stemmer skal flyttes
+   fra en anden liste (for +1 mandat) eller til en anden liste (for -1 mandat).
+   Findes eksakt med bisektion over alle listepar på én gang.
+2. Sandsynlighed for mandatskifte under en støjmodel: stemmerne i hvert
+   afstemningsområde perturberes (log-normal støj per område og liste) og
+   mandaterne genberegnes tusindvis af gange i batches (mandatberegning.fordel_batch).
+
+Kommunerne fordeles over en process pool.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import time
+import argparse
+from datastore import DataStore
+from filplacering import output_sti
+from utils import spor
+from mandatberegning import (RESULTAT_KOLONNER, KANDIDAT_KOLONNER, MANDAT_KOLONNER,
+                             area_list_votes, actual_list_seats, load_forbund,
+                             forbund_niveauer, fordel_batch)
+
+# Standardværdier for simuleringen
+ITERATIONER = 10000
+STØJ_SIGMA = 0.05       # Relativ støj per afstemningsområde og liste (log-normal)
+BATCH_STØRRELSE = 2000  # Scenarier per batch (begrænser hukommelsesforbrug)
+
+
+def minimum_vote_shift(stemmer, mandater, niveauer=()):
+    """
+    Mindste antal stemmer der skal flyttes for at ændre en listes mandattal.
+
+    For alle listepar (i, j) findes ved bisektion det mindste x hvor flytning
+    af x stemmer fra j til i giver liste i et mandat mere (og omvendt for at
+    miste et). Alle par bisekteres samtidigt som én batch.
+
+    Args:
+        stemmer: Array (L) med listestemmer
+        mandater: Antal mandater i valget
+        niveauer: Forbundsniveauer (se mandatberegning.fordel_batch)
+
+    Returns:
+        (gevinst, gevinst_fra, tab, tab_til) - arrays (L): mindste skift for
+        +1 / -1 mandat (inf hvis umuligt) og listen stemmerne flyttes fra/til
+    """
+    stemmer = np.asarray(stemmer, dtype=np.float64)
+    L = len(stemmer)
+    basis = fordel_batch(stemmer[None, :], mandater, niveauer)[0]
+
+    til, fra = np.meshgrid(np.arange(L), np.arange(L), indexing='ij')
+    til, fra = til.ravel(), fra.ravel()
+    par = til != fra
+    til, fra = til[par], fra[par]
+
+    def første_ændring(modtager, afgiver, liste, tegn):
+        """Mindste x (flyttet fra afgiver til modtager) hvor listens mandater ændres i retning tegn"""
+        lav = np.zeros(len(modtager))
+        høj = stemmer[afgiver].copy()
+
+        def ændret(x):
+            scenarie = np.broadcast_to(stemmer, (len(x), L)).copy()
+            scenarie[np.arange(len(x)), modtager] += x
+            scenarie[np.arange(len(x)), afgiver] -= x
+            nye = fordel_batch(scenarie, mandater, niveauer)[np.arange(len(x)), liste]
+            return (nye - basis[liste]) * tegn > 0
+
+        mulig = ændret(høj)
+        while True:
+            aktiv = mulig & (høj - lav > 1)
+            if not aktiv.any():
+                break
+            midt = np.floor((lav + høj) / 2)
+            ja = ændret(np.where(aktiv, midt, høj)) & aktiv
+            høj = np.where(ja, midt, høj)
+            lav = np.where(aktiv & ~ja, midt, lav)
+
+        return np.where(mulig, høj, np.inf)
+
+    # +1 mandat til liste i: flyt stemmer fra j til i
+    gevinst_par = første_ændring(til, fra, til, 1)
+    # -1 mandat for liste i: flyt stemmer fra i til j
+    tab_par = første_ændring(fra, til, til, -1)
+
+    gevinst = np.full(L, np.inf)
+    tab = np.full(L, np.inf)
+    gevinst_fra = np.full(L, -1)
+    tab_til = np.full(L, -1)
+    for i in range(L):
+        maske = til == i
+        if maske.any():
+            k = np.argmin(gevinst_par[maske])
+            gevinst[i], gevinst_fra[i] = gevinst_par[maske][k], fra[maske][k]
+            k = np.argmin(tab_par[maske])
+            tab[i], tab_til[i] = tab_par[maske][k], fra[maske][k]
+
+    return gevinst, gevinst_fra, tab, tab_til
+
+
+def simulate_seat_changes(område_stemmer, mandater, niveauer=(), iterationer=ITERATIONER,
+                          sigma=STØJ_SIGMA, seed=0):
+    """
+    Monte Carlo: perturbér stemmer per afstemningsområde og genberegn mandater.
+
+    Args:
+        område_stemmer: Array (A, L) - stemmer per afstemningsområde og liste
+        mandater: Antal mandater i valget
+        niveauer: Forbundsniveauer (se mandatberegning.fordel_batch)
+        iterationer: Antal scenarier
+        sigma: Standardafvigelse for log-normal støj per område og liste
+        seed: Seed til tilfældighedsgeneratoren
+
+    Returns:
+        (basis, gevinst, tab, forventet, ændring) - basis-mandater (L), andel af
+        scenarier med flere/færre mandater (L), gennemsnitlige mandater (L) og
+        andel scenarier hvor mindst ét mandat skifter (skalar)
+    """
+    område_stemmer = np.asarray(område_stemmer, dtype=np.float64)
+    A, L = område_stemmer.shape
+    basis = fordel_batch(område_stemmer.sum(axis=0)[None, :], mandater, niveauer)[0]
+
+    rng = np.random.default_rng(seed)
+    gevinst = np.zeros(L)
+    tab = np.zeros(L)
+    summer = np.zeros(L)
+    ændringer = 0
+
+    for start in range(0, iterationer, BATCH_STØRRELSE):
+        B = min(BATCH_STØRRELSE, iterationer - start)
+        # Middelværdi-korrigeret log-normal støj, så forventet stemmetal er uændret.
+        # float32 og in-place operationer: støjgenereringen dominerer køretiden
+        støj = rng.standard_normal((B, A, L), dtype=np.float32)
+        støj *= sigma
+        støj -= sigma ** 2 / 2
+        np.exp(støj, out=støj)
+        scenarier = np.einsum('bal,al->bl', støj, område_stemmer.astype(np.float32))
+
+        fordeling = fordel_batch(scenarier, mandater, niveauer)
+        gevinst += (fordeling > basis).sum(axis=0)
+        tab += (fordeling < basis).sum(axis=0)
+        summer += fordeling.sum(axis=0)
+        ændringer += (fordeling != basis).any(axis=1).sum()
+
+    return basis, gevinst / iterationer, tab / iterationer, summer / iterationer, ændringer / iterationer
+
+
+def simuler_valg(opgave):
+    """Kør både stemmeskift og Monte Carlo for ét valg (kaldes i worker-proces)"""
+    niveauer = opgave['niveauer']
+    stemmer = opgave['område_stemmer'].sum(axis=0)
+
+    with spor(opgave['nøgle'][1], 'simulering', områder=opgave['område_stemmer'].shape[0]):
+        gevinst_skift, gevinst_fra, tab_skift, tab_til = minimum_vote_shift(stemmer, opgave['mandater'], niveauer)
+        basis, p_gevinst, p_tab, forventet, p_ændring = simulate_seat_changes(
+            opgave['område_stemmer'], opgave['mandater'], niveauer,
+            opgave['iterationer'], opgave['sigma'], opgave['seed']
+        )
+
+    return {
+        'nøgle': opgave['nøgle'],
+        'basis': basis,
+        'gevinst_skift': gevinst_skift,
+        'gevinst_fra': gevinst_fra,
+        'tab_skift': tab_skift,
+        'tab_til': tab_til,
+        'p_gevinst': p_gevinst,
+        'p_tab': p_tab,
+        'forventet': forventet,
+        'p_ændring': p_ændring,
+    }
+
+
+def build_tasks(områder, mandater_per_valg, forbund, iterationer, sigma, seed):
+    """Opdel område-stemmer i én opgave per valg (stemmematrix område x liste)"""
+    opgaver = []
+    lister_per_valg = {}
+
+    for nr, (nøgle, gruppe) in enumerate(områder.groupby(['Valgart', 'Valg'], sort=True)):
+        mandater = int(mandater_per_valg.get(nøgle, 0))
+        if mandater == 0:
+            continue
+
+        område_kode, områder_unikke = pd.factorize(gruppe['AfstemningsområdeDagiId'])
+        liste_kode, _ = pd.factorize(gruppe['ListeId'])
+        matrix = np.zeros((len(områder_unikke), liste_kode.max() + 1))
+        np.add.at(matrix, (område_kode, liste_kode), gruppe['Stemmer'].to_numpy(dtype=np.float64))
+
+        # Lister i samme rækkefølge som matricens kolonner (første forekomst)
+        lister = gruppe.drop_duplicates('ListeId').reset_index(drop=True)
+        lister = lister.merge(forbund, on=['Valgart', 'Valg', 'ListeBogstav'], how='left')
+
+        lister_per_valg[nøgle] = lister
+        opgaver.append({
+            'nøgle': nøgle,
+            'område_stemmer': matrix,
+            'mandater': mandater,
+            'niveauer': forbund_niveauer(lister),
+            'iterationer': iterationer,
+            'sigma': sigma,
+            'seed': (seed, nr),
+        })
+
+    return opgaver, lister_per_valg
+
+
+def run_tasks(opgaver, workers=None):
+    """Kør opgaver i process pool (workers=1 kører i samme proces)"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(opgaver) <= 1:
+        return [simuler_valg(opgave) for opgave in opgaver]
+
+    # Største valg først, så pool'en ikke venter på en stor kommune til sidst
+    orden = sorted(range(len(opgaver)), key=lambda i: -opgaver[i]['område_stemmer'].size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        resultater = list(pool.map(simuler_valg, [opgaver[i] for i in orden], chunksize=4))
+    return [r for _, r in sorted(zip(orden, resultater), key=lambda x: x[0])]
+
+
+@spor()
+def lav_mandatsimulering(output_dir='excel_output', store=None, iterationer=ITERATIONER,
+                         sigma=STØJ_SIGMA, workers=None, seed=2025, valgart='Kommunalvalg'):
+    """Simulér mandatfølsomhed for alle kommuner og gem til Excel"""
+    print("🎲 Starter mandatsimulering...")
+    if store is None:
+        store = DataStore(output_dir)
+
+    if not store.find_file('valgresultater') or not store.find_file('mandatfordeling'):
+        print("❌ Mangler nødvendige filer")
+        return False
+
+    print(f"📖 Læser data...")
+    df_res = store.get('valgresultater', columns=RESULTAT_KOLONNER)
+    df_mand = store.get('mandatfordeling', columns=MANDAT_KOLONNER)
+    df_kand = store.get('kandidater', columns=KANDIDAT_KOLONNER)
+
+    for kolonne in ['ListeId', 'ListeStemmer']:
+        if kolonne not in df_res.columns:
+            print(f"❌ Valgresultater mangler kolonnen {kolonne}")
+            return False
+
+    områder = area_list_votes(df_res, df_kand)
+    if valgart:
+        områder = områder[områder['Valgart'] == valgart]
+
+    faktiske = actual_list_seats(df_mand)
+    lister = områder.drop_duplicates(['Valgart', 'Valg', 'ListeId'])
+    mandater_per_valg = lister.assign(
+        Mandater=lister['ListeId'].map(faktiske).fillna(0).astype(int)
+    ).groupby(['Valgart', 'Valg'])['Mandater'].sum()
+
+    opgaver, lister_per_valg = build_tasks(områder, mandater_per_valg, load_forbund(),
+                                           iterationer, sigma, seed)
+    print(f"  • Simulerer {len(opgaver)} valg × {iterationer:,} scenarier (σ = {sigma:.0%})...")
+
+    start = time.perf_counter()
+    resultater = run_tasks(opgaver, workers)
+    print(f"    → Færdig på {time.perf_counter() - start:.1f} s")
+
+    per_liste = []
+    per_valg = []
+    for r in resultater:
+        valgart_navn, valg = r['nøgle']
+        lister = lister_per_valg[r['nøgle']]
+        bogstaver = lister['ListeBogstav'].to_numpy()
+
+        per_liste.append(pd.DataFrame({
+            'Valgart': valgart_navn,
+            'Valg': valg,
+            'ListeBogstav': bogstaver,
+            'ListeNavn': lister['ListeNavn'].to_numpy(),
+            'Mandater': r['basis'].astype(int),
+            'Stemmer til +1 mandat': r['gevinst_skift'],
+            'Fra liste': np.where(r['gevinst_fra'] >= 0, bogstaver[r['gevinst_fra']], ''),
+            'Stemmer til -1 mandat': r['tab_skift'],
+            'Til liste': np.where(r['tab_til'] >= 0, bogstaver[r['tab_til']], ''),
+            'P(+1) %': np.round(r['p_gevinst'] * 100, 1),
+            'P(-1) %': np.round(r['p_tab'] * 100, 1),
+            'Forventede Mandater': np.round(r['forventet'], 2),
+        }))
+
+        mindste = min(r['gevinst_skift'].min(), r['tab_skift'].min())
+        per_valg.append({
+            'Valgart': valgart_navn,
+            'Valg': valg,
+            'Mandater': int(r['basis'].sum()),
+            'Lister': len(lister),
+            'Mindste stemmeskift': mindste,
+            'P(mandatskifte) %': round(r['p_ændring'] * 100, 1),
+        })
+
+    df_liste = pd.concat(per_liste, ignore_index=True) if per_liste else pd.DataFrame()
+    df_valg = pd.DataFrame(per_valg)
+
+    if len(df_valg) > 0:
+        df_liste = df_liste.replace(np.inf, np.nan)
+        df_valg = df_valg.replace(np.inf, np.nan).sort_values('Mindste stemmeskift')
+        df_liste = df_liste.sort_values(['Valgart', 'Valg', 'Mandater'], ascending=[True, True, False])
+        mest = df_valg.iloc[0]
+        print(f"    → Mest følsomme: {mest['Valg']} - {mest['Mindste stemmeskift']:.0f} stemmer flytter et mandat")
+
+    output_file = output_sti(output_dir, 'Analyse_mandatfølsomhed.xlsx')
+    store.findings.write_workbook(output_file, {'Per Valg': df_valg, 'Per Liste': df_liste})
+
+    print(f"✅ Mandatsimulering gemt: {output_file}")
+    return True
+
+
+def main(output_dir='excel_output', store=None, iterationer=ITERATIONER, sigma=STØJ_SIGMA, workers=None):
+    """Main funktion til brug i pipeline"""
+    success = lav_mandatsimulering(output_dir, store, iterationer, sigma, workers)
+    return success
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulér mandatfølsomhed (stemmeskift og Monte Carlo)')
+    parser.add_argument('--output-dir', default='excel_output', help='Output directory')
+    parser.add_argument('--iterationer', type=int, default=ITERATIONER, help='Antal scenarier per valg')
+    parser.add_argument('--sigma', type=float, default=STØJ_SIGMA, help='Relativ støj per afstemningsområde')
+    parser.add_argument('--workers', type=int, default=None, help='Antal processer (default: alle kerner)')
+    args = parser.parse_args()
+
+    success = main(args.output_dir, iterationer=args.iterationer, sigma=args.sigma, workers=args.workers)
+    sys.exit(0 if success else 1)
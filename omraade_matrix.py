@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Materialiseret afstemningsområde × parti stemmematrix
+
+Converteren bygger én tæt matrix per valgtype med ListeStemmer per
+afstemningsområde (rækker) og parti (kolonner), plus en områdedimension med
+GyldigeStemmer og de øvrige områdetal. Geografiske analyser (andele,
+afvigelser fra kommunegennemsnit, højborge, stemmebalance) bliver dermed rene
+array-operationer i stedet for endnu en gennemgang af kandidat-tabellen.
+
+Matricen gemmes som ukomprimeret Arrow IPC i arrow/ (områdekolonner + én
+nullable int-kolonne per parti; null = partiet stillede ikke op i området),
+så den kan memory-mappes med utils.open_dataset_mmap.
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from utils import save_arrow_ipc
+
+# Områdedimensionen (rækker). Alle øvrige kolonner i filen er partier.
+OMRÅDE_KOLONNER = ['Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'Afstemningsområde',
+                   'GyldigeStemmer', 'AfgivneStemmer', 'UgyldigeStemmer', 'BlankeStemmer',
+                   'Stemmeberettigede', 'ValgdeltagelseProcent']
+
+# Kolonner fra valgresultater der skal bruges for at bygge matricen
+RESULTAT_KOLONNER = OMRÅDE_KOLONNER + ['ListeNavn', 'ListeStemmer']
+
+
+class OmrådeMatrix:
+    """Tæt stemmematrix: afstemningsområde × parti med områdedimension"""
+
+    def __init__(self, områder, partier, stemmer, deltager):
+        self.områder = områder.reset_index(drop=True)
+        self.partier = np.asarray(partier, dtype=object)
+        self.stemmer = np.asarray(stemmer, dtype=np.int64)
+        self.deltager = np.asarray(deltager, dtype=bool)
+        self.gyldige = self.områder['GyldigeStemmer'].fillna(0).to_numpy(dtype=np.int64)
+        self._kommune_koder = None
+
+    @classmethod
+    def from_results(cls, df_res):
+        """Byg matricen fra valgresultater på kandidatniveau (én gennemgang)"""
+        områdenøgle = ['Valgart', 'AfstemningsområdeDagiId', 'Afstemningsområde', 'Kommune']
+        kolonner = [k for k in OMRÅDE_KOLONNER if k in df_res.columns]
+
+        # ListeStemmer er samme værdi for alle kandidater i samme parti+område
+        parti_rækker = df_res[områdenøgle + ['ListeNavn', 'ListeStemmer']].drop_duplicates()
+
+        område_kode, område_unikke = pd.MultiIndex.from_frame(parti_rækker[områdenøgle]).factorize()
+        parti_kode, partier = pd.factorize(parti_rækker['ListeNavn'])
+
+        stemmer = np.zeros((len(område_unikke), len(partier)), dtype=np.int64)
+        deltager = np.zeros(stemmer.shape, dtype=bool)
+        np.add.at(stemmer, (område_kode, parti_kode), parti_rækker['ListeStemmer'].fillna(0).to_numpy(dtype=np.int64))
+        deltager[område_kode, parti_kode] = True
+
+        # Områdetal (samme værdi for alle rækker i området) i matricens rækkefølge
+        områder = df_res[kolonner].drop_duplicates(subset=områdenøgle)
+        områder = pd.DataFrame(list(område_unikke), columns=områdenøgle).merge(
+            områder, on=områdenøgle, how='left')[kolonner]
+
+        return cls(områder, partier, stemmer, deltager)
+
+    def to_frame(self):
+        """Bred DataFrame: områdekolonner + én nullable Int64-kolonne per parti"""
+        parti_data = {
+            parti: pd.arrays.IntegerArray(self.stemmer[:, j].copy(), ~self.deltager[:, j])
+            for j, parti in enumerate(self.partier)
+        }
+        return pd.concat([self.områder, pd.DataFrame(parti_data)], axis=1)
+
+    def save(self, filepath, description=""):
+        """Gem som ukomprimeret Arrow IPC (kan memory-mappes)"""
+        save_arrow_ipc(self.to_frame(), filepath, description)
+
+    @classmethod
+    def load(cls, filepath):
+        """Indlæs matrix gemt med save() via memory mapping"""
+        from utils import open_dataset_mmap
+
+        table = open_dataset_mmap(filepath)
+        område_kolonner = [k for k in table.column_names if k in OMRÅDE_KOLONNER]
+        partier = [k for k in table.column_names if k not in OMRÅDE_KOLONNER]
+
+        områder = table.select(område_kolonner).to_pandas()
+        stemmer = np.zeros((table.num_rows, len(partier)), dtype=np.int64)
+        deltager = np.zeros(stemmer.shape, dtype=bool)
+        for j, parti in enumerate(partier):
+            kolonne = table.column(parti)
+            stemmer[:, j] = kolonne.fill_null(0).to_numpy()
+            deltager[:, j] = kolonne.is_valid().to_numpy(zero_copy_only=False)
+
+        return cls(områder, partier, stemmer, deltager)
+
+    def udsnit(self, maske):
+        """Matrix med kun de områder (rækker) hvor maske er sand - partierne beholdes"""
+        maske = np.asarray(maske, dtype=bool)
+        return OmrådeMatrix(self.områder[maske], self.partier, self.stemmer[maske], self.deltager[maske])
+
+    def kommune_koder(self):
+        """(koder, unikke) for kommune+valgart per område"""
+        if self._kommune_koder is None:
+            self._kommune_koder = pd.MultiIndex.from_frame(self.områder[['Kommune', 'Valgart']]).factorize()
+        return self._kommune_koder
+
+    def capped_stemmer(self):
+        """Partistemmer begrænset til områdets GyldigeStemmer"""
+        return np.minimum(self.stemmer, self.gyldige[:, None])
+
+    def andel(self, decimaler=1):
+        """Partiets andel af gyldige stemmer per område (%)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.round(self.capped_stemmer() / self.gyldige[:, None] * 100, decimaler)
+
+    def kommune_andel(self, decimaler=1):
+        """Partiets andel i hele kommunen, udvidet til hvert område (%)"""
+        koder, unikke = self.kommune_koder()
+        partistemmer = np.zeros((len(unikke), len(self.partier)))
+        gyldige = np.zeros((len(unikke), len(self.partier)))
+
+        # Kun områder hvor partiet stillede op tæller med i gennemsnittet
+        np.add.at(partistemmer, koder, np.where(self.deltager, self.capped_stemmer(), 0))
+        np.add.at(gyldige, koder, np.where(self.deltager, self.gyldige[:, None], 0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.round(partistemmer / gyldige * 100, decimaler)[koder]
+
+    def afvigelse(self):
+        """Områdeandel minus kommunegennemsnit (procentpoint)"""
+        return self.andel() - self.kommune_andel()
+
+    def parti_summer(self):
+        """Summen af alle partiers stemmer per område"""
+        return self.stemmer.sum(axis=1)
+
+    def to_long(self):
+        """Lang tabel med én række per område+parti hvor partiet stillede op"""
+        række, kolonne = np.nonzero(self.deltager)
+        long = self.områder.iloc[række].reset_index(drop=True)
+        long['ListeNavn'] = self.partier[kolonne]
+        long['ListeStemmer'] = self.stemmer[række, kolonne]
+        return long
+
+
+def build_and_save(df_res, arrow_dir, valgtype, timestamp, description=""):
+    """Byg matrix fra valgresultater og gem som omraade_parti_{valgtype}_{timestamp}.arrow"""
+    matrix = OmrådeMatrix.from_results(df_res)
+    matrix.save(Path(arrow_dir) / f"omraade_parti_{valgtype}_{timestamp}.arrow", description)
+    return matrix
@@ -8,59 +8,465 @@ Usage:
     python pipeline.py --download          # Kun download
     python pipeline.py --convert           # Kun konvertering
     python pipeline.py --analyze           # Kun analyse
+    python pipeline.py --all --simulering  # Inkl. mandatsimulering (Monte Carlo)
     python pipeline.py --clean --all       # Slet gamle filer og kør alt
+    python pipeline.py --timing-imports    # Vis hvor opstartstiden går
+    python pipeline.py --all --workers 1   # Analyse-stager serielt i stedet for parallelt
+    python pipeline.py --all --force       # Kør også stager hvis inputs er uændrede
+    python pipeline.py --all --trace trace.json  # Spans til chrome://tracing / Perfetto
+    python pipeline.py --all --quiet       # Optælling i stedet for én linje per JSON-fil
 """
 
+import os
 import sys
+import time
 import shutil
+import importlib
+import logging
+import traceback
 from pathlib import Path
 import argparse
 from datetime import datetime
+from pipeline_metrics import StageMåling, tabel_rækker, gem_metrics, METRICS_FIL
+from logning import opsæt_logning
+
+# Stage-registry: navn -> (modul, funktion).
+# Modulerne importeres først når en stage faktisk køres, så korte kommandoer
+# som --findings ikke betaler for paramiko, pandas, openpyxl og gender-guesser.
+STAGES = {
+    'download': ('hent_valgdata', 'main'),
+    'convert': ('valg_json_til_excel', 'main'),
+    'gender': ('lav_kønsanalyse', 'main'),
+    'general': ('lav_generel_analyse', 'main'),
+    'parse_borgmestre': ('parse_borgmestre', 'main'),
+    'borgmestre': ('lav_borgmester_analyse', 'main'),
+    'magt': ('lav_magtanalyse', 'main'),
+    'mandater': ('mandatberegning', 'main'),
+    'simulering': ('mandatsimulering', 'main'),
+    'findings': ('generate_findings', 'main'),
+    'validate': ('validate_data', 'main'),
+}
+
+# Stage-graf for analyse-delen: hvad hver stage læser og skriver. Afhængigheder
+# udledes af inputs/outputs, så stager uden indbyrdes afhængighed kan køre
+# samtidig. Inputs som ingen valgt stage skriver (converterens datasæt, filer
+# fra en tidligere kørsel) antages at findes. Inputs og outputs er også det
+# stagens fingerprint bygges af (se stage_cache.py).
+STAGE_GRAF = {
+    # Konverteringen køres før DAG'en (se Pipeline.convert); inputs er JSON-mappen
+    'convert': {
+        'besked': "🔄 Konverterer JSON til Excel...",
+        'beskrivelse': "Konvertering til Excel med kønsestimering",
+        'inputs': [],
+        'outputs': ['kandidater', 'valgresultater', 'mandatfordeling'],
+        'store': False,
+    },
+    'parse_borgmestre': {
+        'besked': "📜 Parser borgmestre.md...",
+        'beskrivelse': "Parsing borgmestre.md",
+        'inputs': ['borgmestre.md'],
+        'outputs': ['borgmestre_parsed.csv'],
+        'store': False,
+    },
+    'gender': {
+        'besked': "👥 Laver kønsanalyse...",
+        'beskrivelse': "Kønsanalyse",
+        'inputs': ['kandidater'],
+        'outputs': ['Analyse_kønsfordeling'],
+    },
+    'general': {
+        'besked': "📊 Laver generel analyse (valgdeltagelse, job, stemmeslugere)...",
+        'beskrivelse': "Generel Analyse",
+        'inputs': ['kandidater', 'valgresultater'],
+        'outputs': ['Analyse_generel'],
+    },
+    'borgmestre': {
+        'besked': "👔 Laver borgmester-analyse...",
+        'beskrivelse': "Borgmester Analyse",
+        'inputs': ['kandidater', 'borgmestre_parsed.csv'],
+        'outputs': ['Analyse_borgmestre'],
+    },
+    'magt': {
+        'besked': "💪 Laver magtanalyse...",
+        'beskrivelse': "Magtanalyse",
+        'inputs': ['valgresultater', 'mandatfordeling', 'borgmestre_parsed.csv'],
+        'outputs': ['Analyse_magt'],
+    },
+    'mandater': {
+        'besked': "🧮 Genberegner mandater...",
+        'beskrivelse': "Mandatberegning",
+        'inputs': ['valgresultater', 'mandatfordeling', 'kandidater', 'data/valgforbund.csv'],
+        'outputs': ['Analyse_mandater'],
+    },
+    'simulering': {
+        'besked': "🎲 Simulerer mandatfølsomhed...",
+        'beskrivelse': "Mandatsimulering",
+        'inputs': ['valgresultater', 'mandatfordeling', 'kandidater', 'data/valgforbund.csv'],
+        'outputs': ['Analyse_mandatfølsomhed'],
+    },
+    'findings': {
+        'besked': "📊 Genererer findings...",
+        'beskrivelse': "Findings generation",
+        'inputs': ['kandidater', 'valgresultater', 'borgmestre_parsed.csv', 'Analyse_generel', 'Analyse_magt'],
+        'outputs': ['MASTER_FINDINGS.md'],
+    },
+    'validate': {
+        'besked': "✅ Validerer data...",
+        'beskrivelse': "Data validering",
+        'inputs': ['kandidater', 'valgresultater', 'Analyse_generel', 'MASTER_FINDINGS.md'],
+        'outputs': [],
+    },
+}
+
+ANALYSE_STAGES = ['gender', 'general', 'borgmestre', 'magt', 'mandater']
+
+# Stager der kun køres når de vælges eksplicit (Monte Carlo-simuleringen tager
+# langt længere tid end de øvrige analyser)
+VALGFRIE_STAGES = ['simulering']
+
+# Tunge tredjepartspakker som stagerne trækker ind (bruges af --timing-imports)
+HEAVY_DEPENDENCIES = ['pandas', 'pyarrow', 'openpyxl', 'paramiko', 'gender_guesser.detector']
+
+# Inkrementel importtid per modul i den rækkefølge de blev indlæst
+_IMPORT_TIMES = {}
+
+
+def _timed_import(module_name):
+    """Importér modul og registrér tiden, hvis det ikke allerede er indlæst"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _IMPORT_TIMES[module_name] = time.perf_counter() - start
+    return module
+
+
+def load_stage(name):
+    """Importér stagens modul ved første brug og returnér dens funktion"""
+    module_name, func_name = STAGES[name]
+    return getattr(_timed_import(module_name), func_name)
+
+
+def stage_afhængigheder(valgte):
+    """
+    Afhængigheder mellem de valgte stager udledt af STAGE_GRAF.
+
+    Returns:
+        {stage: [stager den afhænger af]} i valgte-rækkefølge
+    """
+    producent = {output: navn for navn in valgte for output in STAGE_GRAF[navn]['outputs']}
+    return {
+        navn: sorted({producent[i] for i in STAGE_GRAF[navn]['inputs'] if producent.get(i, navn) != navn},
+                     key=valgte.index)
+        for navn in valgte
+    }
+
+
+def _kør_stage_i_worker(name, args, kwargs, store_dir=None):
+    """
+    Kør en stage i en worker-proces.
+
+    Med store_dir får stagen workerens DataStore; stager i samme worker deler
+    det, ligesom stagerne i en seriel kørsel deler pipelinens. Fejl returneres
+    som tekst, så hovedprocessen kan logge dem som ved en seriel kørsel.
+
+    Returns:
+        (ok, fejl, traceback, importtider, metrics)
+    """
+    global _WORKER_STORE
+    _IMPORT_TIMES.clear()
+    if store_dir is not None:
+        from datastore import DataStore
+        if _WORKER_STORE is None or _WORKER_STORE.output_dir != Path(store_dir):
+            _WORKER_STORE = DataStore(store_dir)
+        kwargs = {**kwargs, 'store': _WORKER_STORE}
+
+    from utils import spor
+
+    måling = StageMåling(kwargs.get('store'))
+    try:
+        with måling, spor(name, 'stage'):
+            load_stage(name)(*args, **kwargs)
+        return True, None, None, dict(_IMPORT_TIMES), måling.metrics
+    except Exception as e:
+        return (False, f"{type(e).__name__}: {str(e)}", traceback.format_exc(),
+                dict(_IMPORT_TIMES), måling.metrics)
+
+
+# DataStore i en worker-proces (deles af de stager workeren kører)
+_WORKER_STORE = None
 
-# Import alle pipeline-moduler
-from hent_valgdata import main as hent_data_main
-from valg_json_til_excel import main as convert_main
-from lav_kønsanalyse import main as kønsanalyse_main
-from lav_generel_analyse import main as generel_analyse_main
-from lav_magtanalyse import main as magtanalyse_main
-from lav_borgmester_analyse import main as borgmester_analyse_main
-from parse_borgmestre import main as parse_borgmestre_main
-from generate_findings import main as generate_findings_main
-from validate_data import main as validate_data_main
 
 class Pipeline:
-    def __init__(self, json_dir='json_data', output_dir='excel_output'):
+    def __init__(self, json_dir='json_data', output_dir='excel_output', quarantine=False, workers=None,
+                 force=False, trace=None, quiet=False, log_level='INFO', log_format='tekst'):
         self.json_dir = Path(json_dir)
         self.output_dir = Path(output_dir)
-        self.log_file = 'pipeline.log'
+        self.quarantine = quarantine
+        self.workers = workers or os.cpu_count() or 1
+        self.force = force
+        self.trace = Path(trace) if trace else None
+        self.metrics = {}
+        self.log_file = 'pipeline.jsonl' if log_format == 'json' else 'pipeline.log'
+        self.logger = opsæt_logning(self.log_file, log_level, log_format, stille=quiet)
         self.start_time = datetime.now()
-
-    def log(self, message, level='INFO'):
-        """Log besked til konsol og fil"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_msg = f"[{timestamp}] [{level}] {message}"
-        print(log_msg)
-
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_msg + '\n')
+        self._store = None
+
+        if self.trace:
+            # Miljøvariablen arves af worker-processerne
+            from utils import start_sporing
+            start_sporing(self.output_dir / '.spor')
+
+    @property
+    def store(self):
+        """Delt DataStore til analyse-stagerne (oprettes ved første brug)"""
+        if self._store is None:
+            from datastore import DataStore
+            self._store = DataStore(self.output_dir)
+        return self._store
+
+    @property
+    def stage_cache(self):
+        """Fingerprints for stagerne i STAGE_GRAF (se stage_cache.py)"""
+        from stage_cache import StageCache
+        return StageCache(self.output_dir, self.store)
+
+    def log(self, message, level='INFO', **felter):
+        """Log besked til konsol og fil (felter kommer med i JSON-loggen)"""
+        self.logger.log(logging.getLevelName(level), message, extra={'felter': felter})
 
     def run_function(self, func, description, *args, **kwargs):
         """Kør en funktion og log resultatet"""
         self.log(f"{'='*60}")
         self.log(f"Starter: {description}")
 
+        start = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            self.log(f"✅ Succes: {description}", 'SUCCESS')
+            self.log_result(description, varighed=time.perf_counter() - start)
             return True
 
         except Exception as e:
-            self.log(f"❌ Fejl: {description}", 'ERROR')
-            self.log(f"Exception: {type(e).__name__}: {str(e)}", 'ERROR')
-            import traceback
-            self.log(f"Traceback:\n{traceback.format_exc()}", 'ERROR')
+            self.log_result(description, f"{type(e).__name__}: {str(e)}", traceback.format_exc(),
+                            varighed=time.perf_counter() - start)
             return False
 
+    def log_result(self, description, fejl=None, tb=None, varighed=None):
+        """Log succes eller fejl (med traceback) for en stage"""
+        tid = f" ({varighed:.1f}s)" if varighed is not None else ""
+        felter = {'stage': description, 'varighed_s': round(varighed, 3) if varighed is not None else None}
+        if fejl is None:
+            self.log(f"✅ Succes: {description}{tid}", 'SUCCESS', status='ok', **felter)
+            return
+        self.log(f"❌ Fejl: {description}{tid}", 'ERROR', status='fejl', fejl=fejl, **felter)
+        self.log(f"Exception: {fejl}", 'ERROR')
+        if tb:
+            self.log(f"Traceback:\n{tb}", 'ERROR')
+
+    def run_stage(self, name, description, *args, **kwargs):
+        """Kør en registreret stage - modulet importeres først her (og måles)"""
+        måling = StageMåling(kwargs.get('store'))
+
+        def stage(*stage_args, **stage_kwargs):
+            from utils import spor
+            with måling, spor(name, 'stage'):
+                return load_stage(name)(*stage_args, **stage_kwargs)
+
+        ok = self.run_function(stage, description, *args, **kwargs)
+        self.record_metrics(name, 'ok' if ok else 'fejl', måling.metrics)
+        return ok
+
+    def record_metrics(self, name, status, metrics=None):
+        """
+        Gem en stages metrics til pipeline_metrics.json.
+
+        Rækker ind/ud tælles i stagens input- og output-tabeller fra STAGE_GRAF
+        (datasæt, findings-tabeller, CSV).
+        """
+        række = {'status': status, **(metrics or {})}
+        if status == 'ok' and name in STAGE_GRAF:
+            cache = self.stage_cache
+            for felt, navne in [('rækker_ind', STAGE_GRAF[name]['inputs']),
+                                ('rækker_ud', STAGE_GRAF[name]['outputs'])]:
+                antal = [tabel_rækker(cache.input_filer(n)) for n in navne]
+                antal = [a for a in antal if a is not None]
+                række[felt] = sum(antal) if antal else None
+        self.metrics[name] = række
+
+    def stage_call(self, name, i_worker=False):
+        """
+        Argumenter til en stage i STAGE_GRAF (uden store).
+
+        Args:
+            i_worker: Stagen kører i en af DAG'ens worker-processer. Stager med
+                deres egen process pool (simulering) får så 1 proces, så
+                pool'en ikke overbookes med workers × kerner processer
+        """
+        if name == 'convert':
+            return (str(self.json_dir), str(self.output_dir)), {'karantæne': self.quarantine}
+        if name == 'parse_borgmestre':
+            return (), {}
+        if name == 'simulering':
+            return (str(self.output_dir),), {'workers': 1 if i_worker else self.workers}
+        return (str(self.output_dir),), {}
+
+    def run_named(self, name):
+        """Kør en stage fra STAGE_GRAF i denne proces (med pipelinens DataStore)"""
+        spec = STAGE_GRAF[name]
+        self.log(spec['besked'])
+        args, kwargs = self.stage_call(name)
+        if spec.get('store', True):
+            kwargs['store'] = self.store
+        return self.run_stage(name, spec['beskrivelse'], *args, **kwargs)
+
+    def check_stage(self, navn, inputs=None):
+        """
+        Beregn stagens fingerprint og log om den skal køres og hvorfor.
+
+        Args:
+            inputs: Erstatter STAGE_GRAF-inputs (fx JSON-mappen for convert)
+
+        Returns:
+            (fingerprint, uændret) - uændret=True betyder at stagen kan springes over
+        """
+        spec = STAGE_GRAF[navn]
+        args, kwargs = self.stage_call(navn)
+        # Antal processer ændrer ikke resultatet og indgår ikke i fingerprintet
+        kwargs.pop('workers', None)
+        fp = self.stage_cache.fingerprint(navn, STAGES[navn][0], spec['inputs'] if inputs is None else inputs,
+                                          {'args': list(args), 'kwargs': kwargs})
+        grunde = ['--force'] if self.force else self.stage_cache.reasons(fp, spec['outputs'])
+
+        if grunde:
+            self.log(f"🔁 {spec['beskrivelse']}: kører ({'; '.join(grunde)})")
+        else:
+            self.log(f"⏭️  {spec['beskrivelse']}: uændret (fingerprint {fp['fingerprint']}) - springes over")
+            self.record_metrics(navn, 'uændret')
+        return fp, not grunde
+
+    def run_stages(self, valgte):
+        """
+        Kør valgte stager fra STAGE_GRAF som en DAG.
+
+        Stager hvis afhængigheder er færdige køres samtidig i en process pool
+        (self.workers; 1 = serielt i denne proces med pipelinens DataStore).
+        En stage der fejler blokerer kun de stager der afhænger af den. Stager
+        hvis fingerprint er uændret siden sidste vellykkede kørsel springes
+        over (medmindre self.force).
+
+        Returns:
+            {stage: True/False/None} (None = sprunget over pga. fejlet afhængighed)
+        """
+        afhængigheder = stage_afhængigheder(valgte)
+        status = {}
+        fingerprints = {}
+
+        if self.workers <= 1 or len(valgte) <= 1:
+            for navn in valgte:
+                fejlet = [a for a in afhængigheder[navn] if not status[a]]
+                if fejlet:
+                    status[navn] = self._skip_stage(navn, fejlet)
+                    continue
+
+                fp, uændret = self.check_stage(navn)
+                status[navn] = uændret or self.run_named(navn)
+                if status[navn] and not uændret:
+                    self.stage_cache.save(fp)
+            return status
+
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+        self.log(f"🔀 Kører {len(valgte)} stager som DAG med op til {self.workers} processer")
+        venter = list(valgte)
+        kører = {}
+        processer = min(self.workers, len(valgte))
+        with ProcessPoolExecutor(max_workers=processer) as pool:
+            while venter or kører:
+                for navn in list(venter):
+                    if len(kører) >= processer:
+                        break
+                    if any(a not in status for a in afhængigheder[navn]):
+                        continue
+                    venter.remove(navn)
+
+                    fejlet = [a for a in afhængigheder[navn] if not status[a]]
+                    if fejlet:
+                        status[navn] = self._skip_stage(navn, fejlet)
+                        continue
+
+                    fingerprints[navn], uændret = self.check_stage(navn)
+                    if uændret:
+                        status[navn] = True
+                        continue
+
+                    spec = STAGE_GRAF[navn]
+                    self.log(spec['besked'])
+                    self.log(f"{'='*60}")
+                    self.log(f"Starter: {spec['beskrivelse']}")
+                    args, kwargs = self.stage_call(navn, i_worker=True)
+                    store_dir = str(self.output_dir) if spec.get('store', True) else None
+                    kører[pool.submit(_kør_stage_i_worker, navn, args, kwargs, store_dir)] = navn
+
+                if not kører:
+                    continue
+
+                færdige, _ = wait(kører, return_when=FIRST_COMPLETED)
+                for future in færdige:
+                    navn = kører.pop(future)
+                    try:
+                        ok, fejl, tb, importtider, metrics = future.result()
+                    except Exception as e:
+                        # Worker-processen døde (fx hukommelse) - ingen traceback fra stagen
+                        ok, fejl, tb, importtider, metrics = False, f"{type(e).__name__}: {str(e)}", None, {}, {}
+                    for modul, sekunder in importtider.items():
+                        _IMPORT_TIMES.setdefault(modul, sekunder)
+
+                    status[navn] = ok
+                    self.log_result(STAGE_GRAF[navn]['beskrivelse'], fejl, tb, varighed=metrics.get('wall_s'))
+                    self.record_metrics(navn, 'ok' if ok else 'fejl', metrics)
+                    if ok:
+                        self.stage_cache.save(fingerprints[navn])
+
+        return {navn: status[navn] for navn in valgte}
+
+    def _skip_stage(self, navn, fejlet):
+        """Log at en stage springes over fordi en afhængighed fejlede"""
+        self.log(f"⏭️  Springer over: {STAGE_GRAF[navn]['beskrivelse']} "
+                 f"(afhænger af: {', '.join(fejlet)})", 'WARNING')
+        self.record_metrics(navn, 'sprunget over')
+        return None
+
+    def report_import_times(self, all_stages=False):
+        """Rapportér importtid per modul (hvor opstartstiden går)"""
+        if all_stages:
+            # Diagnosticering: mål tunge afhængigheder først, så stage-tiderne
+            # kun viser modulernes egen omkostning
+            for module_name in HEAVY_DEPENDENCIES:
+                try:
+                    _timed_import(module_name)
+                except ImportError as e:
+                    self.log(f"  ⚠️  {module_name} kunne ikke importeres: {e}", 'WARNING')
+            for name in STAGES:
+                try:
+                    load_stage(name)
+                except ImportError as e:
+                    self.log(f"  ⚠️  Stage '{name}' kunne ikke importeres: {e}", 'WARNING')
+
+        self.log("="*60)
+        self.log("⏱️  IMPORTTIDER (inkrementelt, i indlæsningsrækkefølge)")
+        self.log("="*60)
+
+        if not _IMPORT_TIMES:
+            self.log("  Ingen stage-moduler blev importeret")
+            return
+
+        total = sum(_IMPORT_TIMES.values())
+        for module_name, seconds in _IMPORT_TIMES.items():
+            andel = seconds / total * 100 if total > 0 else 0
+            self.log(f"  {module_name:30s} {seconds * 1000:8.1f} ms ({andel:4.1f}%)")
+        self.log(f"  {'TOTAL':30s} {total * 1000:8.1f} ms")
+        self.log("  Tip: python -X importtime pipeline.py ... giver fuld detalje")
+
     def clean(self):
         """Slet gamle genererede filer"""
         self.log("🗑️  Sletter gamle filer...")
@@ -86,148 +492,110 @@ class Pipeline:
 
         self.json_dir.mkdir(exist_ok=True)
 
-        return self.run_function(hent_data_main, "Download valgdata fra valg.dk", str(self.json_dir))
+        return self.run_stage('download', "Download valgdata fra valg.dk", str(self.json_dir))
 
     def convert(self):
-        """Konverter JSON til Excel"""
-        self.log("🔄 Konverterer JSON til Excel...")
-
+        """Konverter JSON til Excel (springes over hvis JSON-filerne er uændrede)"""
         if not self.json_dir.exists():
+            self.log(STAGE_GRAF['convert']['besked'])
             self.log("❌ JSON directory findes ikke. Kør --download først.", 'ERROR')
             return False
 
         self.output_dir.mkdir(exist_ok=True)
 
-        return self.run_function(convert_main, "Konvertering til Excel med kønsestimering", 
-                                str(self.json_dir), str(self.output_dir))
+        fp, uændret = self.check_stage('convert', inputs=[str(self.json_dir)])
+        if uændret:
+            return True
+
+        # Nye filer - glem evt. cachede datasæt fra tidligere stager
+        self._store = None
+
+        if not self.run_named('convert'):
+            return False
+        self.stage_cache.save(fp)
+        return True
 
     def analyze_gender(self):
         """Lav kønsanalyse"""
-        self.log("👥 Laver kønsanalyse...")
-
-        return self.run_function(kønsanalyse_main, "Kønsanalyse", str(self.output_dir))
+        return self.run_named('gender')
 
     def analyze_general(self):
         """Lav generel analyse (valgdeltagelse, job, stemmeslugere)"""
-        self.log("📊 Laver generel analyse (valgdeltagelse, job, stemmeslugere)...")
-
-        return self.run_function(generel_analyse_main, "Generel Analyse", str(self.output_dir))
+        return self.run_named('general')
 
     def analyze_borgmestre(self):
         """Parse og analyser borgmester-data"""
-        self.log("👔 Laver borgmester-analyse...")
-
         # Parse borgmestre.md først
         if not Path('borgmestre_parsed.csv').exists():
-            if not self.run_function(parse_borgmestre_main, "Parsing borgmestre.md"):
+            if not self.run_named('parse_borgmestre'):
                 return False
 
         # Lav analyse
-        return self.run_function(borgmester_analyse_main, "Borgmester Analyse", str(self.output_dir))
+        return self.run_named('borgmestre')
 
     def analyze_magt(self):
         """Lav magtanalyse (enmandshære, mandattyveri, højborge, tynde flertaller)"""
-        self.log("💪 Laver magtanalyse...")
+        return self.run_named('magt')
+
+    def analyze_mandater(self):
+        """Genberegn mandater (D'Hondt) og krydstjek mod mandatfordeling"""
+        return self.run_named('mandater')
 
-        return self.run_function(magtanalyse_main, "Magtanalyse", str(self.output_dir))
+    def analyze_simulering(self):
+        """Simulér mandatfølsomhed (stemmeskift og Monte Carlo)"""
+        return self.run_named('simulering')
 
     def generate_findings(self):
         """Generer findings og MASTER_FINDINGS.md"""
-        self.log("📊 Genererer findings...")
-
-        return self.run_function(generate_findings_main, "Findings generation", str(self.output_dir))
+        return self.run_named('findings')
 
     def validate_data(self):
         """Valider data for fejl og realistiske værdier"""
-        self.log("✅ Validerer data...")
-
-        return self.run_function(validate_data_main, "Data validering", str(self.output_dir))
-
-    def organize_files(self):
-        """Organiser filer i mapper"""
-        self.log("📁 Organiserer filer...")
-
-        # Opret undermapper
-        folders = {
-            '00_START_HER': 'Præsentationsfiler',
-            '01_Kommunalvalg': 'Kommunalvalg data',
-            '02_Regionsrådsvalg': 'Regionsrådsvalg data',
-            '03_Samlet_Alle_Valg': 'Samlet data',
-            '04_Reference_Geografi': 'Geografiske data',
-            '05_Valgdeltagelse_Kommunal': 'Valgdeltagelse per opstillingskreds - Kommunalvalg',
-            '06_Valgdeltagelse_Regional': 'Valgdeltagelse per opstillingskreds - Regionsrådsvalg',
-            'parquet': 'Interne Parquet-filer (hurtig læsning)'
-        }
-
-        for folder_name, description in folders.items():
-            folder_path = self.output_dir / folder_name
-            folder_path.mkdir(exist_ok=True)
-            self.log(f"  ✓ {folder_name}/ - {description}")
-
-        # Flyt analyse-filer til START_HER (hvis de ikke allerede er der)
-        # Note: MASTER_FINDINGS.md skrives nu direkte til 00_START_HER af generate_findings.py
-        for file in ['Analyse_kønsfordeling.xlsx', 'Analyse_generel.xlsx', 'Analyse_borgmestre.xlsx']:
-            src = self.output_dir / file
-            if src.exists():
-                dst = self.output_dir / '00_START_HER' / file
-                shutil.copy2(src, dst)
-                self.log(f"  → {file} → 00_START_HER/")
-
-        # Organiser alle Excel-filer i root
-        self.log("\n📦 Organiserer Excel-filer...")
-        file_count = {'kommunal': 0, 'regional': 0, 'samlet': 0, 'geografi': 0, 'valgdelt_k': 0, 'valgdelt_r': 0}
-
-        for excel_file in self.output_dir.glob('*.xlsx'):
-            filename = excel_file.name
-
-            # Skip analyse-filer (allerede håndteret)
-            if filename.startswith('Analyse_'):
+        return self.run_named('validate')
+
+    def report_metrics(self, total_sekunder):
+        """Gem pipeline_metrics.json og log en tabel per stage med ændring mod forrige kørsel"""
+        if not self.metrics:
+            return
+
+        kørsel = gem_metrics({
+            'start': self.start_time.isoformat(timespec='seconds'),
+            'total_s': round(total_sekunder, 3),
+            'workers': self.workers,
+            'stager': self.metrics,
+        })
+        ændring = kørsel['sammenligning']
+
+        def mb(værdi):
+            return f"{værdi / 1024 ** 2:8.1f}" if værdi is not None else f"{'-':>8}"
+
+        def tal(værdi, bredde=9):
+            return f"{værdi:>{bredde},}" if værdi is not None else f"{'-':>{bredde}}"
+
+        self.log("-"*60)
+        self.log(f"📈 STAGE METRICS (gemt i {METRICS_FIL})")
+        self.log(f"  {'Stage':18s} {'Status':>13s} {'Wall s':>7s} {'CPU s':>7s} {'RSS MB':>7s} "
+                 f"{'Rækker ind':>10s} {'Rækker ud':>9s} {'MB læst':>8s} {'MB skr.':>8s} {'Hits':>5s} {'Δ wall':>8s}")
+        for navn, m in self.metrics.items():
+            if m['status'] not in ('ok', 'fejl'):
+                self.log(f"  {navn:18s} {m['status']:>13s}")
                 continue
-
-            # Valgdeltagelse-filer (2500+ filer)
-            if filename.startswith('valgdeltagelse-Kommunalvalg-'):
-                dst = self.output_dir / '05_Valgdeltagelse_Kommunal' / filename
-                shutil.move(str(excel_file), str(dst))
-                file_count['valgdelt_k'] += 1
-            elif filename.startswith('valgdeltagelse-Regionsrådsvalg-'):
-                dst = self.output_dir / '06_Valgdeltagelse_Regional' / filename
-                shutil.move(str(excel_file), str(dst))
-                file_count['valgdelt_r'] += 1
-
-            # Kommunalvalg data
-            elif '_KOMMUNAL_' in filename:
-                dst = self.output_dir / '01_Kommunalvalg' / filename
-                shutil.move(str(excel_file), str(dst))
-                file_count['kommunal'] += 1
-
-            # Regionsrådsvalg data
-            elif '_REGIONAL_' in filename:
-                dst = self.output_dir / '02_Regionsrådsvalg' / filename
-                shutil.move(str(excel_file), str(dst))
-                file_count['regional'] += 1
-
-            # Samlet data (ALLE_VALG eller resultater_per_kommune_region)
-            elif '_ALLE_VALG_' in filename or filename.startswith('resultater_per_'):
-                dst = self.output_dir / '03_Samlet_Alle_Valg' / filename
-                shutil.move(str(excel_file), str(dst))
-                file_count['samlet'] += 1
-
-            # Geografiske reference-filer
-            elif any(x in filename for x in ['Kommune-', 'Region-', 'Afstemningsomraade-',
-                                              'Opstillingskreds-', 'Storkreds-', 'Valglandsdel-']):
-                dst = self.output_dir / '04_Reference_Geografi' / filename
-                shutil.move(str(excel_file), str(dst))
-                file_count['geografi'] += 1
-
-        self.log(f"\n  ✓ Kommunalvalg: {file_count['kommunal']} filer")
-        self.log(f"  ✓ Regionsrådsvalg: {file_count['regional']} filer")
-        self.log(f"  ✓ Samlet data: {file_count['samlet']} filer")
-        self.log(f"  ✓ Geografiske data: {file_count['geografi']} filer")
-        self.log(f"  ✓ Valgdeltagelse Kommunal: {file_count['valgdelt_k']} filer")
-        self.log(f"  ✓ Valgdeltagelse Regional: {file_count['valgdelt_r']} filer")
-
-        self.log("\n✅ Filorganisering færdig")
-        return True
+            delta = ændring.get(navn, {}).get('wall_pct')
+            delta = f"{delta:+7.1f}%" if delta is not None else f"{'-':>8}"
+            rss = f"{m['peak_rss_mb']:7.1f}" if m.get('peak_rss_mb') is not None else f"{'-':>7}"
+            self.log(f"  {navn:18s} {m['status']:>13s} {m['wall_s']:7.2f} {m['cpu_s']:7.2f} {rss} "
+                     f"{tal(m.get('rækker_ind'), 10)} {tal(m.get('rækker_ud'))} "
+                     f"{mb(m.get('bytes_læst'))} {mb(m.get('bytes_skrevet'))} {tal(m.get('cache_hits'), 5)} {delta}")
+        if ændring:
+            self.log("  Δ wall: ændring i forhold til stagens seneste vellykkede kørsel")
+
+    def write_trace(self):
+        """Saml spans fra alle processer til én Chrome Trace Event-fil (--trace)"""
+        if not self.trace:
+            return
+        from utils import skriv_chrome_trace
+        antal = skriv_chrome_trace(self.output_dir / '.spor', self.trace, hovedproces=os.getpid())
+        self.log(f"🧵 Trace gemt: {self.trace} ({antal} spans) - åbn i ui.perfetto.dev eller chrome://tracing")
 
     def print_summary(self):
         """Print pipeline summary"""
@@ -242,12 +610,17 @@ class Pipeline:
         self.log(f"📁 Output: {self.output_dir.absolute()}")
         self.log(f"📝 Log fil: {self.log_file}")
 
+        self.report_metrics(elapsed.total_seconds())
+        self.write_trace()
+
         # Tjek output filer
         if self.output_dir.exists():
-            xlsx_files = list(self.output_dir.glob('*.xlsx'))
+            # Filerne ligger i deres undermappe fra filplacering (ukendte i roden)
+            from filplacering import MAPPER, output_sti
+            xlsx_files = [f for mappe in ['.', *MAPPER] for f in (self.output_dir / mappe).glob('*.xlsx')]
             self.log(f"📄 Genererede Excel-filer: {len(xlsx_files)}")
 
-            master_findings = self.output_dir / 'MASTER_FINDINGS.md'
+            master_findings = output_sti(self.output_dir, 'MASTER_FINDINGS.md')
             if master_findings.exists():
                 self.log(f"✅ MASTER_FINDINGS.md genereret")
 
@@ -265,6 +638,8 @@ Eksempler:
   python pipeline.py --download --convert     # Kun download og konvertering
   python pipeline.py --clean --all            # Slet gamle filer og kør alt
   python pipeline.py --skip-download --all    # Brug eksisterende JSON
+  python pipeline.py --all --simulering       # Inkl. mandatsimulering
+  python pipeline.py --timing-imports         # Vis importtid per modul
         """
     )
 
@@ -276,10 +651,10 @@ Eksempler:
                        help='Konverter JSON til Excel')
     parser.add_argument('--analyze', action='store_true',
                        help='Kør kønsanalyse')
+    parser.add_argument('--simulering', action='store_true',
+                       help='Kør også mandatsimuleringen (Monte Carlo, tager tid)')
     parser.add_argument('--findings', action='store_true',
                        help='Generer findings')
-    parser.add_argument('--organize', action='store_true',
-                       help='Organiser filer i mapper')
     parser.add_argument('--clean', action='store_true',
                        help='Slet gamle filer først')
     parser.add_argument('--skip-download', action='store_true',
@@ -288,17 +663,42 @@ Eksempler:
                        help='JSON directory (default: json_data)')
     parser.add_argument('--output-dir', default='excel_output',
                        help='Output directory (default: excel_output)')
+    parser.add_argument('--quarantine', action='store_true',
+                       help='Flyt valgresultat-filer der fejler stemmebalancen til <json-dir>/karantæne/')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Antal processer til analyse-stagerne (default: alle kerner, 1 = serielt)')
+    parser.add_argument('--force', action='store_true',
+                       help='Kør alle valgte stager, også dem hvis inputs er uændrede')
+    parser.add_argument('--trace', metavar='FIL',
+                       help='Gem spans (filer, datasæt, ark, analyser) som Chrome Trace Event JSON')
+    parser.add_argument('--quiet', action='store_true',
+                       help='Vis ikke én linje per JSON-fil - kun optælling per filtype og fejl')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='Mindste log-niveau (default: INFO)')
+    parser.add_argument('--log-format', default='tekst', choices=['tekst', 'json'],
+                       help='Format for log-filen: tekst (pipeline.log) eller JSON-linjer (pipeline.jsonl)')
+    parser.add_argument('--timing-imports', action='store_true',
+                       help='Rapportér importtid per stage-modul (alene: mål alle stager)')
 
     args = parser.parse_args()
 
     # Hvis ingen options, vis hjælp
-    if not any([args.all, args.download, args.convert, args.analyze,
-                args.findings, args.organize, args.clean]):
+    run_stages = any([args.all, args.download, args.convert, args.analyze,
+                      args.simulering, args.findings, args.clean])
+
+    if not run_stages and not args.timing_imports:
         parser.print_help()
         sys.exit(1)
 
     # Opret pipeline
-    pipeline = Pipeline(args.json_dir, args.output_dir)
+    pipeline = Pipeline(args.json_dir, args.output_dir, quarantine=args.quarantine, workers=args.workers,
+                        force=args.force, trace=args.trace, quiet=args.quiet,
+                        log_level=args.log_level, log_format=args.log_format)
+
+    # Kun importtider: importér alle stager og rapportér uden at køre noget
+    if not run_stages:
+        pipeline.report_import_times(all_stages=True)
+        sys.exit(0)
 
     print("""
 ╔══════════════════════════════════════════════════════════════╗
@@ -328,36 +728,30 @@ Eksempler:
         if not pipeline.convert():
             success = False
 
-    # Analyze
-    if (args.all or args.analyze) and success:
-        if not pipeline.analyze_gender():
-            success = False
-        if not pipeline.analyze_general():
-            success = False
-        if not pipeline.analyze_borgmestre():
-            success = False
-        if not pipeline.analyze_magt():
-            success = False
-
-    # Findings
-    if (args.all or args.findings) and success:
-        if not pipeline.generate_findings():
-            success = False
-
-    # Validate (altid efter findings)
-    if (args.all or args.findings) and success:
-        if not pipeline.validate_data():
-            success = False
+    # Analyse, findings og validering som DAG: uafhængige stager kører samtidig
+    valgte = []
+    if args.all or args.analyze:
+        if Path('borgmestre.md').exists() or not Path('borgmestre_parsed.csv').exists():
+            valgte.append('parse_borgmestre')
+        valgte += ANALYSE_STAGES
+    if args.simulering:
+        valgte += VALGFRIE_STAGES
+    if args.all or args.findings:
+        valgte += ['findings', 'validate']
+
+    if valgte and success:
+        status = pipeline.run_stages(valgte)
+        if status.get('validate') is False:
             pipeline.log("⚠️  ADVARSEL: Data validation fejlede - tjek output!", 'WARNING')
-
-    # Organize
-    if (args.all or args.organize) and success:
-        if not pipeline.organize_files():
+        if not all(status.values()):
             success = False
 
     # Summary
     pipeline.print_summary()
 
+    if args.timing_imports:
+        pipeline.report_import_times()
+
     if not success:
         pipeline.log("❌ Pipeline fejlede", 'ERROR')
         sys.exit(1)
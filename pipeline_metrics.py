@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Metrics per pipeline-stage
+
+Hver stage måles i den proces den kører i (hovedprocessen eller en worker):
+
+- wall_s / cpu_s: vægtid og CPU-tid (inkl. stagens egne underprocesser)
+- peak_rss_mb: stagens eget højvandsmærke for hukommelse. På Linux nulstilles
+  processens højvandsmærke (/proc/self/clear_refs) før stagen og VmHWM læses
+  bagefter; kan det ikke nulstilles, samples VmRSS i en tråd mens stagen kører.
+  Stagens egne underprocesser (fx simuleringens workers) tælles ikke med
+- bytes_læst / bytes_skrevet: I/O fra /proc/self/io (kun Linux, ellers None)
+- cache_hits / cache_misses: DataStore-opslag under stagen
+- rækker_ind / rækker_ud: rækker i stagens input- og output-tabeller (STAGE_GRAF)
+
+Alle stagers metrics for en kørsel gemmes i pipeline_metrics.json sammen med
+en sammenligning mod hver stages seneste vellykkede kørsel (fra samme fil før
+den overskrives).
+"""
+
+import json
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FIL = 'pipeline_metrics.json'
+
+
+def _io():
+    """(læste, skrevne) bytes for processen - None hvis /proc/self/io mangler"""
+    try:
+        with open('/proc/self/io') as f:
+            felter = dict(linje.split(':', 1) for linje in f if ':' in linje)
+        return int(felter['rchar']), int(felter['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _rusage():
+    """(CPU-tid for børneprocesser, processens peak RSS i MB) - (0, None) uden resource-modulet"""
+    if resource is None:
+        return 0.0, None
+    selv = resource.getrusage(resource.RUSAGE_SELF)
+    børn = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss er KB på Linux, bytes på macOS
+    enhed = 1 if sys.platform == 'darwin' else 1024
+    return børn.ru_utime + børn.ru_stime, selv.ru_maxrss * enhed / 1024 ** 2
+
+
+def _status_mb(felt):
+    """VmHWM/VmRSS fra /proc/self/status i MB - None hvis filen mangler"""
+    try:
+        with open('/proc/self/status') as f:
+            for linje in f:
+                if linje.startswith(felt + ':'):
+                    return int(linje.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _nulstil_højvandsmærke():
+    """Nulstil VmHWM for processen (Linux >= 4.0) - False hvis det ikke er muligt"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class _RSSSampler(threading.Thread):
+    """Sampler VmRSS mens en stage kører, når højvandsmærket ikke kan nulstilles"""
+
+    INTERVAL = 0.05
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = _status_mb('VmRSS')
+        self._færdig = threading.Event()
+
+    def run(self):
+        while not self._færdig.wait(self.INTERVAL):
+            rss = _status_mb('VmRSS')
+            if rss is not None:
+                self.peak = max(self.peak or 0.0, rss)
+
+    def stop(self):
+        self._færdig.set()
+        self.join()
+        rss = _status_mb('VmRSS')
+        if rss is not None:
+            self.peak = max(self.peak or 0.0, rss)
+        return self.peak
+
+
+class StageMåling:
+    """Context manager der måler én stage i den aktuelle proces"""
+
+    def __init__(self, store=None):
+        self.store = store
+        self.metrics = {}
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._børn_cpu, self._maxrss = _rusage()
+        # Stagens eget peak: nulstil højvandsmærket, ellers sample i en tråd
+        self._sampler = None
+        self._hwm = _nulstil_højvandsmærke() and _status_mb('VmHWM') is not None
+        if not self._hwm and _status_mb('VmRSS') is not None:
+            self._sampler = _RSSSampler()
+            self._sampler.start()
+        self._io = _io()
+        self._stats = dict(self.store.stats) if self.store is not None else None
+        return self
+
+    def __exit__(self, *exc):
+        børn_cpu, maxrss = _rusage()
+        io = _io()
+        if self._hwm:
+            peak = _status_mb('VmHWM')
+        elif self._sampler is not None:
+            peak = self._sampler.stop()
+        elif maxrss is not None and self._maxrss is not None and maxrss > self._maxrss:
+            # Uden /proc (macOS): kun kendt hvis stagen satte processens nye maksimum
+            peak = maxrss
+        else:
+            peak = None
+        self.metrics = {
+            'wall_s': round(time.perf_counter() - self._wall, 3),
+            'cpu_s': round(time.process_time() - self._cpu + børn_cpu - self._børn_cpu, 3),
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            'bytes_læst': io[0] - self._io[0] if io and self._io else None,
+            'bytes_skrevet': io[1] - self._io[1] if io and self._io else None,
+            'cache_hits': None,
+            'cache_misses': None,
+        }
+        if self._stats is not None:
+            self.metrics['cache_hits'] = self.store.stats['hits'] - self._stats['hits']
+            self.metrics['cache_misses'] = self.store.stats['misses'] - self._stats['misses']
+        return False
+
+
+def tabel_rækker(filer):
+    """Antal rækker i Parquet-/CSV-filer (None hvis ingen af filerne er tabeller)"""
+    rækker = None
+    for fil in filer:
+        if fil.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            antal = pq.ParquetFile(fil).metadata.num_rows
+        elif fil.suffix == '.csv':
+            with open(fil, 'rb') as f:
+                antal = max(sum(1 for _ in f) - 1, 0)
+        else:
+            continue
+        rækker = (rækker or 0) + antal
+    return rækker
+
+
+def load_forrige(fil=METRICS_FIL):
+    """Forrige kørsels metrics (None hvis filen ikke findes eller er ugyldig)"""
+    try:
+        with open(fil, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def sammenlign(stager, forrige):
+    """
+    Ændring per stage i forhold til stagens seneste vellykkede kørsel.
+
+    Args:
+        forrige: {stage: metrics} fra tidligere kørsler (seneste 'ok' per stage)
+
+    Returns:
+        {stage: {'wall_s': delta, 'wall_pct': procent, 'cpu_s': delta, 'peak_rss_mb': delta}}
+        for stager der blev kørt nu og tidligere
+    """
+    ændring = {}
+    for navn, nu in stager.items():
+        før = forrige.get(navn)
+        if not før or nu.get('status') != 'ok':
+            continue
+        ændring[navn] = {
+            'wall_s': round(nu['wall_s'] - før['wall_s'], 3),
+            'wall_pct': round((nu['wall_s'] / før['wall_s'] - 1) * 100, 1) if før['wall_s'] else None,
+            'cpu_s': round(nu['cpu_s'] - før['cpu_s'], 3),
+            'peak_rss_mb': (round(nu['peak_rss_mb'] - før['peak_rss_mb'], 1)
+                            if nu.get('peak_rss_mb') is not None and før.get('peak_rss_mb') is not None
+                            else None),
+            'forrige_kørsel': før.get('kørsel'),
+        }
+    return ændring
+
+
+def gem_metrics(kørsel, fil=METRICS_FIL):
+    """
+    Skriv kørslens metrics med sammenligning mod forrige kørsel.
+
+    Stager der blev sprunget over (uændret fingerprint) sammenlignes næste gang
+    med deres seneste vellykkede kørsel, som gemmes i 'seneste_ok'.
+    """
+    forrige = load_forrige(fil) or {}
+    seneste = dict(forrige.get('seneste_ok', {}))
+    for navn, m in forrige.get('stager', {}).items():
+        if m.get('status') == 'ok':
+            seneste[navn] = {**m, 'kørsel': forrige.get('start')}
+
+    kørsel = {
+        **kørsel,
+        'forrige_kørsel': forrige.get('start'),
+        'sammenligning': sammenlign(kørsel['stager'], seneste),
+        'seneste_ok': seneste,
+    }
+    with open(fil, 'w', encoding='utf-8') as f:
+        json.dump(kørsel, f, ensure_ascii=False, indent=2)
+    return kørsel
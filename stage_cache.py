@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Fingerprints for pipeline-stager (make-agtig genbrug af uændrede resultater)
+
+Efter en vellykket stage gemmes et fingerprint af alt den afhænger af i
+<output_dir>/.stager/<stage>.json:
+
+- inputs: SHA-256 af hver input-fil (JSON-mappen, converterens datasæt,
+  findings-tabeller fra andre stager, borgmestre.md/borgmestre_parsed.csv,
+  data-filer)
+- kode: SHA-256 af stagens modul og alle lokale moduler det importerer
+- parametre: argumenterne stagen kaldes med
+
+Før en stage køres sammenlignes et nyt fingerprint med det gemte. Er de ens
+og findes stagens outputs stadig, springes stagen over; ellers returneres
+grundene til at den skal køres (hvilke inputs, kodefiler eller parametre der
+er ændret).
+"""
+
+import ast
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+FINGERPRINT_MAPPE = '.stager'
+
+# Lokale moduler ligger ved siden af pipeline.py
+KODE_ROD = Path(__file__).parent
+
+_fil_hashes = {}
+
+
+def fil_hash(fil):
+    """SHA-256 af filens indhold (caches på sti, størrelse og mtime)"""
+    fil = Path(fil)
+    stat = fil.stat()
+    key = (str(fil.resolve()), stat.st_size, stat.st_mtime_ns)
+    if key not in _fil_hashes:
+        h = hashlib.sha256()
+        with open(fil, 'rb') as f:
+            for blok in iter(lambda: f.read(1 << 20), b''):
+                h.update(blok)
+        _fil_hashes[key] = h.hexdigest()
+    return _fil_hashes[key]
+
+
+def kode_filer(modul):
+    """Stagens modul + alle lokale moduler det (transitivt) importerer"""
+    fundet = {}
+    kø = [modul]
+    while kø:
+        navn = kø.pop()
+        fil = KODE_ROD / f'{navn}.py'
+        if navn in fundet or not fil.exists():
+            continue
+        fundet[navn] = fil
+        for node in ast.walk(ast.parse(fil.read_text(encoding='utf-8'))):
+            if isinstance(node, ast.Import):
+                kø.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                kø.append(node.module.split('.')[0])
+    return sorted(fundet.values())
+
+
+class StageCache:
+    """Gemte fingerprints per stage i <output_dir>/.stager/"""
+
+    def __init__(self, output_dir, store):
+        self.output_dir = Path(output_dir)
+        self.dir = self.output_dir / FINGERPRINT_MAPPE
+        self.store = store
+
+    def input_filer(self, navn):
+        """
+        Filer bag et input/output-navn fra STAGE_GRAF.
+
+        Datasæt findes via DataStore, analyser via findings-lageret (Parquet-
+        tabellerne - Excel-filerne indeholder tidsstempler), øvrige navne som
+        fil på sin plads i output-mappen (filplacering), arbejdsmappen eller repo'et.
+
+        Returns:
+            Liste af filer (tom hvis inputtet ikke findes)
+        """
+        from datastore import DATASETS
+
+        if navn in DATASETS:
+            fil = self.store.find_file(navn)
+            return [Path(fil)] if fil else []
+
+        # Kun rene navne (fx 'Analyse_magt') slås op i findings-lageret. En sti
+        # som JSON-mappen må ikke: output_dir / '/abs/sti' giver '/abs/sti'
+        if not Path(navn).is_absolute() and len(Path(navn).parts) == 1:
+            findings = self.output_dir / 'findings' / navn
+            if findings.is_dir():
+                return sorted(findings.glob('*.parquet'))
+
+        from filplacering import output_sti
+
+        for fil in [output_sti(self.output_dir, navn), Path(navn), KODE_ROD / navn]:
+            if fil.is_file():
+                return [fil]
+        if Path(navn).is_dir():
+            # Mappe (fx JSON-mappen): alle filer undtagen karantæne
+            return sorted(f for f in Path(navn).rglob('*')
+                          if f.is_file() and 'karantæne' not in f.relative_to(navn).parts)
+        return []
+
+    def fingerprint(self, stage, modul, inputs, parametre):
+        """Nyt fingerprint for en stage ud fra dens inputs, kode og parametre"""
+        fp = {
+            'stage': stage,
+            'inputs': {navn: [fil_hash(f) for f in self.input_filer(navn)] or None for navn in inputs},
+            'kode': {f.name: fil_hash(f) for f in kode_filer(modul)},
+            'parametre': json.loads(json.dumps(parametre, default=str)),
+        }
+        fp['fingerprint'] = hashlib.sha256(json.dumps(fp, sort_keys=True).encode()).hexdigest()[:12]
+        return fp
+
+    def load(self, stage):
+        """Gemt fingerprint (None hvis stagen ikke er kørt før)"""
+        fil = self.dir / f'{stage}.json'
+        if not fil.exists():
+            return None
+        return json.loads(fil.read_text(encoding='utf-8'))
+
+    def save(self, fp):
+        """Gem fingerprint efter vellykket kørsel"""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        fil = self.dir / f"{fp['stage']}.json"
+        fil.write_text(json.dumps({**fp, 'gemt': datetime.now().isoformat(timespec='seconds')},
+                                  ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def reasons(self, fp, outputs):
+        """
+        Grunde til at stagen skal køres (tom liste = uændret, kan springes over).
+        """
+        gammel = self.load(fp['stage'])
+        if gammel is None:
+            return ['ingen tidligere kørsel']
+
+        grunde = []
+        ændrede = [n for n in fp['inputs'] if fp['inputs'][n] != gammel['inputs'].get(n)]
+        if ændrede:
+            grunde.append(f"input ændret: {', '.join(ændrede)}")
+        kode = sorted(set(fp['kode']) ^ set(gammel['kode'])
+                      | {f for f in fp['kode'] if fp['kode'][f] != gammel['kode'].get(f)})
+        if kode:
+            grunde.append(f"kode ændret: {', '.join(kode)}")
+        if fp['parametre'] != gammel['parametre']:
+            grunde.append('parametre ændret')
+
+        mangler = [o for o in outputs if not self.input_filer(o)]
+        if mangler:
+            grunde.append(f"output mangler: {', '.join(mangler)}")
+        return grunde
+
+
+def _selvtjek():
+    """Regressionstjek: en absolut JSON-mappe giver samme filer som en relativ"""
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rod = Path(tmp)
+        (rod / 'json' / 'valgresultater').mkdir(parents=True)
+        (rod / 'json' / 'valgresultater' / 'a.json').write_text('{}', encoding='utf-8')
+        (rod / 'json' / 'karantæne').mkdir()
+        (rod / 'json' / 'karantæne' / 'b.json').write_text('{}', encoding='utf-8')
+        (rod / 'excel_output' / 'findings' / 'Analyse_magt').mkdir(parents=True)
+        (rod / 'excel_output' / 'findings' / 'Analyse_magt' / 't.parquet').write_bytes(b'')
+
+        cache = StageCache(rod / 'excel_output', store=None)
+        absolut = cache.input_filer(str(rod / 'json'))
+        cwd = os.getcwd()
+        try:
+            os.chdir(rod)
+            relativ = StageCache('excel_output', store=None).input_filer('json')
+        finally:
+            os.chdir(cwd)
+
+        assert [f.name for f in absolut] == ['a.json'], absolut
+        assert [f.name for f in relativ] == ['a.json'], relativ
+        assert [f.name for f in cache.input_filer('Analyse_magt')] == ['t.parquet']
+    print("✅ input_filer: absolut og relativ JSON-mappe giver samme filer")
+
+
+if __name__ == '__main__':
+    _selvtjek()
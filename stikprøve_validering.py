@@ -3,216 +3,189 @@
 Stikprøve-validering af valgdata mod valg.dk
 
 Dette script tjekker udvalgte stikprøver for at validere at vores data matcher valg.dk.
+
+Forventede værdier ligger som tabel i data/stikprøver.csv (eller en anden
+CSV/Parquet-fil via --stikprover) med kolonnerne Kommune, ListeNavn og
+Forventet. Tom Forventet betyder at værdien skal findes manuelt på valg.dk.
+Kilde: https://nyheder.tv2.dk/kommunalvalg/valgresultater/[kommune-navn]
+
+Valideringen kører i batch: kommune × liste-totaler beregnes én gang for hele
+datasættet, og alle stikprøver tjekkes med ét join. Resultatet (én række per
+stikprøve med difference) publiceres i findings/Validering_stikprøver/.
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from utils import find_latest_file, load_parquet
-
-# Stikprøver at tjekke (Kommune, Parti, Forventet total fra valg.dk)
-# Værdi = None betyder at den skal valideres manuelt ved at finde tal på valg.dk
-# Kilde: https://nyheder.tv2.dk/kommunalvalg/valgresultater/[kommune-navn]
-
-STIKPRØVER = [
-    # ============= VERIFICEREDE MATCHES ✅ =============
-    ('Hjørring Kommune', 'Venstre, Danmarks Liberale Parti', 8037),
-    ('Hedensted Kommune', 'Dansk Folkeparti', 1829),
-
-    # ============= STORE KOMMUNER (>200k indbyggere) =============
-    # København
-    ('Københavns Kommune', 'Socialdemokratiet', None),
-    ('Københavns Kommune', 'Enhedslisten - De Rød-Grønne', None),
-    ('Københavns Kommune', 'Det Konservative Folkeparti', None),
-
-    # Aarhus
-    ('Aarhus Kommune', 'SF - Socialistisk Folkeparti', None),
-    ('Aarhus Kommune', 'Socialdemokratiet', None),
-    ('Aarhus Kommune', 'Venstre, Danmarks Liberale Parti', None),
-
-    # Odense
-    ('Odense Kommune', 'Socialdemokratiet', None),
-    ('Odense Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Odense Kommune', 'Det Konservative Folkeparti', None),
-
-    # Aalborg
-    ('Aalborg Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Aalborg Kommune', 'Socialdemokratiet', None),
-    ('Aalborg Kommune', 'SF - Socialistisk Folkeparti', None),
-
-    # ============= MELLEMSTORE KOMMUNER (50k-150k) =============
-    ('Randers Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Randers Kommune', 'Socialdemokratiet', None),
+from datastore import DataStore
 
-    ('Horsens Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Horsens Kommune', 'Socialdemokratiet', None),
+STIKPRØVE_FIL = Path(__file__).parent / 'data' / 'stikprøver.csv'
 
-    ('Vejle Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Vejle Kommune', 'Det Konservative Folkeparti', None),
+# Kolonner fra valgresultater (kolonne-projektion)
+RESULTAT_KOLONNER = ['Kommune', 'ListeNavn', 'AfstemningsområdeDagiId', 'KandidatId',
+                     'PersonligeStemmer', 'Listestemmer']
 
-    ('Esbjerg Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Esbjerg Kommune', 'Socialdemokratiet', None),
+NØGLE = ['Kommune', 'ListeNavn']
 
-    ('Kolding Kommune', 'Venstre, Danmarks Liberale Parti', None),
+# Antal stikprøver der vises i detaljer (ved flere vises kun afvigelser)
+DETALJE_GRÆNSE = 50
 
-    # ============= MINDRE KOMMUNER (<20k) =============
-    ('Læsø Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Fanø Kommune', 'Venstre, Danmarks Liberale Parti', None) if any('Fanø' in k for k in ['Fanø']) else None,
-    ('Ærø Kommune', 'Venstre, Danmarks Liberale Parti', None),
-    ('Langeland Kommune', 'Socialdemokratiet', None),
 
-    # ============= FORSKELLIGE PARTIER (inklusive lokallister) =============
-    # Liberal Alliance
-    ('Gentofte Kommune', 'Liberal Alliance', None),
+def indlæs_stikprøver(fil=STIKPRØVE_FIL):
+    """Indlæs forventede værdier (CSV eller Parquet) med Kommune, ListeNavn, Forventet"""
+    fil = Path(fil)
+    stikprøver = pd.read_parquet(fil) if fil.suffix == '.parquet' else pd.read_csv(fil)
+    stikprøver['Forventet'] = pd.to_numeric(stikprøver['Forventet'], errors='coerce').astype('Int64')
+    return stikprøver.dropna(subset=NØGLE).reset_index(drop=True)
 
-    # Radikale Venstre
-    ('Københavns Kommune', 'Radikale Venstre', None),
 
-    # Danmarksdemokraterne
-    ('Frederiksberg Kommune', 'Danmarksdemokraterne - Inger Støjberg', None) if any('Frederiksberg' in k for k in ['Frederiksberg']) else None,
+def hent_valgresultater(store=None):
+    """Load kommunale valgresultater (kun de kolonner valideringen bruger)"""
+    store = store or DataStore('excel_output')
+    df = store.get('valgresultater', 'KOMMUNAL', columns=RESULTAT_KOLONNER)
 
-    # Lokallister (hvis tilgængelige)
-    # ('Kommune med lokalliste', 'Lokalliste navn', None),
-]
-
-# Fjern None entries
-STIKPRØVER = [s for s in STIKPRØVER if s is not None]
-
-def hent_valgresultater():
-    """Find og load den nyeste valgresultater fil"""
-    parquet_dir = Path('excel_output/parquet')
-    samlet_dir = Path('excel_output/03_Samlet_Alle_Valg')
-
-    res_fil = find_latest_file(str(parquet_dir / 'valgresultater_KOMMUNAL_*.parquet'))
-    if not res_fil:
-        res_fil = find_latest_file(str(samlet_dir / 'valgresultater_KOMMUNAL_*.xlsx'))
-    if not res_fil:
-        res_fil = find_latest_file('excel_output/valgresultater_KOMMUNAL_*.xlsx')
-
-    if not res_fil:
+    if df is None:
         raise FileNotFoundError("Kunne ikke finde valgresultater fil")
 
-    print(f"📖 Læser: {Path(res_fil).name}\n")
+    print(f"📖 Læser: {Path(store.find_file('valgresultater', 'KOMMUNAL')).name}\n")
+    return df
+
+
+def kommune_liste_totaler(df):
+    """
+    Totaler per kommune × liste i én gennemgang af valgresultaterne.
+
+    Listestemmer deduplikeres (én per afstemningsområde), personlige stemmer
+    summeres over alle kandidater.
+    """
+    grupper = df.groupby(NØGLE, sort=False)
+    totaler = pd.DataFrame({
+        'Personlige': grupper['PersonligeStemmer'].sum(),
+        'AntalRækker': grupper.size(),
+        'AntalOmråder': grupper['AfstemningsområdeDagiId'].nunique(),
+        'AntalKandidater': grupper['KandidatId'].nunique(),
+    })
+
+    liste_dedup = df[NØGLE + ['AfstemningsområdeDagiId', 'Listestemmer']].drop_duplicates()
+    totaler['Liste'] = liste_dedup.groupby(NØGLE, sort=False)['Listestemmer'].sum()
+    totaler['VoresTotal'] = totaler['Personlige'] + totaler['Liste']
+    return totaler.reset_index()
+
+
+def valider_stikprøver(totaler, stikprøver):
+    """
+    Tjek alle stikprøver mod totalerne med ét join.
+
+    Returns:
+        Difference-tabel med én række per stikprøve (i stikprøvernes rækkefølge):
+        Status ('OK' / 'IKKE_FUNDET'), vores tal, Forventet, Difference, Match
+        og ProcentAfvigelse (de tre sidste kun når Forventet er angivet)
+    """
+    diff = stikprøver.merge(totaler, on=NØGLE, how='left', indicator=True)
+    diff.insert(len(stikprøver.columns), 'Status',
+                np.where(diff.pop('_merge') == 'both', 'OK', 'IKKE_FUNDET'))
+    tal = list(totaler.columns.drop(NØGLE))
+    diff[tal] = diff[tal].astype('Int64')
+
+    forventet = diff['Forventet'].to_numpy(dtype=float, na_value=np.nan)
+    vores = diff['VoresTotal'].to_numpy(dtype=float, na_value=np.nan)
+    difference = vores - forventet
+    tjekket = ~np.isnan(difference)
+
+    diff['Difference'] = pd.Series(difference, index=diff.index).astype('Int64')
+    diff['Match'] = pd.Series(difference == 0, index=diff.index, dtype='boolean').mask(~tjekket)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        procent = np.where(forventet > 0, difference / forventet * 100, 0)
+    diff['ProcentAfvigelse'] = np.where(tjekket, procent, np.nan)
+    return diff
 
-    if res_fil.endswith('.parquet'):
-        return load_parquet(res_fil)
-    else:
-        return pd.read_excel(res_fil)
 
 def tjek_stikprøve(df, kommune, liste_navn, forventet_total):
-    """Tjek en enkelt stikprøve"""
-    # Filtrer data
-    filtreret = df[
-        (df['Kommune'] == kommune) &
-        (df['ListeNavn'] == liste_navn)
-    ].copy()
-
-    if len(filtreret) == 0:
-        return {
-            'status': 'IKKE_FUNDET',
-            'fejl': f"Ingen data fundet for {liste_navn} i {kommune}"
-        }
-
-    # Beregn totaler
-    personlige_stemmer = filtreret['PersonligeStemmer'].sum()
-
-    # Dedupliker listestemmer (én per afstemningsområde)
-    liste_dedup = filtreret[['AfstemningsområdeDagiId', 'Listestemmer']].drop_duplicates()
-    listestemmer = liste_dedup['Listestemmer'].sum()
-
-    vores_total = personlige_stemmer + listestemmer
-
-    result = {
-        'status': 'OK',
-        'personlige': personlige_stemmer,
-        'liste': listestemmer,
-        'vores_total': vores_total,
-        'forventet': forventet_total,
-        'antal_rækker': len(filtreret),
-        'antal_områder': filtreret['AfstemningsområdeDagiId'].nunique(),
-        'antal_kandidater': filtreret['KandidatId'].nunique()
+    """Tjek en enkelt stikprøve (samme beregning som batch-valideringen)"""
+    stikprøve = pd.DataFrame({'Kommune': [kommune], 'ListeNavn': [liste_navn],
+                              'Forventet': pd.array([forventet_total], dtype='Int64')})
+    udsnit = df[(df['Kommune'] == kommune) & (df['ListeNavn'] == liste_navn)]
+    return valider_stikprøver(kommune_liste_totaler(udsnit), stikprøve).iloc[0].to_dict()
+
+
+def sammenfatning(diff):
+    """Sammenfatning af difference-tabellen (beregnet på arrays)"""
+    fundet = (diff['Status'] == 'OK').to_numpy()
+    har_forventet = diff['Forventet'].notna().to_numpy()
+    tjekket = fundet & har_forventet
+    afvigelse = np.abs(diff['ProcentAfvigelse'].to_numpy(dtype=float)[tjekket])
+    difference = np.abs(diff['Difference'].to_numpy(dtype=float, na_value=np.nan)[tjekket])
+
+    return {
+        'stikprøver': len(diff),
+        'tjekket': int(tjekket.sum()),
+        'matches': int((difference == 0).sum()),
+        'mangler_værdi': int((fundet & ~har_forventet).sum()),
+        'ikke_fundet': int((~fundet).sum()),
+        'små': int(((afvigelse > 0) & (afvigelse < 0.1)).sum()),
+        'moderate': int(((afvigelse >= 0.1) & (afvigelse < 1)).sum()),
+        'store': int((afvigelse >= 1).sum()),
+        'max_difference': int(difference.max()) if len(difference) else 0,
+        'median_afvigelse': float(np.median(afvigelse)) if len(afvigelse) else 0.0,
     }
 
-    # Tjek mod forventet værdi hvis angivet
-    if forventet_total is not None:
-        difference = vores_total - forventet_total
-        result['difference'] = difference
-        result['match'] = (difference == 0)
-        result['procent_afvigelse'] = (difference / forventet_total * 100) if forventet_total > 0 else 0
-
-    return result
 
-def print_resultat(kommune, liste_navn, resultat):
-    """Print resultat for en stikprøve"""
+def print_resultat(resultat):
+    """Print resultat for en stikprøve (række fra difference-tabellen)"""
+    kommune, liste_navn = resultat['Kommune'], resultat['ListeNavn']
     print(f"\n{'='*80}")
     print(f"📊 {kommune} - {liste_navn}")
     print(f"{'='*80}")
 
-    if resultat['status'] == 'IKKE_FUNDET':
-        print(f"❌ {resultat['fejl']}")
+    if resultat['Status'] == 'IKKE_FUNDET':
+        print(f"❌ Ingen data fundet for {liste_navn} i {kommune}")
         return
 
-    print(f"   Antal kandidater: {resultat['antal_kandidater']}")
-    print(f"   Antal afstemningsområder: {resultat['antal_områder']}")
-    print(f"   Antal datarækker: {resultat['antal_rækker']}")
+    print(f"   Antal kandidater: {resultat['AntalKandidater']}")
+    print(f"   Antal afstemningsområder: {resultat['AntalOmråder']}")
+    print(f"   Antal datarækker: {resultat['AntalRækker']}")
     print(f"\n   Vores data:")
-    print(f"      Personlige stemmer: {resultat['personlige']:,}")
-    print(f"      Listestemmer:       {resultat['liste']:,}")
-    print(f"      Total:              {resultat['vores_total']:,}")
+    print(f"      Personlige stemmer: {resultat['Personlige']:,}")
+    print(f"      Listestemmer:       {resultat['Liste']:,}")
+    print(f"      Total:              {resultat['VoresTotal']:,}")
 
-    if resultat['forventet'] is not None:
-        print(f"\n   valg.dk:             {resultat['forventet']:,}")
-        print(f"   Difference:          {resultat['difference']:,}")
+    if pd.notna(resultat['Forventet']):
+        print(f"\n   valg.dk:             {resultat['Forventet']:,}")
+        print(f"   Difference:          {resultat['Difference']:,}")
 
-        if resultat['match']:
+        if resultat['Match']:
             print(f"   ✅ PERFEKT MATCH!")
         else:
-            procent = abs(resultat['procent_afvigelse'])
+            procent = abs(resultat['ProcentAfvigelse'])
             if procent < 0.1:
-                print(f"   ⚠️  Lille afvigelse: {resultat['procent_afvigelse']:.2f}%")
+                print(f"   ⚠️  Lille afvigelse: {resultat['ProcentAfvigelse']:.2f}%")
             elif procent < 1:
-                print(f"   ⚠️  Moderat afvigelse: {resultat['procent_afvigelse']:.2f}%")
+                print(f"   ⚠️  Moderat afvigelse: {resultat['ProcentAfvigelse']:.2f}%")
             else:
-                print(f"   ❌ STOR AFVIGELSE: {resultat['procent_afvigelse']:.2f}%")
+                print(f"   ❌ STOR AFVIGELSE: {resultat['ProcentAfvigelse']:.2f}%")
     else:
         print(f"\n   ℹ️  Ingen forventet værdi angivet - tilføj værdi fra valg.dk")
 
-def main():
-    print("="*80)
-    print("STIKPRØVE-VALIDERING AF VALGDATA")
-    print("="*80)
 
-    # Load data
-    df = hent_valgresultater()
-
-    # Kør stikprøver
-    resultater = []
-    for kommune, liste_navn, forventet in STIKPRØVER:
-        resultat = tjek_stikprøve(df, kommune, liste_navn, forventet)
-        print_resultat(kommune, liste_navn, resultat)
-        resultater.append({
-            'Kommune': kommune,
-            'Parti': liste_navn,
-            **resultat
-        })
-
-    # Sammenfatning
+def print_sammenfatning(stats):
+    """Print sammenfatning"""
     print(f"\n\n{'='*80}")
     print("📋 SAMMENFATNING")
     print(f"{'='*80}")
 
-    tjekket = sum(1 for r in resultater if r['status'] == 'OK' and r.get('forventet') is not None)
-    matches = sum(1 for r in resultater if r.get('match', False))
-    ikke_fundet = sum(1 for r in resultater if r['status'] == 'IKKE_FUNDET')
-    mangler_værdi = sum(1 for r in resultater if r['status'] == 'OK' and r.get('forventet') is None)
+    print(f"   Totalt antal stikprøver: {stats['stikprøver']}")
+    print(f"   Tjekket mod valg.dk: {stats['tjekket']}")
+    print(f"   Perfekte matches: {stats['matches']}")
+    print(f"   Mangler forventet værdi: {stats['mangler_værdi']}")
+    print(f"   Ikke fundet: {stats['ikke_fundet']}")
 
-    print(f"   Totalt antal stikprøver: {len(STIKPRØVER)}")
-    print(f"   Tjekket mod valg.dk: {tjekket}")
-    print(f"   Perfekte matches: {matches}")
-    print(f"   Mangler forventet værdi: {mangler_værdi}")
-    print(f"   Ikke fundet: {ikke_fundet}")
+    if stats['tjekket'] > 0:
+        print(f"\n   Afvigelser: {stats['små']} små (<0.1%), {stats['moderate']} moderate (<1%), "
+              f"{stats['store']} store")
+        print(f"   Største difference: {stats['max_difference']:,} stemmer, "
+              f"median afvigelse: {stats['median_afvigelse']:.2f}%")
 
-    if tjekket > 0:
-        success_rate = (matches / tjekket * 100)
+        success_rate = (stats['matches'] / stats['tjekket'] * 100)
         print(f"\n   Success rate: {success_rate:.1f}%")
 
         if success_rate == 100:
@@ -224,12 +197,53 @@ def main():
 
     print(f"\n{'='*80}\n")
 
+
+def main(output_dir='excel_output', stikprøve_fil=STIKPRØVE_FIL, store=None):
+    print("="*80)
+    print("STIKPRØVE-VALIDERING AF VALGDATA")
+    print("="*80)
+
+    store = store or DataStore(output_dir)
+
+    # Load data og forventede værdier
+    df = hent_valgresultater(store)
+    stikprøver = indlæs_stikprøver(stikprøve_fil)
+    print(f"📋 {len(stikprøver)} stikprøver fra {Path(stikprøve_fil).name}")
+
+    # Alle stikprøver i én batch
+    diff = valider_stikprøver(kommune_liste_totaler(df), stikprøver)
+
+    # Detaljer: alle stikprøver, eller kun afvigelser når der er mange
+    detaljer = diff
+    if len(diff) > DETALJE_GRÆNSE:
+        detaljer = diff[(diff['Status'] != 'OK') | ~diff['Match'].fillna(True)].head(DETALJE_GRÆNSE)
+        print(f"   Viser {len(detaljer)} stikprøver med afvigelser (af {len(diff)})")
+    for resultat in detaljer.to_dict('records'):
+        print_resultat(resultat)
+
+    stats = sammenfatning(diff)
+    print_sammenfatning(stats)
+
+    store.findings.publish('Validering_stikprøver', {'Stikprøver': diff})
+
     # Tip til at tilføje flere stikprøver
-    if mangler_værdi > 0:
+    if stats['mangler_værdi'] > 0:
         print("💡 TIP: Tilføj flere stikprøver ved at:")
         print("   1. Besøg valg.dk og find totalen for et parti i en kommune")
-        print("   2. Tilføj en linje i STIKPRØVER-listen i dette script")
+        print(f"   2. Tilføj en linje (Kommune, ListeNavn, Forventet) i {Path(stikprøve_fil).name}")
         print("   3. Kør scriptet igen\n")
 
+    return diff
+
+
 if __name__ == '__main__':
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Valider kommune+parti totaler mod forventede værdier')
+    parser.add_argument('--output-dir', default='excel_output',
+                       help='Output directory (default: excel_output)')
+    parser.add_argument('--stikprover', default=str(STIKPRØVE_FIL),
+                       help='CSV/Parquet med Kommune, ListeNavn, Forventet (default: data/stikprøver.csv)')
+
+    args = parser.parse_args()
+    main(args.output_dir, args.stikprover)
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Syntetiske valgdata i valg.dk-format (til benchmarks og skaleringstest)
+
+Genererer et JSON-træ med samme filnavne og felter som valg.dk's SFTP-server,
+så converteren og analyserne kan køres uden rigtige valgdata:
+
+    kandidat-data/      kandidat-data-<Valgart>-<kommune|region>-<tid>.json
+    valgresultater/     valgresultater-<Valgart>-<kommune>-<område>-<tid>.json
+    mandatfordeling/    mandatfordeling-<Valgart>-<kommune|region>-<tid>.json
+    valgdeltagelse/     valgdeltagelse-<Valgart>-<kommune>-<tid>.json
+    geografi/           Kommune-, Region-, Opstillingskreds-, Afstemningsomraade-<tid>.json
+
+Skala 1 svarer til kommunal- og regionsrådsvalget 2025 (98 kommuner, 5
+regioner, ~1.300 afstemningsområder, ~10.000 kandidater); skala 10 giver 980
+kommuner osv. Med flere udgivelser skrives valgresultater og valgdeltagelse
+én gang per udgivelse med stigende optælling (sidste = fintælling), ligesom
+på valgaftenen - converteren skal så deduplikere til nyeste udgivelse.
+
+Stemmetallene balancerer per afstemningsområde, og mandatfordelingen er
+D'Hondt på de endelige listestemmer, så mandatberegningen bør finde 0
+afvigelser. Partilister vælger i stemmeseddelrækkefølge, og nogle områder er
+højborge for én liste, så magtanalysens mandattyveri og højborge får rækker.
+Samme seed giver samme data.
+
+Brug: python syntetiske_data.py <json_mappe> [--skala 1] [--udgivelser 3] [--seed 2025]
+      [--borgmestre borgmestre_parsed.csv]
+"""
+
+import argparse
+import csv
+import json
+import numpy as np
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Omfang ved skala 1 (intervaller er inklusive)
+KOMMUNER = 98
+REGIONER = ['Hovedstaden', 'Sjælland', 'Syddanmark', 'Midtjylland', 'Nordjylland']
+OMRÅDER_PER_KOMMUNE = (4, 22)
+LISTER_PER_KOMMUNE = (7, 14)
+KANDIDATER_PER_LISTE = (3, 17)
+LISTER_PER_REGION = (10, 14)
+KANDIDATER_PER_REGIONSLISTE = (15, 35)
+MANDATER_PER_KOMMUNE = (19, 31)
+MANDATER_PER_REGION = 41
+
+# Andel af listerne opstillet som partiliste (valgt i stemmeseddelrækkefølge),
+# så kandidater med flere personlige stemmer end den sidst valgte ikke vælges
+PARTILISTE_ANDEL = 0.3
+# Andel af afstemningsområderne hvor én liste står særligt stærkt (højborg)
+# og den faktor listens styrke ganges med dér
+HØJBORG_ANDEL = 0.15
+HØJBORG_FAKTOR = 4.0
+
+# (bogstav, navn på stemmesedlen, kort navn i borgmester-data, omtrentlig andel)
+PARTIER = [
+    ('A', 'Socialdemokratiet', 'Socialdemokratiet', 0.23),
+    ('V', 'Venstre, Danmarks Liberale Parti', 'Venstre', 0.18),
+    ('C', 'Det Konservative Folkeparti', 'Konservative', 0.13),
+    ('F', 'SF - Socialistisk Folkeparti', 'Socialistisk Folkeparti', 0.11),
+    ('Ø', 'Enhedslisten - De Rød-Grønne', 'Enhedslisten', 0.07),
+    ('Æ', 'Danmarksdemokraterne - Inger Støjberg', 'Danmarksdemokraterne', 0.06),
+    ('O', 'Dansk Folkeparti', 'Dansk Folkeparti', 0.05),
+    ('B', 'Radikale Venstre', 'Radikale Venstre', 0.05),
+    ('I', 'Liberal Alliance', 'Liberal Alliance', 0.05),
+    ('Å', 'Alternativet', 'Alternativet', 0.02),
+    ('M', 'Moderaterne', 'Moderaterne', 0.02),
+    ('D', 'Nye Borgerlige', 'Nye Borgerlige', 0.01),
+    ('K', 'Kristendemokraterne', 'Kristendemokraterne', 0.01),
+    ('L', 'Lokallisten', 'Lokallisten', 0.01),
+]
+
+FORNAVNE = ['Anne', 'Peter', 'Mette', 'Lars', 'Jakob', 'Benedikte', 'Søren', 'Hanne', 'Ole', 'Karin',
+            'Mads', 'Louise', 'Henrik', 'Camilla', 'Niels', 'Pia', 'Rasmus', 'Sofie', 'Jens', 'Maria',
+            'Thomas', 'Lene', 'Morten', 'Helle', 'Kasper', 'Ida', 'Anders', 'Birgitte', 'Mikkel', 'Tove']
+EFTERNAVNE = ['Hansen', 'Nielsen', 'Jensen', 'Pedersen', 'Andersen', 'Christensen', 'Larsen',
+              'Sørensen', 'Rasmussen', 'Jørgensen', 'Petersen', 'Madsen', 'Kristensen', 'Olsen',
+              'Thomsen', 'Poulsen', 'Johansen', 'Møller', 'Mortensen', 'Kiær']
+STILLINGER = ['Lærer', 'Pensionist', 'Direktør', 'Sygeplejerske', 'Selvstændig', 'Landmand',
+              'Pædagog', 'Konsulent', 'Ingeniør', 'Studerende', 'Advokat', 'Tømrer',
+              'Socialrådgiver', 'Økonom', 'Læge', 'Borgmester', 'Byrådsmedlem', 'Projektleder']
+BORGMESTER_STATUS = ['Genvalgt', 'Genvalgt', 'Ny', 'Magtskifte']
+
+VALGDAG = '18-11-2025'
+FØRSTE_UDGIVELSE = datetime(2025, 11, 18, 20, 30)
+UDGIVELSE_INTERVAL = timedelta(minutes=45)
+
+
+def tidsstempel(tid):
+    """Tidsstempel i valg.dk-filnavne (18-11-2025 20:30 -> '181120252030')"""
+    return tid.strftime('%d%m%Y%H%M')
+
+
+def d_hondt(stemmer, mandater):
+    """Mandater per liste efter D'Hondt (lige kvotienter går til den første liste)"""
+    stemmer = np.asarray(stemmer, dtype=float)
+    kvotienter = (stemmer[:, None] / np.arange(1, mandater + 1)).ravel()
+    vindere = np.argsort(-kvotienter, kind='stable')[:mandater] // mandater
+    return np.bincount(vindere, minlength=len(stemmer))
+
+
+def _interval(rng, grænser):
+    return int(rng.integers(grænser[0], grænser[1], endpoint=True))
+
+
+def _skriv(fil, data, tæller):
+    tekst = json.dumps(data, ensure_ascii=False)
+    fil.write_text(tekst, encoding='utf-8')
+    tæller['filer'] += 1
+    tæller['bytes'] += len(tekst.encode('utf-8'))
+
+
+class _Id:
+    """Fortløbende id'er for kandidater og lister"""
+
+    def __init__(self):
+        self.kandidat = 0
+        self.liste = 0
+
+    def ny_kandidat(self):
+        self.kandidat += 1
+        return f'{self.kandidat:08x}-5e1e-4c7a-9d2b-000000000000'
+
+    def ny_liste(self):
+        self.liste += 1
+        return f'{self.liste:08x}-1157-4c7a-9d2b-000000000000'
+
+
+def lav_kandidatlister(rng, id, antal_lister, antal_kandidater, mandater, bopæl):
+    """
+    Kandidatlister for ét valg med partier trukket efter landsandel.
+
+    Hver liste får mindst så mange kandidater, at den kan besætte sine mandater
+    (med margin), ligesom i virkeligheden - så mandatfordelingen kun har
+    personlige mandater.
+
+    Returns:
+        Liste af {'Bogstavbetegnelse', 'Navn', 'Kort', 'KandidatlisteId', 'Styrke', 'Kandidater'}
+    """
+    andele = np.array([p[3] for p in PARTIER])
+    valgte = np.sort(rng.choice(len(PARTIER), size=min(antal_lister, len(PARTIER)),
+                                replace=False, p=andele / andele.sum()))
+    # Lokal styrke (fast for hele valget)
+    styrker = andele[valgte] * rng.gamma(4.0, 0.25, size=len(valgte))
+    minimum = np.ceil(styrker / styrker.sum() * mandater * 1.5).astype(int) + 1
+    lister = []
+    for placering, (p, styrke, mindst) in enumerate(zip(valgte, styrker, minimum), 1):
+        bogstav, navn, kort, andel = PARTIER[p]
+        kandidater = [{
+            'Id': id.ny_kandidat(),
+            'Navn': f'{rng.choice(FORNAVNE)} {rng.choice(EFTERNAVNE)}',
+            'Stilling': str(rng.choice(STILLINGER)),
+            'BopaelPaaStemmeseddel': bopæl,
+            'Stemmeseddelsplacering': nr,
+        } for nr in range(1, max(_interval(rng, antal_kandidater), mindst) + 1)]
+        lister.append({
+            'Bogstavbetegnelse': bogstav,
+            'Navn': navn,
+            'Kort': kort,
+            'KandidatlisteId': id.ny_liste(),
+            'Stemmeseddelsplacering': placering,
+            'Opstillingsform': 'Partiliste' if rng.random() < PARTILISTE_ANDEL else 'Sideordnet',
+            'Styrke': styrke,
+            'Popularitet': rng.gamma(0.6, 1.0, size=len(kandidater)) + 1e-6,
+            'Kandidater': kandidater,
+        })
+    return lister
+
+
+def kandidat_dokument(valgart, kommune, region, lister, frigivet):
+    """kandidat-data-dokument (KommuneDagiId/RegionDagiId efter valgart)"""
+    return {
+        'Valgart': valgart,
+        'Valgdag': VALGDAG,
+        'KommuneDagiId': kommune['Kode'] if kommune else None,
+        'Kommune': kommune['Fuldt navn'] if kommune else '',
+        'RegionDagiId': region['Kode'] if region else None,
+        'Region': region['Navn'] if region else '',
+        'FrigivelsesTidspunktUTC': frigivet.isoformat(),
+        'Kandidatlister': [{k: liste[k] for k in ('Bogstavbetegnelse', 'Navn', 'KandidatlisteId',
+                                                   'Stemmeseddelsplacering', 'Opstillingsform', 'Kandidater')}
+                           for liste in lister],
+    }
+
+
+def endelige_stemmer(rng, lister, gyldige):
+    """
+    Endelige stemmer i ét afstemningsområde. I HØJBORG_ANDEL af områderne står
+    en tilfældig liste HØJBORG_FAKTOR gange stærkere end i resten af valget.
+
+    Returns:
+        [(listestemmer, kandidatstemmer-array)] per liste
+    """
+    styrke = np.array([liste['Styrke'] for liste in lister])
+    if rng.random() < HØJBORG_ANDEL:
+        styrke[rng.integers(len(lister))] *= HØJBORG_FAKTOR
+    andele = rng.dirichlet(styrke / styrke.sum() * 200)
+    liste_stemmer = rng.multinomial(gyldige, andele)
+    stemmer = []
+    for liste, antal in zip(lister, liste_stemmer):
+        listestemmer = int(rng.binomial(antal, 0.25))
+        popularitet = liste['Popularitet'] / liste['Popularitet'].sum()
+        stemmer.append((listestemmer, rng.multinomial(antal - listestemmer, popularitet)))
+    return stemmer
+
+
+def resultat_dokument(valgart, kommune, område, lister, stemmer, andel, frigivet, fintælling):
+    """valgresultater-dokument for én udgivelse (andel = optalt andel af de endelige stemmer)"""
+    kandidatlister = []
+    gyldige = 0
+    for liste, (listestemmer, kandidatstemmer) in zip(lister, stemmer):
+        liste_nu = int(listestemmer * andel)
+        kandidater_nu = (kandidatstemmer * andel).astype(int)
+        i_alt = liste_nu + int(kandidater_nu.sum())
+        gyldige += i_alt
+        kandidatlister.append({
+            'Bogstavbetegnelse': liste['Bogstavbetegnelse'],
+            'Navn': liste['Navn'],
+            'KandidatlisteId': liste['KandidatlisteId'],
+            'Stemmer': i_alt,
+            'Listestemmer': liste_nu,
+            'Kandidater': [{'Id': k['Id'], 'Stemmeseddelnavn': k['Navn'], 'Stemmer': int(s)}
+                           for k, s in zip(liste['Kandidater'], kandidater_nu)],
+        })
+    ugyldige = int(område['Ugyldige'] * andel)
+    blanke = int(område['Blanke'] * andel)
+    return {
+        'Valgart': valgart,
+        'Valgdag': VALGDAG,
+        'AfstemningsområdeDagiId': område['Dagi_id'],
+        'AfstemningsområdeNummer': område['Nummer'],
+        'Afstemningsområde': område['Navn'],
+        'Kommune': kommune['Fuldt navn'],
+        'Kommunekode': kommune['Kode'],
+        'AntalStemmeberettigedeVælgere': område['Stemmeberettigede'],
+        'AfgivneStemmer': gyldige + ugyldige + blanke,
+        'GyldigeStemmer': gyldige,
+        'UgyldigeStemmerUdoverBlanke': ugyldige,
+        'BlankeUgyldigeFremmødteStemmer': blanke,
+        'BlankeUgyldigeBrevstemmer': 0,
+        'Resultatart': 'Fintælling' if fintælling else 'Foreløbig',
+        'FrigivelsesTidspunktUTC': frigivet.isoformat(),
+        'Kandidatlister': kandidatlister,
+    }
+
+
+def mandat_dokument(valgart, navn, kode, lister, liste_total, kandidat_total, mandater, frigivet):
+    """
+    mandatfordeling-dokument: D'Hondt på listernes stemmer og to stedfortrædere
+    per liste. Personlige mandater går til kandidaterne med flest personlige
+    stemmer på sideordnede lister og i stemmeseddelrækkefølge på partilister.
+    """
+    pladser = d_hondt(liste_total, mandater)
+    personlige, liste_mandater, stedfortrædere = [], [], []
+    for liste, antal, stemmer in zip(lister, pladser, kandidat_total):
+        if not antal:
+            continue
+        if liste['Opstillingsform'] == 'Partiliste':
+            rækkefølge = np.arange(len(stemmer))
+        else:
+            rækkefølge = np.argsort(-stemmer, kind='stable')
+        valgte = [liste['Kandidater'][i] for i in rækkefølge[:antal]]
+        for kandidat in valgte:
+            personlige.append({
+                'KandidatId': kandidat['Id'],
+                'Nummer': len(personlige) + 1,
+                'Stemmeseddelnavn': kandidat['Navn'],
+                'KandidatlisteId': liste['KandidatlisteId'],
+                'KandidatlisteNavn': liste['Navn'],
+                'Bogstavbetegnelse': liste['Bogstavbetegnelse'],
+            })
+        # Flere mandater end kandidater: resten er listemandater
+        for nr in range(len(valgte) + 1, antal + 1):
+            liste_mandater.append({'KandidatlisteId': liste['KandidatlisteId'], 'Nummer': nr,
+                                   'KandidatlisteNavn': liste['Navn'],
+                                   'Bogstavbetegnelse': liste['Bogstavbetegnelse']})
+        stedfortrædere.append({
+            'KandidatlisteId': liste['KandidatlisteId'],
+            'KandidatlisteNavn': liste['Navn'],
+            'Bogstavbetegnelse': liste['Bogstavbetegnelse'],
+            'Stedfortrædere': [{'Nummer': nr, 'KandidatId': liste['Kandidater'][i]['Id'],
+                                'Stemmeseddelnavn': liste['Kandidater'][i]['Navn']}
+                               for nr, i in enumerate(rækkefølge[antal:antal + 2], 1)],
+        })
+    return {
+        'Valgart': valgart,
+        'Valgdag': VALGDAG,
+        'Kommunekode': kode,
+        'Kommune': navn,
+        'Resultatart': 'Fintælling',
+        'FrigivelsesTidspunktUTC': frigivet.isoformat(),
+        'PersonligeMandater': personlige,
+        'ListeMandater': liste_mandater,
+        'Kandidatliste': stedfortrædere,
+    }, pladser
+
+
+def generer(json_mappe, skala=1.0, udgivelser=1, seed=2025, borgmestre_fil=None):
+    """
+    Generér et syntetisk valg.dk JSON-træ.
+
+    Args:
+        json_mappe: Mappe der skrives til (undermapper oprettes)
+        skala: Gange dagens antal kommuner/regioner (områder og kandidater følger med)
+        udgivelser: Antal udgivelser af valgresultater og valgdeltagelse
+        seed: Seed for tilfældighedsgeneratoren
+        borgmestre_fil: Skriv også en borgmestre_parsed.csv der passer til data
+
+    Returns:
+        Optælling: kommuner, regioner, afstemningsområder, kandidater, filer, bytes
+    """
+    rng = np.random.default_rng(seed)
+    json_mappe = Path(json_mappe)
+    mapper = {navn: json_mappe / navn for navn in
+              ['kandidat-data', 'valgresultater', 'mandatfordeling', 'valgdeltagelse', 'geografi']}
+    for mappe in mapper.values():
+        mappe.mkdir(parents=True, exist_ok=True)
+
+    tider = [FØRSTE_UDGIVELSE + i * UDGIVELSE_INTERVAL for i in range(udgivelser)]
+    første, sidste = tider[0], tider[-1]
+    tæller = {'kommuner': 0, 'regioner': 0, 'afstemningsområder': 0, 'kandidater': 0, 'filer': 0, 'bytes': 0}
+    id = _Id()
+
+    antal_regioner = max(1, round(len(REGIONER) * skala))
+    regioner = []
+    for r in range(antal_regioner):
+        navn = REGIONER[r % len(REGIONER)] + (f' {r // len(REGIONER) + 1}' if r >= len(REGIONER) else '')
+        region = {'Kode': 1081 + r, 'Navn': f'Region {navn}', 'Filnavn': navn.replace(' ', '')}
+        region['Lister'] = lav_kandidatlister(rng, id, _interval(rng, LISTER_PER_REGION),
+                                              KANDIDATER_PER_REGIONSLISTE, MANDATER_PER_REGION, region['Navn'])
+        region['Liste total'] = np.zeros(len(region['Lister']), dtype=np.int64)
+        region['Kandidat total'] = [np.zeros(len(l['Kandidater']), dtype=np.int64) for l in region['Lister']]
+        _skriv(mapper['kandidat-data'] / f"kandidat-data-Regionsrådsvalg-{region['Filnavn']}-{tidsstempel(første)}.json",
+               kandidat_dokument('Regionsrådsvalg', None, region, region['Lister'], første), tæller)
+        tæller['kandidater'] += sum(len(l['Kandidater']) for l in region['Lister'])
+        regioner.append(region)
+
+    geografi = {'Kommune': [], 'Region': [], 'Opstillingskreds': [], 'Afstemningsomraade': []}
+    for region in regioner:
+        geografi['Region'].append({'Dagi_id': 389000 + region['Kode'], 'Kode': region['Kode'], 'Navn': region['Navn']})
+
+    borgmestre = []
+    område_id = 700000
+    antal_kommuner = max(1, round(KOMMUNER * skala))
+    for k in range(antal_kommuner):
+        region = regioner[k % antal_regioner]
+        navn = f'Valgby {k + 1}'
+        kommune = {'Kode': 101 + k, 'Navn': navn, 'Fuldt navn': f'{navn} Kommune', 'Filnavn': navn.replace(' ', '')}
+        geografi['Kommune'].append({'Dagi_id': 389100 + k, 'Kode': kommune['Kode'], 'Navn': navn,
+                                    'Regionskode': region['Kode']})
+        geografi['Opstillingskreds'].append({'Dagi_id': 420000 + k, 'Nummer': k + 1, 'Navn': f'{navn}kredsen',
+                                             'Kommunekode': kommune['Kode']})
+
+        lister = lav_kandidatlister(rng, id, _interval(rng, LISTER_PER_KOMMUNE), KANDIDATER_PER_LISTE,
+                                    MANDATER_PER_KOMMUNE[1], navn)
+        _skriv(mapper['kandidat-data'] / f"kandidat-data-Kommunalvalg-{kommune['Filnavn']}-{tidsstempel(første)}.json",
+               kandidat_dokument('Kommunalvalg', kommune, None, lister, første), tæller)
+        tæller['kandidater'] += sum(len(l['Kandidater']) for l in lister)
+
+        liste_total = np.zeros(len(lister), dtype=np.int64)
+        kandidat_total = [np.zeros(len(l['Kandidater']), dtype=np.int64) for l in lister]
+        deltagelse = np.zeros((udgivelser, 2), dtype=np.int64)
+
+        for nummer in range(1, _interval(rng, OMRÅDER_PER_KOMMUNE) + 1):
+            område_id += 1
+            stemmeberettigede = int(np.clip(rng.lognormal(np.log(3000), 0.6), 150, 40000))
+            afgivne = int(rng.binomial(stemmeberettigede, np.clip(rng.normal(0.69, 0.06), 0.4, 0.95)))
+            område = {
+                'Dagi_id': område_id,
+                'Nummer': nummer,
+                'Navn': f'{navn} Område {nummer}',
+                'Stemmeberettigede': stemmeberettigede,
+                'Ugyldige': int(rng.binomial(afgivne, 0.004)),
+                'Blanke': int(rng.binomial(afgivne, 0.012)),
+            }
+            geografi['Afstemningsomraade'].append({
+                'Dagi_id': område_id, 'Nummer': nummer, 'Navn': område['Navn'], 'Kommunekode': kommune['Kode'],
+                'Afstemningssted': {'Navn': f'{navn} Skole {nummer}',
+                                    'Adgangsadresse': {'Adressebetegnelse': f'Skolevej {nummer}, {navn}'}},
+            })
+            gyldige = afgivne - område['Ugyldige'] - område['Blanke']
+
+            for valgart, valg_lister, lt, kt in [
+                ('Kommunalvalg', lister, liste_total, kandidat_total),
+                ('Regionsrådsvalg', region['Lister'], region['Liste total'], region['Kandidat total']),
+            ]:
+                stemmer = endelige_stemmer(rng, valg_lister, gyldige)
+                for i, (listestemmer, kandidatstemmer) in enumerate(stemmer):
+                    lt[i] += listestemmer + kandidatstemmer.sum()
+                    kt[i] += kandidatstemmer
+                for u, frigivet in enumerate(tider):
+                    dokument = resultat_dokument(valgart, kommune, område, valg_lister, stemmer,
+                                                 (u + 1) / udgivelser, frigivet, u == udgivelser - 1)
+                    if valgart == 'Kommunalvalg':
+                        deltagelse[u] += [dokument['AntalStemmeberettigedeVælgere'], dokument['AfgivneStemmer']]
+                    _skriv(mapper['valgresultater'] /
+                           f"valgresultater-{valgart}-{kommune['Filnavn']}-{område_id}-{tidsstempel(frigivet)}.json",
+                           dokument, tæller)
+            tæller['afstemningsområder'] += 1
+
+        for (berettigede, afgivne), frigivet in zip(deltagelse, tider):
+            for valgart in ['Kommunalvalg', 'Regionsrådsvalg']:
+                _skriv(mapper['valgdeltagelse'] /
+                       f"valgdeltagelse-{valgart}-{kommune['Filnavn']}-{tidsstempel(frigivet)}.json", {
+                           'Valgart': valgart,
+                           'Valgdag': VALGDAG,
+                           'Kommune': kommune['Fuldt navn'],
+                           'Kommunekode': kommune['Kode'],
+                           'AntalStemmeberettigedeVælgere': int(berettigede),
+                           'AfgivneStemmer': int(afgivne),
+                           'Valgdeltagelse': round(afgivne / berettigede * 100, 2) if berettigede else 0,
+                           'FrigivelsesTidspunktUTC': frigivet.isoformat(),
+                       }, tæller)
+
+        dokument, pladser = mandat_dokument('Kommunalvalg', kommune['Fuldt navn'], kommune['Kode'], lister,
+                                            liste_total, kandidat_total,
+                                            _interval(rng, MANDATER_PER_KOMMUNE) | 1, sidste)
+        _skriv(mapper['mandatfordeling'] / f"mandatfordeling-Kommunalvalg-{kommune['Filnavn']}-{tidsstempel(sidste)}.json",
+               dokument, tæller)
+
+        # Borgmester: største listes mest populære kandidat
+        størst = int(np.argmax(pladser))
+        vinder = int(np.argmax(kandidat_total[størst]))
+        borgmestre.append({
+            'Kommune': kommune['Fuldt navn'],
+            'Navn': lister[størst]['Kandidater'][vinder]['Navn'],
+            'Status': str(rng.choice(BORGMESTER_STATUS)),
+            'PersonligeStemmer': int(kandidat_total[størst][vinder]),
+            'Parti': lister[størst]['Kort'],
+            'ValgDato': '19. november',
+            'ValgTidspunkt': f'{rng.integers(19, 24)}.{rng.integers(0, 60):02d}',
+        })
+        tæller['kommuner'] += 1
+
+    for region in regioner:
+        dokument, _ = mandat_dokument('Regionsrådsvalg', region['Navn'], region['Kode'], region['Lister'],
+                                      region['Liste total'], region['Kandidat total'], MANDATER_PER_REGION, sidste)
+        _skriv(mapper['mandatfordeling'] / f"mandatfordeling-Regionsrådsvalg-{region['Filnavn']}-{tidsstempel(sidste)}.json",
+               dokument, tæller)
+        tæller['regioner'] += 1
+
+    for navn, rækker in geografi.items():
+        _skriv(mapper['geografi'] / f'{navn}-{tidsstempel(første)}.json', rækker, tæller)
+
+    if borgmestre_fil:
+        with open(borgmestre_fil, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(borgmestre[0]))
+            writer.writeheader()
+            writer.writerows(borgmestre)
+
+    return tæller
+
+
+def main(json_mappe='json_syntetisk', skala=1.0, udgivelser=1, seed=2025, borgmestre_fil=None):
+    """Main funktion til brug i benchmark"""
+    print(f"🧪 Genererer syntetiske valgdata (skala {skala:g}, {udgivelser} udgivelser) i {json_mappe}/...")
+    tæller = generer(json_mappe, skala, udgivelser, seed, borgmestre_fil)
+    print(f"✅ {tæller['kommuner']} kommuner, {tæller['regioner']} regioner, "
+          f"{tæller['afstemningsområder']:,} afstemningsområder, {tæller['kandidater']:,} kandidater - "
+          f"{tæller['filer']:,} filer ({tæller['bytes'] / 1024 ** 2:.1f} MB)")
+    return tæller
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generér syntetiske valgdata i valg.dk JSON-format')
+    parser.add_argument('json_mappe', nargs='?', default='json_syntetisk', help='Output-mappe for JSON-filerne')
+    parser.add_argument('--skala', type=float, default=1.0, help='Gange dagens antal kommuner (default: 1)')
+    parser.add_argument('--udgivelser', type=int, default=1, help='Antal udgivelser af valgresultater (default: 1)')
+    parser.add_argument('--seed', type=int, default=2025, help='Seed (default: 2025)')
+    parser.add_argument('--borgmestre', metavar='CSV', help='Skriv også borgmestre_parsed.csv der passer til data')
+    args = parser.parse_args()
+
+    main(args.json_mappe, args.skala, args.udgivelser, args.seed, args.borgmestre)
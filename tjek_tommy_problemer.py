@@ -6,6 +6,7 @@ Script til at verificere Tommys observationer om uoverensstemmelser
 import pandas as pd
 from pathlib import Path
 from utils import find_latest_file, load_parquet
+from filplacering import mappe
 
 def tjek_hjørring_venstre():
     """Tjek specifikt Venstre i Hjørring som Tommy rapporterede"""
@@ -16,11 +17,11 @@ def tjek_hjørring_venstre():
 
     # Find nyeste valgresultater fil
     parquet_dir = Path('excel_output/parquet')
-    samlet_dir = Path('excel_output/03_Samlet_Alle_Valg')
+    kommunal_dir = Path('excel_output') / mappe('datasæt', 'KOMMUNAL')
 
     res_fil = find_latest_file(str(parquet_dir / 'valgresultater_KOMMUNAL_*.parquet'))
     if not res_fil:
-        res_fil = find_latest_file(str(samlet_dir / 'valgresultater_KOMMUNAL_*.xlsx'))
+        res_fil = find_latest_file(str(kommunal_dir / 'valgresultater_KOMMUNAL_*.xlsx'))
     if not res_fil:
         res_fil = find_latest_file('excel_output/valgresultater_KOMMUNAL_*.xlsx')
 
@@ -4,14 +4,29 @@ Genbrugelige hjælpefunktioner til valgdata-projektet
 """
 
 import pandas as pd
+import functools
 import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 import glob
-import gender_guesser.detector as gender
 
-# Global gender detector
-_gender_detector = gender.Detector()
+# Global gender detector - bygges først ved første opslag (dyr at importere/bygge)
+_gender_detector = None
 _MANUEL_KØNSBESTEMMELSE = None
+_JOB_KLASSIFIKATOR = None
+
+
+def get_gender_detector():
+    """Returnér delt gender-guesser Detector (oprettes ved første kald)"""
+    global _gender_detector
+    if _gender_detector is None:
+        import gender_guesser.detector as gender
+        _gender_detector = gender.Detector()
+    return _gender_detector
 
 
 def load_gender_data():
@@ -52,7 +67,7 @@ def estimér_køn(fornavn):
 
     # 2. Brug gender-guesser som fallback
     try:
-        result = _gender_detector.get_gender(clean_name, 'denmark')
+        result = get_gender_detector().get_gender(clean_name, 'denmark')
 
         # Map resultater til M/K/Ukendt
         if result in ['male', 'mostly_male']:
@@ -67,6 +82,72 @@ def estimér_køn(fornavn):
         return 'Ukendt', f'fejl: {str(e)}'
 
 
+def load_job_classifier():
+    """
+    Indlæs jobkategorier fra data/jobkategorier.json og kompilér dem til ét regex.
+
+    Filen er en ordnet mapping kategori -> nøgleord; rækkefølgen er prioritet
+    (første kategori med et nøgleord i titlen vinder). Mønstret er ét lookahead
+    med alle nøgleord i prioritetsrækkefølge, så findall giver det højest
+    prioriterede nøgleord der starter på hver position i titlen.
+
+    Returns:
+        (regex, nøgleord -> prioritet, kategorier i prioritetsrækkefølge)
+    """
+    global _JOB_KLASSIFIKATOR
+    if _JOB_KLASSIFIKATOR is None:
+        data_file = Path(__file__).parent / 'data' / 'jobkategorier.json'
+        with open(data_file, 'r', encoding='utf-8') as f:
+            kategorier = json.load(f)
+
+        prioritet = {}
+        for nr, nøgleord in enumerate(kategorier.values()):
+            for ord_ in nøgleord:
+                prioritet.setdefault(ord_, nr)
+
+        alternativer = '|'.join(re.escape(o) for o in sorted(prioritet, key=prioritet.get))
+        _JOB_KLASSIFIKATOR = (re.compile(f'(?=({alternativer}))'), prioritet, list(kategorier))
+    return _JOB_KLASSIFIKATOR
+
+
+def klassificer_stilling(titel):
+    """Simpel rensning af én jobtitel til JobKategori (se load_job_classifier)"""
+    if not isinstance(titel, str) or pd.isna(titel):
+        return "Uoplyst"
+
+    titel = titel.lower().strip()
+    regex, prioritet, kategorier = load_job_classifier()
+
+    fund = regex.findall(titel)
+    if fund:
+        return kategorier[min(prioritet[o] for o in fund)]
+
+    return titel.capitalize()
+
+
+def klassificer_stillinger(stillinger):
+    """
+    JobKategori for en hel kolonne af jobtitler.
+
+    Klassificerer hver unik titel én gang og mapper tilbage via koder.
+
+    Returns:
+        Categorical Series (kategorier i første-forekomst rækkefølge)
+    """
+    stillinger = pd.Series(stillinger)
+    koder, unikke = pd.factorize(stillinger, use_na_sentinel=True)
+
+    etiketter = pd.Series([klassificer_stilling(t) for t in unikke], dtype=object)
+    # Sidste plads bruges til manglende værdier (kode -1)
+    etiketter = pd.concat([etiketter, pd.Series(["Uoplyst"])], ignore_index=True).to_numpy()
+
+    værdier = etiketter[koder]
+    return pd.Series(
+        pd.Categorical(værdier, categories=pd.unique(værdier)),
+        index=stillinger.index, name='JobKategori'
+    )
+
+
 def find_latest_file(pattern):
     """Find den nyeste fil der matcher pattern"""
     files = glob.glob(pattern)
@@ -77,18 +158,232 @@ def find_latest_file(pattern):
     return files[0]
 
 
+@contextmanager
+def atomisk(filepath):
+    """
+    Skriv en fil atomisk: giver en midlertidig sti i samme mappe, som erstatter
+    filepath (os.replace) når blokken lykkes. Læsere ser aldrig en halv fil.
+
+        with atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False)
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp = filepath.with_name(f'.{filepath.stem}.{os.getpid()}.tmp{filepath.suffix}')
+    try:
+        yield tmp
+        os.replace(tmp, filepath)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
 def save_parquet(df, filepath, description=""):
     """Gem DataFrame som Parquet med metadata"""
     filepath = Path(filepath)
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(filepath, engine='pyarrow', compression='snappy')
+    with spor(filepath.name, 'parquet', rækker=len(df)), atomisk(filepath) as tmp:
+        df.to_parquet(tmp, engine='pyarrow', compression='snappy')
     if description:
         print(f"✓ {description}: {filepath.name} ({len(df)} rækker)")
     else:
         print(f"✓ Parquet gemt: {filepath.name} ({len(df)} rækker)")
 
 
-def load_parquet(filepath):
-    """Indlæs Parquet-fil"""
-    return pd.read_parquet(filepath, engine='pyarrow')
+def load_parquet(filepath, columns=None):
+    """Indlæs Parquet-fil (evt. kun udvalgte kolonner)"""
+    return pd.read_parquet(filepath, engine='pyarrow', columns=columns)
+
+
+def save_arrow_ipc(df, filepath, description=""):
+    """
+    Gem DataFrame som ukomprimeret Arrow IPC (Feather v2).
+
+    Ukomprimeret IPC kan memory-mappes direkte af andre processer (se
+    open_dataset_mmap), så workers deler OS page cache i stedet for hver at
+    dekode Parquet.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with spor(filepath.name, 'arrow', rækker=len(df)), atomisk(filepath) as tmp:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, tmp, compression='uncompressed')
+    if description:
+        print(f"✓ {description}: {filepath.name} ({len(df)} rækker)")
+    else:
+        print(f"✓ Arrow IPC gemt: {filepath.name} ({len(df)} rækker)")
+
+
+def open_dataset_mmap(filepath, columns=None, as_pandas=False):
+    """
+    Åbn Arrow IPC-fil via memory mapping uden at kopiere eller deserialisere.
+
+    Args:
+        filepath: Sti til .arrow-fil (skrevet af save_arrow_ipc)
+        columns: Valgfri liste af kolonner (udvælgelse er også zero-copy)
+        as_pandas: Returnér pandas-view i stedet for pyarrow.Table. Numeriske
+            kolonner uden nulls deler buffer med filen; tekstkolonner
+            materialiseres af pandas.
+
+    Returns:
+        pyarrow.Table (eller DataFrame hvis as_pandas=True)
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(str(filepath), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    if as_pandas:
+        return table.to_pandas(split_blocks=True, self_destruct=False)
+    return table
+
+
+
+# ---------------------------------------------------------------------------
+# Sporing (Chrome Trace Event / Perfetto)
+# ---------------------------------------------------------------------------
+#
+# Slås til ved at sætte miljøvariablen VALG_TRACE til en mappe (eller kalde
+# start_sporing). Hver proces skriver sine spans som JSON-linjer til
+# <mappe>/spor-<pid>.jsonl; skriv_chrome_trace samler dem til én fil der kan
+# åbnes i chrome://tracing eller ui.perfetto.dev. Workers arver miljøvariablen,
+# så spans fra parallelle stager lander på hver sin proces-række.
+
+SPOR_MILJØ = 'VALG_TRACE'
+
+_spor_lås = threading.Lock()
+_spor_tråd = threading.local()
+_spor_buffer = []
+_spor_pid = None
+
+
+def sporing_aktiv():
+    """Mappen spans skrives til, eller None hvis sporing er slået fra"""
+    return os.environ.get(SPOR_MILJØ) or None
+
+
+def start_sporing(mappe):
+    """Slå sporing til for denne proces og processer den starter"""
+    mappe = Path(mappe)
+    mappe.mkdir(parents=True, exist_ok=True)
+    for gammel in mappe.glob('spor-*.jsonl'):
+        gammel.unlink()
+    os.environ[SPOR_MILJØ] = str(mappe)
+    return mappe
+
+
+def _gem_spans():
+    """Skriv bufferens spans til processens spor-fil"""
+    mappe = sporing_aktiv()
+    with _spor_lås:
+        events = _spor_buffer[:]
+        _spor_buffer.clear()
+    if not events or not mappe:
+        return
+    with open(Path(mappe) / f'spor-{os.getpid()}.jsonl', 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+
+
+class spor:
+    """
+    Tidsmål et stykke kode som et span (no-op når sporing er slået fra).
+
+    Bruges som context manager eller decorator, og spans kan nestes:
+
+        with spor('parse', 'convert', fil=json_fil.name):
+            ...
+
+        @spor(kategori='magt')
+        def find_mandate_theft(df_res, df_mand):
+            ...
+
+    Spans gemmes når processens yderste span afsluttes.
+    """
+
+    def __init__(self, navn=None, kategori='analyse', **args):
+        self.navn = navn
+        self.kategori = kategori
+        self.args = args
+
+    def __call__(self, func):
+        navn = self.navn or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not sporing_aktiv():
+                return func(*args, **kwargs)
+            with spor(navn, self.kategori, **self.args):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        self._aktiv = bool(sporing_aktiv())
+        if self._aktiv:
+            global _spor_pid
+            if _spor_pid != os.getpid():
+                # Ny (forket) proces: forælderens buffer og dybde tilhører ikke os
+                with _spor_lås:
+                    _spor_buffer.clear()
+                _spor_tråd.__dict__.clear()
+                _spor_pid = os.getpid()
+            _spor_tråd.dybde = getattr(_spor_tråd, 'dybde', 0) + 1
+            self._ts = time.time_ns() // 1000
+            self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if not self._aktiv:
+            return False
+        event = {
+            'name': self.navn,
+            'cat': self.kategori,
+            'ph': 'X',
+            'ts': self._ts,
+            'dur': (time.perf_counter_ns() - self._start) // 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_native_id(),
+            'args': {**self.args, **({'fejl': exc_type.__name__} if exc_type else {})},
+        }
+        with _spor_lås:
+            _spor_buffer.append(event)
+        _spor_tråd.dybde -= 1
+        if _spor_tråd.dybde == 0:
+            _gem_spans()
+        return False
+
+
+def skriv_chrome_trace(mappe, output_fil, hovedproces=None):
+    """
+    Saml alle processers spans til én Chrome Trace Event-fil.
+
+    Args:
+        mappe: Mappe med spor-<pid>.jsonl (se start_sporing)
+        output_fil: JSON-fil til chrome://tracing / ui.perfetto.dev
+        hovedproces: PID der navngives 'pipeline' (øvrige hedder 'worker <pid>')
+
+    Returns:
+        Antal spans
+    """
+    _gem_spans()
+    events = []
+    for fil in sorted(Path(mappe).glob('spor-*.jsonl')):
+        with open(fil, encoding='utf-8') as f:
+            events.extend(json.loads(linje) for linje in f if linje.strip())
+
+    processer = sorted({e['pid'] for e in events})
+    metadata = [{
+        'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+        'args': {'name': 'pipeline' if pid == hovedproces else f'worker {pid}'},
+    } for pid in processer]
 
+    output_fil = Path(output_fil)
+    output_fil.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_fil, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + sorted(events, key=lambda e: e['ts']),
+                   'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return len(events)
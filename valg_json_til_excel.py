@@ -3,7 +3,11 @@
 Konvertering af valg.dk JSON-filer til Excel
 Håndterer nested JSON-strukturer fra SFTP-serveren
 
-Brug: python valg_json_til_excel.py <json_mappe> <output_mappe>
+Brug: python valg_json_til_excel.py <json_mappe> <output_mappe> [--karantaene]
+
+Valgresultaternes stemmebalance tjekkes per afstemningsområde under
+konverteringen; overtrædelser publiceres i findings/Datakvalitet_konvertering/.
+Med --karantaene flyttes fejlende filer til <json_mappe>/karantæne/.
 """
 
 import json
@@ -11,7 +15,20 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import sys
-from utils import estimér_køn, save_parquet
+from collections import Counter
+from logning import hent_logger, opsæt_logning, FIL_LOGGER
+from utils import estimér_køn, save_parquet, save_arrow_ipc, klassificer_stillinger, spor, atomisk
+from omraade_matrix import build_and_save as gem_område_matrix
+from kandidat_matrix import build_and_save as gem_kandidat_matrix
+from geografi import geografi_type, geografi_tabel, gem_geografi
+from filplacering import output_sti
+
+# Undermappe i json_mappe til valgresultat-filer der fejler stemmebalancen
+KARANTÆNE_MAPPE = 'karantæne'
+
+# Kolonner i kvalitetsrapporten (også når den er tom)
+KVALITET_KOLONNER = ['Fil', 'Valgart', 'Kommune', 'AfstemningsområdeDagiId', 'Afstemningsområde',
+                     'FrigivelsesTidspunkt', 'Tjek', 'Forventet', 'Faktisk', 'Difference']
 
 
 def dedupliker_nyeste_data(data_list, gruppering_kolonner):
@@ -168,10 +185,42 @@ def fladgør_kandidatdata_kvrv(json_data):
     return kandidater
 
 
-def fladgør_valgresultater_kvrv(json_data):
+def tjek_stemmebalance(valg_info, sum_liste_stemmer, antal_lister):
+    """
+    Per-område invarianter for ét afstemningsområde-dokument.
+
+    - GyldigeStemmer = sum af listernes stemmer (kun når listerne er med)
+    - AfgivneStemmer = gyldige + ugyldige + blanke
+
+    Returns:
+        Liste af overtrædelser (tom hvis området balancerer)
+    """
+    tjek = [('AfgivneStemmer = gyldige + ugyldige + blanke',
+             valg_info["AfgivneStemmer"],
+             valg_info["GyldigeStemmer"] + valg_info["UgyldigeStemmer"] + valg_info["BlankeStemmer"])]
+    if antal_lister:
+        tjek.insert(0, ('GyldigeStemmer = sum af listestemmer', valg_info["GyldigeStemmer"], sum_liste_stemmer))
+
+    return [{
+        "Valgart": valg_info["Valgart"],
+        "Kommune": valg_info["Kommune"],
+        "AfstemningsområdeDagiId": valg_info["AfstemningsområdeDagiId"],
+        "Afstemningsområde": valg_info["Afstemningsområde"],
+        "FrigivelsesTidspunkt": valg_info["FrigivelsesTidspunkt"],
+        "Tjek": navn,
+        "Forventet": forventet,
+        "Faktisk": faktisk,
+        "Difference": faktisk - forventet,
+    } for navn, forventet, faktisk in tjek if forventet != faktisk]
+
+
+def fladgør_valgresultater_kvrv(json_data, kvalitet=None):
     """
     Fladgør valgresultater for kommunal/regionsrådsvalg.
     Returnerer liste af resultater på kandidat-niveau.
+
+    Hvis kvalitet er en liste, tjekkes områdets stemmebalance mens dokumentet
+    alligevel er i hukommelsen, og overtrædelser tilføjes listen.
     """
     resultater = []
 
@@ -223,8 +272,11 @@ def fladgør_valgresultater_kvrv(json_data):
     }
 
     # Hent kandidatlister med stemmer
-    for liste in valg.get("Kandidatlister", []):
+    kandidatlister = valg.get("Kandidatlister", [])
+    sum_liste_stemmer = 0
+    for liste in kandidatlister:
         liste_stemmer = liste.get("Stemmer", 0)
+        sum_liste_stemmer += liste_stemmer or 0
         stemmer_ændring = liste.get("StemmerDifferenceFraForrigeValg", "")
 
         liste_info = {
@@ -253,6 +305,9 @@ def fladgør_valgresultater_kvrv(json_data):
             }
             resultater.append(row)
 
+    if kvalitet is not None:
+        kvalitet.extend(tjek_stemmebalance(valg_info, sum_liste_stemmer, len(kandidatlister)))
+
     return resultater
 
 
@@ -360,14 +415,60 @@ def fladgør_mandatfordeling(json_data):
     return mandater
 
 
-def process_json_files(json_mappe, output_mappe):
+def gem_kvalitetsrapport(kvalitet, output_mappe):
+    """Publicér stemmebalance-overtrædelser som 'Datakvalitet_konvertering' i findings/"""
+    from findings_store import FindingsStore
+
+    rapport = pd.DataFrame(kvalitet, columns=KVALITET_KOLONNER)
+    FindingsStore(output_mappe).publish('Datakvalitet_konvertering', {'Stemmebalance': rapport})
+
+    print("\n" + "=" * 60)
+    print("DATAKVALITET (stemmebalance per afstemningsområde)")
+    print("=" * 60)
+    if rapport.empty:
+        print("✓ Alle afstemningsområder balancerer")
+        return
+
+    print(f"⚠️  {len(rapport)} overtrædelser i {rapport['Fil'].nunique()} filer:")
+    for tjek, antal in rapport['Tjek'].value_counts().items():
+        print(f"   • {tjek}: {antal}")
+    for r in rapport.head(10).itertuples():
+        print(f"   {r.Fil}: {r.Afstemningsområde} ({r.Kommune}) - {r.Tjek}: "
+              f"forventet {r.Forventet:,}, faktisk {r.Faktisk:,}")
+    if len(rapport) > 10:
+        print(f"   ... se findings/Datakvalitet_konvertering/ for alle {len(rapport)}")
+
+
+def flyt_til_karantæne(filer, json_mappe, karantæne_mappe):
+    """Flyt filer til karantæne-mappen (bevarer relativ sti under json_mappe)"""
+    for fil in filer:
+        mål = karantæne_mappe / fil.relative_to(json_mappe)
+        mål.parent.mkdir(parents=True, exist_ok=True)
+        fil.replace(mål)
+    print(f"🚧 {len(filer)} filer flyttet i karantæne: {karantæne_mappe}")
+
+
+@spor(kategori='convert')
+def process_json_files(json_mappe, output_mappe, karantæne=False):
     """
     Hovedfunktion: Læser alle JSON-filer og konverterer til Excel.
+
+    Args:
+        karantæne: Flyt valgresultat-filer der fejler stemmebalancen til
+            <json_mappe>/karantæne/ og udelad dem fra output (ellers medtages
+            de og overtrædelserne rapporteres blot)
     """
     json_mappe = Path(json_mappe)
     output_mappe = Path(output_mappe)
     output_mappe.mkdir(exist_ok=True)
 
+    # Én linje per fil går til 'valg.fil' (undertrykkes i stille tilstand);
+    # optællingen per filtype logges altid til sidst
+    log = hent_logger()
+    fil_log = hent_logger(FIL_LOGGER)
+    optælling = Counter()
+    rækker = Counter()
+
     # Saml data i kategorier - både samlet og opdelt
     alle_kandidater = []
     alle_resultater = []
@@ -381,6 +482,11 @@ def process_json_files(json_mappe, output_mappe):
     regions_resultater = []
     regions_mandater = []
 
+    # Stemmebalance-overtrædelser fundet under fladgøring (kvalitetsrapport)
+    kvalitet = []
+    karantæne_mappe = json_mappe / KARANTÆNE_MAPPE
+    karantæne_filer = []
+
     # Find alle JSON-filer
     json_filer = list(json_mappe.rglob("*.json"))
     print(f"Fundet {len(json_filer)} JSON-filer i {json_mappe}")
@@ -392,73 +498,115 @@ def process_json_files(json_mappe, output_mappe):
     for json_fil in json_filer:
         # Spring over verifikationsdata (testdata fra KOMBIT)
         if 'verifikation' in str(json_fil):
-            print(f"Springer over verifikationsdata: {json_fil.name}")
+            fil_log.info(f"Springer over verifikationsdata: {json_fil.name}")
+            optælling['verifikation (sprunget over)'] += 1
+            continue
+        if KARANTÆNE_MAPPE in json_fil.relative_to(json_mappe).parts:
             continue
 
-        print(f"Behandler: {json_fil.name}")
+        fil_log.info(f"Behandler: {json_fil.name}")
 
-        try:
-            # Læs JSON med UTF-8 encoding og håndter BOM
-            with open(json_fil, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
+        with spor(json_fil.name, 'parse'):
+            try:
+                # Læs JSON med UTF-8 encoding og håndter BOM
+                with open(json_fil, 'r', encoding='utf-8-sig') as f:
+                    data = json.load(f)
             
-            filnavn = json_fil.name.lower()
+                filnavn = json_fil.name.lower()
             
-            # Kategoriser og fladgør baseret på filtype
-            er_kommunal = "kommunalvalg" in filnavn
-            er_regions = "regionsrådsvalg" in filnavn or "region" in filnavn
-
-            if "kandidat-data" in filnavn:
-                if "kommunalvalg" in filnavn or "regionsrådsvalg" in filnavn:
-                    kandidater = fladgør_kandidatdata_kvrv(data)
-                    alle_kandidater.extend(kandidater)
-
-                    if er_kommunal:
-                        kommunal_kandidater.extend(kandidater)
-                    if er_regions:
-                        regions_kandidater.extend(kandidater)
-
-                    print(f"  → {len(kandidater)} kandidater")
-
-            elif "valgresultater" in filnavn:
-                if "kommunalvalg" in filnavn or "regionsrådsvalg" in filnavn or "kvrv" in filnavn.lower():
-                    resultater = fladgør_valgresultater_kvrv(data)
-                    alle_resultater.extend(resultater)
+                # Kategoriser og fladgør baseret på filtype
+                er_kommunal = "kommunalvalg" in filnavn
+                er_regions = "regionsrådsvalg" in filnavn or "region" in filnavn
+
+                if "kandidat-data" in filnavn:
+                    if "kommunalvalg" in filnavn or "regionsrådsvalg" in filnavn:
+                        kandidater = fladgør_kandidatdata_kvrv(data)
+                        alle_kandidater.extend(kandidater)
+
+                        if er_kommunal:
+                            kommunal_kandidater.extend(kandidater)
+                        if er_regions:
+                            regions_kandidater.extend(kandidater)
+
+                        optælling['kandidat-data'] += 1
+                        rækker['kandidater'] += len(kandidater)
+                        fil_log.info(f"  → {len(kandidater)} kandidater")
+
+                elif "valgresultater" in filnavn:
+                    if "kommunalvalg" in filnavn or "regionsrådsvalg" in filnavn or "kvrv" in filnavn.lower():
+                        fil_kvalitet = []
+                        resultater = fladgør_valgresultater_kvrv(data, kvalitet=fil_kvalitet)
+                        if fil_kvalitet:
+                            kvalitet.extend({'Fil': json_fil.name, **o} for o in fil_kvalitet)
+                            fil_log.warning(f"  ⚠️  {json_fil.name}: {len(fil_kvalitet)} stemmebalance-fejl")
+                            if karantæne:
+                                karantæne_filer.append(json_fil)
+                                optælling['karantæne'] += 1
+                                continue
+
+                        alle_resultater.extend(resultater)
+
+                        if er_kommunal:
+                            kommunal_resultater.extend(resultater)
+                        if er_regions:
+                            regions_resultater.extend(resultater)
+
+                        optælling['valgresultater'] += 1
+                        rækker['resultatrækker'] += len(resultater)
+                        fil_log.info(f"  → {len(resultater)} resultatrækker")
+
+                elif "mandatfordeling" in filnavn:
+                    mandater = fladgør_mandatfordeling(data)
+                    alle_mandater.extend(mandater)
 
                     if er_kommunal:
-                        kommunal_resultater.extend(resultater)
+                        kommunal_mandater.extend(mandater)
                     if er_regions:
-                        regions_resultater.extend(resultater)
+                        regions_mandater.extend(mandater)
 
-                    print(f"  → {len(resultater)} resultatrækker")
-
-            elif "mandatfordeling" in filnavn:
-                mandater = fladgør_mandatfordeling(data)
-                alle_mandater.extend(mandater)
+                    optælling['mandatfordeling'] += 1
+                    rækker['mandater'] += len(mandater)
+                    fil_log.info(f"  → {len(mandater)} mandater")
+            
+                elif geografi_type(json_fil.name):
+                    # Geografi: typet dimensionstabel (Parquet) + Excel til reference
+                    df = geografi_tabel(data)
+                    gem_geografi(df, output_mappe / 'parquet', json_fil.stem, f"{geografi_type(json_fil.name)} (Parquet)")
 
-                if er_kommunal:
-                    kommunal_mandater.extend(mandater)
-                if er_regions:
-                    regions_mandater.extend(mandater)
+                    output_fil = output_sti(output_mappe, f"{json_fil.stem}.xlsx")
+                    with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+                        df.to_excel(tmp, index=False)
+                    optælling['geografi'] += 1
+                    fil_log.info(f"  → Gemt som {output_fil.name}")
 
-                print(f"  → {len(mandater)} mandater")
-            
-            else:
-                # Generisk håndtering - prøv at flade JSON ud
-                if isinstance(data, list):
-                    df = pd.json_normalize(data)
                 else:
-                    df = pd.json_normalize([data])
+                    # Generisk håndtering - prøv at flade JSON ud
+                    if isinstance(data, list):
+                        df = pd.json_normalize(data)
+                    else:
+                        df = pd.json_normalize([data])
                 
-                output_fil = output_mappe / f"{json_fil.stem}.xlsx"
-                df.to_excel(output_fil, index=False)
-                print(f"  → Gemt som {output_fil.name}")
+                    output_fil = output_sti(output_mappe, f"{json_fil.stem}.xlsx")
+                    with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+                        df.to_excel(tmp, index=False)
+                    optælling['øvrige'] += 1
+                    fil_log.info(f"  → Gemt som {output_fil.name}")
         
-        except json.JSONDecodeError as e:
-            print(f"  ✗ JSON-fejl: {e}")
-        except Exception as e:
-            print(f"  ✗ Fejl: {e}")
+            except json.JSONDecodeError as e:
+                optælling['fejl'] += 1
+                fil_log.error(f"  ✗ {json_fil.name}: JSON-fejl: {e}")
+            except Exception as e:
+                optælling['fejl'] += 1
+                fil_log.error(f"  ✗ {json_fil.name}: Fejl: {e}")
     
+    log.info(f"📊 {sum(optælling.values())} filer: "
+             + ", ".join(f"{antal} {navn}" for navn, antal in optælling.most_common())
+             + (" | " + ", ".join(f"{antal:,} {navn}" for navn, antal in rækker.items()) if rækker else ""))
+
+    gem_kvalitetsrapport(kvalitet, output_mappe)
+    if karantæne_filer:
+        flyt_til_karantæne(karantæne_filer, json_mappe, karantæne_mappe)
+
     # Gem samlede data
     timestamp = datetime.now().strftime("%Y%m%d_%H%M")
     
@@ -466,6 +614,10 @@ def process_json_files(json_mappe, output_mappe):
     parquet_dir = output_mappe / 'parquet'
     parquet_dir.mkdir(exist_ok=True)
 
+    # Ukomprimeret Arrow IPC til memory-mapped læsning i worker-processer
+    arrow_dir = output_mappe / 'arrow'
+    arrow_dir.mkdir(exist_ok=True)
+
     print("\n" + "=" * 60)
     print("GEMMER PARQUET OG EXCEL-FILER")
     print("=" * 60)
@@ -473,14 +625,17 @@ def process_json_files(json_mappe, output_mappe):
     # SAMLEDE FILER (kommunal + regional)
     if alle_kandidater:
         df = pd.DataFrame(alle_kandidater)
+        df['JobKategori'] = klassificer_stillinger(df['Stilling'])
         
         # Gem Parquet (primær, hurtig)
         parquet_fil = parquet_dir / f"kandidater_ALLE_VALG_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Alle kandidater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Alle kandidater (Arrow IPC)")
         
         # Gem Excel (sekundær, kompatibilitet)
-        output_fil = output_mappe / f"kandidater_ALLE_VALG_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"kandidater_ALLE_VALG_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Alle kandidater (Excel): {output_fil.name}")
         print(f"  {len(alle_kandidater)} rækker, {len(df.columns)} kolonner")
 
@@ -488,10 +643,8 @@ def process_json_files(json_mappe, output_mappe):
         # Dedupliker: Behold kun nyeste data per afstemningsområde+kandidat
         print("\n🔄 Deduplikerer valgresultater (beholder kun nyeste opdateringer)...")
         før_antal = len(alle_resultater)
-        alle_resultater = dedupliker_nyeste_data(
-            alle_resultater,
-            ['AfstemningsområdeDagiId', 'KandidatId']
-        )
+        with spor('dedup alle_resultater', 'dedup', rækker=før_antal):
+            alle_resultater = dedupliker_nyeste_data(alle_resultater, ['AfstemningsområdeDagiId', 'KandidatId'])
         efter_antal = len(alle_resultater)
         print(f"   Før: {før_antal} rækker → Efter: {efter_antal} rækker ({før_antal - efter_antal} duplikater fjernet)")
 
@@ -500,10 +653,14 @@ def process_json_files(json_mappe, output_mappe):
         # Gem Parquet
         parquet_fil = parquet_dir / f"valgresultater_ALLE_VALG_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Alle valgresultater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Alle valgresultater (Arrow IPC)")
+        gem_område_matrix(df, arrow_dir, 'ALLE_VALG', timestamp, "Alle område × parti matrix (Arrow IPC)")
+        gem_kandidat_matrix(df, arrow_dir, 'ALLE_VALG', timestamp, "Kandidat × område matrix (sparse)")
         
         # Gem Excel
-        output_fil = output_mappe / f"valgresultater_ALLE_VALG_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"valgresultater_ALLE_VALG_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Alle valgresultater (Excel): {output_fil.name}")
         print(f"  {len(alle_resultater)} rækker, {len(df.columns)} kolonner")
 
@@ -524,18 +681,17 @@ def process_json_files(json_mappe, output_mappe):
                 valgart_pivot = valgart_pivot[['Kommune', 'ListeNavn', 'TotalStemmer']]  # Drop Valgart kolonne
 
                 valgart_navn = valgart.replace('valg', '').replace('råds', 'raads')  # Filvenlig navn
-                pivot_fil = output_mappe / f"resultater_per_kommune_{valgart_navn}_{timestamp}.xlsx"
-                valgart_pivot.to_excel(pivot_fil, index=False, engine='openpyxl')
+                pivot_fil = output_sti(output_mappe, f"resultater_per_kommune_{valgart_navn}_{timestamp}.xlsx")
+                with spor(pivot_fil.name, 'excel', rækker=len(valgart_pivot)), atomisk(pivot_fil) as tmp:
+                    valgart_pivot.to_excel(tmp, index=False, engine='openpyxl')
                 print(f"✓ Pivottabel gemt: {pivot_fil.name} ({len(valgart_pivot)} rækker)")
 
     if alle_mandater:
         # Dedupliker: Behold kun nyeste data per kandidat
         print("\n🔄 Deduplikerer mandatfordeling (beholder kun nyeste opdateringer)...")
         før_antal = len(alle_mandater)
-        alle_mandater = dedupliker_nyeste_data(
-            alle_mandater,
-            ['KommuneKode', 'KandidatId']
-        )
+        with spor('dedup alle_mandater', 'dedup', rækker=før_antal):
+            alle_mandater = dedupliker_nyeste_data(alle_mandater, ['KommuneKode', 'KandidatId'])
         efter_antal = len(alle_mandater)
         print(f"   Før: {før_antal} rækker → Efter: {efter_antal} rækker ({før_antal - efter_antal} duplikater fjernet)")
 
@@ -544,10 +700,12 @@ def process_json_files(json_mappe, output_mappe):
         # Gem Parquet
         parquet_fil = parquet_dir / f"mandatfordeling_ALLE_VALG_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Alle mandater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Alle mandater (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"mandatfordeling_ALLE_VALG_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"mandatfordeling_ALLE_VALG_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Alle mandater (Excel): {output_fil.name}")
         print(f"  {len(alle_mandater)} rækker")
 
@@ -558,14 +716,17 @@ def process_json_files(json_mappe, output_mappe):
 
     if kommunal_kandidater:
         df = pd.DataFrame(kommunal_kandidater)
+        df['JobKategori'] = klassificer_stillinger(df['Stilling'])
         
         # Gem Parquet
         parquet_fil = parquet_dir / f"kandidater_KOMMUNAL_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Kommunale kandidater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Kommunale kandidater (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"kandidater_KOMMUNAL_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"kandidater_KOMMUNAL_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Kommunale kandidater (Excel): {output_fil.name}")
         print(f"  {len(kommunal_kandidater)} rækker, {len(df.columns)} kolonner")
 
@@ -573,10 +734,8 @@ def process_json_files(json_mappe, output_mappe):
         # Dedupliker: Behold kun nyeste data per afstemningsområde+kandidat
         print("\n🔄 Deduplikerer kommunale valgresultater...")
         før_antal = len(kommunal_resultater)
-        kommunal_resultater = dedupliker_nyeste_data(
-            kommunal_resultater,
-            ['AfstemningsområdeDagiId', 'KandidatId']
-        )
+        with spor('dedup kommunal_resultater', 'dedup', rækker=før_antal):
+            kommunal_resultater = dedupliker_nyeste_data(kommunal_resultater, ['AfstemningsområdeDagiId', 'KandidatId'])
         efter_antal = len(kommunal_resultater)
         print(f"   Før: {før_antal} rækker → Efter: {efter_antal} rækker ({før_antal - efter_antal} duplikater fjernet)")
 
@@ -585,10 +744,13 @@ def process_json_files(json_mappe, output_mappe):
         # Gem Parquet
         parquet_fil = parquet_dir / f"valgresultater_KOMMUNAL_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Kommunale resultater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Kommunale resultater (Arrow IPC)")
+        gem_område_matrix(df, arrow_dir, 'KOMMUNAL', timestamp, "Kommunale område × parti matrix (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"valgresultater_KOMMUNAL_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"valgresultater_KOMMUNAL_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Kommunale resultater (Excel): {output_fil.name}")
         print(f"  {len(kommunal_resultater)} rækker, {len(df.columns)} kolonner")
 
@@ -596,10 +758,8 @@ def process_json_files(json_mappe, output_mappe):
         # Dedupliker: Behold kun nyeste data per kandidat
         print("\n🔄 Deduplikerer kommunale mandater...")
         før_antal = len(kommunal_mandater)
-        kommunal_mandater = dedupliker_nyeste_data(
-            kommunal_mandater,
-            ['KommuneKode', 'KandidatId']
-        )
+        with spor('dedup kommunal_mandater', 'dedup', rækker=før_antal):
+            kommunal_mandater = dedupliker_nyeste_data(kommunal_mandater, ['KommuneKode', 'KandidatId'])
         efter_antal = len(kommunal_mandater)
         print(f"   Før: {før_antal} rækker → Efter: {efter_antal} rækker ({før_antal - efter_antal} duplikater fjernet)")
 
@@ -608,10 +768,12 @@ def process_json_files(json_mappe, output_mappe):
         # Gem Parquet
         parquet_fil = parquet_dir / f"mandatfordeling_KOMMUNAL_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Kommunale mandater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Kommunale mandater (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"mandatfordeling_KOMMUNAL_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"mandatfordeling_KOMMUNAL_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Kommunale mandater (Excel): {output_fil.name}")
         print(f"  {len(kommunal_mandater)} rækker")
 
@@ -622,14 +784,17 @@ def process_json_files(json_mappe, output_mappe):
 
     if regions_kandidater:
         df = pd.DataFrame(regions_kandidater)
+        df['JobKategori'] = klassificer_stillinger(df['Stilling'])
         
         # Gem Parquet
         parquet_fil = parquet_dir / f"kandidater_REGIONAL_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Regionale kandidater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Regionale kandidater (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"kandidater_REGIONAL_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"kandidater_REGIONAL_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Regionale kandidater (Excel): {output_fil.name}")
         print(f"  {len(regions_kandidater)} rækker, {len(df.columns)} kolonner")
 
@@ -637,10 +802,8 @@ def process_json_files(json_mappe, output_mappe):
         # Dedupliker: Behold kun nyeste data per afstemningsområde+kandidat
         print("\n🔄 Deduplikerer regionale valgresultater...")
         før_antal = len(regions_resultater)
-        regions_resultater = dedupliker_nyeste_data(
-            regions_resultater,
-            ['AfstemningsområdeDagiId', 'KandidatId']
-        )
+        with spor('dedup regions_resultater', 'dedup', rækker=før_antal):
+            regions_resultater = dedupliker_nyeste_data(regions_resultater, ['AfstemningsområdeDagiId', 'KandidatId'])
         efter_antal = len(regions_resultater)
         print(f"   Før: {før_antal} rækker → Efter: {efter_antal} rækker ({før_antal - efter_antal} duplikater fjernet)")
 
@@ -649,10 +812,13 @@ def process_json_files(json_mappe, output_mappe):
         # Gem Parquet
         parquet_fil = parquet_dir / f"valgresultater_REGIONAL_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Regionale resultater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Regionale resultater (Arrow IPC)")
+        gem_område_matrix(df, arrow_dir, 'REGIONAL', timestamp, "Regionale område × parti matrix (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"valgresultater_REGIONAL_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"valgresultater_REGIONAL_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Regionale resultater (Excel): {output_fil.name}")
         print(f"  {len(regions_resultater)} rækker, {len(df.columns)} kolonner")
 
@@ -660,10 +826,8 @@ def process_json_files(json_mappe, output_mappe):
         # Dedupliker: Behold kun nyeste data per kandidat
         print("\n🔄 Deduplikerer regionale mandater...")
         før_antal = len(regions_mandater)
-        regions_mandater = dedupliker_nyeste_data(
-            regions_mandater,
-            ['KommuneKode', 'KandidatId']
-        )
+        with spor('dedup regions_mandater', 'dedup', rækker=før_antal):
+            regions_mandater = dedupliker_nyeste_data(regions_mandater, ['KommuneKode', 'KandidatId'])
         efter_antal = len(regions_mandater)
         print(f"   Før: {før_antal} rækker → Efter: {efter_antal} rækker ({før_antal - efter_antal} duplikater fjernet)")
 
@@ -672,10 +836,12 @@ def process_json_files(json_mappe, output_mappe):
         # Gem Parquet
         parquet_fil = parquet_dir / f"mandatfordeling_REGIONAL_{timestamp}.parquet"
         save_parquet(df, parquet_fil, "Regionale mandater (Parquet)")
+        save_arrow_ipc(df, arrow_dir / parquet_fil.with_suffix('.arrow').name, "Regionale mandater (Arrow IPC)")
         
         # Gem Excel
-        output_fil = output_mappe / f"mandatfordeling_REGIONAL_{timestamp}.xlsx"
-        df.to_excel(output_fil, index=False, engine='openpyxl')
+        output_fil = output_sti(output_mappe, f"mandatfordeling_REGIONAL_{timestamp}.xlsx")
+        with spor(output_fil.name, 'excel', rækker=len(df)), atomisk(output_fil) as tmp:
+            df.to_excel(tmp, index=False, engine='openpyxl')
         print(f"✓ Regionale mandater (Excel): {output_fil.name}")
         print(f"  {len(regions_mandater)} rækker")
 
@@ -685,28 +851,33 @@ def process_json_files(json_mappe, output_mappe):
     print("=" * 60)
 
 
-def main(json_mappe=None, output_mappe=None):
+def main(json_mappe=None, output_mappe=None, karantæne=False):
     """Main funktion til brug i pipeline"""
     # Hvis ikke angivet, brug sys.argv (for CLI-brug)
+    argv = [a for a in sys.argv[1:] if not a.startswith('--')]
     if json_mappe is None:
-        if len(sys.argv) < 2:
-            print("Brug: python valg_json_til_excel.py <json_mappe> [output_mappe]")
+        karantæne = karantæne or '--karantaene' in sys.argv
+        opsæt_logning(stille='--stille' in sys.argv)
+        if len(argv) < 1:
+            print("Brug: python valg_json_til_excel.py <json_mappe> [output_mappe] [--karantaene] [--stille]")
             print("\nEksempel:")
             print('  python valg_json_til_excel.py "C:\\Users\\Nils\\valg_data" "C:\\Users\\Nils\\excel_output"')
             sys.exit(1)
-        json_mappe = sys.argv[1]
+        json_mappe = argv[0]
     
     if output_mappe is None:
-        output_mappe = sys.argv[2] if len(sys.argv) > 2 else Path(json_mappe) / "excel_output"
+        output_mappe = argv[1] if len(argv) > 1 else Path(json_mappe) / "excel_output"
     
     print("=" * 60)
     print("VALG.DK JSON til Excel Konvertering")
     print("=" * 60)
     print(f"JSON-mappe: {json_mappe}")
     print(f"Output-mappe: {output_mappe}")
+    if karantæne:
+        print(f"Karantæne: {Path(json_mappe) / KARANTÆNE_MAPPE}")
     print()
     
-    process_json_files(json_mappe, output_mappe)
+    process_json_files(json_mappe, output_mappe, karantæne=karantæne)
 
 
 if __name__ == "__main__":
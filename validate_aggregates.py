@@ -7,11 +7,19 @@ Dette script validerer intern konsistens i valgdata:
 - Valgdeltagelse-beregninger
 - Nationale totaler
 - Parti-niveau aggregater
+
+Tjekkene er deklareret som regler (se valideringsregler.py) over fire delte
+tabeller der bygges én gang per valgtype: område, række, parti og national.
+KOMMUNAL og REGIONAL valideres parallelt; rækker der overtræder en regel
+gemmes i findings/Validering_aggregater/.
 """
 
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from utils import find_latest_file, load_parquet
+from omraade_matrix import OmrådeMatrix, RESULTAT_KOLONNER as MATRIX_KOLONNER
+from valideringsregler import Regel, evaluer_regler
 
 # FORVENTEDE VÆRDIER FRA VALG.DK / OFFICIELLE KILDER
 # Opdater disse værdier når de er tilgængelige
@@ -61,276 +69,235 @@ FORVENTEDE_PARTI_TOTALER = {
     }
 }
 
+# Talkolonner der aldrig må være negative
+NUMERISKE_KOLONNER = ['Stemmeberettigede', 'AfgivneStemmer', 'GyldigeStemmer',
+                      'UgyldigeStemmer', 'BlankeStemmer', 'PersonligeStemmer', 'ListeStemmer']
+
+# Kolonner valideringen bruger fra valgresultater (kolonne-projektion)
+RESULTAT_KOLONNER = ['AfstemningsområdeDagiId', 'KandidatId', 'ListeNavn', 'Listestemmer'] + NUMERISKE_KOLONNER
+
+# Grænser der kan bruges ved navn i reglerne
+KONSTANTER = {
+    'MAX_AFVIGELSE_STEMMER': 1,         # stemmer
+    'MAX_AFVIGELSE_VALGDELTAGELSE': 0.1,  # procentpoint
+    'MAX_AFVIGELSE_NATIONAL_PCT': 0.1,  # % af forventet total
+    'MAX_AFVIGELSE_PARTI_PCT': 0.5,     # % af forventet partitotal
+}
+
+# Reglerne skrives som ~(fejlbetingelse), så manglende værdier (NaN) ikke tæller som fejl
+REGLER = [
+    # Stemme-balance og valgdeltagelse per afstemningsområde
+    Regel('gyldige_balance', 'område', '~(abs(Difference_Gyldige) >= MAX_AFVIGELSE_STEMMER)',
+          'GyldigeStemmer matcher sum af parti-stemmer',
+          '{r[Afstemningsområde]}: GyldigeStemmer={r[GyldigeStemmer]}, sum af partier={r[SumPartiStemmer]}'),
+    Regel('afgivne_balance', 'område', '~(abs(Difference_Afgivne) >= MAX_AFVIGELSE_STEMMER)',
+          'AfgivneStemmer matcher GyldigeStemmer + UgyldigeStemmer + BlankeStemmer',
+          '{r[Afstemningsområde]}: Afgivne diff={r[Difference_Afgivne]}'),
+    Regel('valgdeltagelse_beregning', 'område', '~(Difference_Valgdeltagelse >= MAX_AFVIGELSE_VALGDELTAGELSE)',
+          'Valgdeltagelse beregnet korrekt',
+          '{r[Afstemningsområde]}: {r[ValgdeltagelseProcent]}% vs beregnet {r[Beregnet_Valgdeltagelse]}%'),
+    Regel('valgdeltagelse_range', 'område', '~((ValgdeltagelseProcent < 0) | (ValgdeltagelseProcent > 100))',
+          'Valgdeltagelse inden for 0-100%',
+          '{r[Afstemningsområde]}: valgdeltagelse {r[ValgdeltagelseProcent]:.1f}%'),
+    Regel('valgdeltagelse_lav', 'område', '~(ValgdeltagelseProcent < 30)',
+          'Ingen meget lav valgdeltagelse (< 30%)',
+          'Meget lav valgdeltagelse: {r[Afstemningsområde]} {r[ValgdeltagelseProcent]:.1f}%', alvor='advarsel'),
+    Regel('valgdeltagelse_høj', 'område', '~(ValgdeltagelseProcent > 95)',
+          'Ingen meget høj valgdeltagelse (> 95%)',
+          'Meget høj valgdeltagelse: {r[Afstemningsområde]} {r[ValgdeltagelseProcent]:.1f}%', alvor='advarsel'),
+
+    # Datakvalitet på rækkeniveau
+    *[Regel(f'ikke_negativ_{kolonne}', 'række', f'~({kolonne} < 0)',
+            f'Ingen negative værdier i {kolonne}',
+            f'{{r[AfstemningsområdeDagiId]}}/{{r[KandidatId]}}: {kolonne}={{r[{kolonne}]}}')
+      for kolonne in NUMERISKE_KOLONNER],
+    Regel('ingen_duplikater', 'række', '~Duplikat',
+          'Ingen duplikater (AfstemningsområdeDagiId + KandidatId)',
+          'Duplikat: {r[AfstemningsområdeDagiId]}/{r[KandidatId]}'),
+
+    # Nationale totaler mod officielle tal (kolonnerne findes kun når tallet er kendt)
+    *[Regel(f'national_{navn}', 'national', f'~(abs(Afvigelse_{navn}) >= MAX_AFVIGELSE_NATIONAL_PCT)',
+            f'{navn} matcher valg.dk/DR',
+            f'{navn} MATCHER IKKE (beregnet {{r[{navn}]:,}}, forventet {{r[Forventet_{navn}]:,}}, '
+            f'{{r[Afvigelse_{navn}]:.3f}}%)')
+      for navn in ['Stemmeberettigede', 'AfgivneStemmer', 'GyldigeStemmer']],
+    Regel('national_Valgdeltagelse', 'national', '~(abs(Afvigelse_Valgdeltagelse) >= MAX_AFVIGELSE_VALGDELTAGELSE)',
+          'Valgdeltagelse matcher valg.dk/DR',
+          'Valgdeltagelse MATCHER IKKE (diff: {r[Afvigelse_Valgdeltagelse]:.3f}%)'),
+
+    # Partitotaler mod DR/Altinget (NaN = intet forventet tal)
+    Regel('parti_totaler', 'parti', '~(abs(Afvigelse_pct) >= MAX_AFVIGELSE_PARTI_PCT)',
+          'Partitotaler matcher DR/Altinget',
+          '{r[ListeNavn]} MATCHER IKKE (diff: {r[Afvigelse]:,.0f}, {r[Afvigelse_pct]:.2f}%)'),
+]
+
+# Overskrift per tabel i rapporten
+AFSNIT = {
+    'område': 'STEMME-BALANCE OG VALGDELTAGELSE',
+    'række': 'DATAKVALITET',
+    'national': 'NATIONALE TOTALER',
+    'parti': 'PARTI-TOTALER',
+}
+
+
 class AggregateValidator:
-    def __init__(self, valgtype='KOMMUNAL'):
+    def __init__(self, valgtype='KOMMUNAL', output_dir='excel_output'):
         self.valgtype = valgtype
+        self.output_dir = Path(output_dir)
         self.df = self._load_data()
+        self._matrix = None
+        self.tabeller = {}
+        self.sammenfatning = None
+        self.overtrædelser = None
         self.errors = []
         self.warnings = []
         self.success_count = 0
         self.total_checks = 0
 
     def _load_data(self):
-        """Load den nyeste valgresultater fil"""
-        parquet_dir = Path('excel_output/parquet')
-        res_fil = find_latest_file(str(parquet_dir / f'valgresultater_{self.valgtype}_*.parquet'))
+        """Load den nyeste valgresultater fil (kun de kolonner valideringen bruger)"""
+        import pyarrow.parquet as pq
+
+        res_fil = find_latest_file(str(self.output_dir / 'parquet' / f'valgresultater_{self.valgtype}_*.parquet'))
 
         if not res_fil:
             raise FileNotFoundError(f"Kunne ikke finde valgresultater fil for {self.valgtype}")
 
-        print(f"📖 Læser: {Path(res_fil).name}\n")
-        return load_parquet(res_fil)
-
-    def _check(self, condition, success_msg, error_msg):
-        """Helper til at tjekke en condition og registrere resultat"""
-        self.total_checks += 1
-        if condition:
-            self.success_count += 1
-            print(f"   ✅ {success_msg}")
-            return True
-        else:
-            self.errors.append(error_msg)
-            print(f"   ❌ {error_msg}")
-            return False
-
-    def _warn(self, condition, warning_msg):
-        """Helper til at give en advarsel"""
-        if not condition:
-            self.warnings.append(warning_msg)
-            print(f"   ⚠️  {warning_msg}")
-
-    def validate_stemme_balance(self):
-        """Valider at stemme-balance stemmer per afstemningsområde"""
-        print("="*80)
-        print("1. STEMME-BALANCE VALIDERING")
-        print("="*80)
-
-        # Dedupliker til afstemningsområde-niveau
-        areas = self.df.groupby('AfstemningsområdeDagiId').first().reset_index()
-
-        print(f"\n📊 Analyserer {len(areas)} afstemningsområder...")
-
-        # Beregn summen af alle partiers stemmer per område
-        parti_stemmer = self.df.groupby(['AfstemningsområdeDagiId', 'ListeNavn'])['ListeStemmer'].first()
-        parti_stemmer_sum = parti_stemmer.groupby('AfstemningsområdeDagiId').sum().reset_index()
-        parti_stemmer_sum.columns = ['AfstemningsområdeDagiId', 'SumPartiStemmer']
-
-        # Merge med areas
-        areas = areas.merge(parti_stemmer_sum, on='AfstemningsområdeDagiId')
-
-        # Tjek 1: GyldigeStemmer = sum af alle parti-stemmer
-        areas['Difference_Gyldige'] = areas['GyldigeStemmer'] - areas['SumPartiStemmer']
-        max_diff = areas['Difference_Gyldige'].abs().max()
-
-        self._check(
-            max_diff < 1,
-            f"GyldigeStemmer matcher sum af parti-stemmer (max afvigelse: {max_diff})",
-            f"GyldigeStemmer matcher IKKE sum af parti-stemmer (max afvigelse: {max_diff})"
-        )
-
-        # Tjek 2: AfgivneStemmer = GyldigeStemmer + UgyldigeStemmer + BlankeStemmer
-        areas['Beregnet_Afgivne'] = areas['GyldigeStemmer'] + areas['UgyldigeStemmer'] + areas['BlankeStemmer']
-        areas['Difference_Afgivne'] = areas['AfgivneStemmer'] - areas['Beregnet_Afgivne']
-        max_diff_afgivne = areas['Difference_Afgivne'].abs().max()
-
-        self._check(
-            max_diff_afgivne < 1,
-            f"AfgivneStemmer matcher GyldigeStemmer + UgyldigeStemmer + BlankeStemmer (max afvigelse: {max_diff_afgivne})",
-            f"AfgivneStemmer matcher IKKE (max afvigelse: {max_diff_afgivne})"
-        )
-
-        # Tjek 3: Valgdeltagelse beregning
-        areas['Beregnet_Valgdeltagelse'] = (areas['AfgivneStemmer'] / areas['Stemmeberettigede'] * 100).round(2)
-        areas['Difference_Valgdeltagelse'] = (areas['ValgdeltagelseProcent'] - areas['Beregnet_Valgdeltagelse']).abs()
-        max_diff_valgdelt = areas['Difference_Valgdeltagelse'].max()
-
-        self._check(
-            max_diff_valgdelt < 0.1,
-            f"Valgdeltagelse beregnet korrekt (max afvigelse: {max_diff_valgdelt:.3f}%)",
-            f"Valgdeltagelse beregning FEJLER (max afvigelse: {max_diff_valgdelt:.3f}%)"
-        )
-
-        # Vis områder med afvigelser hvis der er nogen
-        if max_diff >= 1 or max_diff_afgivne >= 1:
-            print(f"\n   ⚠️  Områder med afvigelser:")
-            problemer = areas[
-                (areas['Difference_Gyldige'].abs() >= 1) |
-                (areas['Difference_Afgivne'].abs() >= 1)
-            ]
-            for _, row in problemer.head(5).iterrows():
-                print(f"      {row['Afstemningsområde']}: Gyldige diff={row['Difference_Gyldige']}, Afgivne diff={row['Difference_Afgivne']}")
-
-    def validate_data_quality(self):
-        """Valider data kvalitet - ingen negative tal, outliers, etc."""
-        print("\n" + "="*80)
-        print("2. DATA KVALITETS-VALIDERING")
-        print("="*80)
-
-        print(f"\n📊 Analyserer {len(self.df)} datarækker...")
-
-        # Tjek for negative værdier
-        numeric_cols = ['Stemmeberettigede', 'AfgivneStemmer', 'GyldigeStemmer',
-                        'UgyldigeStemmer', 'BlankeStemmer', 'PersonligeStemmer', 'ListeStemmer']
-
-        for col in numeric_cols:
-            if col in self.df.columns:
-                negative_count = (self.df[col] < 0).sum()
-                self._check(
-                    negative_count == 0,
-                    f"Ingen negative værdier i {col}",
-                    f"FUNDET {negative_count} negative værdier i {col}"
-                )
-
-        # Tjek valgdeltagelse range
-        areas = self.df.groupby('AfstemningsområdeDagiId')['ValgdeltagelseProcent'].first()
-        min_valgdelt = areas.min()
-        max_valgdelt = areas.max()
-
-        self._check(
-            min_valgdelt >= 0 and max_valgdelt <= 100,
-            f"Valgdeltagelse inden for 0-100% (range: {min_valgdelt:.1f}% - {max_valgdelt:.1f}%)",
-            f"Valgdeltagelse UDEN FOR range 0-100%: {min_valgdelt:.1f}% - {max_valgdelt:.1f}%"
-        )
-
-        # Advarsel om meget lav eller meget høj valgdeltagelse
-        self._warn(
-            min_valgdelt >= 30,
-            f"Meget lav valgdeltagelse fundet: {min_valgdelt:.1f}%"
-        )
-        self._warn(
-            max_valgdelt <= 95,
-            f"Meget høj valgdeltagelse fundet: {max_valgdelt:.1f}%"
-        )
-
-        # Tjek for duplikater (bør ikke eksistere efter deduplikering)
-        dupes = self.df.duplicated(subset=['AfstemningsområdeDagiId', 'KandidatId']).sum()
-        self._check(
-            dupes == 0,
-            f"Ingen duplikater fundet (AfstemningsområdeDagiId + KandidatId)",
-            f"FUNDET {dupes} duplikater!"
-        )
-
-    def validate_nationale_totaler(self):
-        """Valider nationale totaler"""
-        print("\n" + "="*80)
-        print("3. NATIONALE TOTALER")
-        print("="*80)
-
-        # Dedupliker til afstemningsområde-niveau
-        areas = self.df.groupby('AfstemningsområdeDagiId').first().reset_index()
-
-        # Beregn totaler
-        total_stemmeberettigede = areas['Stemmeberettigede'].sum()
-        total_afgivne = areas['AfgivneStemmer'].sum()
-        total_gyldige = areas['GyldigeStemmer'].sum()
-        total_ugyldige = areas['UgyldigeStemmer'].sum()
-        total_blanke = areas['BlankeStemmer'].sum()
-
-        national_valgdeltagelse = (total_afgivne / total_stemmeberettigede * 100)
-
-        print(f"\n📊 Beregnede nationale totaler ({self.valgtype}):")
-        print(f"   Stemmeberettigede:  {total_stemmeberettigede:>12,}")
-        print(f"   Afgivne stemmer:    {total_afgivne:>12,}")
-        print(f"   Gyldige stemmer:    {total_gyldige:>12,}")
-        print(f"   Ugyldige stemmer:   {total_ugyldige:>12,}")
-        print(f"   Blanke stemmer:     {total_blanke:>12,}")
-        print(f"   Valgdeltagelse:     {national_valgdeltagelse:>12.2f}%")
-
-        # Sammenlign med forventede værdier hvis tilgængelige
+        skema = pq.read_schema(res_fil).names
+        kolonner = [k for k in dict.fromkeys(RESULTAT_KOLONNER + MATRIX_KOLONNER) if k in skema]
+        return load_parquet(res_fil, columns=kolonner)
+
+    @property
+    def matrix(self):
+        """Område × parti matrix (materialiseret af converteren, ellers bygget fra self.df)"""
+        if self._matrix is None:
+            matrix_fil = find_latest_file(str(self.output_dir / 'arrow' / f'omraade_parti_{self.valgtype}_*.arrow'))
+            if matrix_fil:
+                self._matrix = OmrådeMatrix.load(matrix_fil)
+            else:
+                self._matrix = OmrådeMatrix.from_results(self.df)
+        return self._matrix
+
+    def build_tables(self):
+        """Byg de delte tabeller reglerne evalueres over (én gang per valgtype)"""
+        matrix = self.matrix
+
+        # Område-niveau: én række per afstemningsområde fra matricen
+        område = matrix.områder.assign(SumPartiStemmer=matrix.parti_summer())
+        område['Difference_Gyldige'] = område['GyldigeStemmer'] - område['SumPartiStemmer']
+        område['Difference_Afgivne'] = område['AfgivneStemmer'] - (
+            område['GyldigeStemmer'] + område['UgyldigeStemmer'] + område['BlankeStemmer'])
+        område['Beregnet_Valgdeltagelse'] = (område['AfgivneStemmer'] / område['Stemmeberettigede'] * 100).round(2)
+        område['Difference_Valgdeltagelse'] = (område['ValgdeltagelseProcent'] - område['Beregnet_Valgdeltagelse']).abs()
+
+        # Række-niveau: rå data + duplikat-markering
+        række = self.df.assign(Duplikat=self.df.duplicated(subset=['AfstemningsområdeDagiId', 'KandidatId']))
+
+        # National: én række med totaler og afvigelse fra officielle tal
+        totaler = område[['Stemmeberettigede', 'AfgivneStemmer', 'GyldigeStemmer',
+                          'UgyldigeStemmer', 'BlankeStemmer']].sum()
+        national = totaler.to_frame().T
+        national['Valgdeltagelse'] = totaler['AfgivneStemmer'] / totaler['Stemmeberettigede'] * 100
         forventede = FORVENTEDE_NATIONALE_TOTALER.get(self.valgtype, {})
-
-        if any(v is not None for v in forventede.values()):
-            print(f"\n📊 Sammenligning med valg.dk:")
-
-            if forventede.get('Stemmeberettigede') is not None:
-                diff = total_stemmeberettigede - forventede['Stemmeberettigede']
-                pct_diff = (diff / forventede['Stemmeberettigede'] * 100) if forventede['Stemmeberettigede'] > 0 else 0
-                self._check(
-                    abs(pct_diff) < 0.1,
-                    f"Stemmeberettigede matcher (diff: {diff:,}, {pct_diff:.3f}%)",
-                    f"Stemmeberettigede MATCHER IKKE (diff: {diff:,}, {pct_diff:.3f}%)"
-                )
-
-            if forventede.get('AfgivneStemmer') is not None:
-                diff = total_afgivne - forventede['AfgivneStemmer']
-                pct_diff = (diff / forventede['AfgivneStemmer'] * 100) if forventede['AfgivneStemmer'] > 0 else 0
-                self._check(
-                    abs(pct_diff) < 0.1,
-                    f"AfgivneStemmer matcher (diff: {diff:,}, {pct_diff:.3f}%)",
-                    f"AfgivneStemmer MATCHER IKKE (diff: {diff:,}, {pct_diff:.3f}%)"
-                )
-
-            if forventede.get('GyldigeStemmer') is not None:
-                diff = total_gyldige - forventede['GyldigeStemmer']
-                pct_diff = (diff / forventede['GyldigeStemmer'] * 100) if forventede['GyldigeStemmer'] > 0 else 0
-                self._check(
-                    abs(pct_diff) < 0.1,
-                    f"GyldigeStemmer matcher (diff: {diff:,}, {pct_diff:.3f}%)",
-                    f"GyldigeStemmer MATCHER IKKE (diff: {diff:,}, {pct_diff:.3f}%)"
-                )
-
-            if forventede.get('Valgdeltagelse') is not None:
-                diff = national_valgdeltagelse - forventede['Valgdeltagelse']
-                self._check(
-                    abs(diff) < 0.1,
-                    f"Valgdeltagelse matcher (diff: {diff:.3f}%)",
-                    f"Valgdeltagelse MATCHER IKKE (diff: {diff:.3f}%)"
-                )
-        else:
+        for navn, forventet in forventede.items():
+            if forventet is None:
+                continue
+            national[f'Forventet_{navn}'] = forventet
+            if navn == 'Valgdeltagelse':
+                national['Afvigelse_Valgdeltagelse'] = national['Valgdeltagelse'] - forventet
+            else:
+                national[f'Afvigelse_{navn}'] = (national[navn] - forventet) / forventet * 100
+
+        # Parti-niveau: ListeStemmer fra matricen, personlige/listestemmer fra rækkerne
+        parti = pd.DataFrame({'ListeNavn': matrix.partier, 'ListeStemmer': matrix.stemmer.sum(axis=0)})
+        personlige = self.df.groupby('ListeNavn')['PersonligeStemmer'].sum()
+        listestemmer = (self.df.drop_duplicates(['AfstemningsområdeDagiId', 'ListeNavn'])
+                        .groupby('ListeNavn')['Listestemmer'].sum()) if 'Listestemmer' in self.df.columns else None
+        parti['PersonligeStemmer'] = parti['ListeNavn'].map(personlige).fillna(0).astype('int64')
+        if listestemmer is not None:
+            parti['Listestemmer'] = parti['ListeNavn'].map(listestemmer).fillna(0).astype('int64')
+        forventet = pd.Series(FORVENTEDE_PARTI_TOTALER.get(self.valgtype, {}), dtype='float64')
+        parti['Forventet'] = parti['ListeNavn'].map(forventet)
+        parti['Afvigelse'] = parti['ListeStemmer'] - parti['Forventet']
+        parti['Afvigelse_pct'] = parti['Afvigelse'] / parti['Forventet'] * 100
+        parti = parti.sort_values('ListeStemmer', ascending=False, kind='stable').reset_index(drop=True)
+
+        self.tabeller = {'område': område, 'række': række, 'national': national, 'parti': parti}
+        return self.tabeller
+
+    def validate(self):
+        """Evaluer alle regler i én gennemgang"""
+        if not self.tabeller:
+            self.build_tables()
+        self.sammenfatning, self.overtrædelser = evaluer_regler(REGLER, self.tabeller, KONSTANTER)
+
+        evalueret = self.sammenfatning[self.sammenfatning['Status'] != 'sprunget over']
+        fejl = evalueret[evalueret['Alvor'] == 'fejl']
+        self.total_checks = len(fejl)
+        self.success_count = int((fejl['Status'] == 'bestået').sum())
+
+        for _, regel in evalueret[evalueret['Status'] != 'bestået'].iterrows():
+            besked = f"{regel['Beskrivelse']}: {regel['Overtrædelser']} af {regel['Rækker']} rækker fejler"
+            (self.errors if regel['Alvor'] == 'fejl' else self.warnings).append(besked)
+        return len(self.errors) == 0
+
+    def print_report(self, top_n=10):
+        """Print regelresultater per afsnit med nationale totaler og top-partier"""
+        for i, (tabel, overskrift) in enumerate(AFSNIT.items(), 1):
+            print("\n" + "="*80)
+            print(f"{i}. {overskrift}")
+            print("="*80)
+
+            if tabel == 'national':
+                self._print_national()
+            elif tabel == 'parti':
+                self._print_partier(top_n)
+            else:
+                print(f"\n📊 Analyserer {len(self.tabeller[tabel])} {'afstemningsområder' if tabel == 'område' else 'datarækker'}...")
+
+            regler = self.sammenfatning[(self.sammenfatning['Tabel'] == tabel) &
+                                        (self.sammenfatning['Status'] != 'sprunget over')]
+            if len(regler):
+                print()
+            for _, regel in regler.iterrows():
+                if regel['Status'] == 'bestået':
+                    print(f"   ✅ {regel['Beskrivelse']}")
+                else:
+                    ikon = '❌' if regel['Alvor'] == 'fejl' else '⚠️ '
+                    print(f"   {ikon} {regel['Beskrivelse']}: {regel['Overtrædelser']} af {regel['Rækker']} rækker")
+                    for besked in self.overtrædelser.loc[self.overtrædelser['Regel'] == regel['Regel'], 'Besked'].head(5):
+                        print(f"      {besked}")
+
+    def _print_national(self):
+        national = self.tabeller['national'].iloc[0]
+        print(f"\n📊 Beregnede nationale totaler ({self.valgtype}):")
+        print(f"   Stemmeberettigede:  {int(national['Stemmeberettigede']):>12,}")
+        print(f"   Afgivne stemmer:    {int(national['AfgivneStemmer']):>12,}")
+        print(f"   Gyldige stemmer:    {int(national['GyldigeStemmer']):>12,}")
+        print(f"   Ugyldige stemmer:   {int(national['UgyldigeStemmer']):>12,}")
+        print(f"   Blanke stemmer:     {int(national['BlankeStemmer']):>12,}")
+        print(f"   Valgdeltagelse:     {national['Valgdeltagelse']:>12.2f}%")
+
+        if not any(k.startswith('Forventet_') for k in national.index):
             print(f"\n   ℹ️  For at validere mod valg.dk: Tilføj officielle værdier til scriptet")
 
-    def validate_parti_totaler(self, top_n=10):
-        """Valider parti-niveau aggregater"""
-        print("\n" + "="*80)
-        print(f"4. TOP {top_n} PARTIER - NATIONALE TOTALER")
-        print("="*80)
-
-        # Dedupliker ListeStemmer per område per parti
-        parti_per_omraade = self.df.groupby(['AfstemningsområdeDagiId', 'ListeNavn'])['ListeStemmer'].first()
-
-        # Summer på tværs af alle områder
-        parti_totaler = parti_per_omraade.groupby('ListeNavn').sum().sort_values(ascending=False)
-
+    def _print_partier(self, top_n):
+        parti = self.tabeller['parti']
         print(f"\n📊 Top {top_n} partier ({self.valgtype}):\n")
-        for i, (parti, stemmer) in enumerate(parti_totaler.head(top_n).items(), 1):
-            print(f"   {i:2d}. {parti:45s} {stemmer:>10,} stemmer")
-
-        # Beregn også fordeling af personlige vs liste-stemmer
-        print(f"\n📊 Personlige vs Listestemmer breakdown:\n")
-
-        personlige_total = self.df.groupby('ListeNavn')['PersonligeStemmer'].sum()
-        listestemmer_dedupe = self.df.groupby(['AfstemningsområdeDagiId', 'ListeNavn'])['Listestemmer'].first()
-        listestemmer_total = listestemmer_dedupe.groupby('ListeNavn').sum()
-
-        for parti in parti_totaler.head(5).index:
-            personlige = personlige_total.get(parti, 0)
-            liste = listestemmer_total.get(parti, 0)
-            total = personlige + liste
-            pct_personlige = (personlige / total * 100) if total > 0 else 0
-
-            print(f"   {parti[:40]:40s}")
-            print(f"      Personlige: {personlige:>10,} ({pct_personlige:5.1f}%)")
-            print(f"      Liste:      {liste:>10,} ({100-pct_personlige:5.1f}%)")
-            print(f"      Total:      {total:>10,}")
-
-        # Sammenlign med forventede værdier hvis tilgængelige
-        forventede_partier = FORVENTEDE_PARTI_TOTALER.get(self.valgtype, {})
-
-        if any(v is not None for v in forventede_partier.values()):
-            print(f"\n📊 Sammenligning med DR/Altinget:")
-
-            for parti, forventet_stemmer in forventede_partier.items():
-                if forventet_stemmer is not None and parti in parti_totaler.index:
-                    vores_stemmer = parti_totaler[parti]
-                    diff = vores_stemmer - forventet_stemmer
-                    pct_diff = (diff / forventet_stemmer * 100) if forventet_stemmer > 0 else 0
-
-                    self._check(
-                        abs(pct_diff) < 0.5,
-                        f"{parti[:35]:35s} matcher (diff: {diff:>7,}, {pct_diff:>6.2f}%)",
-                        f"{parti[:35]:35s} MATCHER IKKE (diff: {diff:>7,}, {pct_diff:>6.2f}%)"
-                    )
-        else:
+        for i, række in enumerate(parti.head(top_n).itertuples(index=False), 1):
+            print(f"   {i:2d}. {række.ListeNavn:45s} {række.ListeStemmer:>10,} stemmer")
+
+        if 'Listestemmer' in parti.columns:
+            print(f"\n📊 Personlige vs Listestemmer breakdown:\n")
+            for række in parti.head(5).itertuples(index=False):
+                total = række.PersonligeStemmer + række.Listestemmer
+                pct_personlige = (række.PersonligeStemmer / total * 100) if total > 0 else 0
+                print(f"   {række.ListeNavn[:40]:40s}")
+                print(f"      Personlige: {række.PersonligeStemmer:>10,} ({pct_personlige:5.1f}%)")
+                print(f"      Liste:      {række.Listestemmer:>10,} ({100-pct_personlige:5.1f}%)")
+                print(f"      Total:      {total:>10,}")
+
+        if parti['Forventet'].isna().all():
             print(f"\n   ℹ️  For at validere mod DR/Altinget: Tilføj forventede værdier til scriptet")
 
     def print_summary(self):
@@ -364,28 +331,44 @@ class AggregateValidator:
 
         print(f"\n{'='*80}\n")
 
-def main():
+def valider(valgtype, output_dir='excel_output'):
+    """Byg tabeller og evaluer regler for én valgtype (køres i egen tråd)"""
+    validator = AggregateValidator(valgtype, output_dir)
+    validator.validate()
+    return validator
+
+
+def main(output_dir='excel_output'):
     print("="*80)
     print("AGGREGATE-NIVEAU VALIDERING AF VALGDATA")
     print("="*80)
 
-    # Valider kommunalvalg
-    print("\n🏛️  KOMMUNALVALG\n")
-    validator_kommunal = AggregateValidator('KOMMUNAL')
-    validator_kommunal.validate_stemme_balance()
-    validator_kommunal.validate_data_quality()
-    validator_kommunal.validate_nationale_totaler()
-    validator_kommunal.validate_parti_totaler(top_n=10)
-    validator_kommunal.print_summary()
-
-    # Valider regionsrådsvalg
-    print("\n🏛️  REGIONSRÅDSVALG\n")
-    validator_regional = AggregateValidator('REGIONAL')
-    validator_regional.validate_stemme_balance()
-    validator_regional.validate_data_quality()
-    validator_regional.validate_nationale_totaler()
-    validator_regional.validate_parti_totaler(top_n=10)
-    validator_regional.print_summary()
+    # KOMMUNAL og REGIONAL er uafhængige - valider parallelt, rapportér i rækkefølge
+    valgtyper = [('KOMMUNAL', 'KOMMUNALVALG'), ('REGIONAL', 'REGIONSRÅDSVALG')]
+    with ThreadPoolExecutor(max_workers=len(valgtyper)) as pool:
+        futures = [pool.submit(valider, valgtype, output_dir) for valgtype, _ in valgtyper]
+        validatorer = [future.result() for future in futures]
+
+    for (_, overskrift), validator in zip(valgtyper, validatorer):
+        print(f"\n🏛️  {overskrift}\n")
+        validator.print_report(top_n=10)
+        validator.print_summary()
+
+    # Alle overtrædelser som én tabel i findings-lageret
+    from findings_store import FindingsStore
+
+    regler = pd.concat([v.sammenfatning.assign(Valgtype=v.valgtype) for v in validatorer], ignore_index=True)
+    overtrædelser = pd.concat([v.overtrædelser.assign(Valgtype=v.valgtype) for v in validatorer], ignore_index=True)
+    FindingsStore(output_dir).publish('Validering_aggregater', {'Regler': regler, 'Overtrædelser': overtrædelser})
+
+    return all(not v.errors for v in validatorer)
 
 if __name__ == '__main__':
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Valider aggregater og intern konsistens')
+    parser.add_argument('--output-dir', default='excel_output',
+                       help='Output directory (default: excel_output)')
+
+    args = parser.parse_args()
+    main(args.output_dir)
@@ -7,6 +7,8 @@ Sikrer at beregninger giver realistiske resultater
 import pandas as pd
 from pathlib import Path
 import sys
+from datastore import DataStore
+from valideringsregler import Regel, evaluer_regler
 
 class ValidationError(Exception):
     """Exception raised when validation fails"""
@@ -18,25 +20,71 @@ class DataValidator:
     # Realistiske grænser for Danmark (kommunal + regional combined)
     MAX_TOTAL_VOTES = 15_000_000  # Max ~15 mio stemmer (begge valg, listestemmer + personlige)
     MAX_VOTES_PER_PARTY = 3_000_000  # Max stemmer til ét parti (begge valg)
+    MAX_VOTES_PER_CANDIDATE_AVG = 10_000  # Stemmer per kandidat over dette er usædvanligt
     MAX_PERSONAL_VOTES_CANDIDATE = 100_000  # Max personlige stemmer til én kandidat
     MIN_TURNOUT = 40.0  # Min valgdeltagelse %
     MAX_TURNOUT = 100.0  # Max valgdeltagelse %
+    MIN_AVG_TURNOUT = 50.0  # Gennemsnitlig valgdeltagelse under dette er lav
     MAX_CANDIDATES = 15_000  # Max antal kandidater
-
-    def __init__(self, output_dir='excel_output'):
+    MIN_CANDIDATES = 1_000  # Færre kandidater end dette virker lavt
+
+    # Tjek som regler over partistatistik og én-rækkes oversigter (se valideringsregler.py)
+    REGLER = [
+        Regel('total_stemmer', 'generel', '~(TotalStemmer > MAX_TOTAL_VOTES)',
+              'Total stemmer under max',
+              'Total stemmer ({r[TotalStemmer]:,}) overstiger max ({MAX_TOTAL_VOTES:,}). '
+              'Sandsynligvis overtælling af listestemmer!'),
+        Regel('stemmer_per_parti', 'partistatistik', '~(`Totale Stemmer` > MAX_VOTES_PER_PARTY)',
+              'Stemmer per parti under max',
+              '{r[Parti]} har {r[Totale Stemmer]:,} stemmer - over max ({MAX_VOTES_PER_PARTY:,})'),
+        Regel('stemmer_per_kandidat', 'partistatistik', '~(`Stemmer per Kandidat` > MAX_VOTES_PER_CANDIDATE_AVG)',
+              'Stemmer per kandidat realistisk',
+              '{r[Parti]} har {r[Stemmer per Kandidat]:,.0f} stemmer/kandidat - usædvanligt højt', alvor='advarsel'),
+        Regel('top_kandidat', 'generel', '~(TopStemmer > MAX_PERSONAL_VOTES_CANDIDATE)',
+              'Top kandidat under max',
+              'Top kandidat {r[TopNavn]} har {r[TopStemmer]:,} personlige stemmer - '
+              'over max ({MAX_PERSONAL_VOTES_CANDIDATE:,})'),
+        Regel('stemmeslugere_sorteret', 'generel', 'StemmeslugereSorteret',
+              'Stemmeslugere er sorteret', 'Stemmeslugere er ikke sorteret korrekt', alvor='advarsel'),
+        Regel('valgdeltagelse_min', 'generel', '~(MinValgdeltagelse < MIN_TURNOUT)',
+              'Laveste valgdeltagelse realistisk',
+              'Laveste valgdeltagelse ({r[MinValgdeltagelse]:.1f}%) er usædvanligt lav', alvor='advarsel'),
+        Regel('valgdeltagelse_max', 'generel', '~(MaxValgdeltagelse > MAX_TURNOUT)',
+              'Højeste valgdeltagelse under 100%',
+              'Højeste valgdeltagelse ({r[MaxValgdeltagelse]:.1f}%) over 100%!'),
+        Regel('valgdeltagelse_snit', 'generel', '~(SnitValgdeltagelse < MIN_AVG_TURNOUT)',
+              'Gennemsnitlig valgdeltagelse realistisk',
+              'Gennemsnitlig valgdeltagelse ({r[SnitValgdeltagelse]:.1f}%) er lav', alvor='advarsel'),
+        Regel('kandidater_max', 'kandidater', '~(AntalKandidater > MAX_CANDIDATES)',
+              'Antal kandidater under max',
+              'Antal kandidater ({r[AntalKandidater]:,}) virker højt', alvor='advarsel'),
+        Regel('kandidater_min', 'kandidater', '~(AntalKandidater < MIN_CANDIDATES)',
+              'Antal kandidater over min',
+              'Antal kandidater ({r[AntalKandidater]:,}) virker lavt', alvor='advarsel'),
+    ]
+
+    def __init__(self, output_dir='excel_output', store=None):
         self.output_dir = Path(output_dir)
+        self.store = store if store is not None else DataStore(output_dir)
         self.errors = []
         self.warnings = []
 
+    def konstanter(self):
+        """Grænseværdierne (klasse-konstanterne) som regel-konstanter"""
+        return {k: getattr(self, k) for k in dir(self) if k.startswith(('MAX_', 'MIN_'))}
+
     def validate_all(self):
         """Kør alle valideringer"""
         print("🔍 Validerer data...")
 
         try:
-            self.validate_partistatistik()
-            self.validate_stemmeslugere()
-            self.validate_valgdeltagelse()
-            self.validate_kandidat_antal()
+            tabeller = {}
+            tabeller.update(self.build_generel_tables())
+            tabeller.update(self.build_kandidat_table())
+
+            sammenfatning, overtrædelser = evaluer_regler(self.REGLER, tabeller, self.konstanter())
+            self.errors.extend(overtrædelser.loc[overtrædelser['Alvor'] == 'fejl', 'Besked'])
+            self.warnings.extend(overtrædelser.loc[overtrædelser['Alvor'] == 'advarsel', 'Besked'])
 
             if self.errors:
                 print("\n❌ VALIDERINGSFEJL FUNDET:")
@@ -59,147 +107,59 @@ class DataValidator:
             print(f"❌ Uventet fejl under validering: {e}")
             return False
 
-    def validate_partistatistik(self):
-        """Valider partistatistik - tjek for overtællinger"""
+    def build_generel_tables(self):
+        """Partistatistik + én-rækkes oversigt (stemmeslugere, valgdeltagelse) fra findings-lageret"""
         print("  • Validerer partistatistik...")
 
-        # Find fil
-        fil = self.output_dir / '00_START_HER' / 'Analyse_generel.xlsx'
-        if not fil.exists():
-            self.errors.append(f"Mangler fil: {fil}")
-            return
-
-        df = pd.read_excel(fil, sheet_name='Partistatistik')
-
-        # Check totale stemmer
-        total_stemmer = df['Totale Stemmer'].sum()
-        if total_stemmer > self.MAX_TOTAL_VOTES:
-            self.errors.append(
-                f"Total stemmer ({total_stemmer:,}) overstiger max ({self.MAX_TOTAL_VOTES:,}). "
-                f"Sandsynligvis overtælling af listestemmer!"
-            )
-
-        # Check individuelle partier
-        for _, row in df.iterrows():
-            parti = row['Parti']
-            stemmer = row['Totale Stemmer']
-            if stemmer > self.MAX_VOTES_PER_PARTY:
-                self.errors.append(
-                    f"{parti} har {stemmer:,} stemmer - over max ({self.MAX_VOTES_PER_PARTY:,})"
-                )
-
-        # Check stemmer per kandidat (skal være realistisk)
-        for _, row in df.iterrows():
-            parti = row['Parti']
-            spm_kand = row['Stemmer per Kandidat']
-            if spm_kand > 10_000:
-                self.warnings.append(
-                    f"{parti} har {spm_kand:,.0f} stemmer/kandidat - usædvanligt højt"
-                )
+        # Resultattabeller fra findings-lageret
+        if not self.store.findings.has('Analyse_generel'):
+            self.errors.append(f"Mangler fil: {self.store.findings.excel_file('Analyse_generel')}")
+            return {}
 
+        partistatistik = self.store.findings.get('Analyse_generel', 'Partistatistik')
+        total_stemmer = partistatistik['Totale Stemmer'].sum()
         print(f"    ✓ Total stemmer: {total_stemmer:,}")
 
-    def validate_stemmeslugere(self):
-        """Valider top stemmeslugere"""
         print("  • Validerer stemmeslugere...")
-
-        fil = self.output_dir / '00_START_HER' / 'Analyse_generel.xlsx'
-        if not fil.exists():
-            return
-
-        df = pd.read_excel(fil, sheet_name='Top 100 Stemmeslugere')
-
-        # Check top kandidat
-        top_stemmer = df.iloc[0]['Personlige Stemmer']
-        top_navn = df.iloc[0]['Navn']
-
-        if top_stemmer > self.MAX_PERSONAL_VOTES_CANDIDATE:
-            self.errors.append(
-                f"Top kandidat {top_navn} har {top_stemmer:,} personlige stemmer - "
-                f"over max ({self.MAX_PERSONAL_VOTES_CANDIDATE:,})"
-            )
-
-        # Check at personlige stemmer falder (er sorteret)
-        if not df['Personlige Stemmer'].is_monotonic_decreasing:
-            self.warnings.append("Stemmeslugere er ikke sorteret korrekt")
-
+        stemmeslugere = self.store.findings.get('Analyse_generel', 'Top 100 Stemmeslugere')
+        top_stemmer = stemmeslugere.iloc[0]['Personlige Stemmer']
+        top_navn = stemmeslugere.iloc[0]['Navn']
         print(f"    ✓ Top stemmemodtager: {top_navn} med {top_stemmer:,} stemmer")
 
-    def validate_valgdeltagelse(self):
-        """Valider valgdeltagelse procenter"""
         print("  • Validerer valgdeltagelse...")
-
-        fil = self.output_dir / '00_START_HER' / 'Analyse_generel.xlsx'
-        if not fil.exists():
-            return
-
-        df = pd.read_excel(fil, sheet_name='Valgdeltagelse')
-
-        # Check procenter er realistiske
-        min_pct = df['Valgdeltagelse %'].min()
-        max_pct = df['Valgdeltagelse %'].max()
-        avg_pct = df['Valgdeltagelse %'].mean()
-
-        if min_pct < self.MIN_TURNOUT:
-            self.warnings.append(
-                f"Laveste valgdeltagelse ({min_pct:.1f}%) er usædvanligt lav"
-            )
-
-        if max_pct > self.MAX_TURNOUT:
-            self.errors.append(
-                f"Højeste valgdeltagelse ({max_pct:.1f}%) over 100%!"
-            )
-
-        if avg_pct < 50.0:
-            self.warnings.append(
-                f"Gennemsnitlig valgdeltagelse ({avg_pct:.1f}%) er lav"
-            )
-
+        valgdeltagelse = self.store.findings.get('Analyse_generel', 'Valgdeltagelse')['Valgdeltagelse %']
+        min_pct, max_pct, avg_pct = valgdeltagelse.min(), valgdeltagelse.max(), valgdeltagelse.mean()
         print(f"    ✓ Valgdeltagelse: {min_pct:.1f}% - {max_pct:.1f}% (snit: {avg_pct:.1f}%)")
 
-    def validate_kandidat_antal(self):
-        """Valider antal kandidater"""
+        generel = pd.DataFrame([{
+            'TotalStemmer': total_stemmer,
+            'TopNavn': top_navn,
+            'TopStemmer': top_stemmer,
+            'StemmeslugereSorteret': stemmeslugere['Personlige Stemmer'].is_monotonic_decreasing,
+            'MinValgdeltagelse': min_pct,
+            'MaxValgdeltagelse': max_pct,
+            'SnitValgdeltagelse': avg_pct,
+        }])
+        return {'partistatistik': partistatistik, 'generel': generel}
+
+    def build_kandidat_table(self):
+        """Én-rækkes tabel med antal kandidater"""
         print("  • Validerer kandidat-antal...")
 
-        # Find kandidat-fil
-        samlet_dir = self.output_dir / '03_Samlet_Alle_Valg'
-        parquet_dir = self.output_dir / 'parquet'
-
-        kandidat_fil = None
-        for p in [parquet_dir / 'kandidater_ALLE_VALG_*.parquet',
-                  samlet_dir / 'kandidater_ALLE_VALG_*.xlsx']:
-            files = list(Path(p.parent).glob(p.name))
-            if files:
-                kandidat_fil = files[0]
-                break
-
-        if not kandidat_fil:
+        # Find kandidat-fil (nyeste, Parquet først)
+        if not self.store.find_file('kandidater'):
             self.warnings.append("Kunne ikke finde kandidat-fil til validering")
-            return
-
-        # Læs kandidater
-        if kandidat_fil.suffix == '.parquet':
-            df = pd.read_parquet(kandidat_fil)
-        else:
-            df = pd.read_excel(kandidat_fil)
-
-        antal_kandidater = len(df)
-
-        if antal_kandidater > self.MAX_CANDIDATES:
-            self.warnings.append(
-                f"Antal kandidater ({antal_kandidater:,}) virker højt"
-            )
-
-        if antal_kandidater < 1000:
-            self.warnings.append(
-                f"Antal kandidater ({antal_kandidater:,}) virker lavt"
-            )
+            return {}
 
+        # Læs kandidater (kun én kolonne er nødvendig for at tælle)
+        antal_kandidater = len(self.store.get('kandidater', columns=['KandidatId']))
         print(f"    ✓ Antal kandidater: {antal_kandidater:,}")
 
-def main(output_dir='excel_output'):
+        return {'kandidater': pd.DataFrame({'AntalKandidater': [antal_kandidater]})}
+
+def main(output_dir='excel_output', store=None):
     """Kør validering - main funktion til brug i pipeline"""
-    validator = DataValidator(output_dir)
+    validator = DataValidator(output_dir, store)
     success = validator.validate_all()
     return success
 
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Deklarativ regelmotor til validering af valgdata
+
+En regel er et vektoriseret pandas-udtryk over én af de delte, forudberegnede
+tabeller (fx områder, partier, rækker eller en én-rækkes oversigt). Udtrykket
+skal være sandt for gyldige rækker:
+
+    Regel('gyldige_balance', 'område', 'abs(Difference_Gyldige) < 1',
+          'GyldigeStemmer = sum af parti-stemmer')
+
+Alle regler evalueres samlet med evaluer_regler(), som returnerer en
+sammenfatning per regel og en tabel med alle rækker der overtræder en regel.
+Konstanter (grænseværdier) kan bruges ved navn i både udtryk og beskeder.
+"""
+
+import pandas as pd
+from pandas.errors import UndefinedVariableError
+
+
+class Regel:
+    """Én valideringsregel: udtryk over en tabel, sandt for gyldige rækker"""
+
+    def __init__(self, navn, tabel, udtryk, beskrivelse, besked=None, alvor='fejl'):
+        """
+        Args:
+            navn: Kort id for reglen
+            tabel: Navn på tabellen reglen evalueres over
+            udtryk: pandas eval-udtryk (kolonner med mellemrum i `backticks`)
+            beskrivelse: Hvad reglen tjekker (vises ved bestået/fejlet)
+            besked: Format-streng per overtrædelse; rækken er `r`, konstanter ved
+                navn (fx '{r[Parti]} har {r[Totale Stemmer]:,} stemmer')
+            alvor: 'fejl' eller 'advarsel'
+        """
+        self.navn = navn
+        self.tabel = tabel
+        self.udtryk = udtryk
+        self.beskrivelse = beskrivelse
+        self.besked = besked or beskrivelse
+        self.alvor = alvor
+
+
+def evaluer_regler(regler, tabeller, konstanter=None):
+    """
+    Evaluer alle regler mod de forudberegnede tabeller.
+
+    Regler hvis tabel mangler, eller som refererer kolonner tabellen ikke har,
+    springes over (Status 'sprunget over').
+
+    Returns:
+        (sammenfatning, overtrædelser) - sammenfatning har én række per regel
+        (Regel, Tabel, Alvor, Beskrivelse, Rækker, Overtrædelser, Status);
+        overtrædelser har én række per overtrædende tabelrække
+        (Regel, Tabel, Alvor, Række, Besked)
+    """
+    konstanter = konstanter or {}
+    sammenfatning = []
+    overtrædelser = []
+
+    for regel in regler:
+        tabel = tabeller.get(regel.tabel)
+        status, antal_rækker, antal_fejl = 'sprunget over', 0, 0
+
+        if tabel is not None:
+            try:
+                gyldig = tabel.eval(regel.udtryk, engine='python', resolvers=(konstanter,))
+            except UndefinedVariableError:
+                gyldig = None
+
+            if gyldig is not None:
+                gyldig = pd.Series(gyldig, index=tabel.index).fillna(False).astype(bool)
+                fejl = tabel[~gyldig.to_numpy()]
+                antal_rækker, antal_fejl = len(tabel), len(fejl)
+                status = 'bestået' if antal_fejl == 0 else regel.alvor
+
+                for række, r in zip(fejl.index, fejl.to_dict('records')):
+                    overtrædelser.append({
+                        'Regel': regel.navn,
+                        'Tabel': regel.tabel,
+                        'Alvor': regel.alvor,
+                        'Række': række,
+                        'Besked': regel.besked.format(r=r, **konstanter),
+                    })
+
+        sammenfatning.append({
+            'Regel': regel.navn,
+            'Tabel': regel.tabel,
+            'Alvor': regel.alvor,
+            'Beskrivelse': regel.beskrivelse,
+            'Rækker': antal_rækker,
+            'Overtrædelser': antal_fejl,
+            'Status': status,
+        })
+
+    return (pd.DataFrame(sammenfatning),
+            pd.DataFrame(overtrædelser, columns=['Regel', 'Tabel', 'Alvor', 'Række', 'Besked']))